@@ -1,34 +1,65 @@
 # apps/orders/api_views.py
 
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 import inspect
 
-from rest_framework import generics
+from rest_framework import generics, status
 from rest_framework.exceptions import ValidationError
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from config.orgs.org_context import get_request_org
-from config.orgs.permissions import IsOrgMemberReadOnlyOrOrgAdmin
+from config.orgs.permissions import IsOrgMemberReadOnlyOrOrgAdminFromToken
 
+from .filters import ORDER_LIST_FIELDS, filter_orders, order_fields, order_sort
 from .logic.cancel_draft_order import cancel_draft_order
 from .logic.cancel_order import cancel_order
+from .logic.export import CONTENT_TYPES, EXPORT_FORMATS, export_records, render_export
 from .logic.pay_order import pay_order
+from .logic.reservations import reservations_enabled, reserve_items
 from .models import Order, OrderItem, OrderStatusEvent
 from .serializers import (
+    OrderItemBulkCreateSerializer,
     OrderItemCreateSerializer,
     OrderItemSerializer,
+    OrderListSerializer,
     OrderSerializer,
     OrderStatusEventSerializer,
 )
 
 
 class OrderListCreateApi(generics.ListCreateAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
-    serializer_class = OrderSerializer
+    """
+    GET — фильтры/сортировка/fields= из apps/orders/filters.py, keyset-страницы.
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
 
     def get_queryset(self):
         org = get_request_org(self.request)
-        return Order.objects.filter(org=org).order_by("id")
+        queryset = Order.objects.filter(org=org)
+        if self.request.method != "GET":
+            return queryset.order_by("id")
+
+        params = self.request.query_params
+        sort = order_sort(params)
+        queryset = filter_orders(queryset, params).order_by(sort)
+        # id — ключ keyset, status читает Order.__init__, sort — ключ курсора
+        fields = order_fields(params) or ORDER_LIST_FIELDS
+        return queryset.only("id", "status", sort.lstrip("-"), *fields)
+
+    def get_serializer_class(self):
+        if self.request.method == "GET":
+            return OrderListSerializer
+        return OrderSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == "GET":
+            kwargs.setdefault("fields", order_fields(self.request.query_params))
+        return super().get_serializer(*args, **kwargs)
 
     def perform_create(self, serializer):
         org = get_request_org(self.request)
@@ -36,7 +67,7 @@ class OrderListCreateApi(generics.ListCreateAPIView):
 
 
 class OrderItemListApi(generics.ListAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = OrderItemSerializer
 
     def get_queryset(self):
@@ -49,11 +80,14 @@ class OrderItemListApi(generics.ListAPIView):
 
 
 class OrderItemListCreateApi(generics.ListCreateAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
 
     def get_order(self):
-        org = get_request_org(self.request)
-        return get_object_or_404(Order, org=org, public_id=self.kwargs["order_public_id"])
+        # get_queryset и perform_create работают с одним и тем же заказом — грузим его один раз
+        if getattr(self, "_order", None) is None:
+            org = get_request_org(self.request)
+            self._order = get_object_or_404(Order, org=org, public_id=self.kwargs["order_public_id"])
+        return self._order
 
     def get_queryset(self):
         order = self.get_order()
@@ -70,14 +104,80 @@ class OrderItemListCreateApi(generics.ListCreateAPIView):
         if order.status != Order.STATUS_DRAFT:
             raise ValidationError({"order": "Cannot modify items for non-draft order."})
 
-        serializer.save(order=order)
+        with transaction.atomic():
+            item = serializer.save(order=order)
+
+            # инкрементально: + одна позиция, без перечитывания всех строк заказа
+            if not order.apply_item_to_totals(item):
+                raise ValidationError({"order": "Cannot modify items for non-draft order."})
+
+            if reservations_enabled():
+                reserve_items(order=order, items=[item])
+
+
+class OrderItemBulkCreateApi(generics.GenericAPIView):
+    """
+    POST /api/v1/orders/<order_public_id>/items/bulk/
+    Пачка позиций за один запрос: всё или ничего.
+    - справочники резолвятся тремя запросами на всю пачку (см. OrderItemBulkCreateSerializer)
+    - вставка одним bulk_create, итоги пересчитываются один раз
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
+    serializer_class = OrderItemBulkCreateSerializer
+
+    def post(self, request, *args, **kwargs):
+        org = get_request_org(request)
+        order = get_object_or_404(Order, org=org, public_id=self.kwargs["order_public_id"])
+
+        if order.status != Order.STATUS_DRAFT:
+            raise ValidationError({"order": "Cannot modify items for non-draft order."})
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # lock: статус не должен смениться между проверкой и пересчётом итогов
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if order.status != Order.STATUS_DRAFT:
+                raise ValidationError({"order": "Cannot modify items for non-draft order."})
+
+            items = OrderItem.objects.bulk_create(serializer.build_items(order=order))
+            order.recompute_totals(save=True)
+
+            if reservations_enabled():
+                reserve_items(order=order, items=items)
+
+        return Response({"items": OrderItemSerializer(items, many=True).data}, status=status.HTTP_201_CREATED)
 
-        order.recompute_totals()
-        order.save(update_fields=["subtotal", "tax_total", "total", "updated_at"])
+
+class OrderItemDetailApi(generics.DestroyAPIView):
+    """
+    DELETE /api/v1/orders/<order_public_id>/items/<public_id>/
+    Удаление позиции из draft-заказа (итоги уменьшаются инкрементально).
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
+    lookup_field = "public_id"
+    lookup_url_kwarg = "public_id"
+
+    def get_queryset(self):
+        org = get_request_org(self.request)
+        return OrderItem.objects.select_related("order", "tax_rate").filter(
+            order__org=org,
+            order__public_id=self.kwargs["order_public_id"],
+        )
+
+    def perform_destroy(self, instance):
+        if instance.order.status != Order.STATUS_DRAFT:
+            raise ValidationError({"order": "Cannot modify items for non-draft order."})
+
+        with transaction.atomic():
+            instance.delete()
+            if not instance.order.apply_item_to_totals(instance, sign=-1):
+                raise ValidationError({"order": "Cannot modify items for non-draft order."})
 
 
 class OrderDetailApi(generics.RetrieveUpdateAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = OrderSerializer
     lookup_field = "public_id"
     lookup_url_kwarg = "public_id"
@@ -125,7 +225,7 @@ class OrderDetailApi(generics.RetrieveUpdateAPIView):
         serializer.save()
 
 class OrderStatusEventListApi(generics.ListAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = OrderStatusEventSerializer
 
     def get_queryset(self):
@@ -141,3 +241,36 @@ class OrderStatusEventListApi(generics.ListAPIView):
             .select_related("actor", "order")
             .order_by("-created_at", "-id")
         )
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """
+    ?format= у выгрузки — формат файла, а не выбор DRF-рендерера: ошибки всегда отдаём первым (JSON).
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class OrderExportApi(APIView):
+    """
+    GET /api/v1/orders/export/?format=csv|jsonl  (+ фильтры списка: status, created_after, ...)
+    Потоковая выгрузка заказов с позициями и платежами (apps/orders/logic/export.py).
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request):
+        fmt = request.query_params.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError({"format": [f"Expected one of: {', '.join(EXPORT_FORMATS)}."]})
+
+        org = get_request_org(request)
+        orders = filter_orders(Order.objects.filter(org=org), request.query_params)
+
+        response = StreamingHttpResponse(
+            render_export(export_records(orders), fmt=fmt),
+            content_type=CONTENT_TYPES[fmt],
+        )
+        response["Content-Disposition"] = f'attachment; filename="orders-{org.public_id}.{fmt}"'
+        return response
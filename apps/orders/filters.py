@@ -0,0 +1,104 @@
+# apps/orders/filters.py
+"""
+Серверные фильтры, сортировка и sparse fieldsets списка заказов (GET /api/v1/orders/).
+
+    ?status=draft,paid
+    ?created_after=2026-01-01T00:00:00Z&created_before=2026-02-01T00:00:00Z   # [after, before)
+    ?total_min=10&total_max=100                                                # включительно
+    ?has_payments=true|false
+    ?sort=-created_at          # ORDER_SORT_KEYS, pk — tiebreak (KeysetPagination)
+    ?fields=status,total       # ORDER_LIST_FIELDS, public_id отдаётся всегда
+
+Каждая комбинация фильтров и сортировки обслуживается индексом с ведущим org
+(Order.Meta.indexes, has_payments — payment_org_order_idx; проверка — tests/test_order_list_filters.py, EXPLAIN без Seq Scan).
+"""
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Order
+from .serializers import OrderListSerializer
+
+ORDER_SORT_KEYS = ("id", "created_at", "total")
+
+ORDER_LIST_FIELDS = tuple(OrderListSerializer.Meta.fields)
+
+_TRUE = {"1", "true", "yes"}
+_FALSE = {"0", "false", "no"}
+
+
+def filter_orders(queryset, params):
+    """
+    Фильтры из query params. Неизвестные значения — 400, а не молча полный список.
+    """
+    errors = {}
+
+    if params.get("status"):
+        statuses = [s.strip() for s in params["status"].split(",") if s.strip()]
+        allowed = {value for value, _ in Order.STATUS_CHOICES}
+        if not statuses or not set(statuses) <= allowed:
+            errors["status"] = [f"Expected a comma-separated list of: {', '.join(sorted(allowed))}."]
+        else:
+            queryset = queryset.filter(status__in=statuses)
+
+    for param, lookup in (("created_after", "created_at__gte"), ("created_before", "created_at__lt")):
+        if params.get(param):
+            value = parse_datetime(params[param])
+            if value is None:
+                errors[param] = ["Expected an ISO 8601 datetime."]
+            else:
+                queryset = queryset.filter(**{lookup: value})
+
+    for param, lookup in (("total_min", "total__gte"), ("total_max", "total__lte")):
+        if params.get(param):
+            try:
+                value = Decimal(params[param])
+            except InvalidOperation:
+                value = None
+            if value is None or not value.is_finite():
+                errors[param] = ["Expected a decimal number."]
+            else:
+                queryset = queryset.filter(**{lookup: value})
+
+    if params.get("has_payments"):
+        flag = params["has_payments"].lower()
+        if flag not in _TRUE | _FALSE:
+            errors["has_payments"] = ["Expected true or false."]
+        else:
+            # без импорта payments: orders от него не зависит
+            payments = apps.get_model("payments", "OrderPayment").objects.filter(
+                org=OuterRef("org"), order=OuterRef("pk")
+            )
+            exists = Exists(payments)
+            queryset = queryset.filter(exists if flag in _TRUE else ~exists)
+
+    if errors:
+        raise ValidationError(errors)
+    return queryset
+
+
+def order_sort(params) -> str:
+    sort = params.get("sort") or "id"
+    if sort.lstrip("-") not in ORDER_SORT_KEYS:
+        raise ValidationError(
+            {"sort": [f"Expected one of: {', '.join(ORDER_SORT_KEYS)} (prefix '-' for descending)."]}
+        )
+    return sort
+
+
+def order_fields(params) -> list[str] | None:
+    """
+    Поля sparse fieldset (None — все ORDER_LIST_FIELDS).
+    """
+    if not params.get("fields"):
+        return None
+    fields = [f.strip() for f in params["fields"].split(",") if f.strip()]
+    unknown = [f for f in fields if f not in ORDER_LIST_FIELDS]
+    if not fields or unknown:
+        raise ValidationError({"fields": [f"Expected a comma-separated list of: {', '.join(ORDER_LIST_FIELDS)}."]})
+    return ["public_id", *(f for f in fields if f != "public_id")]
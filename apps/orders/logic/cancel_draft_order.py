@@ -3,6 +3,7 @@ from __future__ import annotations
 from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
+from apps.orders.logic.reservations import release_reservations, reservations_enabled
 from apps.orders.models import Order
 
 
@@ -15,6 +16,7 @@ def cancel_draft_order(*, order: Order, actor=None) -> Order:
     - повторная отмена запрещена
     - защищаемся от гонок: lock order row (select_for_update) внутри transaction.atomic
     - Пишем историю статусов (OrderStatusEvent)
+    - Снимаем резервы склада заказа (если STOCK_RESERVATIONS включены)
     """
 
     with transaction.atomic():
@@ -25,6 +27,10 @@ def cancel_draft_order(*, order: Order, actor=None) -> Order:
         if order.status != Order.STATUS_DRAFT:
             raise ValidationError({"status": ["Only draft orders can be cancelled."]})
 
+        # резервы черновика больше не нужны — остаток снова доступен к продаже
+        if reservations_enabled():
+            release_reservations(order)
+
         old_status = order.status
         
         order.status = Order.STATUS_CANCELLED
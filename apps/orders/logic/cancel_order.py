@@ -1,13 +1,23 @@
 from __future__ import annotations
 
-from decimal import Decimal
-
 from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
+from apps.orders.logic.stock import (
+    apply_stock_deltas,
+    lock_products_stock,
+    put_to_shards,
+    qty_by_product,
+    retry_on_lock_conflict,
+    schedule_stock_cache_refresh,
+    split_by_stock_mode,
+)
 from apps.orders.models import Order
+from apps.products.models import StockMovement
+from apps.products.stock_ledger import record_stock_movements
 
 
+@retry_on_lock_conflict
 def cancel_order(*, order: Order, actor=None) -> Order:
     """
     Use-case: отмена ОПЛАЧЕННОГО заказа (paid -> cancelled) + возврат склада.
@@ -34,31 +44,26 @@ def cancel_order(*, order: Order, actor=None) -> Order:
         if locked_order.status != Order.STATUS_PAID:
             raise ValidationError({"status": ["Only paid orders can be cancelled."]})
 
-        items_qs = locked_order.items.select_related("product").all()
-        if not items_qs.exists():
+        qty_by_product_id = qty_by_product(locked_order)
+        if not qty_by_product_id:
             raise ValidationError({"order": "Cannot cancel order without items."})
+        qty_by_product_id.pop(None, None)
 
-        qty_by_product_id: dict[int, Decimal] = {}
-        for item in items_qs:
-            pid = item.product_id
-            item_qty = item.qty if isinstance(item.qty, Decimal) else Decimal(str(item.qty))
-            qty_by_product_id[pid] = qty_by_product_id.get(pid, Decimal("0")) + item_qty
+        plain_ids, sharded_ids = split_by_stock_mode(qty_by_product_id)
+        locked_ids = lock_products_stock(plain_ids).keys()
+        sharded_ids += [pid for pid in plain_ids if pid not in locked_ids]
 
-        from apps.products.models import Product
+        apply_stock_deltas({pid: qty_by_product_id[pid] for pid in locked_ids})
+        for pid in sorted(sharded_ids):
+            put_to_shards(pid, qty_by_product_id[pid])
+        schedule_stock_cache_refresh(sharded_ids)
 
-        locked_products = Product.objects.select_for_update().filter(
-            id__in=list(qty_by_product_id.keys())
+        record_stock_movements(
+            org=locked_order.org,
+            deltas=qty_by_product_id,
+            reason=StockMovement.REASON_SALE_CANCEL,
+            order=locked_order,
         )
-        products_map = {p.id: p for p in locked_products}
-
-        for pid, total_qty in qty_by_product_id.items():
-            p = products_map[pid]
-            p.stock_qty = p.stock_qty + total_qty
-
-            fields = ["stock_qty"]
-            if "updated_at" in [f.name for f in p._meta.fields]:
-                fields.append("updated_at")
-            p.save(update_fields=fields)
 
         old_status = locked_order.status
         
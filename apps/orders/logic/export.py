@@ -0,0 +1,135 @@
+# apps/orders/logic/export.py
+"""
+Выгрузка заказов для бухгалтерии: заказ, его позиции и платежи — плоскими записями CSV/JSONL.
+
+- заказы читаются server-side курсором (.iterator(chunk_size)): в памяти одна пачка, а не вся org;
+- позиции и платежи подтягиваются prefetch'ем на пачку — два запроса order_id IN (...) на chunk_size заказов;
+- вывод — генератор строк (для StreamingHttpResponse / файла), буфер сбрасывается каждые FLUSH_ROWS записей.
+
+Порядок записей: заказ, затем его позиции, затем его платежи (record = order | item | payment).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+from django.apps import apps
+from django.db.models import Prefetch
+
+from apps.orders.models import OrderItem
+
+EXPORT_FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+DEFAULT_CHUNK_SIZE = 2000
+FLUSH_ROWS = 500
+
+ORDER_FIELDS = (
+    "status", "subtotal", "tax_total", "total", "captured_total", "refunded_total", "created_at", "updated_at",
+)
+ITEM_FIELDS = ("product_name", "qty", "unit_price", "created_at")
+PAYMENT_FIELDS = ("tender", "status", "amount", "currency", "provider", "external_id", "created_at")
+
+EXPORT_COLUMNS = (
+    "record",
+    "order_id",
+    "id",
+    *ORDER_FIELDS,
+    "product_name",
+    "qty",
+    "unit",
+    "unit_price",
+    "tax_rate",
+    "tender",
+    "amount",
+    "currency",
+    "provider",
+    "external_id",
+)
+
+
+def _value(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def export_records(orders, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Записи выгрузки по queryset'у заказов (уже ограниченному org и фильтрами), в порядке id.
+    """
+    payment_model = apps.get_model("payments", "OrderPayment")
+    queryset = (
+        orders.order_by("id")
+        .only("id", "public_id", *ORDER_FIELDS)
+        .prefetch_related(
+            Prefetch(
+                "items",
+                queryset=OrderItem.objects.select_related("unit", "tax_rate")
+                .only("order", "public_id", *ITEM_FIELDS, "unit__name", "tax_rate__rate")
+                .order_by("id"),
+            ),
+            Prefetch(
+                "payments",
+                queryset=payment_model.objects.only("order", "public_id", *PAYMENT_FIELDS).order_by("id"),
+            ),
+        )
+    )
+
+    for order in queryset.iterator(chunk_size=chunk_size):
+        order_id = str(order.public_id)
+        yield {
+            "record": "order",
+            "order_id": order_id,
+            "id": order_id,
+            **{name: _value(getattr(order, name)) for name in ORDER_FIELDS},
+        }
+        for item in order.items.all():
+            yield {
+                "record": "item",
+                "order_id": order_id,
+                "id": str(item.public_id),
+                **{name: _value(getattr(item, name)) for name in ITEM_FIELDS},
+                "unit": item.unit.name,
+                "tax_rate": _value(item.tax_rate.rate),
+            }
+        for payment in order.payments.all():
+            yield {
+                "record": "payment",
+                "order_id": order_id,
+                "id": str(payment.public_id),
+                **{name: _value(getattr(payment, name)) for name in PAYMENT_FIELDS},
+            }
+
+
+def render_export(records: Iterable[dict], *, fmt: str) -> Iterator[str]:
+    """
+    CSV (заголовок EXPORT_COLUMNS, пустые ячейки для полей чужого типа записи) или JSONL.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            buf.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            buf.write("\n")
+
+    for count, record in enumerate(records, start=1):
+        write(record)
+        if count % FLUSH_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    tail = buf.getvalue()
+    if tail:
+        yield tail
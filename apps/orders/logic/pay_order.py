@@ -4,13 +4,25 @@ from __future__ import annotations
 from decimal import Decimal
 
 from django.db import transaction
-from django.db.models import Sum
 from rest_framework.exceptions import ValidationError
 
+from apps.orders.logic.reservations import release_reservations, reserved_qty, reservations_enabled
 from apps.orders.logic.status_fsm import assert_can_transition
+from apps.orders.logic.stock import (
+    apply_stock_deltas,
+    lock_products_stock,
+    qty_by_product,
+    retry_on_lock_conflict,
+    schedule_stock_cache_refresh,
+    split_by_stock_mode,
+    take_from_shards,
+)
 from apps.orders.models import Order
+from apps.products.models import StockMovement
+from apps.products.stock_ledger import record_stock_movements
 
 
+@retry_on_lock_conflict
 def pay_order(*, order: Order, actor=None) -> Order:
     """
     Use-case: оплатить заказ (draft -> paid) с проверкой и списанием склада.
@@ -24,7 +36,10 @@ def pay_order(*, order: Order, actor=None) -> Order:
         * row-lock на Product (select_for_update)
     - НОВОЕ (Payments MVP):
         * заказ можно оплатить только если деньги реально получены:
-          sum(captured payments) >= order.total
+          captured_total - refunded_total >= order.total
+          (итоги ведут capture/refund use-case'ы, см. apps/payments/logic/order_totals.py)
+    - Резервы (если включены): зарезервированное под заказ списывается без row-lock на Product,
+      остальное проверяется с учётом чужих активных резервов.
     - В случае ошибки: никаких изменений (transaction.atomic).
     - Пишем историю статусов (OrderStatusEvent)
     """
@@ -49,61 +64,72 @@ def pay_order(*, order: Order, actor=None) -> Order:
         if order.status != Order.STATUS_DRAFT:
             raise ValidationError({"status": ["Invalid status transition."]})
 
-        items_qs = order.items.select_related("product").all()
-        if not items_qs.exists():
+        # qty по продуктам — один GROUP BY-запрос (заодно и проверка "есть ли позиции")
+        qty_by_product_id = qty_by_product(order)
+        if not qty_by_product_id:
             raise ValidationError({"order": "Cannot pay order without items."})
-
-        # агрегируем qty
-        qty_by_product_id: dict[int, Decimal] = {}
-        for item in items_qs:
-            pid = item.product_id
-            item_qty = item.qty if isinstance(item.qty, Decimal) else Decimal(str(item.qty))
-            qty_by_product_id[pid] = qty_by_product_id.get(pid, Decimal("0")) + item_qty
-
-        # lock products
-        from apps.products.models import Product
-
-        locked_products = Product.objects.select_for_update().filter(
-            id__in=list(qty_by_product_id.keys())
+        qty_by_product_id.pop(None, None)
+
+        plain_ids, sharded_ids = split_by_stock_mode(qty_by_product_id)
+
+        # резервы (STOCK_RESERVATIONS): полностью зарезервированные продукты не лочим —
+        # остаток под них гарантирован при резервировании, списываем guarded UPDATE ниже
+        use_reservations = reservations_enabled()
+        own_reserved = reserved_qty(plain_ids, order=order) if use_reservations else {}
+        reserved_ids = [pid for pid in plain_ids if own_reserved.get(pid, Decimal("0")) >= qty_by_product_id[pid]]
+
+        # lock products (в порядке id); sharded-продукты строку Product не лочат
+        contended_ids = [pid for pid in plain_ids if pid not in reserved_ids]
+        stock_by_product_id = lock_products_stock(contended_ids)
+        # режим мог смениться на sharded до lock — такие продукты списываем через шарды
+        sharded_ids += [pid for pid in contended_ids if pid not in stock_by_product_id]
+
+        # чужие активные резервы продать нельзя
+        others_reserved = (
+            reserved_qty(stock_by_product_id.keys(), exclude_order=order)
+            if use_reservations and stock_by_product_id
+            else {}
         )
-        products_map = {p.id: p for p in locked_products}
 
         # check stock (ВАЖНО: хотим сохранить прежние ошибки/поведение тестов)
-        for pid, total_qty in qty_by_product_id.items():
-            p = products_map[pid]
-            if p.stock_qty < total_qty:
+        for pid, stock_qty in stock_by_product_id.items():
+            if stock_qty - others_reserved.get(pid, Decimal("0")) < qty_by_product_id[pid]:
+                raise ValidationError({"order": "Insufficient stock."})
+
+        # sharded: проверка и списание одним шагом под lock шардов (откатится вместе с транзакцией)
+        for pid in sorted(sharded_ids):
+            if not take_from_shards(pid, qty_by_product_id[pid]):
                 raise ValidationError({"order": "Insufficient stock."})
 
         # НОВОЕ: требование captured payment (ставим ПОСЛЕ stock-check, но ДО write-off)
         # Это позволяет тестам "insufficient stock" падать по складу,
         # но не списывать stock и не переводить в paid без оплаты.
-        from apps.payments.models import OrderPayment
-
-        captured_total = (
-            OrderPayment.objects.filter(
-                org=order.org,
-                order=order,
-                status=OrderPayment.Status.CAPTURED,
-            )
-            .aggregate(total=Sum("amount"))
-            .get("total")
-            or Decimal("0.00")
-        )
-
-        if captured_total < order.total:
+        # Деньги — из денормализованных итогов заказа (строка уже под lock), без агрегата по платежам.
+        if order.captured_total - order.refunded_total < order.total:
             raise ValidationError(
                 {"payment": ["Cannot pay order without captured payment covering order total."]}
             )
 
-        # write-off stock
-        for pid, total_qty in qty_by_product_id.items():
-            p = products_map[pid]
-            p.stock_qty = p.stock_qty - total_qty
+        # write-off stock — один UPDATE на все обычные продукты
+        apply_stock_deltas({pid: -qty_by_product_id[pid] for pid in stock_by_product_id})
+        schedule_stock_cache_refresh(sharded_ids)
+
+        # списание по резервам: без SELECT ... FOR UPDATE, UPDATE сам проверяет остаток
+        if reserved_ids:
+            reserved_deltas = {pid: -qty_by_product_id[pid] for pid in reserved_ids}
+            if apply_stock_deltas(reserved_deltas, guarded=True) != len(reserved_deltas):
+                # резерв успел истечь, и остаток продали — заказ не оплачиваем
+                raise ValidationError({"order": "Insufficient stock."})
+        if use_reservations:
+            release_reservations(order)
 
-            fields = ["stock_qty"]
-            if "updated_at" in [f.name for f in p._meta.fields]:
-                fields.append("updated_at")
-            p.save(update_fields=fields)
+        # ledger: движения по всем продуктам заказа одним INSERT
+        record_stock_movements(
+            org=order.org,
+            deltas={pid: -total_qty for pid, total_qty in qty_by_product_id.items()},
+            reason=StockMovement.REASON_SALE,
+            order=order,
+        )
 
         # status change + history event
         old_status = order.status
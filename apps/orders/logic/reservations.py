@@ -0,0 +1,147 @@
+#apps/orders/logic/reservations.py
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from apps.orders.logic.stock import lock_products_stock, split_by_stock_mode
+from apps.orders.models import Order, OrderItem, StockReservation
+from apps.products.models import Product
+
+
+def reservations_settings() -> dict:
+    return getattr(settings, "STOCK_RESERVATIONS", {})
+
+
+def reservations_enabled() -> bool:
+    return bool(reservations_settings().get("ENABLED", False))
+
+
+def active_reservations():
+    return StockReservation.objects.filter(expires_at__gt=timezone.now())
+
+
+def reserved_qty(product_ids, *, exclude_order: Order | None = None, order: Order | None = None) -> dict[int, Decimal]:
+    """
+    Сумма активных резервов по продуктам — один GROUP BY по (product, expires_at).
+    exclude_order — без резервов этого заказа; order — только его резервы.
+    """
+    qs = active_reservations().filter(product_id__in=list(product_ids))
+    if exclude_order is not None:
+        qs = qs.exclude(order_id=exclude_order.pk)
+    if order is not None:
+        qs = qs.filter(order_id=order.pk)
+    return dict(qs.order_by().values("product_id").annotate(total=Sum("qty")).values_list("product_id", "total"))
+
+
+def reserve_items(*, order: Order, items: list[OrderItem]) -> list[StockReservation]:
+    """
+    Резерв под новые позиции draft-заказа (внутри транзакции добавления позиций).
+
+    - row-lock на Product (lock_products_stock, порядок id) — резервирование сериализуется
+      с оплатами "без резерва", которые тоже учитывают чужие резервы.
+    - доступно = stock_qty - активные резервы; не хватает -> "Insufficient stock." сразу при добавлении.
+    - активные резервы заказа продлеваются до now + TTL: пока корзину собирают, она не "протухает".
+
+    Sharded-продукты не резервируются: их смысл — не лочить строку Product на горячем SKU.
+    """
+    qty_by_product_id: dict[int, Decimal] = {}
+    for item in items:
+        if item.product_id is not None:
+            qty_by_product_id[item.product_id] = qty_by_product_id.get(item.product_id, Decimal("0")) + item.qty
+    if not qty_by_product_id:
+        return []
+
+    plain_ids, _sharded_ids = split_by_stock_mode(qty_by_product_id)
+    stock_by_product_id = lock_products_stock(plain_ids)
+    reserved = reserved_qty(stock_by_product_id.keys())
+
+    for pid, stock_qty in stock_by_product_id.items():
+        if stock_qty - reserved.get(pid, Decimal("0")) < qty_by_product_id[pid]:
+            raise ValidationError({"order": "Insufficient stock."})
+
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=reservations_settings().get("TTL_S", 900))
+    StockReservation.objects.filter(order_id=order.pk, expires_at__gt=now).update(expires_at=expires_at)
+
+    return StockReservation.objects.bulk_create(
+        StockReservation(
+            org_id=order.org_id,
+            order_id=order.pk,
+            order_item=item,
+            product_id=item.product_id,
+            qty=item.qty,
+            expires_at=expires_at,
+        )
+        for item in items
+        if item.product_id in stock_by_product_id
+    )
+
+
+def release_reservations(order: Order) -> int:
+    """
+    Снять все резервы заказа (оплачен — резерв стал списанием; отменён — остаток свободен).
+    """
+    deleted, _ = StockReservation.objects.filter(order_id=order.pk).delete()
+    return deleted
+
+
+def expire_reservations(*, batch_size: int = 1000) -> int:
+    """
+    Sweeper: удаляет истёкшие резервы батчами.
+    SKIP LOCKED — не ждём резервы, которые прямо сейчас забирает pay_order / cancel_draft_order.
+    """
+    removed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                StockReservation.objects.filter(expires_at__lte=timezone.now())
+                .select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return removed
+            StockReservation.objects.filter(id__in=ids).delete()
+            removed += len(ids)
+
+
+def available_to_sell_annotations() -> dict:
+    """
+    Аннотации Product: reserved_qty (активные резервы) и available_qty = stock_qty - reserved_qty.
+    Подзапрос — index-only scan по (product, expires_at) include qty.
+    """
+    qty_field = DecimalField(max_digits=12, decimal_places=3)
+    reserved = (
+        StockReservation.objects.filter(product_id=OuterRef("pk"), expires_at__gt=timezone.now())
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("qty"))
+        .values("total")
+    )
+    return {
+        "reserved_qty": Coalesce(Subquery(reserved, output_field=qty_field), Value(Decimal("0")), output_field=qty_field),
+        "available_qty": F("stock_qty") - F("reserved_qty"),
+    }
+
+
+def available_to_sell(product_id: int) -> Decimal:
+    """
+    Доступно к продаже = stock_qty - активные резервы, одним запросом.
+    """
+    qty = (
+        Product.objects.filter(pk=product_id)
+        .annotate(**available_to_sell_annotations())
+        .values_list("available_qty", flat=True)
+        .first()
+    )
+    if qty is None:
+        raise Product.DoesNotExist(product_id)
+    return qty
@@ -0,0 +1,260 @@
+#apps/orders/logic/stock.py
+from __future__ import annotations
+
+import functools
+import random
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.orders.models import Order
+from apps.products.models import Product, ProductStockShard
+
+
+# SQLSTATE Postgres
+LOCK_NOT_AVAILABLE = "55P03"  # NOWAIT не взял lock
+DEADLOCK_DETECTED = "40P01"
+SERIALIZATION_FAILURE = "40001"
+RETRYABLE_SQLSTATES = frozenset({DEADLOCK_DETECTED, SERIALIZATION_FAILURE})
+
+
+def stock_locking_settings() -> dict:
+    return getattr(settings, "STOCK_LOCKING", {})
+
+
+def db_error_sqlstate(exc: BaseException) -> str | None:
+    """
+    SQLSTATE исходной ошибки драйвера (Django оборачивает её в django.db.*Error).
+    """
+    cause = exc.__cause__
+    return getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+
+
+def _backoff_s(attempt: int) -> float:
+    """
+    Экспоненциальный backoff с full jitter, ограничен BACKOFF_MAX_S.
+    """
+    conf = stock_locking_settings()
+    cap = min(conf.get("BACKOFF_MAX_S", 0.2), conf.get("BACKOFF_BASE_S", 0.01) * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def retry_on_lock_conflict(fn):
+    """
+    Повторяет use-case целиком при deadlock/serialization failure (40P01/40001).
+
+    После такой ошибки Postgres откатывает транзакцию — повторять имеет смысл только
+    всю transaction.atomic, поэтому декоратор вешается на use-case (снаружи atomic).
+    Если вызов уже внутри чужой транзакции — не ретраим, ошибка уходит наверх.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        attempts = stock_locking_settings().get("RETRY_ATTEMPTS", 5)
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except DatabaseError as exc:
+                if (
+                    db_error_sqlstate(exc) not in RETRYABLE_SQLSTATES
+                    or transaction.get_connection().in_atomic_block
+                    or attempt + 1 >= attempts
+                ):
+                    raise
+            time.sleep(_backoff_s(attempt))
+            attempt += 1
+
+    return wrapper
+
+
+def qty_by_product(order: Order) -> dict[int | None, Decimal]:
+    """
+    qty по product_id одним запросом (GROUP BY в БД, позиции в Python не грузим).
+    Пустой dict == в заказе нет позиций.
+
+    Ключ None — позиции без product (складских эффектов у них нет).
+    """
+    rows = (
+        order.items.order_by()
+        .values("product_id")
+        .annotate(total_qty=Sum("qty"))
+        .values_list("product_id", "total_qty")
+    )
+    return dict(rows)
+
+
+def split_by_stock_mode(product_ids) -> tuple[list[int], list[int]]:
+    """
+    (обычные, sharded) product_id — один запрос, без lock.
+    Режим может смениться до lock: lock_products_stock не вернёт ставший sharded продукт.
+    """
+    modes = dict(Product.objects.filter(id__in=list(product_ids)).values_list("id", "stock_shard_count"))
+    plain = sorted(pid for pid, shards in modes.items() if not shards)
+    sharded = sorted(pid for pid, shards in modes.items() if shards)
+    return plain, sharded
+
+
+def lock_products_stock(product_ids) -> dict[int, Decimal]:
+    """
+    row-lock на Product (select_for_update) строго по возрастанию id — одинаковый
+    порядок во всех use-case'ах, чтобы конкурирующие корзины не ловили deadlock.
+    Возвращает {id: stock_qty}; sharded-продукты не лочатся и в результат не попадают.
+
+    Сначала NOWAIT (в savepoint, чтобы 55P03 не ломал внешнюю транзакцию) с коротким
+    backoff — не встаём в очередь за горячими SKU; после NOWAIT_ATTEMPTS ждём lock обычным FOR UPDATE.
+    SKIP LOCKED здесь не подходит: для списания нужны все строки корзины сразу.
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+
+    qs = Product.objects.filter(id__in=ids, stock_shard_count=0).order_by("id").values_list("id", "stock_qty")
+
+    for attempt in range(stock_locking_settings().get("NOWAIT_ATTEMPTS", 3)):
+        try:
+            with transaction.atomic():
+                return dict(qs.select_for_update(nowait=True))
+        except DatabaseError as exc:
+            if db_error_sqlstate(exc) != LOCK_NOT_AVAILABLE:
+                raise
+        time.sleep(_backoff_s(attempt))
+
+    return dict(qs.select_for_update())
+
+
+def _delta_by_id(deltas: dict[int, Decimal], qty_field) -> Case:
+    return Case(
+        *(When(id=pk, then=Value(qty, output_field=qty_field)) for pk, qty in deltas.items()),
+        output_field=DecimalField(max_digits=qty_field.max_digits, decimal_places=qty_field.decimal_places),
+    )
+
+
+def apply_stock_deltas(deltas: dict[int, Decimal], *, guarded: bool = False) -> int:
+    """
+    stock_qty += delta для всех продуктов одним UPDATE ... SET stock_qty = stock_qty + CASE id WHEN ... END.
+    Строки должны быть уже залочены (lock_products_stock).
+
+    guarded=True — для незалоченных строк (списание по резерву): UPDATE только там, где
+    stock_qty + delta >= 0 (и продукт не sharded). Вызывающий сравнивает число обновлённых
+    строк с len(deltas) и при расхождении откатывает транзакцию.
+    """
+    if not deltas:
+        return 0
+
+    delta = _delta_by_id(deltas, Product._meta.get_field("stock_qty"))
+    qs = Product.objects.filter(id__in=list(deltas))
+    if guarded:
+        qs = qs.alias(new_stock_qty=F("stock_qty") + delta).filter(new_stock_qty__gte=0, stock_shard_count=0)
+
+    return qs.update(
+        stock_qty=F("stock_qty") + delta,
+        updated_at=timezone.now(),
+    )
+
+
+def take_from_shards(product_id: int, qty: Decimal) -> bool:
+    """
+    Списание qty sharded-продукта (check + write-off одним шагом, внутри транзакции use-case).
+
+    1) По одному свободному шарду (FOR UPDATE SKIP LOCKED, случайный порядок) — кассы
+       не ждут друг друга, пока в свободных шардах хватает остатка.
+    2) Свободных не хватило — ждём занятые шарды (обычный FOR UPDATE по shard_no).
+       Здесь возможен deadlock с другой кассой на том же SKU — его повторяет retry_on_lock_conflict.
+
+    Возвращает False (ничего не списав), если суммарного остатка не хватает.
+    """
+    remaining = qty
+    decrements: dict[int, Decimal] = {}
+    shards = ProductStockShard.objects.filter(product_id=product_id, qty__gt=0)
+
+    while remaining > 0:
+        row = (
+            shards.exclude(id__in=list(decrements))
+            .select_for_update(skip_locked=True)
+            .order_by("?")
+            .values_list("id", "qty")
+            .first()
+        )
+        if row is None:
+            break
+        shard_id, available = row
+        decrements[shard_id] = min(available, remaining)
+        remaining -= decrements[shard_id]
+
+    if remaining > 0:
+        busy = shards.exclude(id__in=list(decrements)).select_for_update().order_by("shard_no").values_list("id", "qty")
+        for shard_id, available in busy:
+            decrements[shard_id] = min(available, remaining)
+            remaining -= decrements[shard_id]
+            if remaining == 0:
+                break
+
+    if remaining > 0:
+        return False
+
+    ProductStockShard.objects.filter(id__in=list(decrements)).update(
+        qty=F("qty") - _delta_by_id(decrements, ProductStockShard._meta.get_field("qty")),
+    )
+    return True
+
+
+def put_to_shards(product_id: int, qty: Decimal) -> None:
+    """
+    Возврат qty sharded-продукта в один шард: свободный (SKIP LOCKED), иначе ждём случайный.
+    """
+    shards = ProductStockShard.objects.filter(product_id=product_id)
+    shard_id = (
+        shards.select_for_update(skip_locked=True).order_by("?").values_list("id", flat=True).first()
+        or shards.select_for_update().order_by("?").values_list("id", flat=True).first()
+    )
+    if shard_id is None:
+        # шарды удалены (режим выключили) — возвращаем в обычный stock_qty
+        apply_stock_deltas({product_id: qty})
+        return
+    ProductStockShard.objects.filter(id=shard_id).update(qty=F("qty") + qty)
+
+
+def refresh_sharded_stock_cache(product_ids) -> int:
+    """
+    Product.stock_qty = sum(shards) для sharded-продуктов.
+
+    Best-effort: строки Product, занятые другой транзакцией, пропускаем (SKIP LOCKED),
+    чтобы обновление кэша не вставало в очередь за горячим SKU.
+    Точный остаток — сумма шардов; rebalance_stock_shards пересчитывает кэш гарантированно.
+    """
+    with transaction.atomic():
+        ids = list(
+            Product.objects.filter(id__in=list(product_ids), stock_shard_count__gt=0)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if not ids:
+            return 0
+
+        shard_sum = (
+            ProductStockShard.objects.filter(product_id=OuterRef("pk"))
+            .order_by()
+            .values("product_id")
+            .annotate(total=Sum("qty"))
+            .values("total")
+        )
+        return Product.objects.filter(id__in=ids).update(
+            stock_qty=Coalesce(Subquery(shard_sum), Value(Decimal("0")), output_field=DecimalField()),
+            updated_at=timezone.now(),
+        )
+
+
+def schedule_stock_cache_refresh(product_ids) -> None:
+    """
+    Пересчёт кэша после commit use-case — вне транзакции, которая держит шарды.
+    """
+    ids = sorted(product_ids)
+    if ids:
+        transaction.on_commit(lambda: refresh_sharded_stock_cache(ids))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.logic.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired stock reservations of draft orders in batches. "
+        "Run periodically (cron / worker loop); expired holds are already ignored by stock checks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        removed = expire_reservations(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {removed} stock reservations."))
@@ -0,0 +1,67 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from apps.orders.filters import filter_orders
+from apps.orders.logic.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_records, render_export
+from apps.orders.models import Order
+from config.orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream an accounting export of orders with their items and payments (CSV or JSONL, "
+        "one record per order/item/payment). Memory use depends on --chunk-size, not on the number of orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", required=True, help="Organization public_id")
+        parser.add_argument("--output", default="-", help="Output file (default: stdout)")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, help="Default: by --output extension, else csv")
+        parser.add_argument("--status", help="Comma-separated order statuses")
+        parser.add_argument("--since", help="Orders created at or after (ISO 8601)")
+        parser.add_argument("--until", help="Orders created before (ISO 8601)")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(public_id=options["org"])
+        except (Organization.DoesNotExist, ValueError, DjangoValidationError):
+            raise CommandError(f"Organization {options['org']} not found.")
+
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        output = options["output"]
+        fmt = options["format"] or ("jsonl" if output.endswith((".jsonl", ".ndjson")) else "csv")
+
+        params = {"status": options["status"], "created_after": options["since"], "created_before": options["until"]}
+        try:
+            orders = filter_orders(Order.objects.filter(org=org), params)
+        except ValidationError as exc:
+            raise CommandError(f"Invalid filter: {exc.detail}")
+
+        counts = {"order": 0, "item": 0, "payment": 0}
+
+        def counted(records):
+            for record in records:
+                counts[record["record"]] += 1
+                yield record
+
+        chunks = render_export(counted(export_records(orders, chunk_size=options["chunk_size"])), fmt=fmt)
+        if output == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+        else:
+            try:
+                with open(output, "w", newline="", encoding="utf-8") as stream:
+                    for chunk in chunks:
+                        stream.write(chunk)
+            except OSError as exc:
+                raise CommandError(f"Cannot write export file: {exc}")
+
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Exported {counts['order']} orders, {counts['item']} items, {counts['payment']} payments."
+            )
+        )
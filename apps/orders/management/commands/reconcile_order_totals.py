@@ -0,0 +1,70 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem, line_totals_aggregates, totals_from_sums
+from config.orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Detect and repair drift of incrementally maintained order totals "
+        "(subtotal/tax_total/total) against order items, batch by batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", required=True, help="Organization public_id")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Only report drift, do not repair")
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(public_id=options["org"])
+        except (Organization.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Organization {options['org']} not found.")
+
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        checked = drifted = 0
+        last_id = 0
+
+        while True:
+            with transaction.atomic():
+                # lock батча ДО агрегата: параллельный apply_item_to_totals дождётся нас
+                # и применит свою F()-дельту уже поверх исправленных значений
+                orders = list(
+                    Order.objects.select_for_update()
+                    .filter(org=org, id__gt=last_id)
+                    .order_by("id")
+                    .values("id", "public_id", *Order.TOTALS_FIELDS)[:batch_size]
+                )
+                if not orders:
+                    break
+                last_id = orders[-1]["id"]
+
+                sums_by_order = {
+                    row.pop("order_id"): row
+                    for row in OrderItem.objects.filter(order_id__in=[o["id"] for o in orders])
+                    .order_by()
+                    .values("order_id")
+                    .annotate(**line_totals_aggregates())
+                }
+
+                now = timezone.now()
+                for stored in orders:
+                    checked += 1
+                    expected = totals_from_sums(**sums_by_order.get(stored["id"], {"subtotal": None, "tax_x100": None}))
+                    if all(stored[name] == value for name, value in expected.items()):
+                        continue
+
+                    drifted += 1
+                    self.stdout.write(
+                        f"drift: order {stored['public_id']} total {stored['total']} -> {expected['total']}"
+                    )
+                    if not dry_run:
+                        Order.objects.filter(pk=stored["id"]).update(updated_at=now, **expected)
+
+        action = "found" if dry_run else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} orders, {action} {drifted} with drifted totals."))
@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-18 10:17
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_exact_totals(apps, schema_editor):
+    """
+    Заполняем точные накопители из позиций — одним UPDATE с подзапросами.
+    """
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    items = OrderItem.objects.filter(order_id=OuterRef("pk")).order_by().values("order_id")
+    base = items.annotate(
+        s=Sum(F("qty") * F("unit_price"), output_field=DecimalField(max_digits=30, decimal_places=5))
+    ).values("s")
+    tax = items.annotate(
+        s=Sum(
+            F("qty") * F("unit_price") * F("tax_rate__rate"),
+            output_field=DecimalField(max_digits=40, decimal_places=7),
+        ) / Value(Decimal("100"))
+    ).values("s")
+
+    Order.objects.update(
+        subtotal_exact=Coalesce(Subquery(base), Value(Decimal("0")), output_field=DecimalField()),
+        tax_total_exact=Coalesce(Subquery(tax), Value(Decimal("0")), output_field=DecimalField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='subtotal_exact',
+            field=models.DecimalField(decimal_places=5, default=Decimal('0'), max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='tax_total_exact',
+            field=models.DecimalField(decimal_places=9, default=Decimal('0'), max_digits=24),
+        ),
+        migrations.RunPython(backfill_exact_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-18 14:05
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_payment_totals(apps, schema_editor):
+    """
+    captured_total / refunded_total из платежей — одним UPDATE с подзапросами.
+    """
+    Order = apps.get_model("orders", "Order")
+    OrderPayment = apps.get_model("payments", "OrderPayment")
+
+    payments = OrderPayment.objects.filter(order_id=OuterRef("pk")).order_by().values("order_id")
+    money = DecimalField(max_digits=12, decimal_places=2)
+    captured = payments.annotate(s=Sum("amount", filter=Q(status__in=["captured", "refunded"]))).values("s")
+    refunded = payments.annotate(s=Sum("amount", filter=Q(status="refunded"))).values("s")
+
+    Order.objects.update(
+        captured_total=Coalesce(Subquery(captured), Value(Decimal("0.00")), output_field=money),
+        refunded_total=Coalesce(Subquery(refunded), Value(Decimal("0.00")), output_field=money),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_stock_reservations'),
+        ('payments', '0004_payment_provider_config'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='captured_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='refunded_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_payment_totals, migrations.RunPython.noop),
+    ]
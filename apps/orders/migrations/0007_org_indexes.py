@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0006_order_payment_totals'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['org', 'id'], name='order_org_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['org', 'status', 'created_at'], name='order_org_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'draft')), fields=['org', 'created_at'], name='order_org_draft_created_idx'),
+        ),
+    ]
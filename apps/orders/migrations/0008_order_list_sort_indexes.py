@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 14:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0007_org_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='order_org_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['org', 'total', 'id'], name='order_org_total_idx'),
+        ),
+    ]
@@ -7,13 +7,69 @@ import uuid
 from django.core.exceptions import ValidationError as DjangoValidationError
 
 
-from config.orgs.models import OrgScopedModel, Organization
+from config.orgs.models import OrgScopedModel, Organization, org_foreign_key, org_index
 from django.conf import settings
 from apps.products.models import Unit, TaxRate
-from django.db.models import F, Sum, DecimalField, ExpressionWrapper
-
-
-
+from django.db.models import F, Func, Sum, DecimalField, ExpressionWrapper, Value
+from django.utils import timezone
+
+
+CENT = Decimal("0.01")
+
+
+class RoundHalfEven(Func):
+    """
+    ROUND(x, 2) с банковским округлением — как Decimal.quantize(Decimal("0.01")).
+    Встроенный ROUND() в Postgres округляет половину "от нуля".
+    """
+
+    output_field = DecimalField(max_digits=12, decimal_places=2)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        x = f"({sql})"
+        return (
+            f"(CASE WHEN ABS({x} * 100 - TRUNC({x} * 100)) = 0.5 AND MOD(TRUNC({x} * 100), 2) = 0 "
+            f"THEN TRUNC({x} * 100) / 100 ELSE ROUND({x}, 2) END)",
+            (*params, *params, *params, *params, *params),
+        )
+
+
+def line_totals_aggregates() -> dict:
+    """
+    Агрегаты по OrderItem: точная сумма qty * unit_price и qty * unit_price * rate (в 100 раз больше налога).
+    """
+    return {
+        "subtotal": Sum(
+            ExpressionWrapper(F("qty") * F("unit_price"), output_field=DecimalField(max_digits=30, decimal_places=5))
+        ),
+        "tax_x100": Sum(
+            ExpressionWrapper(
+                F("qty") * F("unit_price") * F("tax_rate__rate"),
+                output_field=DecimalField(max_digits=40, decimal_places=7),
+            )
+        ),
+    }
+
+
+def totals_from_sums(*, subtotal: Decimal | None, tax_x100: Decimal | None) -> dict:
+    """
+    Итоги заказа из агрегатов line_totals_aggregates().
+    /100 и округление (quantize, ROUND_HALF_EVEN) — в Python, как при построчном подсчёте.
+    """
+    subtotal_exact = subtotal or Decimal("0")
+    tax_total_exact = (tax_x100 or Decimal("0")) / Decimal("100")
+
+    # normalize to 2 decimals
+    rounded_subtotal = subtotal_exact.quantize(CENT)
+    rounded_tax = tax_total_exact.quantize(CENT)
+    return {
+        "subtotal": rounded_subtotal,
+        "tax_total": rounded_tax,
+        "total": (rounded_subtotal + rounded_tax).quantize(CENT),
+        "subtotal_exact": subtotal_exact,
+        "tax_total_exact": tax_total_exact,
+    }
 
 
 class Order(OrgScopedModel):
@@ -26,6 +82,8 @@ class Order(OrgScopedModel):
         (STATUS_CANCELLED, "Cancelled"),
     )
 
+    org = org_foreign_key(db_index=False)  # покрыт order_org_id_idx
+
     status = models.CharField(
         max_length=16,
         choices=STATUS_CHOICES,
@@ -36,6 +94,21 @@ class Order(OrgScopedModel):
     tax_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
     total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
 
+    # Точные (неокруглённые) суммы для инкрементального пересчёта:
+    # subtotal/tax_total = округление этих накопителей, total = subtotal + tax_total.
+    subtotal_exact = models.DecimalField(max_digits=20, decimal_places=5, default=Decimal("0"))
+    tax_total_exact = models.DecimalField(max_digits=24, decimal_places=9, default=Decimal("0"))
+
+    # Деньги по заказу (денормализация OrderPayment): ведут только payment use-case'ы
+    # F()-дельтами в транзакции перехода статуса; сверка — reconcile_order_payment_totals.
+    # captured_total — всё когда-либо списанное (captured + refunded), refunded_total — возвращённое.
+    captured_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    refunded_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    TOTALS_FIELDS = ("subtotal", "tax_total", "total", "subtotal_exact", "tax_total_exact")
+    PAYMENT_TOTALS_FIELDS = ("captured_total", "refunded_total")
+    DENORMALIZED_FIELDS = TOTALS_FIELDS + PAYMENT_TOTALS_FIELDS
+
     def __init__(self, *args, **kwargs):
         """
         Django создаёт объект модели как при загрузке из БД, так и при создании.
@@ -68,6 +141,15 @@ class Order(OrgScopedModel):
                 {"status": "Order.status can only be changed via a use-case (pay/cancel/etc)."}
             )
 
+        # полный save() (serializer.save() и т.п.) не перетирает итоги устаревшим значением
+        # из памяти — их меняют только UPDATE'ы: F()-дельты позиций (apply_item_to_totals),
+        # recompute_totals(save=True) и F()-дельты payment use-case'ов
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DENORMALIZED_FIELDS
+            ]
+
         super().save(*args, **kwargs)
 
         # После успешного сохранения обновляем "загруженный" статус.
@@ -77,29 +159,79 @@ class Order(OrgScopedModel):
         if hasattr(self, "_status_change_allowed"):
             self._status_change_allowed = False
 
-    def recompute_totals(self) -> None:
+    def recompute_totals(self, *, save: bool = False, reconcile: bool = False) -> bool:
         """
         Minimal: totals = sum(qty * unit_price),
         tax_total = subtotal * (rate/100) per item,
         total = subtotal + tax_total
+
+        Суммы считаются одним агрегатом в БД (позиции в Python не грузим).
+        Postgres numeric считает qty * unit_price * rate точно, а /100 и округление
+        (quantize, ROUND_HALF_EVEN) делаем в Python — ровно как при построчном подсчёте.
+
+        save=True: записываем итоги одним UPDATE (без model.save()).
+        reconcile=True: сверка с тем, что сейчас лежит в БД (инкрементальные итоги);
+        пишем только при расхождении. Возвращает True, если был drift.
         """
-        items = self.items.select_related("tax_rate").all()
+        sums = OrderItem.objects.filter(order_id=self.pk).aggregate(**line_totals_aggregates())
+        for name, value in totals_from_sums(**sums).items():
+            setattr(self, name, value)
+
+        drift = True
+        if reconcile:
+            stored = Order.objects.filter(pk=self.pk).values(*self.TOTALS_FIELDS).first() or {}
+            drift = any(stored.get(name) != getattr(self, name) for name in self.TOTALS_FIELDS)
+
+        if save and drift:
+            self.updated_at = timezone.now()
+            Order.objects.filter(pk=self.pk).update(
+                updated_at=self.updated_at,
+                **{name: getattr(self, name) for name in self.TOTALS_FIELDS},
+            )
 
-        subtotal = Decimal("0.00")
-        tax_total = Decimal("0.00")
+        return drift
 
-        for it in items:
-            line_base = (it.qty * it.unit_price)
-            subtotal += line_base
-            tax_total += (line_base * it.tax_rate.rate / Decimal("100"))
+    def apply_item_to_totals(self, item: "OrderItem", *, sign: int = 1) -> bool:
+        """
+        Инкрементальный пересчёт: +/- одна позиция одним UPDATE с F()-выражениями.
+        Остальные строки заказа не читаем (важно для больших POS-корзин).
+
+        sign=1 — позиция добавлена, sign=-1 — удалена.
+        UPDATE ограничен draft-заказами: возвращает False, если заказ уже не draft
+        (вызывающий должен откатить транзакцию).
 
-        # normalize to 2 decimals
-        self.subtotal = subtotal.quantize(Decimal("0.01"))
-        self.tax_total = tax_total.quantize(Decimal("0.01"))
-        self.total = (self.subtotal + self.tax_total).quantize(Decimal("0.01"))
+        In-memory итоги объекта после вызова не актуальны — при необходимости refresh_from_db().
+        """
+        base = item.qty * item.unit_price
+        delta_base = sign * base
+        delta_tax = sign * base * item.tax_rate.rate / Decimal("100")
+
+        new_subtotal = F("subtotal_exact") + Value(delta_base, output_field=self._meta.get_field("subtotal_exact"))
+        new_tax = F("tax_total_exact") + Value(delta_tax, output_field=self._meta.get_field("tax_total_exact"))
+
+        updated = Order.objects.filter(pk=self.pk, status=Order.STATUS_DRAFT).update(
+            subtotal_exact=new_subtotal,
+            tax_total_exact=new_tax,
+            subtotal=RoundHalfEven(new_subtotal),
+            tax_total=RoundHalfEven(new_tax),
+            total=RoundHalfEven(new_subtotal) + RoundHalfEven(new_tax),
+            updated_at=timezone.now(),
+        )
+        return bool(updated)
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            # список заказов (keyset по id)
+            org_index("id", name="order_org_id_idx"),
+            # список заказов: ?sort=created_at / ?sort=total (apps/orders/filters.py)
+            org_index("created_at", "id", name="order_org_created_idx"),
+            org_index("total", "id", name="order_org_total_idx"),
+            # отчёты: статус + период
+            org_index("status", "created_at", name="order_org_status_created_idx"),
+            # открытые черновики (касса, sweeper резервов) — малая доля таблицы
+            org_index("created_at", name="order_org_draft_created_idx", condition=models.Q(status="draft")),
+        ]
 
     def __str__(self) -> str:
         return f"Order {self.public_id}"
@@ -148,6 +280,38 @@ class OrderItem(models.Model):
 
 
 
+class StockReservation(models.Model):
+    """
+    Резерв остатка под позицию draft-заказа (если включён settings.STOCK_RESERVATIONS).
+
+    Активен, пока expires_at > now; истёкшие для всех расчётов не существуют,
+    физически их удаляет sweeper (expire_stock_reservations).
+    pay_order превращает резерв в списание, cancel_draft_order / удаление позиции — освобождают.
+    """
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="stock_reservations")
+    order = models.ForeignKey("orders.Order", on_delete=models.CASCADE, related_name="stock_reservations")
+    order_item = models.OneToOneField(
+        "orders.OrderItem",
+        on_delete=models.CASCADE,
+        related_name="stock_reservation",
+    )
+    product = models.ForeignKey("products.Product", on_delete=models.CASCADE, related_name="stock_reservations")
+    qty = models.DecimalField(max_digits=12, decimal_places=3)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # available-to-sell: sum(qty) активных резервов продукта — index-only scan
+            models.Index(fields=["product", "expires_at"], include=["qty"], name="stock_resv_product_exp_idx"),
+            # sweeper
+            models.Index(fields=["expires_at"], name="stock_resv_expires_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id}: {self.qty} until {self.expires_at}"
+
+
 class OrderStatusEvent(models.Model):
     public_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
 
@@ -49,6 +49,34 @@ class OrderSerializer(serializers.ModelSerializer):
         return value
 
 
+class OrderListSerializer(serializers.ModelSerializer):
+    """
+    Строка списка заказов (GET /orders/), только чтение.
+    fields=[...] — sparse fieldset: лишние поля выкидываем (queryset при этом сужен .only()).
+    """
+
+    class Meta:
+        model = Order
+        fields = [
+            "public_id",
+            "status",
+            "subtotal",
+            "tax_total",
+            "total",
+            "captured_total",
+            "refunded_total",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
@@ -130,6 +158,101 @@ class OrderItemCreateSerializer(serializers.ModelSerializer):
         )
 
 
+class OrderItemLineSerializer(serializers.ModelSerializer):
+    """
+    Одна строка bulk-запроса: только форма данных.
+    Существование/принадлежность org проверяет OrderItemBulkCreateSerializer пачкой.
+    """
+    product = serializers.UUIDField()
+    unit = serializers.UUIDField()
+    tax_rate = serializers.UUIDField()
+
+    class Meta:
+        model = OrderItem
+        fields = ["product", "qty", "unit", "unit_price", "tax_rate"]
+
+
+class OrderItemBulkCreateSerializer(serializers.Serializer):
+    """
+    POST /orders/<id>/items/bulk/  {"lines": [{product, qty, unit, unit_price, tax_rate}, ...]}
+
+    - Product/Unit/TaxRate резолвим тремя запросами public_id__in на всю пачку.
+    - Ошибки отдаём по индексу строки: {"lines": {"3": {"product": ["Invalid product."]}}}.
+    """
+    MAX_LINES = 1000
+
+    lines = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_LINES,
+    )
+
+    def validate_lines(self, lines):
+        errors: dict[str, dict] = {}
+        parsed: dict[int, dict] = {}
+
+        for index, line in enumerate(lines):
+            line_serializer = OrderItemLineSerializer(data=line)
+            if line_serializer.is_valid():
+                parsed[index] = dict(line_serializer.validated_data)
+            else:
+                errors[str(index)] = line_serializer.errors
+
+        # ссылки проверяем и у корректных по форме строк — все ошибки пачки одним ответом
+        org = get_request_org(self.context["request"])
+
+        def by_public_id(model, key):
+            ids = {line[key] for line in parsed.values()}
+            if not ids:
+                return {}
+            qs = model.objects.filter(org=org, status=model.STATUS_ACTIVE, public_id__in=ids)
+            return {obj.public_id: obj for obj in qs}
+
+        products = by_public_id(Product, "product")
+        units = by_public_id(Unit, "unit")
+        taxes = by_public_id(TaxRate, "tax_rate")
+
+        for index, line in parsed.items():
+            line_errors = {}
+            if line["product"] not in products:
+                line_errors["product"] = ["Invalid product."]
+            if line["unit"] not in units:
+                line_errors["unit"] = ["Invalid unit."]
+            if line["tax_rate"] not in taxes:
+                line_errors["tax_rate"] = ["Invalid tax_rate."]
+            if line_errors:
+                errors[str(index)] = line_errors
+                continue
+
+            line["product_obj"] = products[line["product"]]
+            line["unit_obj"] = units[line["unit"]]
+            line["tax_obj"] = taxes[line["tax_rate"]]
+
+        if errors:
+            raise serializers.ValidationError(dict(sorted(errors.items(), key=lambda item: int(item[0]))))
+
+        return list(parsed.values())
+
+    def build_items(self, *, order) -> list[OrderItem]:
+        """
+        Несохранённые OrderItem (для bulk_create) со snapshot product_name.
+        """
+        items = []
+        for line in self.validated_data["lines"]:
+            data = {k: v for k, v in line.items() if k in ("qty", "unit_price")}
+            items.append(
+                OrderItem(
+                    order=order,
+                    product=line["product_obj"],
+                    product_name=line["product_obj"].name,
+                    unit=line["unit_obj"],
+                    tax_rate=line["tax_obj"],
+                    **data,
+                )
+            )
+        return items
+
+
 class OrderStatusEventSerializer(serializers.ModelSerializer):
     order = serializers.UUIDField(source="order.public_id", read_only=True)
     actor = serializers.UUIDField(source="actor.public_id", read_only=True, allow_null=True)
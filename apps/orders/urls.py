@@ -2,15 +2,21 @@
 from django.urls import path
 from .api_views import (
     OrderListCreateApi,
+    OrderExportApi,
     OrderDetailApi,
     OrderItemListCreateApi,
+    OrderItemBulkCreateApi,
+    OrderItemDetailApi,
     OrderStatusEventListApi,
 )
 
 urlpatterns = [
     path("orders/", OrderListCreateApi.as_view(), name="orders-list-create"),
+    path("orders/export/", OrderExportApi.as_view(), name="orders-export"),
     path("orders/<uuid:public_id>/", OrderDetailApi.as_view(), name="orders-detail"),  # <-- ВАЖНО
     path("orders/<uuid:order_public_id>/items/", OrderItemListCreateApi.as_view(), name="order-items"),
+    path("orders/<uuid:order_public_id>/items/bulk/", OrderItemBulkCreateApi.as_view(), name="order-items-bulk"),
+    path("orders/<uuid:order_public_id>/items/<uuid:public_id>/", OrderItemDetailApi.as_view(), name="order-item-detail"),
     path("orders/<uuid:public_id>/status-events/", OrderStatusEventListApi.as_view()),
 
 ]
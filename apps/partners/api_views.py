@@ -3,7 +3,7 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
 from config.orgs.org_context import get_request_org
-from config.orgs.permissions import IsOrgMemberReadOnlyOrOrgAdmin
+from config.orgs.permissions import IsOrgMemberReadOnlyOrOrgAdminFromToken
 
 from .models import Partner
 from .serializers import PartnerSerializer
@@ -14,7 +14,7 @@ from rest_framework.response import Response
 
 
 class PartnerListCreateApi(generics.ListCreateAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = PartnerSerializer
 
     def get_queryset(self):
@@ -28,7 +28,7 @@ class PartnerListCreateApi(generics.ListCreateAPIView):
 
 
 class PartnerDetailApi(generics.RetrieveUpdateDestroyAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = PartnerSerializer
     lookup_field = "public_id"
     lookup_url_kwarg = "public_id"
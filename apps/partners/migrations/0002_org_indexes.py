@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('partners', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='partner',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['org', 'id'], name='partner_org_active_id_idx'),
+        ),
+    ]
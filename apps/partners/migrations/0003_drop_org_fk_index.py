@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('partners', '0002_org_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='partner',
+            index=models.Index(fields=['org', 'id'], name='partner_org_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='partner',
+            name='partner_org_active_id_idx',
+        ),
+        migrations.AlterField(
+            model_name='partner',
+            name='org',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='orgs.organization'),
+        ),
+    ]
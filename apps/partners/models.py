@@ -1,5 +1,5 @@
 from django.db import models
-from config.orgs.models import OrgScopedModel
+from config.orgs.models import OrgScopedModel, org_foreign_key, org_index
 
 
 class Partner(OrgScopedModel):
@@ -10,11 +10,16 @@ class Partner(OrgScopedModel):
         (STATUS_ARCHIVED, "Archived"),
     )
 
+    org = org_foreign_key(db_index=False)  # покрыт partner_org_id_idx
     name = models.CharField(max_length=255)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            # список (активные, keyset по id) и любые выборки по org — полный, заменяет индекс FK org
+            org_index("id", name="partner_org_id_idx"),
+        ]
 
 
     def __str__(self) -> str:
@@ -0,0 +1,47 @@
+# apps/payments/api_views.py
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.payments.logic.webhooks import SIGNATURE_HEADER, enqueue_webhook, parse_webhook, verify_webhook_signature
+from apps.payments.providers.registry import get_registry
+
+
+class ProviderStatsView(APIView):
+    """
+    GET /api/v1/payments/providers/stats/
+    Метрики провайдеров текущего процесса (только staff): размер registry, degraded,
+    по каждому (org:provider) — состояние circuit breaker'а, вызовы/ошибки/отказы, p99, переходы.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_registry().stats())
+
+
+class PaymentWebhookView(APIView):
+    """
+    POST /api/v1/payments/webhooks/<org public_id>/<provider>/
+    Приём webhook'а провайдера: подпись (WEBHOOK_SECRET обязателен), форма события и один INSERT
+    в очередь PaymentWebhook. Переходы платежей — асинхронно, воркерами (process_payment_webhooks).
+
+    202 — поставлено в очередь, 200 — дубль (event id уже был), 400 — неверное событие,
+    403 — неверная подпись или у провайдера нет WEBHOOK_SECRET, 404 — нет такой org.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, org_id, provider):
+        body = request.body
+        verify_webhook_signature(
+            org_public_id=org_id, provider=provider, body=body, signature=request.headers.get(SIGNATURE_HEADER)
+        )
+        event = parse_webhook(body)
+
+        result = enqueue_webhook(org_public_id=org_id, provider=provider, event=event)
+        if result is None:
+            raise NotFound("Organization not found.")
+        code = status.HTTP_202_ACCEPTED if result == "queued" else status.HTTP_200_OK
+        return Response({"status": result}, status=code)
@@ -0,0 +1,96 @@
+# apps/payments/idempotency_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class IdempotencyKeyCache:
+    """
+    Недавно виденные ключи идемпотентности: (org_id, idempotency_key) -> pk платежа.
+
+    Process-local LRU с коротким TTL: ретраи POS/терминала приходят пачкой в первые
+    секунды, повтор по ключу из кэша — чтение по pk вместо попытки INSERT ... ON CONFLICT
+    (та тратит значение sequence и берёт speculative lock на уникальный индекс).
+    Храним только pk, не сам платёж: статус к моменту ретрая мог измениться.
+
+    Запись — только после commit транзакции, создавшей/нашедшей платёж;
+    удаление платежа — сигнал post_delete (см. signals.py).
+    """
+
+    def __init__(self, *, max_size: int, ttl_s: float):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+
+        self._lock = threading.Lock()
+        self._data: OrderedDict[tuple[int, str], tuple[float, int]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, org_id: int, key: str) -> int | None:
+        with self._lock:
+            entry = self._data.get((org_id, key))
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._data[(org_id, key)]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end((org_id, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, org_id: int, key: str, payment_id: int) -> None:
+        with self._lock:
+            self._data[(org_id, key)] = (time.monotonic() + self.ttl_s, payment_id)
+            self._data.move_to_end((org_id, key))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, org_id: int, key: str) -> None:
+        with self._lock:
+            self._data.pop((org_id, key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_cache: IdempotencyKeyCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_idempotency_cache() -> IdempotencyKeyCache | None:
+    """
+    Singleton процесса. None — кэш выключен (PAYMENT_IDEMPOTENCY_CACHE["ENABLED"] = False).
+    """
+    global _cache
+
+    conf = getattr(settings, "PAYMENT_IDEMPOTENCY_CACHE", {})
+    if not conf.get("ENABLED", False):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IdempotencyKeyCache(
+                    max_size=conf.get("MAX_SIZE", 10_000),
+                    ttl_s=conf.get("TTL_S", 10),
+                )
+    return _cache
@@ -0,0 +1,194 @@
+# apps/payments/logic/async_payments.py
+"""
+Async use-case'ы платежей (для ASGI: core/asgi.py, async views, воркеры на asyncio).
+
+БД — короткие sync-фазы тех же use-case'ов через sync_to_async (общий sync-поток Django,
+как у async ORM); провайдер — await registry.call_provider без потока и без транзакции.
+Поэтому пачка из N платежей занимает ~один round-trip провайдера + N коротких транзакций,
+а не N round-trip'ов.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import ValidationError
+
+from apps.payments.logic.authorize_payment import _finalize_authorize, _start_authorize
+from apps.payments.logic.capture_payment import capture_payment
+from apps.payments.logic.provider_circuit import record_circuit_transitions
+from apps.payments.logic.refund_payment import refund_payment
+from apps.payments.logic.void_payment import void_payment
+from apps.payments.models import OrderPayment, PaymentEvent
+from apps.payments.providers import registry
+
+
+async def aauthorize_payment(
+    *,
+    payment: OrderPayment,
+    actor=None,
+    metadata: dict | None = None,
+    timeout_s: float | None = None,
+) -> OrderPayment:
+    """
+    authorize_payment для asyncio: те же фазы intent -> provider -> CAS finalize, тот же
+    circuit breaker (разрешение / probe-слот — до фазы 1, открыт — ProviderUnavailable) и те же ошибки.
+    """
+    if metadata is None:
+        metadata = {}
+    entry = await registry.aget_provider_entry(payment)
+    transitions = entry.breaker.acquire()
+    lease_timeout_s = timeout_s if timeout_s is not None else entry.options["TIMEOUT_S"]
+
+    try:
+        locked, redrive = await sync_to_async(_start_authorize)(
+            payment=payment, actor=actor, timeout_s=lease_timeout_s
+        )
+    except BaseException:
+        entry.breaker.release()
+        if transitions:
+            await sync_to_async(record_circuit_transitions)(
+                payment=payment, operation="authorize", transitions=transitions
+            )
+        raise
+    payload = await _call_recording_transitions(
+        locked, "authorize", timeout_s=timeout_s, transitions=transitions, acquired=True
+    )
+    return await sync_to_async(_finalize_authorize)(
+        payment=locked, payload=payload, actor=actor, metadata=metadata, redrive=redrive
+    )
+
+
+async def _call_recording_transitions(
+    payment: OrderPayment,
+    operation: str,
+    *,
+    timeout_s: float | None,
+    transitions: list[dict[str, Any]] | None = None,
+    acquired: bool = False,
+) -> Any:
+    """
+    registry.call_provider + переходы circuit breaker'а этого вызова в PaymentEvent платежа.
+    """
+    transitions = transitions if transitions is not None else []
+    try:
+        return await registry.call_provider(
+            payment, operation, timeout_s=timeout_s, transitions=transitions, acquired=acquired
+        )
+    finally:
+        if transitions:
+            await sync_to_async(record_circuit_transitions)(
+                payment=payment, operation=operation, transitions=transitions
+            )
+
+
+async def aauthorize_payments(
+    payments: list[OrderPayment],
+    *,
+    actor=None,
+    timeout_s: float | None = None,
+) -> list[OrderPayment | BaseException]:
+    """
+    Пакетный authorize (терминал прислал пачку): все платежи конкурентно,
+    с лимитом одновременных вызовов на провайдера. Результат — по платежу в исходном
+    порядке: OrderPayment или исключение (ValidationError / ProviderError) этого платежа.
+    """
+    return await asyncio.gather(
+        *(aauthorize_payment(payment=p, actor=actor, timeout_s=timeout_s) for p in payments),
+        return_exceptions=True,
+    )
+
+
+# из каких статусов операция допустима — иначе провайдера не зовём,
+# а отдаём ошибку самого use-case'а (тексты ошибок живут там)
+_PROVIDER_OPERATIONS = {
+    "capture": (capture_payment, {OrderPayment.Status.PENDING, OrderPayment.Status.AUTHORIZED}),
+    "refund": (refund_payment, {OrderPayment.Status.CAPTURED}),
+    "void": (void_payment, {OrderPayment.Status.PENDING, OrderPayment.Status.AUTHORIZED}),
+}
+
+
+async def _apply_with_provider(
+    operation: str,
+    *,
+    payment: OrderPayment,
+    actor=None,
+    metadata: dict | None = None,
+    timeout_s: float | None = None,
+) -> OrderPayment:
+    """
+    Провайдер (вне транзакции) -> sync use-case со строгими проверками под row-lock.
+    Ответ провайдера кладём в metadata события; отказ ({"ok": False}) — ValidationError, статус не меняем.
+
+    Провайдер операцию выполнил, а use-case отказал (статус успел смениться, ошибка БД) —
+    деньги уже движутся: пишем событие action="provider_unapplied" с ответом провайдера
+    (для ручной сверки) и пробрасываем ошибку use-case'а.
+    """
+    use_case, allowed = _PROVIDER_OPERATIONS[operation]
+    metadata = dict(metadata or {})
+
+    current = await OrderPayment.objects.aget(pk=payment.pk)
+    if current.status in allowed:
+        payload = await _call_recording_transitions(current, operation, timeout_s=timeout_s)
+        if isinstance(payload, dict) and payload.get("ok") is False:
+            raise ValidationError({"status": [f"Payment {operation} declined."]})
+        metadata["provider_payload"] = payload
+
+    try:
+        return await sync_to_async(use_case)(payment=current, actor=actor, metadata=metadata)
+    except Exception as exc:
+        if "provider_payload" in metadata:
+            await sync_to_async(_record_unapplied)(
+                payment=current, operation=operation, payload=metadata["provider_payload"], actor=actor, error=exc
+            )
+        raise
+
+
+def _record_unapplied(*, payment: OrderPayment, operation: str, payload: Any, actor, error: Exception) -> None:
+    """
+    Операция у провайдера прошла, переход в БД — нет. Статус платежа не меняем,
+    только фиксируем расхождение в аудите (отдельной транзакцией: транзакция use-case'а откатилась).
+    """
+    PaymentEvent.objects.create(
+        org_id=payment.org_id,
+        payment=payment,
+        actor=actor if actor is not None else None,
+        terminal=None,
+        from_status=payment.status,
+        to_status=payment.status,
+        action="provider_unapplied",
+        metadata={
+            "operation": operation,
+            "provider_payload": payload,
+            "error": getattr(error, "detail", None) or str(error),
+        },
+    )
+
+
+async def acapture_payment(*, payment: OrderPayment, actor=None, metadata: dict | None = None,
+                           timeout_s: float | None = None) -> OrderPayment:
+    return await _apply_with_provider("capture", payment=payment, actor=actor, metadata=metadata, timeout_s=timeout_s)
+
+
+async def arefund_payment(*, payment: OrderPayment, actor=None, metadata: dict | None = None,
+                          timeout_s: float | None = None) -> OrderPayment:
+    return await _apply_with_provider("refund", payment=payment, actor=actor, metadata=metadata, timeout_s=timeout_s)
+
+
+async def avoid_payment(*, payment: OrderPayment, actor=None, metadata: dict | None = None,
+                        timeout_s: float | None = None) -> OrderPayment:
+    return await _apply_with_provider("void", payment=payment, actor=actor, metadata=metadata, timeout_s=timeout_s)
+
+
+async def acheck_payment_statuses(
+    payments: list[OrderPayment],
+    *,
+    timeout_s: float | None = None,
+) -> dict[Any, dict[str, Any] | BaseException]:
+    """
+    Сверка: статус у провайдера по каждому платежу, конкурентно. {public_id: ответ | исключение}.
+    Состояние в БД не меняется (переходы circuit breaker'а — только в метриках registry).
+    """
+    results = await registry.call_many(payments, "check_status", timeout_s=timeout_s)
+    return {p.public_id: result for p, result in zip(payments, results)}
@@ -1,13 +1,31 @@
 # apps/payments/logic/authorize_payment.py
 from __future__ import annotations
 
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from apps.payments.logic.provider_circuit import record_circuit_transitions
 from apps.payments.models import OrderPayment, PaymentEvent
 from apps.payments.providers import registry
 
 
+def authorize_settings() -> dict:
+    return getattr(settings, "PAYMENT_AUTHORIZE", {})
+
+
+def inflight_lease_s(timeout_s: float) -> float:
+    """
+    Сколько authorize может быть "в полёте", прежде чем его можно перезапустить.
+    Не меньше двух таймаутов провайдера — живой вызов не перехватываем.
+    """
+    return max(authorize_settings().get("INFLIGHT_LEASE_S", 60), 2 * timeout_s)
+
+
 def authorize_payment(
     *,
     payment: OrderPayment,
@@ -16,12 +34,33 @@ def authorize_payment(
     timeout_s: int = 10,
 ) -> OrderPayment:
     """
-    Use-case: AUTHORIZE платежа (pending -> authorized).
+    Use-case: AUTHORIZE платежа (pending -> authorizing -> authorized).
+
+    Сетевой вызов провайдера — вне транзакции и row-lock (иначе медленный эквайринг
+    держит соединение с БД и блокирует строку payment на весь таймаут):
+
+    1) короткая транзакция: select_for_update, проверка статуса, pending -> authorizing
+       (intent: provider_request_id + inflight_since), commit;
+    2) provider.authorize без открытой транзакции;
+    3) короткая транзакция: compare-and-set authorizing -> authorized (или failed при отказе)
+       по (status, provider_request_id) + PaymentEvent.
 
     Конкурентность:
-    - POS/эквайринг часто ретраят запросы / двойные клики возможны.
-    - Два параллельных authorize не должны “тихо” пройти.
-      Поэтому: transaction.atomic + select_for_update на строку payment.
+    - Два параллельных authorize не должны “тихо” пройти: второй видит authorizing
+      и получает 400, провайдер вызывается один раз.
+    - Процесс упал между 1) и 3) — платёж остаётся authorizing. После lease
+      (inflight_lease_s) повторный authorize / recover_inflight_authorizations перезапускает
+      вызов с тем же provider_request_id: провайдер идемпотентен по нему.
+    - Ошибка провайдера (таймаут/сеть) — статус не трогаем, исход неизвестен; ошибка уходит наверх.
+
+    Circuit breaker провайдера (registry.get_breaker):
+    - открыт (или в half_open заняты все probe-слоты) — ProviderUnavailable (503) до фазы 1:
+      платёж остаётся pending, POS берёт другой tender; слот берётся до фазы 1 и возвращается,
+      если фаза 1 отказала;
+    - провайдер без синхронного клиента (http), выключенный или неизвестный — ValueError
+      тоже до фазы 1, статус платежа не меняется;
+    - таймаут вызова — timeout_s, урезанный по наблюдаемому p99 провайдера;
+    - переходы состояния breaker'а пишутся событиями action="provider_circuit".
 
     Строго:
     - authorized -> authorized запрещаем (400).
@@ -30,6 +69,42 @@ def authorize_payment(
     if metadata is None:
         metadata = {}
 
+    # провайдер и разрешение breaker'а (в half_open — probe-слот) — до фазы 1: иначе intent
+    # закоммичен, а провайдер не резолвится (async-only / выключен / неизвестен) или вызов
+    # отклонён — платёж завис бы в authorizing, и завершить его некому
+    # ВАЖНО: вызываем через registry, чтобы monkeypatch работал по пути
+    provider = registry.get_provider_for_payment(payment)
+    breaker = registry.get_breaker(payment)
+    transitions = breaker.acquire()
+
+    try:
+        # 1) intent
+        locked, redrive = _start_authorize(payment=payment, actor=actor, timeout_s=timeout_s)
+    except BaseException:
+        breaker.release()
+        record_circuit_transitions(payment=payment, operation="authorize", transitions=transitions)
+        raise
+
+    # 2) провайдер — без транзакции
+    try:
+        payload = breaker.call(
+            lambda t: provider.authorize(payment=locked, timeout_s=t),
+            timeout_s=timeout_s,
+            transitions=transitions,
+            acquired=True,
+        )
+    finally:
+        record_circuit_transitions(payment=locked, operation="authorize", transitions=transitions)
+
+    # 3) finalize
+    return _finalize_authorize(payment=locked, payload=payload, actor=actor, metadata=metadata, redrive=redrive)
+
+
+def _start_authorize(*, payment: OrderPayment, actor, timeout_s: float) -> tuple[OrderPayment, bool]:
+    """
+    Фаза 1: pending -> authorizing под row-lock (или перехват зависшего intent'а).
+    Возвращает (платёж, redrive).
+    """
     with transaction.atomic():
         locked = (
             OrderPayment.objects.select_for_update()
@@ -40,29 +115,109 @@ def authorize_payment(
         if locked.status == OrderPayment.Status.AUTHORIZED:
             raise ValidationError({"status": ["Payment is already authorized."]})
 
+        now = timezone.now()
+        if locked.status == OrderPayment.Status.AUTHORIZING:
+            if locked.inflight_since > now - timedelta(seconds=inflight_lease_s(timeout_s)):
+                raise ValidationError({"status": ["Payment authorization is in progress."]})
+            # зависший intent: повторяем вызов с тем же provider_request_id
+            locked.inflight_since = now
+            locked.save(update_fields=["inflight_since", "updated_at"])
+            return locked, True
+
         if locked.status != OrderPayment.Status.PENDING:
             raise ValidationError({"status": ["Invalid status transition."]})
 
-        old_status = locked.status
-
-        # ВАЖНО: вызываем через registry, чтобы monkeypatch работал по пути
-        provider = registry.get_provider_for_payment(locked)
-        payload = provider.authorize(payment=locked, timeout_s=timeout_s)
-
-        locked.raw_provider_payload = payload
-        locked.status = OrderPayment.Status.AUTHORIZED
+        locked.status = OrderPayment.Status.AUTHORIZING
+        locked.provider_request_id = uuid.uuid4()
+        locked.inflight_since = now
         locked._status_change_allowed = True
-        locked.save(update_fields=["raw_provider_payload", "status", "updated_at"])
+        locked.save(update_fields=["status", "provider_request_id", "inflight_since", "updated_at"])
 
         PaymentEvent.objects.create(
             org=locked.org,
             payment=locked,
             actor=actor if actor is not None else None,
             terminal=None,
-            from_status=old_status,
-            to_status=OrderPayment.Status.AUTHORIZED,
+            from_status=OrderPayment.Status.PENDING,
+            to_status=OrderPayment.Status.AUTHORIZING,
+            action="authorize_start",
+            metadata={"provider_request_id": str(locked.provider_request_id)},
+        )
+        return locked, False
+
+
+def _finalize_authorize(*, payment: OrderPayment, payload: dict, actor, metadata: dict, redrive: bool) -> OrderPayment:
+    """
+    authorizing -> authorized/failed одним UPDATE ... WHERE status='authorizing' AND provider_request_id=...
+
+    Не совпало (другой воркер уже финализировал этот intent) — возвращаем актуальное
+    состояние, если это тот же исход, иначе 400. Событие пишет только победитель CAS.
+    """
+    declined = isinstance(payload, dict) and payload.get("ok") is False
+    new_status = OrderPayment.Status.FAILED if declined else OrderPayment.Status.AUTHORIZED
+
+    with transaction.atomic():
+        updated = OrderPayment.objects.filter(
+            pk=payment.pk,
+            status=OrderPayment.Status.AUTHORIZING,
+            provider_request_id=payment.provider_request_id,
+        ).update(
+            status=new_status,
+            raw_provider_payload=payload,
+            inflight_since=None,
+            updated_at=timezone.now(),
+        )
+
+        current = OrderPayment.objects.select_related("org", "order").get(pk=payment.pk)
+        if not updated:
+            if current.status == OrderPayment.Status.AUTHORIZED and not declined:
+                return current
+            raise ValidationError({"status": ["Invalid status transition."]})
+
+        PaymentEvent.objects.create(
+            org=current.org,
+            payment=current,
+            actor=actor if actor is not None else None,
+            terminal=None,
+            # бизнес-переход: pending -> authorized (authorizing — техническое промежуточное состояние)
+            from_status=OrderPayment.Status.PENDING,
+            to_status=new_status,
             action="authorize",
-            metadata=metadata,
+            metadata={
+                **metadata,
+                "provider_request_id": str(payment.provider_request_id),
+                **({"redrive": True} if redrive else {}),
+            },
         )
 
-        return locked
+    if declined:
+        raise ValidationError({"status": ["Payment authorization declined."]})
+    return current
+
+
+def recover_inflight_authorizations(*, timeout_s: int = 10, limit: int = 100) -> dict[str, int]:
+    """
+    Перезапуск authorize, зависших в authorizing дольше lease (процесс упал до finalize).
+
+    Кандидаты — по частичному индексу payment_inflight_idx; каждый платёж идёт через
+    authorize_payment (его intent-транзакция заново проверяет lease под row-lock,
+    поэтому параллельные recovery не вызывают провайдера дважды одновременно).
+    """
+    cutoff = timezone.now() - timedelta(seconds=inflight_lease_s(timeout_s))
+    stale = list(
+        OrderPayment.objects.filter(status=OrderPayment.Status.AUTHORIZING, inflight_since__lte=cutoff)
+        .order_by("inflight_since")[:limit]
+    )
+
+    result = {"authorized": 0, "failed": 0, "skipped": 0, "errors": 0}
+    for payment in stale:
+        try:
+            authorize_payment(payment=payment, timeout_s=timeout_s, metadata={"recovered": True})
+            result["authorized"] += 1
+        except ValidationError:
+            payment.refresh_from_db(fields=["status"])
+            result["failed" if payment.status == OrderPayment.Status.FAILED else "skipped"] += 1
+        except Exception:
+            # провайдер недоступен — останется authorizing до следующего прогона
+            result["errors"] += 1
+    return result
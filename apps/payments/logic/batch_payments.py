@@ -0,0 +1,195 @@
+# apps/payments/logic/batch_payments.py
+"""
+Пакетные переходы статусов платежей (закрытие смены / settlement run).
+
+Вместо N транзакций capture_payment / void_payment (N row-lock'ов, N UPDATE, N INSERT
+события) — на пачку chunk_size платежей одна транзакция:
+
+1) SELECT ... FOR UPDATE всей пачки в порядке pk (параллельные пачки и одиночные
+   use-case'ы не встречаются в deadlock'е);
+2) проверка переходов в памяти — по каждому платежу свой исход, ошибки одного
+   не откатывают остальные;
+3) один UPDATE ... WHERE id = ANY(...) AND status = ANY(...) RETURNING id;
+4) Order.captured_total — одним UPDATE на все заказы пачки (для capture);
+5) PaymentEvent — одним bulk_create.
+
+Тексты ошибок — те же, что у одиночных use-case'ов.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.payments.logic.order_totals import add_to_orders_totals
+from apps.payments.models import OrderPayment, PaymentEvent
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class BatchOutcome:
+    ok: bool
+    status: str | None  # статус платежа после пачки (None — платёж не найден)
+    error: str | None = None
+
+
+def capture_payments(
+    payment_ids: Iterable[int],
+    *,
+    org,
+    actor=None,
+    metadata: dict | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[int, BatchOutcome]:
+    """
+    Пакетный capture_payment: pending/authorized -> captured (+ Order.captured_total).
+    """
+    return _transition_many(
+        payment_ids,
+        org=org,
+        actor=actor,
+        metadata=metadata,
+        chunk_size=chunk_size,
+        action="capture",
+        to_status=OrderPayment.Status.CAPTURED,
+        allowed=(OrderPayment.Status.PENDING, OrderPayment.Status.AUTHORIZED),
+        already="Payment is already captured.",
+    )
+
+
+def void_payments(
+    payment_ids: Iterable[int],
+    *,
+    org,
+    actor=None,
+    metadata: dict | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[int, BatchOutcome]:
+    """
+    Пакетный void_payment: pending/authorized -> voided.
+    """
+    return _transition_many(
+        payment_ids,
+        org=org,
+        actor=actor,
+        metadata=metadata,
+        chunk_size=chunk_size,
+        action="void",
+        to_status=OrderPayment.Status.VOIDED,
+        allowed=(OrderPayment.Status.PENDING, OrderPayment.Status.AUTHORIZED),
+        already="Payment is already voided.",
+    )
+
+
+def _transition_many(
+    payment_ids: Iterable[int],
+    *,
+    org,
+    actor,
+    metadata: dict | None,
+    chunk_size: int,
+    action: str,
+    to_status: str,
+    allowed: tuple[str, ...],
+    already: str,
+) -> dict[int, BatchOutcome]:
+    """
+    {payment_id: BatchOutcome} в порядке payment_ids (повторы схлопываются).
+    Пачки по chunk_size — каждая своей транзакцией: row-lock'и не держатся на весь прогон.
+    """
+    ids = list(dict.fromkeys(payment_ids))
+    outcomes: dict[int, BatchOutcome] = {}
+    ordered = sorted(ids)
+    for start in range(0, len(ordered), chunk_size):
+        outcomes.update(
+            _transition_chunk(
+                ordered[start:start + chunk_size],
+                org=org, actor=actor, metadata=metadata or {},
+                action=action, to_status=to_status, allowed=allowed, already=already,
+            )
+        )
+    return {pid: outcomes[pid] for pid in ids}
+
+
+def _transition_chunk(
+    ids: list[int],
+    *,
+    org,
+    actor,
+    metadata: dict,
+    action: str,
+    to_status: str,
+    allowed: tuple[str, ...],
+    already: str,
+) -> dict[int, BatchOutcome]:
+    with transaction.atomic():
+        # чужая org — как несуществующий платёж
+        rows = {
+            pid: (status, order_id, amount)
+            for pid, status, order_id, amount in OrderPayment.objects.select_for_update()
+            .filter(org=org, pk__in=ids)
+            .order_by("pk")
+            .values_list("id", "status", "order_id", "amount")
+        }
+
+        outcomes: dict[int, BatchOutcome] = {}
+        eligible = []
+        for pid in ids:
+            if pid not in rows:
+                outcomes[pid] = BatchOutcome(ok=False, status=None, error="Payment not found.")
+                continue
+            status = rows[pid][0]
+            if status == to_status:
+                outcomes[pid] = BatchOutcome(ok=False, status=status, error=already)
+            elif status not in allowed:
+                outcomes[pid] = BatchOutcome(ok=False, status=status, error="Invalid status transition.")
+            else:
+                eligible.append(pid)
+
+        if not eligible:
+            return outcomes
+
+        # строки уже под lock, WHERE status — страховка инварианта "переход только из allowed"
+        table = connection.ops.quote_name(OrderPayment._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET status = %s, updated_at = %s "
+                "WHERE id = ANY(%s) AND status = ANY(%s) RETURNING id",
+                [to_status, timezone.now(), eligible, list(allowed)],
+            )
+            updated = {row[0] for row in cursor.fetchall()}
+
+        if to_status == OrderPayment.Status.CAPTURED:
+            captured_by_order: dict[int, Decimal] = defaultdict(Decimal)
+            for pid in updated:
+                captured_by_order[rows[pid][1]] += rows[pid][2]
+            add_to_orders_totals(captured=captured_by_order)
+
+        PaymentEvent.objects.bulk_create(
+            [
+                PaymentEvent(
+                    org=org,
+                    payment_id=pid,
+                    actor=actor,
+                    terminal=None,
+                    from_status=rows[pid][0],
+                    to_status=to_status,
+                    action=action,
+                    metadata=metadata,
+                )
+                for pid in eligible
+                if pid in updated
+            ]
+        )
+
+        for pid in eligible:
+            if pid in updated:
+                outcomes[pid] = BatchOutcome(ok=True, status=to_status)
+            else:  # pragma: no cover - строки под lock, статус не мог смениться
+                outcomes[pid] = BatchOutcome(ok=False, status=rows[pid][0], error="Invalid status transition.")
+        return outcomes
@@ -4,6 +4,7 @@ from __future__ import annotations
 from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
+from apps.payments.logic.order_totals import add_to_order_totals
 from apps.payments.models import OrderPayment, PaymentEvent
 
 
@@ -19,6 +20,8 @@ def capture_payment(*, payment: OrderPayment, actor=None, metadata: dict | None
 
     Строгое правило:
     - captured -> captured запрещаем (400), не делаем “тихий” idempotent success.
+
+    Order.captured_total += amount — в той же транзакции (F()-дельта).
     """
 
     if metadata is None:
@@ -46,6 +49,7 @@ def capture_payment(*, payment: OrderPayment, actor=None, metadata: dict | None
         # Инвариант модели: статус можно менять только через use-case
         locked._status_change_allowed = True
         locked.save(update_fields=["status", "updated_at"])
+        add_to_order_totals(order_id=locked.order_id, captured=locked.amount)
 
         PaymentEvent.objects.create(
             org=locked.org,
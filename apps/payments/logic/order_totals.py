@@ -0,0 +1,87 @@
+# apps/payments/logic/order_totals.py
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.orders.models import Order
+from apps.payments.models import OrderPayment
+
+ZERO = Decimal("0.00")
+
+# refund возможен только из captured — возвращённый платёж тоже когда-то был списан
+CAPTURED_STATUSES = (OrderPayment.Status.CAPTURED, OrderPayment.Status.REFUNDED)
+
+
+def payment_totals_aggregates() -> dict:
+    """
+    Эталонные Order.captured_total / refunded_total — агрегаты по OrderPayment (для сверки и backfill).
+    """
+    money = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        "captured_total": Coalesce(
+            Sum("amount", filter=Q(status__in=CAPTURED_STATUSES)), Value(ZERO), output_field=money
+        ),
+        "refunded_total": Coalesce(
+            Sum("amount", filter=Q(status=OrderPayment.Status.REFUNDED)), Value(ZERO), output_field=money
+        ),
+    }
+
+
+def add_to_order_totals(*, order_id: int, captured: Decimal = ZERO, refunded: Decimal = ZERO) -> None:
+    """
+    +дельта к денежным итогам заказа одним UPDATE с F()-выражениями.
+
+    Вызывается в транзакции перехода статуса платежа (под его row-lock): итог меняется
+    атомарно вместе со статусом, параллельные capture разных платежей заказа не теряют
+    обновления друг друга (строка Order лочится только на время UPDATE до commit).
+    """
+    money = Order._meta.get_field("captured_total")
+    Order.objects.filter(pk=order_id).update(
+        captured_total=F("captured_total") + Value(captured, output_field=money),
+        refunded_total=F("refunded_total") + Value(refunded, output_field=money),
+        updated_at=timezone.now(),
+    )
+
+
+def add_to_orders_totals(
+    *,
+    captured: dict[int, Decimal] | None = None,
+    refunded: dict[int, Decimal] | None = None,
+) -> None:
+    """
+    add_to_order_totals для многих заказов сразу (пакетные переходы): один UPDATE ... FROM unnest(...).
+    Строки Order лочатся в порядке id — параллельные пачки не встречаются в deadlock'е.
+    """
+    captured = captured or {}
+    refunded = refunded or {}
+    order_ids = sorted(set(captured) | set(refunded))
+    if not order_ids:
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(Order._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "WITH delta (order_id, captured, refunded) AS ("
+            "  SELECT * FROM unnest(%s::bigint[], %s::numeric[], %s::numeric[])"
+            "), locked AS ("
+            f"  SELECT o.id FROM {table} o WHERE o.id = ANY(%s) ORDER BY o.id FOR UPDATE"
+            ") "
+            f"UPDATE {table} o SET "
+            "captured_total = o.captured_total + delta.captured, "
+            "refunded_total = o.refunded_total + delta.refunded, "
+            "updated_at = %s "
+            "FROM delta, locked WHERE o.id = delta.order_id AND locked.id = o.id",
+            [
+                order_ids,
+                [captured.get(oid, ZERO) for oid in order_ids],
+                [refunded.get(oid, ZERO) for oid in order_ids],
+                order_ids,
+                timezone.now(),
+            ],
+        )
@@ -1,17 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from decimal import Decimal
 from typing import Any
 
-from django.db import transaction
+from django.db import connection, transaction
 
+from apps.payments.idempotency_cache import get_idempotency_cache
+from apps.payments.logic.order_totals import add_to_order_totals
 from apps.payments.models import OrderPayment, PaymentEvent
 from django.core.exceptions import ValidationError
 
 
 
-@transaction.atomic
 def create_payment(
     *,
     order,
@@ -32,24 +32,27 @@ def create_payment(
     - идемпотентность:
       если idempotency_key задан и уже существует платёж (org + key) -> вернуть его
       и НЕ создавать дубликаты PaymentEvent.
-    - транзакция atomic нужна, потому что:
-      1) в следующих шагах мы будем делать цепочки authorize/capture/refund и они должны быть согласованы,
-      2) дедупликация должна быть “надёжной” на ретраях.
+    - платёж и его событие — в одной транзакции.
+
+    Идемпотентность без предварительного locking-чтения:
+    - INSERT ... ON CONFLICT ON CONSTRAINT uniq_payment_org_idempotency DO NOTHING RETURNING id:
+      вставил — пишем событие; конфликт — Postgres сам дождался транзакции-конкурента,
+      и после неё читаем победителя (fallback read по тому же уникальному индексу).
+      Параллельные ретраи одного ключа создают ровно один платёж и одно событие.
+    - недавно виденные ключи — из IdempotencyKeyCache (pk платежа, короткий TTL).
     """
     org = order.org
     metadata = metadata or {}
 
-    if idempotency_key:
-        existing = (
-            OrderPayment.objects
-            .filter(org=org, idempotency_key=idempotency_key)
-            .select_for_update()  # защищаемся от гонки при параллельных ретраях
-            .first()
-        )
-        if existing:
-            return existing
+    cache = get_idempotency_cache() if idempotency_key else None
+    if cache is not None:
+        payment_id = cache.get(org.pk, idempotency_key)
+        if payment_id is not None:
+            existing = OrderPayment.objects.filter(pk=payment_id).first()
+            if existing is not None:
+                return existing
 
-    payment = OrderPayment.objects.create(
+    payment = OrderPayment(
         org=org,
         order=order,
         tender=tender,
@@ -61,20 +64,61 @@ def create_payment(
         provider=provider,
     )
 
-    PaymentEvent.objects.create(
-        org=org,
-        payment=payment,
-        actor=actor,
-        terminal=None,
-        from_status=None,
-        to_status=payment.status,
-        action="create",
-        metadata=metadata,
-    )
+    with transaction.atomic():
+        if idempotency_key:
+            created = _insert_if_absent(payment)
+        else:
+            payment.save(force_insert=True)
+            created = True
+
+        if created:
+            PaymentEvent.objects.create(
+                org=org,
+                payment=payment,
+                actor=actor,
+                terminal=None,
+                from_status=None,
+                to_status=payment.status,
+                action="create",
+                metadata=metadata,
+            )
+
+    if not created:
+        payment = OrderPayment.objects.get(org=org, idempotency_key=idempotency_key)
+
+    if cache is not None:
+        payment_id = payment.pk
+        transaction.on_commit(lambda: cache.set(org.pk, idempotency_key, payment_id))
 
     return payment
 
 
+def _insert_if_absent(payment: OrderPayment) -> bool:
+    """
+    INSERT платежа, если (org, idempotency_key) свободен. True — вставили (payment.pk заполнен).
+    """
+    meta = OrderPayment._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    qn = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(f.column) for f in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ON CONSTRAINT {qn('uniq_payment_org_idempotency')} DO NOTHING "
+            f"RETURNING {qn(meta.pk.column)}",
+            [f.get_db_prep_save(f.pre_save(payment, True), connection) for f in fields],
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        return False
+    payment.pk = row[0]
+    payment._state.adding = False
+    payment._state.db = connection.alias
+    return True
+
+
 
 
 
@@ -130,6 +174,7 @@ def capture_payment(*, payment: OrderPayment, actor=None, metadata: dict | None
     - atomic + select_for_update на payment предотвращают гонки (двойной capture).
     - status меняется только через allow-флаг.
     - обязательно создаём PaymentEvent.
+    - Order.captured_total += amount в той же транзакции.
     """
     metadata = metadata or {}
 
@@ -147,6 +192,7 @@ def capture_payment(*, payment: OrderPayment, actor=None, metadata: dict | None
     locked.status = OrderPayment.Status.CAPTURED
     locked._status_change_allowed = True
     locked.save(update_fields=["status", "updated_at"])
+    add_to_order_totals(order_id=locked.order_id, captured=locked.amount)
 
     PaymentEvent.objects.create(
         org=locked.org,
@@ -0,0 +1,24 @@
+# apps/payments/logic/provider_circuit.py
+from __future__ import annotations
+
+from typing import Any
+
+from apps.payments.models import OrderPayment, PaymentEvent
+
+
+def record_circuit_transitions(*, payment: OrderPayment, operation: str, transitions: list[dict[str, Any]]) -> None:
+    """
+    Переходы circuit breaker'а (closed -> open -> half_open -> ...) в аудит платежа,
+    на вызове которого они случились: action="provider_circuit", статус платежа не меняется.
+    """
+    for transition in transitions:
+        PaymentEvent.objects.create(
+            org_id=payment.org_id,
+            payment=payment,
+            actor=None,
+            terminal=None,
+            from_status=payment.status,
+            to_status=payment.status,
+            action="provider_circuit",
+            metadata={"breaker": {**transition, "operation": operation}},
+        )
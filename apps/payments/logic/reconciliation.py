@@ -0,0 +1,246 @@
+"""
+Сверка OrderPayment с settlement-файлом эквайрера (CSV / JSONL).
+
+Память ограничена chunk_size строками с обеих сторон:
+- файл читается потоково, по chunk_size строк;
+- на пачку — один SELECT ... WHERE org = ? AND external_id IN (...) (индекс uniq_payment_org_external_id);
+- сопоставленные платежи пишутся в TEMP-таблицу — по ней же ловим дубли в файле и
+  во втором проходе (keyset по id) ищем списанные платежи, которых в файле нет.
+
+Расхождения отдаются генератором по мере нахождения, ни одна сторона целиком в память не грузится.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from apps.payments.models import OrderPayment
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# в settlement-отчёт попадают только списанные деньги (refund — тоже списанный когда-то платёж)
+SETTLED_STATUSES = (OrderPayment.Status.CAPTURED, OrderPayment.Status.REFUNDED)
+
+SEEN_TABLE = "payments_settlement_seen"
+
+SETTLEMENT_FIELDS = ("external_id", "amount", "currency", "status")
+
+
+@dataclass(frozen=True)
+class SettlementRow:
+    line: int
+    external_id: str
+    amount: Decimal
+    currency: str
+    status: str
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    # invalid / duplicate / missing_payment / missing_in_settlement / amount / currency / status
+    kind: str
+    external_id: str | None
+    line: int | None = None  # строка файла (None — расхождение найдено по стороне БД)
+    settlement: str | None = None  # значение в файле
+    payment: str | None = None  # значение в OrderPayment
+
+    def __str__(self) -> str:
+        parts = [f"{self.kind}: external_id={self.external_id}"]
+        if self.line is not None:
+            parts.append(f"line={self.line}")
+        if self.settlement is not None:
+            parts.append(f"settlement={self.settlement}")
+        if self.payment is not None:
+            parts.append(f"payment={self.payment}")
+        return " ".join(parts)
+
+
+@dataclass
+class ReconciliationStats:
+    rows: int = 0
+    matched: int = 0
+    mismatches: int = 0
+
+
+def read_settlement_rows(stream: IO[str], *, fmt: str) -> Iterator[SettlementRow | Mismatch]:
+    """
+    Потоковый разбор settlement-файла: SettlementRow на каждую строку, Mismatch("invalid") на битую.
+    CSV — с заголовком, JSONL — объект на строку; поля SETTLEMENT_FIELDS.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        records = ((reader.line_num, record) for record in reader)
+    elif fmt == "jsonl":
+        records = _jsonl_records(stream)
+    else:
+        raise ValueError(f"Unsupported settlement format: {fmt}")
+
+    for line, record in records:
+        if not isinstance(record, dict):
+            yield Mismatch(kind="invalid", external_id=None, line=line, settlement=str(record)[:64])
+            continue
+        external_id = str(record.get("external_id") or "").strip()
+        try:
+            amount = Decimal(str(record.get("amount")).strip())
+        except InvalidOperation:
+            amount = None
+        if not external_id or amount is None or not amount.is_finite():
+            yield Mismatch(kind="invalid", external_id=external_id or None, line=line)
+            continue
+        yield SettlementRow(
+            line=line,
+            external_id=external_id,
+            amount=amount,
+            currency=str(record.get("currency") or "").strip().upper(),
+            status=str(record.get("status") or "").strip().lower(),
+        )
+
+
+def _jsonl_records(stream: IO[str]) -> Iterator[tuple[int, object]]:
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError:
+            yield line, text.strip()
+
+
+def reconcile_settlement(
+    rows: Iterable[SettlementRow | Mismatch],
+    *,
+    org,
+    provider: str | None = None,
+    since=None,
+    until=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: ReconciliationStats | None = None,
+) -> Iterator[Mismatch]:
+    """
+    Расхождения settlement-файла и OrderPayment org (опционально — одного provider).
+
+    since/until (created_at платежа, [since, until)) ограничивают второй проход:
+    какие списанные платежи обязаны быть в файле. Без них — все списанные платежи с external_id.
+    """
+    stats = stats if stats is not None else ReconciliationStats()
+    payments = OrderPayment.objects.filter(org=org)
+    if provider:
+        payments = payments.filter(provider=provider)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {SEEN_TABLE} (payment_id bigint PRIMARY KEY)")
+        cursor.execute(f"TRUNCATE {SEEN_TABLE}")
+    try:
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            for mismatch in _reconcile_chunk(chunk, payments=payments, stats=stats):
+                stats.mismatches += 1
+                yield mismatch
+
+        # статистика заполненной seen-таблицы — иначе планировщик считает её пустой (temp-таблицы autovacuum не видит)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {SEEN_TABLE}")
+        for mismatch in _unsettled_payments(payments, since=since, until=until, chunk_size=chunk_size):
+            stats.mismatches += 1
+            yield mismatch
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEEN_TABLE}")
+
+
+def _reconcile_chunk(
+    chunk: list[SettlementRow | Mismatch],
+    *,
+    payments,
+    stats: ReconciliationStats,
+) -> Iterator[Mismatch]:
+    settled = [row for row in chunk if isinstance(row, SettlementRow)]
+    found = {
+        external_id: (pk, amount, currency, status)
+        for pk, external_id, amount, currency, status in payments.filter(
+            external_id__in={row.external_id for row in settled}
+        ).values_list("id", "external_id", "amount", "currency", "status")
+    }
+
+    first_seen: set[int] = set()
+    if found:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEEN_TABLE} (payment_id) SELECT unnest(%s::bigint[]) "
+                "ON CONFLICT DO NOTHING RETURNING payment_id",
+                [[pk for pk, *_ in found.values()]],
+            )
+            first_seen = {row[0] for row in cursor.fetchall()}
+
+    for row in chunk:
+        stats.rows += 1
+        if isinstance(row, Mismatch):
+            yield row
+            continue
+
+        if row.external_id not in found:
+            yield Mismatch(kind="missing_payment", external_id=row.external_id, line=row.line)
+            continue
+
+        pk, amount, currency, status = found[row.external_id]
+        # первое вхождение в этой пачке и не встречался в прошлых — иначе дубль в файле
+        if pk not in first_seen:
+            yield Mismatch(kind="duplicate", external_id=row.external_id, line=row.line)
+            continue
+        first_seen.discard(pk)
+
+        stats.matched += 1
+        if row.amount != amount:
+            yield Mismatch(
+                kind="amount", external_id=row.external_id, line=row.line,
+                settlement=str(row.amount), payment=str(amount),
+            )
+        if row.currency != currency.upper():
+            yield Mismatch(
+                kind="currency", external_id=row.external_id, line=row.line,
+                settlement=row.currency, payment=currency,
+            )
+        if row.status != status:
+            yield Mismatch(
+                kind="status", external_id=row.external_id, line=row.line,
+                settlement=row.status, payment=status,
+            )
+
+
+def _unsettled_payments(payments, *, since, until, chunk_size: int) -> Iterator[Mismatch]:
+    """
+    Списанные платежи с external_id, которых не было в файле — keyset по id, пачками.
+    """
+    # NOT EXISTS, а не NOT IN (subquery): Postgres строит hash anti-join; NOT IN при seen больше
+    # work_mem превращается в subplan, который пересканируется на каждый платёж-кандидат
+    not_seen = RawSQL(
+        f'NOT EXISTS (SELECT 1 FROM {SEEN_TABLE} AS seen WHERE seen.payment_id = "{OrderPayment._meta.db_table}"."id")',
+        [],
+        output_field=BooleanField(),
+    )
+    unsettled = payments.filter(not_seen, status__in=SETTLED_STATUSES, external_id__isnull=False)
+    if since is not None:
+        unsettled = unsettled.filter(created_at__gte=since)
+    if until is not None:
+        unsettled = unsettled.filter(created_at__lt=until)
+
+    last_id = 0
+    while True:
+        batch = list(
+            unsettled.filter(id__gt=last_id).order_by("id").values_list("id", "external_id", "amount", "status")[
+                :chunk_size
+            ]
+        )
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        for _, external_id, amount, status in batch:
+            yield Mismatch(kind="missing_in_settlement", external_id=external_id, payment=f"{amount} {status}")
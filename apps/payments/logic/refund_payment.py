@@ -4,6 +4,7 @@ from __future__ import annotations
 from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
+from apps.payments.logic.order_totals import add_to_order_totals
 from apps.payments.models import OrderPayment, PaymentEvent
 
 
@@ -20,6 +21,8 @@ def refund_payment(*, payment: OrderPayment, actor=None, metadata: dict | None =
 
     Строго:
     - refunded -> refunded запрещаем (400), чтобы не было "тихих" дублей.
+
+    Order.refunded_total += amount — в той же транзакции (F()-дельта).
     """
 
     if metadata is None:
@@ -43,6 +46,7 @@ def refund_payment(*, payment: OrderPayment, actor=None, metadata: dict | None =
         locked.status = OrderPayment.Status.REFUNDED
         locked._status_change_allowed = True
         locked.save(update_fields=["status", "updated_at"])
+        add_to_order_totals(order_id=locked.order_id, refunded=locked.amount)
 
         PaymentEvent.objects.create(
             org=locked.org,
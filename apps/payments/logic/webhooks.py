@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from apps.payments.logic.capture_payment import capture_payment
+from apps.payments.logic.refund_payment import refund_payment
+from apps.payments.logic.void_payment import void_payment
+from apps.payments.models import OrderPayment, PaymentProviderConfig, PaymentWebhook, PaymentWebhookDeadLetter
+from apps.payments.providers.registry import provider_settings
+from config.orgs.models import Organization
+
+# event type -> (статусы, в которых событие уже применено, use-case).
+# Authorize приходит синхронно (authorize_payment / recover_inflight_authorizations).
+WEBHOOK_TRANSITIONS = {
+    "payment.captured": ((OrderPayment.Status.CAPTURED, OrderPayment.Status.REFUNDED), capture_payment),
+    "payment.voided": ((OrderPayment.Status.VOIDED,), void_payment),
+    "payment.refunded": ((OrderPayment.Status.REFUNDED,), refund_payment),
+}
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+def webhook_settings() -> dict:
+    return {
+        "BATCH_SIZE": 100,
+        "MAX_ATTEMPTS": 8,
+        "BACKOFF_BASE_S": 5,
+        "BACKOFF_MAX_S": 3600,
+        "POLL_INTERVAL_S": 1,
+        **getattr(settings, "PAYMENT_WEBHOOKS", {}),
+    }
+
+
+def webhook_secret(*, org_public_id, provider: str) -> str:
+    """
+    WEBHOOK_SECRET провайдера org: options PaymentProviderConfig (источник истины для org),
+    иначе PAYMENT_PROVIDERS[code] — как в registry._load_config. Отключённый провайдер — без секрета.
+    """
+    row = (
+        PaymentProviderConfig.objects.filter(org__public_id=org_public_id, code=provider)
+        .values("options", "is_active")
+        .first()
+    )
+    if row is not None:
+        options = {**provider_settings(), **row["options"]} if row["is_active"] else {}
+    else:
+        options = provider_settings(provider)
+    return options.get("WEBHOOK_SECRET") or ""
+
+
+def verify_webhook_signature(*, org_public_id, provider: str, body: bytes, signature: str | None) -> None:
+    """
+    HMAC-SHA256(body) в hex по WEBHOOK_SECRET провайдера org.
+    Без секрета webhook не принимаем: endpoint без аутентификации, а событие двигает деньги по заказу.
+    """
+    secret = webhook_secret(org_public_id=org_public_id, provider=provider)
+    if not secret:
+        raise PermissionDenied("Webhooks are not configured for this provider.")
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(expected, signature.strip().lower()):
+        raise PermissionDenied("Invalid webhook signature.")
+
+
+def parse_webhook(body: bytes) -> dict:
+    """
+    Проверка формы события: {"id": ..., "type": ..., "external_id": ..., ...}.
+    Остальные поля не трогаем — payload кладётся в очередь как есть.
+    """
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise ValidationError({"body": ["Invalid JSON."]})
+    if not isinstance(event, dict):
+        raise ValidationError({"body": ["Expected a JSON object."]})
+
+    errors = {}
+    for name in ("id", "external_id"):
+        value = event.get(name)
+        if not isinstance(value, str) or not value or len(value) > 128:
+            errors[name] = ["Required string, at most 128 characters."]
+    if event.get("type") not in WEBHOOK_TRANSITIONS:
+        errors["type"] = [f"Unsupported event type. Expected one of: {', '.join(WEBHOOK_TRANSITIONS)}."]
+    if errors:
+        raise ValidationError(errors)
+    return event
+
+
+def enqueue_webhook(*, org_public_id, provider: str, event: dict) -> str | None:
+    """
+    Кладёт событие в очередь одним statement'ом (org по public_id + INSERT ... ON CONFLICT DO NOTHING).
+
+    "queued" — вставили, "duplicate" — (org, provider, event_id) уже был, None — org не найдена.
+    """
+    webhook = PaymentWebhook(
+        provider=provider,
+        event_id=event["id"],
+        event_type=event["type"],
+        external_id=event["external_id"],
+        payload=event,
+    )
+    meta = PaymentWebhook._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key and f.name != "org"]
+    qn = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"WITH org AS (SELECT {qn('id')} FROM {qn(Organization._meta.db_table)} WHERE {qn('public_id')} = %s), "
+            f"queued AS ("
+            f"  INSERT INTO {qn(meta.db_table)} ({qn('org_id')}, {', '.join(qn(f.column) for f in fields)}) "
+            f"  SELECT org.{qn('id')}, {', '.join(['%s'] * len(fields))} FROM org "
+            f"  ON CONFLICT ON CONSTRAINT {qn('uniq_webhook_org_provider_event')} DO NOTHING "
+            f"  RETURNING {qn(meta.pk.column)}"
+            f") "
+            f"SELECT (SELECT {qn('id')} FROM org), (SELECT {qn(meta.pk.column)} FROM queued)",
+            [org_public_id, *(f.get_db_prep_save(f.pre_save(webhook, True), connection) for f in fields)],
+        )
+        org_id, webhook_id = cursor.fetchone()
+
+    if org_id is None:
+        return None
+    return "queued" if webhook_id is not None else "duplicate"
+
+
+def backoff_s(attempts: int) -> float:
+    """
+    Пауза перед попыткой attempts + 1: BACKOFF_BASE_S * 2^(attempts - 1), не больше BACKOFF_MAX_S.
+    """
+    conf = webhook_settings()
+    return min(conf["BACKOFF_MAX_S"], conf["BACKOFF_BASE_S"] * 2 ** (attempts - 1))
+
+
+def apply_webhook(webhook: PaymentWebhook) -> bool:
+    """
+    Переход платежа по событию через use-case. False — событие уже применено (повтор, наш же
+    capture через API, запоздавший captured после refund), PaymentEvent не пишем.
+
+    Платёж не найден / переход пока невозможен (refund раньше capture) — ValidationError, уйдёт в retry.
+    """
+    payment = OrderPayment.objects.filter(
+        org_id=webhook.org_id, provider=webhook.provider, external_id=webhook.external_id
+    ).first()
+    if payment is None:
+        raise ValidationError({"payment": ["Payment not found."]})
+
+    applied, use_case = WEBHOOK_TRANSITIONS[webhook.event_type]
+    if payment.status in applied:
+        return False
+    use_case(payment=payment, metadata={"source": "webhook", "webhook_event_id": webhook.event_id})
+    return True
+
+
+def _error_text(exc: Exception) -> str:
+    detail = getattr(exc, "detail", None)
+    if isinstance(detail, dict):
+        text = "; ".join(f"{name}: {' '.join(map(str, messages))}" for name, messages in detail.items())
+    elif isinstance(detail, list):
+        text = " ".join(map(str, detail))
+    else:
+        text = str(exc)
+    return (text or exc.__class__.__name__)[:255]
+
+
+def process_webhook_batch(*, batch_size: int | None = None) -> dict[str, int]:
+    """
+    Одна пачка очереди: до batch_size готовых событий под FOR UPDATE SKIP LOCKED —
+    параллельные воркеры берут разные строки и не ждут друг друга.
+
+    Каждое событие — в своём savepoint: ошибка одного не откатывает переходы остальных.
+    Ошибка -> attempts + 1 и available_at = now + backoff_s(attempts);
+    attempts == MAX_ATTEMPTS -> PaymentWebhookDeadLetter, строка из очереди удаляется.
+    """
+    conf = webhook_settings()
+    batch_size = batch_size or conf["BATCH_SIZE"]
+
+    with transaction.atomic():
+        now = timezone.now()
+        batch = list(
+            PaymentWebhook.objects.select_for_update(skip_locked=True)
+            .filter(status=PaymentWebhook.Status.QUEUED, available_at__lte=now)
+            .order_by("available_at")[:batch_size]
+        )
+
+        done, retried, dead = [], [], []
+        for webhook in batch:
+            webhook.attempts += 1
+            webhook.updated_at = now  # bulk_update не трогает auto_now
+            try:
+                with transaction.atomic():
+                    apply_webhook(webhook)
+            except Exception as exc:
+                webhook.last_error = _error_text(exc)
+                if webhook.attempts >= conf["MAX_ATTEMPTS"]:
+                    dead.append(webhook)
+                else:
+                    webhook.available_at = now + timedelta(seconds=backoff_s(webhook.attempts))
+                    retried.append(webhook)
+            else:
+                webhook.status = PaymentWebhook.Status.DONE
+                webhook.processed_at = now
+                webhook.last_error = ""
+                done.append(webhook)
+
+        PaymentWebhook.objects.bulk_update(
+            done + retried, ["status", "attempts", "available_at", "last_error", "processed_at", "updated_at"]
+        )
+        if dead:
+            PaymentWebhookDeadLetter.objects.bulk_create(
+                PaymentWebhookDeadLetter(
+                    org_id=w.org_id, provider=w.provider, event_id=w.event_id, event_type=w.event_type,
+                    external_id=w.external_id, payload=w.payload, attempts=w.attempts, last_error=w.last_error,
+                )
+                for w in dead
+            )
+            PaymentWebhook.objects.filter(pk__in=[w.pk for w in dead]).delete()
+
+    return {"done": len(done), "retried": len(retried), "dead": len(dead)}
+
+
+def run_webhook_workers(
+    *,
+    workers: int = 1,
+    batch_size: int | None = None,
+    once: bool = False,
+    stop: threading.Event | None = None,
+) -> dict[str, int]:
+    """
+    Пул воркеров очереди webhook'ов: каждый поток со своим соединением крутит process_webhook_batch.
+    Пустая пачка — once: поток завершается, иначе ждёт POLL_INTERVAL_S. stop — остановка извне.
+    workers=1 — в текущем потоке (и его соединении/транзакции).
+    """
+    stop = stop or threading.Event()
+    poll_s = webhook_settings()["POLL_INTERVAL_S"]
+    totals = {"done": 0, "retried": 0, "dead": 0}
+    totals_lock = threading.Lock()
+
+    def work():
+        while not stop.is_set():
+            result = process_webhook_batch(batch_size=batch_size)
+            with totals_lock:
+                for key, value in result.items():
+                    totals[key] += value
+            if not any(result.values()):
+                if once:
+                    return
+                stop.wait(poll_s)
+
+    def work_in_thread():
+        try:
+            work()
+        finally:
+            connection.close()
+
+    if workers <= 1:
+        work()
+        return totals
+
+    threads = [threading.Thread(target=work_in_thread, name=f"payment-webhooks-{i}") for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        stop.set()
+    return totals
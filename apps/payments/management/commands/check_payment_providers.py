@@ -0,0 +1,29 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.providers.registry import check_providers_health
+from config.orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Health-check active payment provider configurations and mark failing ones as degraded. "
+        "Run periodically (cron / worker loop)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", help="Organization public_id (default: all organizations).")
+
+    def handle(self, *args, **options):
+        org = None
+        if options["org"]:
+            try:
+                org = Organization.objects.get(public_id=options["org"])
+            except (Organization.DoesNotExist, ValueError, ValidationError):
+                raise CommandError(f"Organization {options['org']} not found.")
+
+        report = check_providers_health(org=org)
+        degraded = [r for r in report if r["error"]]
+        for r in degraded:
+            self.stdout.write(self.style.WARNING(f"{r['org_id']}:{r['code']} degraded: {r['error']}"))
+        self.stdout.write(self.style.SUCCESS(f"Checked {len(report)} providers, degraded: {len(degraded)}."))
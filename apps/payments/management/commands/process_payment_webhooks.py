@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.logic.webhooks import run_webhook_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the payment webhook queue with a pool of workers (FOR UPDATE SKIP LOCKED batches) "
+        "and apply the transitions through the payment use-cases. Runs until interrupted unless --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, help="Default: PAYMENT_WEBHOOKS['BATCH_SIZE']")
+        parser.add_argument("--once", action="store_true", help="Exit when no events are ready")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be positive.")
+
+        result = run_webhook_workers(
+            workers=options["workers"], batch_size=options["batch_size"], once=options["once"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed webhooks: done={result['done']} retried={result['retried']} dead={result['dead']}."
+            )
+        )
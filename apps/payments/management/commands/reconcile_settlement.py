@@ -0,0 +1,68 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from apps.payments.logic.reconciliation import (
+    DEFAULT_CHUNK_SIZE,
+    ReconciliationStats,
+    read_settlement_rows,
+    reconcile_settlement,
+)
+from config.orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile order payments against an acquirer settlement file (CSV with header or JSONL: "
+        "external_id, amount, currency, status). Streams the file in chunks and reports "
+        "missing payments, amount/currency/status differences and settled payments absent from the file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Settlement file (.csv or .jsonl)")
+        parser.add_argument("--org", required=True, help="Organization public_id")
+        parser.add_argument("--provider", help="Only payments of this provider code")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: by file extension")
+        parser.add_argument("--since", help="Settlement window start (payment created_at, ISO 8601)")
+        parser.add_argument("--until", help="Settlement window end, exclusive (ISO 8601)")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(public_id=options["org"])
+        except (Organization.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Organization {options['org']} not found.")
+
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        window = {name: self._datetime(options, name) for name in ("since", "until")}
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        stats = ReconciliationStats()
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as stream:
+                for mismatch in reconcile_settlement(
+                    read_settlement_rows(stream, fmt=fmt),
+                    org=org,
+                    provider=options["provider"],
+                    chunk_size=options["chunk_size"],
+                    stats=stats,
+                    **window,
+                ):
+                    self.stdout.write(str(mismatch))
+        except OSError as exc:
+            raise CommandError(f"Cannot read settlement file: {exc}")
+
+        summary = f"Checked {stats.rows} settlement rows, matched {stats.matched}, found {stats.mismatches} mismatches."
+        style = self.style.WARNING if stats.mismatches else self.style.SUCCESS
+        self.stdout.write(style(summary))
+
+    @staticmethod
+    def _datetime(options, name):
+        if not options[name]:
+            return None
+        value = parse_datetime(options[name])
+        if value is None:
+            raise CommandError(f"--{name} must be an ISO 8601 datetime.")
+        return value
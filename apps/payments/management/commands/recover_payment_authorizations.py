@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.payments.logic.authorize_payment import recover_inflight_authorizations
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-drive payment authorizations stuck in 'authorizing' longer than the in-flight lease "
+        "(process died between the provider call and finalize). Safe to run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100)
+        parser.add_argument("--timeout", type=int, default=10, help="Provider call timeout, seconds.")
+
+    def handle(self, *args, **options):
+        result = recover_inflight_authorizations(timeout_s=options["timeout"], limit=options["limit"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Recovered authorizations: "
+                f"authorized={result['authorized']} failed={result['failed']} "
+                f"skipped={result['skipped']} errors={result['errors']}."
+            )
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_stock_reservations'),
+        ('orgs', '0003_org_membership_version'),
+        ('payments', '0002_paymentevent_public_id_paymentevent_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderpayment',
+            name='inflight_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderpayment',
+            name='provider_request_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='orderpayment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('authorizing', 'Authorizing'), ('authorized', 'Authorized'), ('captured', 'Captured'), ('refunded', 'Refunded'), ('voided', 'Voided'), ('failed', 'Failed')], default='pending', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='orderpayment',
+            index=models.Index(condition=models.Q(('status', 'authorizing')), fields=['inflight_since'], name='payment_inflight_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 11:05
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0003_org_membership_version'),
+        ('payments', '0003_payment_authorize_inflight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentProviderConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('code', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('manual', 'Manual'), ('fake', 'Fake (testing)'), ('http', 'HTTP JSON API')], max_length=16)),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('is_active', models.BooleanField(default=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('health_status', models.CharField(choices=[('ok', 'OK'), ('degraded', 'Degraded')], default='ok', max_length=16)),
+                ('health_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('health_error', models.CharField(blank=True, default='', max_length=255)),
+                ('org', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='orgs.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('org', 'code'), name='uniq_payment_provider_org_code')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('payments', '0005_payment_webhooks'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='orderpayment',
+            index=models.Index(fields=['org', 'status', 'created_at'], name='payment_org_status_created_idx'),
+        ),
+    ]
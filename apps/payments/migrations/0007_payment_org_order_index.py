@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 09:45
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('payments', '0006_org_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='orderpayment',
+            index=models.Index(fields=['org', 'order'], name='payment_org_order_idx'),
+        ),
+    ]
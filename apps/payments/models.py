@@ -2,12 +2,13 @@
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from .models_terminal import Terminal  # noqa: F401
 
 from django.core.exceptions import ValidationError
 
-from config.orgs.models import OrgScopedModel
+from config.orgs.models import OrgScopedModel, org_index
 
 
 class OrderPayment(OrgScopedModel):
@@ -27,6 +28,8 @@ class OrderPayment(OrgScopedModel):
 
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
+        # authorize в полёте: intent закоммичен, ответ провайдера ещё не записан
+        AUTHORIZING = "authorizing", "Authorizing"
         AUTHORIZED = "authorized", "Authorized"
         CAPTURED = "captured", "Captured"
         REFUNDED = "refunded", "Refunded"
@@ -51,6 +54,11 @@ class OrderPayment(OrgScopedModel):
 
     raw_provider_payload = models.JSONField(null=True, blank=True)
 
+    # Двухфазный authorize: ключ идемпотентности запроса к провайдеру (один на все повторы)
+    # и момент, с которого платёж в статусе authorizing (для recovery зависших).
+    provider_request_id = models.UUIDField(null=True, blank=True)
+    inflight_since = models.DateTimeField(null=True, blank=True)
+
     
     
     # флаг (по умолчанию False) — use-case временно выставляет True
@@ -86,7 +94,20 @@ class OrderPayment(OrgScopedModel):
             if status_changed and not getattr(self, "_status_change_allowed", False):
                 raise ValidationError("OrderPayment.status can only be changed via use-case")
 
-        super().save(*args, **kwargs)
+        if self._state.adding and self.status in (self.Status.CAPTURED, self.Status.REFUNDED):
+            # платёж, созданный уже списанным (наличные на POS, импорт), сразу учитываем
+            # в Order.captured_total / refunded_total — в одной транзакции со вставкой
+            from apps.payments.logic.order_totals import add_to_order_totals
+
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                add_to_order_totals(
+                    order_id=self.order_id,
+                    captured=self.amount,
+                    refunded=self.amount if self.status == self.Status.REFUNDED else Decimal("0.00"),
+                )
+        else:
+            super().save(*args, **kwargs)
 
         # После успешного сохранения обновляем "загруженный" статус
         self._loaded_status = self.status
@@ -99,6 +120,18 @@ class OrderPayment(OrgScopedModel):
             models.UniqueConstraint(fields=["org", "idempotency_key"], name="uniq_payment_org_idempotency"),
             models.UniqueConstraint(fields=["org", "external_id"], name="uniq_payment_org_external_id"),
         ]
+        indexes = [
+            # отчёты/сверка: статус + период
+            org_index("status", "created_at", name="payment_org_status_created_idx"),
+            # ?has_payments= списка заказов: EXISTS по (org, order)
+            org_index("order", name="payment_org_order_idx"),
+            # recovery: только зависшие authorize, индекс почти всегда пустой
+            models.Index(
+                fields=["inflight_since"],
+                name="payment_inflight_idx",
+                condition=models.Q(status="authorizing"),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Payment({self.public_id}) {self.status} {self.amount} {self.currency}"
@@ -129,3 +162,125 @@ class PaymentEvent(OrgScopedModel):
 
     def __str__(self) -> str:
         return f"PaymentEvent({self.payment_id}) {self.action} {self.from_status}->{self.to_status}"
+
+
+class PaymentProviderConfig(OrgScopedModel):
+    """
+    Настройка провайдера платежей для org: OrderPayment.provider == code -> адаптер kind с options.
+
+    options (все необязательны, по умолчанию — PAYMENT_PROVIDERS["default"]):
+    - BASE_URL — для http;
+    - CONCURRENCY / TIMEOUT_S — лимит одновременных вызовов и таймаут;
+    - POOL_SIZE — keep-alive соединений на провайдера;
+    - BREAKER_* / ADAPTIVE_TIMEOUT / TIMEOUT_* — circuit breaker и adaptive timeout (providers/breaker.py);
+    - WEBHOOK_SECRET — HMAC-подпись webhook'ов провайдера (без него webhook'и отклоняются).
+
+    version растёт на каждом save(): registry пересобирает закэшированный экземпляр
+    (hot reload). Поля health_* пишет только health check — version не трогают.
+    """
+
+    class Kind(models.TextChoices):
+        MANUAL = "manual", "Manual"
+        FAKE = "fake", "Fake (testing)"
+        HTTP = "http", "HTTP JSON API"
+
+    class Health(models.TextChoices):
+        OK = "ok", "OK"
+        DEGRADED = "degraded", "Degraded"
+
+    code = models.CharField(max_length=64)
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    options = models.JSONField(default=dict, blank=True)
+    is_active = models.BooleanField(default=True)
+    version = models.PositiveIntegerField(default=0)
+
+    health_status = models.CharField(max_length=16, choices=Health.choices, default=Health.OK)
+    health_checked_at = models.DateTimeField(null=True, blank=True)
+    health_error = models.CharField(max_length=255, blank=True, default="")
+
+    def save(self, *args, **kwargs):
+        # при UPDATE version растёт в БД (F() + 1): два параллельных save() не дадут одну и ту же
+        # version, иначе registry в другом процессе не заметит второе изменение
+        is_update = not self._state.adding
+        if is_update:
+            self.version = models.F("version") + 1
+        else:
+            self.version += 1
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "version"}
+        super().save(*args, **kwargs)
+        if is_update:
+            self.refresh_from_db(fields=["version"])
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["org", "code"], name="uniq_payment_provider_org_code"),
+        ]
+
+    def __str__(self) -> str:
+        return f"PaymentProviderConfig({self.org_id}:{self.code}) {self.kind} v{self.version}"
+
+
+class PaymentWebhook(OrgScopedModel):
+    """
+    Очередь входящих webhook'ов провайдеров (table-backed queue).
+
+    Endpoint только проверяет и кладёт payload одним INSERT ... ON CONFLICT DO NOTHING:
+    повтор того же (org, provider, event_id) — дубль, в очередь не попадает.
+    Разбирают воркеры (apps/payments/logic/webhooks.py): FOR UPDATE SKIP LOCKED пачками,
+    переход — через use-case'ы платежей; ошибка — повтор через available_at с экспоненциальным
+    backoff, после MAX_ATTEMPTS — PaymentWebhookDeadLetter.
+
+    done-строки остаются в таблице — на них держится дедупликация.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        DONE = "done", "Done"
+
+    provider = models.CharField(max_length=64)
+    event_id = models.CharField(max_length=128)
+    event_type = models.CharField(max_length=64)
+    external_id = models.CharField(max_length=128)
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True, default="")
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["org", "provider", "event_id"], name="uniq_webhook_org_provider_event"),
+        ]
+        indexes = [
+            # воркеры: только ждущие события, done не раздувают индекс
+            models.Index(
+                fields=["available_at"],
+                name="webhook_queue_idx",
+                condition=models.Q(status="queued"),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"PaymentWebhook({self.provider}:{self.event_id}) {self.event_type} {self.status}"
+
+
+class PaymentWebhookDeadLetter(OrgScopedModel):
+    """
+    Webhook'и, не применившиеся за MAX_ATTEMPTS попыток: разбираются вручную.
+    Из очереди строка удаляется — повторная доставка провайдером снова попадёт в очередь.
+    """
+
+    provider = models.CharField(max_length=64)
+    event_id = models.CharField(max_length=128)
+    event_type = models.CharField(max_length=64)
+    external_id = models.CharField(max_length=128)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True, default="")
+
+    def __str__(self) -> str:
+        return f"PaymentWebhookDeadLetter({self.provider}:{self.event_id}) {self.event_type}"
@@ -0,0 +1,39 @@
+# apps/payments/providers/async_adapter.py
+from __future__ import annotations
+
+from typing import Any
+
+from asgiref.sync import sync_to_async
+
+from apps.payments.models import OrderPayment
+
+
+class SyncProviderAdapter:
+    """
+    AsyncPaymentProviderPort поверх синхронного провайдера (ManualProvider, FakeProvider, ...).
+
+    Вызов уходит в thread pool (thread_sensitive=False): провайдер не трогает ORM,
+    поэтому не обязан сидеть в общем "sync"-потоке Django и не блокирует event loop.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    async def _run(self, operation: str, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        method = getattr(self.provider, operation)
+        return await sync_to_async(method, thread_sensitive=False)(payment=payment, timeout_s=timeout_s)
+
+    async def authorize(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._run("authorize", payment, timeout_s)
+
+    async def capture(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._run("capture", payment, timeout_s)
+
+    async def refund(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._run("refund", payment, timeout_s)
+
+    async def void(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._run("void", payment, timeout_s)
+
+    async def check_status(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._run("check_status", payment, timeout_s)
@@ -0,0 +1,261 @@
+# apps/payments/providers/breaker.py
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from apps.payments.providers.port import ProviderUnavailable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker провайдера (один на запись registry, т.е. на (org, provider)).
+
+    closed    — вызовы идут; по скользящему окну WINDOW_S считаем долю ошибок и медленных
+                вызовов (дольше SLOW_CALL_S). Набралось MIN_CALLS и доля >= порога -> open.
+    open      — вызовы сразу получают ProviderUnavailable (POS переключается на другой tender),
+                ни БД, ни потоки не ждут таймаут умирающего эквайера. Через OPEN_S -> half_open.
+    half_open — пропускаем до HALF_OPEN_PROBES пробных вызовов: все успешны -> closed
+                (окно очищается), любая ошибка -> снова open.
+
+    Adaptive timeout: при MIN_CALLS успешных замерах в окне таймаут вызова =
+    clamp(p99 * TIMEOUT_P99_FACTOR, TIMEOUT_MIN_S, настроенный TIMEOUT_S) — не ждём
+    10 s там, где провайдер обычно отвечает за 200 ms.
+
+    call() / acall() дописывают переходы состояния ({"provider", "from", "to", ...})
+    в переданный список — use-case пишет их в PaymentEvent.metadata.
+    """
+
+    def __init__(self, name: str, options: dict[str, Any], *, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.window_s = options.get("BREAKER_WINDOW_S", 60)
+        self.min_calls = options.get("BREAKER_MIN_CALLS", 20)
+        self.error_rate_threshold = options.get("BREAKER_ERROR_RATE", 0.5)
+        self.slow_call_s = options.get("BREAKER_SLOW_CALL_S", 5)
+        self.slow_rate_threshold = options.get("BREAKER_SLOW_RATE", 0.8)
+        self.open_s = options.get("BREAKER_OPEN_S", 30)
+        self.half_open_probes = options.get("BREAKER_HALF_OPEN_PROBES", 3)
+        self.adaptive_timeout = options.get("ADAPTIVE_TIMEOUT", True)
+        self.timeout_p99_factor = options.get("TIMEOUT_P99_FACTOR", 2.0)
+        self.timeout_min_s = options.get("TIMEOUT_MIN_S", 0.5)
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probes_ok = 0
+        # (момент, ok, длительность) за последние window_s
+        self._window: deque[tuple[float, bool, float]] = deque()
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.transitions: dict[str, int] = {}
+
+    # --- окно ---
+
+    def _prune(self, now: float) -> None:
+        while self._window and self._window[0][0] <= now - self.window_s:
+            self._window.popleft()
+
+    def _rates(self) -> tuple[int, float, float]:
+        total = len(self._window)
+        if not total:
+            return 0, 0.0, 0.0
+        errors = sum(1 for _, ok, _ in self._window if not ok)
+        slow = sum(1 for _, _, duration in self._window if duration >= self.slow_call_s)
+        return total, errors / total, slow / total
+
+    def _p99(self) -> float | None:
+        durations = sorted(duration for _, ok, duration in self._window if ok)
+        if len(durations) < self.min_calls:
+            return None
+        return durations[min(len(durations) - 1, math.ceil(len(durations) * 0.99) - 1)]
+
+    def _transition(self, to: str, now: float, reason: str) -> dict[str, Any]:
+        frm, self.state = self.state, to
+        key = f"{frm}->{to}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        total, error_rate, slow_rate = self._rates()
+        if to == OPEN:
+            self._opened_at = now
+        if to == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probes_ok = 0
+        if to == CLOSED:
+            self._window.clear()
+        return {
+            "provider": self.name,
+            "from": frm,
+            "to": to,
+            "reason": reason,
+            "calls_in_window": total,
+            "error_rate": round(error_rate, 4),
+            "slow_rate": round(slow_rate, 4),
+        }
+
+    # --- API вызова ---
+
+    def check(self) -> None:
+        """
+        Fail fast до любых записей в БД: open (и OPEN_S не истёк) -> ProviderUnavailable.
+        Состояние не меняет — probe-слот берёт acquire().
+        """
+        now = self.clock()
+        with self._lock:
+            if self.state == OPEN and now - self._opened_at < self.open_s:
+                self.rejected += 1
+                raise ProviderUnavailable(
+                    provider=self.name, retry_after_s=round(self.open_s - (now - self._opened_at), 3)
+                )
+
+    def acquire(self) -> list[dict[str, Any]]:
+        """
+        Разрешение на вызов. open -> ProviderUnavailable; half_open без свободного probe-слота — тоже.
+        """
+        now = self.clock()
+        with self._lock:
+            transitions = []
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_s:
+                    self.rejected += 1
+                    raise ProviderUnavailable(
+                        provider=self.name, retry_after_s=round(self.open_s - (now - self._opened_at), 3)
+                    )
+                transitions.append(self._transition(HALF_OPEN, now, "open timeout elapsed"))
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight + self._probes_ok >= self.half_open_probes:
+                    self.rejected += 1
+                    raise ProviderUnavailable(provider=self.name, retry_after_s=0)
+                self._probes_in_flight += 1
+            return transitions
+
+    def release(self) -> None:
+        """
+        Вызов не состоялся (use-case отказал до провайдера) — вернуть probe-слот, ничего не записывая.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def record(self, *, ok: bool, duration_s: float) -> list[dict[str, Any]]:
+        """
+        Итог вызова: ok=False — исключение/таймаут (отказ провайдера {"ok": False} — это ok=True).
+        """
+        now = self.clock()
+        with self._lock:
+            self.calls += 1
+            self.failures += not ok
+            self.slow_calls += duration_s >= self.slow_call_s
+
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not ok:
+                    return [self._transition(OPEN, now, "probe failed")]
+                self._probes_ok += 1
+                if self._probes_ok >= self.half_open_probes:
+                    return [self._transition(CLOSED, now, "probes succeeded")]
+                return []
+
+            self._window.append((now, ok, duration_s))
+            self._prune(now)
+            if self.state != CLOSED:
+                return []
+
+            total, error_rate, slow_rate = self._rates()
+            if total >= self.min_calls:
+                if error_rate >= self.error_rate_threshold:
+                    return [self._transition(OPEN, now, "error rate")]
+                if slow_rate >= self.slow_rate_threshold:
+                    return [self._transition(OPEN, now, "slow calls")]
+            return []
+
+    def call(
+        self,
+        fn: Callable[[float], Any],
+        *,
+        timeout_s: float,
+        transitions: list[dict[str, Any]],
+        acquired: bool = False,
+    ) -> Any:
+        """
+        fn(адаптивный таймаут) под breaker'ом. Исключение fn — неуспешный вызов (и пробрасывается).
+        acquired=True — разрешение уже взято acquire() вызывающим (до записи intent'а в БД).
+        """
+        timeout_s = self.timeout_s(timeout_s)
+        if not acquired:
+            transitions += self.acquire()
+        started = self.clock()
+        try:
+            result = fn(timeout_s)
+        except Exception:
+            transitions += self.record(ok=False, duration_s=self.clock() - started)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        transitions += self.record(ok=True, duration_s=self.clock() - started)
+        return result
+
+    async def acall(
+        self,
+        fn: Callable[[float], Awaitable[Any]],
+        *,
+        timeout_s: float,
+        transitions: list[dict[str, Any]],
+        acquired: bool = False,
+    ) -> Any:
+        """
+        call() для корутин; отмена (CancelledError) — не ошибка провайдера, только освобождает слот.
+        """
+        timeout_s = self.timeout_s(timeout_s)
+        if not acquired:
+            transitions += self.acquire()
+        started = self.clock()
+        try:
+            result = await fn(timeout_s)
+        except Exception:
+            transitions += self.record(ok=False, duration_s=self.clock() - started)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        transitions += self.record(ok=True, duration_s=self.clock() - started)
+        return result
+
+    def timeout_s(self, configured_s: float) -> float:
+        if not self.adaptive_timeout:
+            return configured_s
+        with self._lock:
+            self._prune(self.clock())
+            p99 = self._p99()
+        if p99 is None:
+            return configured_s
+        return min(configured_s, max(self.timeout_min_s, p99 * self.timeout_p99_factor))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._prune(self.clock())
+            total, error_rate, slow_rate = self._rates()
+            p99 = self._p99()
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "rejected": self.rejected,
+                "calls_in_window": total,
+                "error_rate": round(error_rate, 4),
+                "slow_rate": round(slow_rate, 4),
+                "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+                "transitions": dict(self.transitions),
+            }
@@ -0,0 +1,84 @@
+# apps/payments/providers/fake.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from apps.payments.models import OrderPayment
+from apps.payments.providers.async_adapter import SyncProviderAdapter
+
+
+class FakeProvider:
+    """
+    Локальный провайдер для тестов/benchmark'ов: искусственная задержка сети + идемпотентность.
+
+    - latency_s — имитация медленного эквайринга (time.sleep внутри вызова).
+    - Повтор операции с тем же payment.provider_request_id возвращает сохранённый ответ,
+      как это делают реальные эквайеры по idempotency key.
+    - decline=True — провайдер отказывает ({"ok": False}).
+    """
+
+    def __init__(self, *, latency_s: float = 0.0, decline: bool = False):
+        self.latency_s = latency_s
+        self.decline = decline
+        self.calls = 0
+        self._responses: dict[tuple[str, str], dict[str, Any]] = {}
+        self._status: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def authorize(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return self._call("authorize", "authorized", payment=payment, timeout_s=timeout_s)
+
+    def capture(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return self._call("capture", "captured", payment=payment, timeout_s=timeout_s)
+
+    def refund(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return self._call("refund", "refunded", payment=payment, timeout_s=timeout_s)
+
+    def void(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return self._call("void", "voided", payment=payment, timeout_s=timeout_s)
+
+    def check_status(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        self._sleep(timeout_s)
+        with self._lock:
+            self.calls += 1
+            return {"ok": True, "provider": "fake", "status": self._status.get(self._key(payment), "unknown")}
+
+    @staticmethod
+    def _key(payment: OrderPayment) -> str:
+        return str(payment.provider_request_id or payment.public_id)
+
+    def _sleep(self, timeout_s: float) -> None:
+        if self.latency_s:
+            time.sleep(min(self.latency_s, timeout_s))
+
+    def _call(self, operation: str, status: str, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+        self._sleep(timeout_s)
+
+        key = self._key(payment)
+        with self._lock:
+            if (operation, key) not in self._responses:
+                self._responses[operation, key] = {
+                    "ok": not self.decline,
+                    "provider": "fake",
+                    "request_id": key,
+                    "auth_code": f"F{len(self._responses) + 1}",
+                }
+                if not self.decline:
+                    self._status[key] = status
+            return self._responses[operation, key]
+
+
+# один экземпляр на процесс: хранит ответы по provider_request_id (идемпотентность повторов)
+_shared_provider = FakeProvider()
+
+
+def build_fake_provider(code: str, options: dict):
+    """
+    Фабрика kind "fake" для registry.PROVIDER_KINDS. В production-таблице её нет —
+    подключают только тесты/benchmark'и (tests/conftest.py).
+    """
+    return _shared_provider, SyncProviderAdapter(_shared_provider)
@@ -0,0 +1,205 @@
+# apps/payments/providers/http.py
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import weakref
+from collections import deque
+from typing import Any
+from urllib.parse import urlsplit
+
+from apps.payments.models import OrderPayment
+from apps.payments.providers.port import ProviderError
+
+
+class HttpProvider:
+    """
+    Async-адаптер к провайдеру с JSON-over-HTTP API:
+        POST {base_url}/{operation}  {"payment_id", "request_id", "amount", "currency"}
+        -> 200 {"ok": true|false, ...}
+        GET  {base_url}/health -> 200
+
+    Клиент — asyncio streams (stdlib) с keep-alive пулом: до pool_size простаивающих
+    соединений на event loop (streams привязаны к loop). Экземпляр живёт в registry
+    столько же, сколько его конфигурация, — TCP/TLS handshake не на каждый вызов.
+
+    Таймаут навешивает registry.call_provider; здесь — только протокол.
+    Тело ответа — по Content-Length или Transfer-Encoding: chunked (иначе до закрытия соединения).
+    Не-200 / битый JSON -> ProviderError (исход неизвестен).
+    """
+
+    def __init__(self, *, base_url: str, name: str = "http", pool_size: int = 8):
+        parts = urlsplit(base_url)
+        self.name = name
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = parts.port or (443 if self.tls else 80)
+        self.path = parts.path.rstrip("/")
+        self.pool_size = pool_size
+        self.connections_opened = 0
+        self._ssl = ssl.create_default_context() if self.tls else None
+        self._idle: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, deque]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _body(payment: OrderPayment) -> dict[str, Any]:
+        return {
+            "payment_id": str(payment.public_id),
+            "request_id": str(payment.provider_request_id or payment.public_id),
+            "amount": str(payment.amount),
+            "currency": payment.currency,
+        }
+
+    def _pool(self) -> deque:
+        return self._idle.setdefault(asyncio.get_running_loop(), deque())
+
+    async def _acquire(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        pool = self._pool()
+        while pool:
+            reader, writer = pool.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+        self.connections_opened += 1
+        return reader, writer, False
+
+    def _release(self, reader, writer, *, keep_alive: bool) -> None:
+        pool = self._pool()
+        if keep_alive and len(pool) < self.pool_size and not writer.is_closing():
+            pool.append((reader, writer))
+        else:
+            writer.close()
+
+    async def _exchange(self, reader, writer, method: str, path: str, data: bytes) -> tuple[bytes, dict, bytes]:
+        writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: keep-alive\r\n\r\n"
+            ).encode()
+            + data
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by provider")
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = headers.get("content-length")
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            raw = await self._read_chunked(reader)
+        elif length is not None:
+            raw = await reader.readexactly(int(length))
+        else:
+            raw = await reader.read()
+        return status_line, headers, raw
+
+    async def _read_chunked(self, reader) -> bytes:
+        """
+        Тело Transfer-Encoding: chunked: "<размер hex>[;ext]" CRLF данные CRLF ... "0" CRLF [trailers] CRLF.
+        """
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            if not size_line:
+                raise asyncio.IncompleteReadError(b"", None)
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError as exc:
+                raise ProviderError(f"{self.name}: invalid chunked response") from exc
+            if size == 0:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)  # CRLF после данных chunk'а
+        # trailers не используем — дочитываем до пустой строки
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass
+        return b"".join(chunks)
+
+    async def _request(
+        self, method: str, operation: str, body: dict[str, Any] | None = None, *, pooled: bool = True
+    ) -> tuple[bytes, bytes]:
+        data = json.dumps(body).encode() if body is not None else b""
+        path = f"{self.path}/{operation}"
+
+        if pooled:
+            reader, writer, reused = await self._acquire()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+            reused = False
+        try:
+            try:
+                status_line, headers, raw = await self._exchange(reader, writer, method, path, data)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                # keep-alive соединение закрыли на стороне провайдера — один повтор на свежем
+                # (операции идемпотентны по request_id)
+                writer.close()
+                reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+                self.connections_opened += 1
+                status_line, headers, raw = await self._exchange(reader, writer, method, path, data)
+        except BaseException:
+            # таймаут/отмена посреди ответа — соединение в неизвестном состоянии, в пул не возвращаем
+            writer.close()
+            raise
+
+        # без Content-Length / chunked конец тела — закрытие соединения, его не переиспользовать
+        framed = "content-length" in headers or headers.get("transfer-encoding", "").lower() == "chunked"
+        keep_alive = pooled and headers.get("connection", "").lower() != "close" and framed
+        self._release(reader, writer, keep_alive=keep_alive)
+        return status_line, raw
+
+    async def _post(self, operation: str, body: dict[str, Any]) -> dict[str, Any]:
+        status_line, raw = await self._request("POST", operation, body)
+
+        parts = status_line.split()
+        if len(parts) < 2 or parts[1] != b"200":
+            raise ProviderError(f"{self.name} {operation}: {status_line.decode('latin-1').strip()}")
+        try:
+            return json.loads(raw)
+        except ValueError as exc:
+            raise ProviderError(f"{self.name} {operation}: invalid JSON response") from exc
+
+    async def authorize(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._post("authorize", self._body(payment))
+
+    async def capture(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._post("capture", self._body(payment))
+
+    async def refund(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._post("refund", self._body(payment))
+
+    async def void(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._post("void", self._body(payment))
+
+    async def check_status(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        return await self._post("check_status", self._body(payment))
+
+    async def health_check(self, *, timeout_s: float) -> None:
+        """
+        GET /health == 200, иначе ProviderError (таймаут — снаружи, в registry).
+        Всегда новое соединение: проверяем и TCP/TLS до провайдера, а не только живой keep-alive.
+        """
+        status_line, _ = await self._request("GET", "health", pooled=False)
+        parts = status_line.split()
+        if len(parts) < 2 or parts[1] != b"200":
+            raise ProviderError(f"{self.name} health: {status_line.decode('latin-1').strip()}")
+
+    def close(self) -> None:
+        """
+        Закрыть простаивающие соединения (конфигурация сменилась / вытеснен из registry).
+        """
+        for pool in list(self._idle.values()):
+            while pool:
+                _, writer = pool.pop()
+                try:
+                    writer.close()
+                except RuntimeError:
+                    pass  # event loop уже закрыт — соединение умерло вместе с ним
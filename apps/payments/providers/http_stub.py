@@ -0,0 +1,122 @@
+# apps/payments/providers/http_stub.py
+from __future__ import annotations
+
+import asyncio
+import json
+
+
+class StubProviderServer:
+    """
+    Локальный HTTP-двойник провайдера (для HttpProvider в тестах/benchmark'ах).
+
+    - каждая операция отвечает через latency_s (имитация round-trip к эквайеру);
+    - идемпотентность по request_id: повтор возвращает сохранённый ответ;
+    - check_status отдаёт последний статус request_id ("unknown", если операций не было);
+    - max_in_flight — пик одновременных запросов (проверка лимитов конкурентности);
+    - keep-alive: несколько запросов на соединение, connections — сколько соединений приняли;
+    - GET /health — 200, пока healthy=True, иначе 503;
+    - chunked=True — ответы с Transfer-Encoding: chunked вместо Content-Length.
+
+        server = StubProviderServer(latency_s=0.1)
+        base_url = await server.start()
+        ...
+        await server.close()
+    """
+
+    STATUS_BY_OPERATION = {
+        "authorize": "authorized",
+        "capture": "captured",
+        "refund": "refunded",
+        "void": "voided",
+    }
+
+    def __init__(self, *, latency_s: float = 0.0, host: str = "127.0.0.1", port: int = 0, chunked: bool = False):
+        self.latency_s = latency_s
+        self.chunked = chunked
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.connections = 0
+        self.healthy = True
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._responses: dict[tuple[str, str], dict] = {}
+        self._status: dict[str, str] = {}
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{self.port}"
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # keep-alive соединения клиентов (пул HttpProvider) иначе держат wait_closed
+            self._server.close_clients()
+            await self._server.wait_closed()
+
+    def _respond(self, operation: str, body: dict) -> tuple[int, dict]:
+        key = body.get("request_id", "")
+        if operation == "check_status":
+            return 200, {"ok": True, "provider": "stub", "status": self._status.get(key, "unknown")}
+        if operation not in self.STATUS_BY_OPERATION:
+            return 404, {"ok": False, "error": "unknown operation"}
+        if (operation, key) not in self._responses:
+            self._responses[operation, key] = {"ok": True, "provider": "stub", "request_id": key, "operation": operation}
+            self._status[key] = self.STATUS_BY_OPERATION[operation]
+        return 200, self._responses[operation, key]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        request_line = await reader.readline()
+        if not request_line:
+            return False
+
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            body = json.loads(await reader.readexactly(length)) if length else {}
+
+            await asyncio.sleep(self.latency_s)
+
+            operation = request_line.split()[1].decode().rstrip("/").rsplit("/", 1)[-1]
+            if operation == "health":
+                code, payload = (200, {"ok": True}) if self.healthy else (503, {"ok": False})
+            else:
+                code, payload = self._respond(operation, body)
+            keep_alive = headers.get("connection", "").lower() != "close"
+            data = json.dumps(payload).encode()
+            if self.chunked:
+                # несколько chunk'ов по 16 байт — клиент должен собрать тело целиком
+                framing = "Transfer-Encoding: chunked"
+                data = b"".join(
+                    b"%x\r\n%s\r\n" % (len(data[i:i + 16]), data[i:i + 16]) for i in range(0, len(data), 16)
+                ) + b"0\r\n\r\n"
+            else:
+                framing = f"Content-Length: {len(data)}"
+            writer.write(
+                f"HTTP/1.1 {code} {'OK' if code == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\n{framing}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                + data
+            )
+            await writer.drain()
+            return keep_alive
+        finally:
+            self.in_flight -= 1
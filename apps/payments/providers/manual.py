@@ -18,3 +18,15 @@ class ManualProvider:
     def authorize(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
         return {"ok": True, "provider": "manual", "note": "authorized manually"}
 
+    def capture(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return {"ok": True, "provider": "manual", "note": "captured manually"}
+
+    def refund(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return {"ok": True, "provider": "manual", "note": "refunded manually"}
+
+    def void(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        return {"ok": True, "provider": "manual", "note": "voided manually"}
+
+    def check_status(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
+        # у ручного платежа нет внешнего состояния — источник правды наша БД
+        return {"ok": True, "provider": "manual", "status": payment.status}
@@ -2,9 +2,39 @@
 from __future__ import annotations
 
 from typing import Protocol, Any
+
+from rest_framework.exceptions import APIException
+
 from apps.payments.models import OrderPayment
 
 
+class ProviderError(Exception):
+    """
+    Провайдер не ответил осмысленно (сеть, 5xx, битый ответ) — исход операции неизвестен.
+    Отказ провайдера — это не ошибка, а ответ {"ok": False, ...}.
+    """
+
+
+class ProviderTimeout(ProviderError):
+    pass
+
+
+class ProviderUnavailable(APIException):
+    """
+    Circuit breaker провайдера открыт — вызов не выполнялся (fail fast, исход известен:
+    у провайдера ничего не произошло). POS по 503 / code "provider_unavailable"
+    предлагает другой tender, не дожидаясь таймаута.
+    """
+
+    status_code = 503
+    default_code = "provider_unavailable"
+
+    def __init__(self, *, provider: str, retry_after_s: float):
+        self.provider = provider
+        self.retry_after_s = retry_after_s
+        super().__init__({"provider": [f"Payment provider {provider} is temporarily unavailable."]})
+
+
 class PaymentProviderPort(Protocol):
     """
     Порт (интерфейс) для эквайринга/фискального ПО.
@@ -13,7 +43,37 @@ class PaymentProviderPort(Protocol):
     - capture/refund/void
     - check_status
     - retries/backoff/timeouts
+
+    authorize вызывается вне транзакции БД и может повторяться для того же платежа
+    (recovery после сбоя) — реализация должна быть идемпотентна по payment.provider_request_id.
+    Отказ провайдера — {"ok": False, ...}; исключение — исход неизвестен.
     """
 
     def authorize(self, *, payment: OrderPayment, timeout_s: int) -> dict[str, Any]:
         ...
+
+
+class AsyncPaymentProviderPort(Protocol):
+    """
+    Async-вариант порта: для пакетного authorize с терминалов и сверки — вызовы
+    к провайдеру идут конкурентно (registry.call_provider / call_many), не по одному.
+
+    Контракт ответов тот же, что у PaymentProviderPort; все операции идемпотентны
+    по payment.provider_request_id (или public_id, если authorize ещё не начинался).
+    check_status — {"ok": True, "status": "<статус у провайдера>"} без изменения состояния.
+    """
+
+    async def authorize(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        ...
+
+    async def capture(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        ...
+
+    async def refund(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        ...
+
+    async def void(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        ...
+
+    async def check_status(self, *, payment: OrderPayment, timeout_s: float) -> dict[str, Any]:
+        ...
@@ -1,20 +1,397 @@
 # apps/payments/providers/registry.py
 from __future__ import annotations
 
-from apps.payments.models import OrderPayment
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from apps.payments.models import OrderPayment, PaymentProviderConfig
+from apps.payments.providers.async_adapter import SyncProviderAdapter
+from apps.payments.providers.breaker import CircuitBreaker
+from apps.payments.providers.http import HttpProvider
 from apps.payments.providers.manual import ManualProvider
+from apps.payments.providers.port import AsyncPaymentProviderPort, ProviderError, ProviderTimeout
+
+def _build_manual(code: str, options: dict):
+    provider = ManualProvider()
+    return provider, SyncProviderAdapter(provider)
+
+
+def _build_http(code: str, options: dict):
+    if not options.get("BASE_URL"):
+        raise ValueError(f"Payment provider {code}: BASE_URL is required")
+    # только async: синхронного клиента у HTTP-адаптера нет
+    return None, HttpProvider(base_url=options["BASE_URL"], name=code, pool_size=options["POOL_SIZE"])
+
+
+# kind -> фабрика (sync-экземпляр | None, async-экземпляр).
+# Kind.FAKE (всегда одобряет) сюда не входит: его регистрируют только тесты/benchmark'и (tests/conftest.py).
+PROVIDER_KINDS = {
+    PaymentProviderConfig.Kind.MANUAL: _build_manual,
+    PaymentProviderConfig.Kind.HTTP: _build_http,
+}
+
+
+def provider_settings(code: str | None = None) -> dict[str, Any]:
+    """
+    PAYMENT_PROVIDERS["default"], перекрытый PAYMENT_PROVIDERS[code] (конфигурация без строки в БД).
+    """
+    conf = getattr(settings, "PAYMENT_PROVIDERS", {})
+    options = {"CONCURRENCY": 16, "TIMEOUT_S": 10, "POOL_SIZE": 8, **conf.get("default", {})}
+    if code is not None:
+        options.update(conf.get(code, {}))
+    return options
+
+
+@dataclass
+class ProviderEntry:
+    org_id: int
+    code: str
+    kind: str
+    options: dict[str, Any]
+    version: str
+    instance: Any
+    async_instance: AsyncPaymentProviderPort
+    degraded: bool
+    verified_at: float
+    # пересобирается вместе с экземпляром: новая конфигурация (BASE_URL, пороги) — новая статистика
+    breaker: CircuitBreaker
+
+    def close(self) -> None:
+        for provider in {id(p): p for p in (self.instance, self.async_instance) if p is not None}.values():
+            close = getattr(provider, "close", None)
+            if close is not None:
+                close()
+
+
+def _load_config(org_id: int, code: str) -> tuple[str, dict, str, bool]:
+    """
+    (kind, options, version, degraded): строка PaymentProviderConfig org'а, иначе PAYMENT_PROVIDERS[code].
+    version — PaymentProviderConfig.version либо отпечаток настроек: по нему registry видит смену конфигурации.
+    """
+    row = (
+        PaymentProviderConfig.objects.filter(org_id=org_id, code=code)
+        .values("kind", "options", "is_active", "version", "health_status")
+        .first()
+    )
+    if row is not None:
+        if not row["is_active"]:
+            raise ValueError(f"Payment provider is disabled: {code}")
+        if row["kind"] not in PROVIDER_KINDS:
+            raise ValueError(f"Unknown payment provider kind: {row['kind']} ({code})")
+        options = {**provider_settings(), **row["options"]}
+        degraded = row["health_status"] == PaymentProviderConfig.Health.DEGRADED
+        return row["kind"], options, f"db:{row['version']}", degraded
+
+    options = provider_settings(code)
+    kind = options.get("KIND", code)
+    if kind not in PROVIDER_KINDS:
+        # Без сюрпризов: если провайдер неизвестен — явно падаем
+        raise ValueError(f"Unknown payment provider: {code}")
+    return kind, options, "settings:" + json.dumps(options, sort_keys=True, default=str), False
+
+
+class ProviderRegistry:
+    """
+    Экземпляры провайдеров по (org_id, provider code): строятся один раз на версию конфигурации
+    и живут в bounded LRU (MAX_SIZE) — вместе с ними живут HTTP keep-alive пулы и TLS-контексты.
+
+    Hot reload:
+    - изменение PaymentProviderConfig в этом процессе — сигнал сбрасывает запись сразу;
+    - другие процессы перечитывают версию конфигурации не реже раза в CONFIG_TTL_S
+      (один запрос по уникальному (org, code)) и пересобирают экземпляр, если она сменилась.
+
+    Здоровье: degraded — из PaymentProviderConfig.health_status (пишет check_providers_health).
+    """
+
+    def __init__(self, *, max_size: int, config_ttl_s: float):
+        self.max_size = max_size
+        self.config_ttl_s = config_ttl_s
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[int, str], ProviderEntry] = OrderedDict()
+        self.builds = 0
+        self.reloads = 0
+
+    def peek(self, org_id: int, code: str, *, fresh: bool = True) -> ProviderEntry | None:
+        """
+        Запись без похода в БД (None — нет или, при fresh=True, пора перечитать конфигурацию).
+        """
+        with self._lock:
+            entry = self._entries.get((org_id, code))
+            if entry is None or (fresh and entry.verified_at + self.config_ttl_s <= time.monotonic()):
+                return None
+            self._entries.move_to_end((org_id, code))
+            return entry
+
+    def get(self, org_id: int, code: str) -> ProviderEntry:
+        entry = self.peek(org_id, code)
+        if entry is not None:
+            return entry
+
+        kind, options, version, degraded = _load_config(org_id, code)
+        key = (org_id, code)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current.version == version:
+                current.verified_at = time.monotonic()
+                current.degraded = degraded
+                self._entries.move_to_end(key)
+                return current
+
+        instance, async_instance = PROVIDER_KINDS[kind](code, options)
+        entry = ProviderEntry(
+            org_id=org_id, code=code, kind=kind, options=options, version=version,
+            instance=instance, async_instance=async_instance, degraded=degraded, verified_at=time.monotonic(),
+            breaker=CircuitBreaker(code, options),
+        )
+
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                evicted.append(previous)
+                self.reloads += 1
+            self._entries[key] = entry
+            self.builds += 1
+            while len(self._entries) > self.max_size:
+                evicted.append(self._entries.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return entry
+
+    def mark_health(self, org_id: int, code: str, *, degraded: bool) -> None:
+        with self._lock:
+            entry = self._entries.get((org_id, code))
+            if entry is not None:
+                entry.degraded = degraded
+
+    def invalidate(self, org_id: int, code: str) -> None:
+        with self._lock:
+            entry = self._entries.pop((org_id, code), None)
+        if entry is not None:
+            entry.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "config_ttl_s": self.config_ttl_s,
+                "builds": self.builds,
+                "reloads": self.reloads,
+                "degraded": sorted(f"{org_id}:{code}" for (org_id, code), e in self._entries.items() if e.degraded),
+                "breakers": {f"{org_id}:{code}": e.breaker.stats() for (org_id, code), e in self._entries.items()},
+            }
+
+
+_registry: ProviderRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ProviderRegistry:
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                conf = getattr(settings, "PAYMENT_PROVIDER_REGISTRY", {})
+                _registry = ProviderRegistry(
+                    max_size=conf.get("MAX_SIZE", 1000),
+                    config_ttl_s=conf.get("CONFIG_TTL_S", 30),
+                )
+    return _registry
+
+
+def reset_registry() -> None:
+    """
+    Закрыть и забыть все экземпляры (смена настроек PAYMENT_PROVIDERS / тесты).
+    """
+    global _registry
+
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        registry.clear()
+
+
+def get_provider_entry(payment: OrderPayment) -> ProviderEntry:
+    return get_registry().get(payment.org_id, payment.provider)
+
+
+async def aget_provider_entry(payment: OrderPayment) -> ProviderEntry:
+    entry = get_registry().peek(payment.org_id, payment.provider)
+    if entry is None:
+        entry = await sync_to_async(get_provider_entry)(payment)
+    return entry
+
+
+def get_breaker(payment: OrderPayment) -> CircuitBreaker:
+    return get_provider_entry(payment).breaker
 
 
 def get_provider_for_payment(payment: OrderPayment):
     """
-    MVP-registry: выбираем провайдера по payment.provider.
+    Синхронный провайдер платежа по конфигурации его org (PaymentProviderConfig / PAYMENT_PROVIDERS).
+    """
+    entry = get_provider_entry(payment)
+    if entry.instance is None:
+        raise ValueError(f"Payment provider {payment.provider} is async-only")
+    return entry.instance
 
-    Позже:
-    - внедрим DI (container) или настройку org->provider
-    - добавим caching, healthchecks
+
+def get_async_provider_for_payment(payment: OrderPayment) -> AsyncPaymentProviderPort:
+    """
+    Async-порт провайдера. Вызывается после aget_provider_entry — запись уже в registry,
+    в БД из event loop не ходим.
+    """
+    entry = get_registry().peek(payment.org_id, payment.provider, fresh=False) or get_provider_entry(payment)
+    return entry.async_instance
+
+
+# asyncio.Semaphore привязан к event loop — держим свои семафоры на каждый loop
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _semaphore(entry: ProviderEntry) -> asyncio.Semaphore:
+    per_loop = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    limit = entry.options["CONCURRENCY"]
+    key = (entry.org_id, entry.code)
+    if key not in per_loop or per_loop[key][0] != limit:
+        per_loop[key] = (limit, asyncio.Semaphore(limit))
+    return per_loop[key][1]
+
+
+async def call_provider(
+    payment: OrderPayment,
+    operation: str,
+    *,
+    timeout_s: float | None = None,
+    transitions: list[dict[str, Any]] | None = None,
+    acquired: bool = False,
+) -> dict[str, Any]:
     """
-    if payment.provider == "manual":
-        return ManualProvider()
+    Одна операция async-порта (authorize/capture/refund/void/check_status).
+
+    - circuit breaker открыт -> ProviderUnavailable сразу, без ожидания слота;
+    - не больше CONCURRENCY одновременных вызовов на провайдера org'а (в рамках event loop) —
+      остальные ждут слот, а не перегружают эквайера;
+    - таймаут (timeout_s или TIMEOUT_S, урезанный breaker'ом по наблюдаемому p99) считается
+      с момента получения слота -> ProviderTimeout.
+
+    Переходы состояния breaker'а дописываются в transitions (если передан).
+    acquired=True — разрешение breaker'а уже взято (breaker.acquire() до фазы 1 authorize):
+    check() не повторяем, а если до вызова провайдера не дошло — возвращаем probe-слот.
+    """
+    entry = await aget_provider_entry(payment)
+    timeout_s = timeout_s if timeout_s is not None else entry.options["TIMEOUT_S"]
+    transitions = transitions if transitions is not None else []
+    # ВАЖНО: через модуль, чтобы monkeypatch get_async_provider_for_payment работал
+    provider = get_async_provider_for_payment(payment)
+
+    async def call(timeout_s: float) -> dict[str, Any]:
+        try:
+            return await asyncio.wait_for(getattr(provider, operation)(payment=payment, timeout_s=timeout_s), timeout_s)
+        except asyncio.TimeoutError as exc:
+            raise ProviderTimeout(f"{payment.provider} {operation}: no response in {timeout_s}s") from exc
+
+    if not acquired:
+        entry.breaker.check()
+    semaphore = _semaphore(entry)
+    try:
+        await semaphore.acquire()
+    except BaseException:
+        if acquired:
+            entry.breaker.release()
+        raise
+    try:
+        return await entry.breaker.acall(call, timeout_s=timeout_s, transitions=transitions, acquired=acquired)
+    finally:
+        semaphore.release()
+
+
+async def call_many(
+    payments: list[OrderPayment],
+    operation: str,
+    *,
+    timeout_s: float | None = None,
+) -> list[dict[str, Any] | BaseException]:
+    """
+    Fan-out: операция по всем платежам конкурентно (с лимитами call_provider).
+    Результат в порядке payments; ошибка одного вызова — исключение на его месте, остальные не отменяются.
+    """
+    return await asyncio.gather(
+        *(call_provider(p, operation, timeout_s=timeout_s) for p in payments),
+        return_exceptions=True,
+    )
+
+
+async def _probe(entry: ProviderEntry, timeout_s: float) -> str:
+    """
+    "" — здоров, иначе текст ошибки. Провайдер без health_check считается здоровым.
+    """
+    check = getattr(entry.async_instance, "health_check", None)
+    if check is None:
+        return ""
+    try:
+        await asyncio.wait_for(check(timeout_s=timeout_s), timeout_s)
+    except asyncio.TimeoutError:
+        return f"no response in {timeout_s}s"
+    except (ProviderError, OSError) as exc:
+        return str(exc) or exc.__class__.__name__
+    return ""
+
+
+def check_providers_health(*, org=None) -> list[dict[str, Any]]:
+    """
+    Health check всех активных PaymentProviderConfig (конкурентно, таймаут HEALTH_TIMEOUT_S).
+
+    Результат пишется в health_status/health_checked_at/health_error через UPDATE (version
+    не растёт — экземпляры не пересобираются) и в registry текущего процесса;
+    остальные процессы увидят degraded при следующей перепроверке конфигурации.
+    """
+    timeout_s = getattr(settings, "PAYMENT_PROVIDER_REGISTRY", {}).get("HEALTH_TIMEOUT_S", 2)
+    configs = PaymentProviderConfig.objects.filter(is_active=True).order_by("id")
+    if org is not None:
+        configs = configs.filter(org=org)
+
+    registry = get_registry()
+    entries, results = [], []
+    for config in configs:
+        try:
+            entries.append((config, registry.get(config.org_id, config.code)))
+        except ValueError as exc:
+            entries.append((config, None))
+            results.append((config, str(exc)))
+
+    async def probe_all():
+        return await asyncio.gather(*(_probe(entry, timeout_s) for _, entry in entries if entry is not None))
+
+    errors = iter(asyncio.run(probe_all()))
+    results += [(config, next(errors)) for config, entry in entries if entry is not None]
 
-    # Без сюрпризов: если провайдер неизвестен — явно падаем
-    raise ValueError(f"Unknown payment provider: {payment.provider}")
+    now = timezone.now()
+    report = []
+    for config, error in sorted(results, key=lambda r: r[0].pk):
+        status = PaymentProviderConfig.Health.DEGRADED if error else PaymentProviderConfig.Health.OK
+        PaymentProviderConfig.objects.filter(pk=config.pk).update(
+            health_status=status, health_checked_at=now, health_error=error[:255]
+        )
+        registry.mark_health(config.org_id, config.code, degraded=bool(error))
+        report.append({"org_id": config.org_id, "code": config.code, "status": status, "error": error})
+    return report
@@ -0,0 +1,32 @@
+# apps/payments/signals.py
+
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .idempotency_cache import get_idempotency_cache
+from .models import OrderPayment, PaymentProviderConfig
+from .providers.registry import get_registry, reset_registry
+
+
+@receiver(post_save, sender=PaymentProviderConfig)
+@receiver(post_delete, sender=PaymentProviderConfig)
+def reload_payment_provider(sender, instance: PaymentProviderConfig, **kwargs):
+    """
+    Конфигурация провайдера изменилась — экземпляр пересоберётся при следующем вызове
+    (в этом процессе сразу, в остальных — через CONFIG_TTL_S по version).
+    """
+    get_registry().invalidate(instance.org_id, instance.code)
+
+
+@receiver(setting_changed)
+def reset_payment_providers(setting, **kwargs):
+    if setting in ("PAYMENT_PROVIDERS", "PAYMENT_PROVIDER_REGISTRY"):
+        reset_registry()
+
+
+@receiver(post_delete, sender=OrderPayment)
+def forget_idempotency_key(sender, instance: OrderPayment, **kwargs):
+    cache = get_idempotency_cache()
+    if cache is not None and instance.idempotency_key:
+        cache.invalidate(instance.org_id, instance.idempotency_key)
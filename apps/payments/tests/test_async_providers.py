@@ -0,0 +1,154 @@
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+from rest_framework.exceptions import ValidationError
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def _payments(org, n, provider="http", status="pending"):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    order = Order.objects.create(org=org)
+    return [
+        OrderPayment.objects.create(
+            org=org, order=order, tender=OrderPayment.Tender.CARD,
+            status=status, amount=Decimal("10.00"), provider=provider,
+        )
+        for _ in range(n)
+    ]
+
+
+def _with_stub(settings, latency_s, fn, **http_conf):
+    """
+    Поднять StubProviderServer в event loop теста, направить на него provider "http" и выполнить fn().
+    """
+    from apps.payments.providers.http_stub import StubProviderServer
+
+    async def main():
+        server = StubProviderServer(latency_s=latency_s)
+        base_url = await server.start()
+        settings.PAYMENT_PROVIDERS = {"default": {"CONCURRENCY": 16, "TIMEOUT_S": 5}, "http": {"BASE_URL": base_url, **http_conf}}
+        try:
+            return server, await fn()
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_batch_authorize_runs_provider_calls_concurrently(org_factory, settings):
+    from apps.payments.logic.async_payments import aauthorize_payments
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    payments = _payments(org_factory(name="Async Org"), 10)
+
+    started = time.perf_counter()
+    server, results = _with_stub(settings, 0.3, lambda: aauthorize_payments(payments))
+    elapsed = time.perf_counter() - started
+
+    assert all(isinstance(r, OrderPayment) and r.status == OrderPayment.Status.AUTHORIZED for r in results)
+    assert server.max_in_flight == 10
+    assert elapsed < 0.3 * 3  # последовательно было бы >= 3 s
+    assert PaymentEvent.objects.filter(payment__in=payments, action="authorize").count() == 10
+    assert results[0].raw_provider_payload["request_id"] == str(results[0].provider_request_id)
+
+
+def test_per_provider_concurrency_limit(org_factory, settings):
+    from apps.payments.providers import registry
+
+    payments = _payments(org_factory(name="Limit Org"), 6)
+
+    started = time.perf_counter()
+    server, results = _with_stub(settings, 0.1, lambda: registry.call_many(payments, "authorize"), CONCURRENCY=2)
+    elapsed = time.perf_counter() - started
+
+    assert all(r["ok"] for r in results)
+    assert server.max_in_flight == 2
+    assert elapsed >= 0.3  # 6 вызовов по 2 одновременно
+
+
+def test_provider_timeout_leaves_payment_in_flight(org_factory, settings):
+    from apps.payments.logic.async_payments import aauthorize_payments
+    from apps.payments.models import OrderPayment
+    from apps.payments.providers.port import ProviderTimeout
+
+    payment, = _payments(org_factory(name="Timeout Org"), 1)
+
+    _, results = _with_stub(settings, 1.0, lambda: aauthorize_payments([payment], timeout_s=0.1))
+
+    assert isinstance(results[0], ProviderTimeout)
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.AUTHORIZING
+
+
+def test_capture_and_check_status_through_http_provider(org_factory, settings):
+    from apps.payments.logic.async_payments import aauthorize_payment, acapture_payment, acheck_payment_statuses
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    payment, = _payments(org_factory(name="Capture Org"), 1)
+
+    async def flow():
+        authorized = await aauthorize_payment(payment=payment)
+        captured = await acapture_payment(payment=authorized)
+        return captured, await acheck_payment_statuses([captured])
+
+    _, (captured, statuses) = _with_stub(settings, 0.0, flow)
+
+    assert captured.status == OrderPayment.Status.CAPTURED
+    assert statuses[payment.public_id]["status"] == "captured"
+    event = PaymentEvent.objects.get(payment=payment, action="capture")
+    assert event.metadata["provider_payload"]["operation"] == "capture"
+
+
+def test_provider_success_with_failed_transition_is_recorded(org_factory, monkeypatch):
+    from apps.payments.logic import async_payments
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    payment, = _payments(org_factory(name="Unapplied Org"), 1, provider="manual", status="authorized")
+
+    def lost_race(*, payment, actor, metadata):
+        raise ValidationError({"status": ["Invalid status transition."]})
+
+    monkeypatch.setitem(
+        async_payments._PROVIDER_OPERATIONS, "capture", (lost_race, {OrderPayment.Status.AUTHORIZED})
+    )
+
+    with pytest.raises(ValidationError):
+        asyncio.run(async_payments.acapture_payment(payment=payment))
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.AUTHORIZED
+    event = PaymentEvent.objects.get(payment=payment, action="provider_unapplied")
+    assert event.from_status == event.to_status == OrderPayment.Status.AUTHORIZED
+    assert event.metadata["operation"] == "capture"
+    assert event.metadata["provider_payload"]["provider"] == "manual"
+    assert event.metadata["error"] == {"status": ["Invalid status transition."]}
+
+
+def test_async_use_case_keeps_strict_errors_without_calling_provider(org_factory, settings):
+    from apps.payments.logic.async_payments import arefund_payment
+
+    payment, = _payments(org_factory(name="Strict Org"), 1, provider="manual", status="authorized")
+
+    server, results = _with_stub(
+        settings, 0.0, lambda: asyncio.gather(arefund_payment(payment=payment), return_exceptions=True)
+    )
+
+    assert isinstance(results[0], ValidationError)
+    assert results[0].detail == {"status": ["Invalid status transition."]}
+
+
+def test_sync_providers_are_adapted_to_async_port(org_factory):
+    from apps.payments.logic.async_payments import aauthorize_payments
+    from apps.payments.models import OrderPayment
+
+    payments = _payments(org_factory(name="Manual Org"), 3, provider="manual")
+
+    results = asyncio.run(aauthorize_payments(payments))
+
+    assert [r.status for r in results] == [OrderPayment.Status.AUTHORIZED] * 3
+    assert results[0].raw_provider_payload["provider"] == "manual"
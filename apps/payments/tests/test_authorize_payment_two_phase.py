@@ -0,0 +1,202 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+
+def _payment(org, provider="fake"):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    return OrderPayment.objects.create(
+        org=org,
+        order=Order.objects.create(org=org),
+        tender=OrderPayment.Tender.CARD,
+        status=OrderPayment.Status.PENDING,
+        amount=Decimal("10.00"),
+        currency="EUR",
+        provider=provider,
+    )
+
+
+def _use_provider(monkeypatch, provider):
+    monkeypatch.setattr("apps.payments.providers.registry.get_provider_for_payment", lambda p: provider)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_provider_is_called_without_transaction_and_row_lock(org_factory, monkeypatch):
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    payment = _payment(org_factory(name="Two Phase Org"))
+    seen = {}
+
+    class Probe:
+        def authorize(self, *, payment, timeout_s):
+            seen["in_atomic"] = connection.in_atomic_block
+            seen["status"] = payment.status
+
+            def try_lock():
+                # строка payment не залочена — NOWAIT из другого соединения проходит
+                try:
+                    with transaction.atomic():
+                        OrderPayment.objects.select_for_update(nowait=True).get(pk=payment.pk)
+                    seen["lockable"] = True
+                finally:
+                    connection.close()
+
+            t = threading.Thread(target=try_lock)
+            t.start()
+            t.join()
+            return {"ok": True, "auth_code": "A1"}
+
+    _use_provider(monkeypatch, Probe())
+    authorize_payment(payment=payment)
+
+    assert seen == {"in_atomic": False, "status": OrderPayment.Status.AUTHORIZING, "lockable": True}
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.AUTHORIZED
+    assert payment.inflight_since is None
+    assert payment.raw_provider_payload == {"ok": True, "auth_code": "A1"}
+    assert list(PaymentEvent.objects.filter(payment=payment).order_by("created_at").values_list("action", "to_status")) == [
+        ("authorize_start", OrderPayment.Status.AUTHORIZING),
+        ("authorize", OrderPayment.Status.AUTHORIZED),
+    ]
+
+
+@pytest.mark.django_db
+def test_unresolvable_provider_leaves_payment_in_original_status(org_factory):
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment, PaymentEvent, PaymentProviderConfig
+
+    org = org_factory(name="Async Only Org")
+    PaymentProviderConfig.objects.create(
+        org=org, code="acq", kind=PaymentProviderConfig.Kind.HTTP, options={"BASE_URL": "http://127.0.0.1:9"}
+    )
+    payment = _payment(org, provider="acq")
+
+    with pytest.raises(ValueError, match="async-only"):
+        authorize_payment(payment=payment)
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.PENDING
+    assert payment.provider_request_id is None
+    assert not PaymentEvent.objects.filter(payment=payment).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_authorize_while_in_flight_is_rejected_and_provider_called_once(org_factory, monkeypatch):
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment
+    from apps.payments.providers.fake import FakeProvider
+
+    payment = _payment(org_factory(name="In Flight Org"))
+    provider = FakeProvider(latency_s=0.3)
+    _use_provider(monkeypatch, provider)
+
+    t = threading.Thread(target=lambda: (authorize_payment(payment=payment), connection.close()))
+    t.start()
+    try:
+        for _ in range(100):
+            if OrderPayment.objects.filter(pk=payment.pk, status=OrderPayment.Status.AUTHORIZING).exists():
+                break
+            threading.Event().wait(0.01)
+
+        with pytest.raises(ValidationError) as e:
+            authorize_payment(payment=payment)
+        assert e.value.detail == {"status": ["Payment authorization is in progress."]}
+    finally:
+        t.join()
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.AUTHORIZED
+    assert provider.calls == 1
+
+
+@pytest.mark.django_db
+def test_crash_after_intent_is_recovered_with_same_provider_request_id(admin_client, monkeypatch):
+    from apps.payments.logic.authorize_payment import authorize_payment, recover_inflight_authorizations
+    from apps.payments.models import OrderPayment, PaymentEvent
+    from apps.payments.providers.fake import FakeProvider
+
+    client, user, org = admin_client
+    payment = _payment(org)
+
+    class Timeout:
+        def authorize(self, *, payment, timeout_s):
+            raise TimeoutError("provider timeout")
+
+    _use_provider(monkeypatch, Timeout())
+    with pytest.raises(TimeoutError):
+        authorize_payment(payment=payment)
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.AUTHORIZING
+    request_id = payment.provider_request_id
+
+    # lease ещё не истёк — recovery не трогает
+    provider = FakeProvider()
+    _use_provider(monkeypatch, provider)
+    assert recover_inflight_authorizations()["authorized"] == 0
+
+    OrderPayment.objects.filter(pk=payment.pk).update(inflight_since=timezone.now() - timedelta(minutes=10))
+    assert recover_inflight_authorizations() == {"authorized": 1, "failed": 0, "skipped": 0, "errors": 0}
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.AUTHORIZED
+    assert payment.provider_request_id == request_id
+    assert payment.raw_provider_payload["request_id"] == str(request_id)
+
+    events = PaymentEvent.objects.filter(payment=payment)
+    assert events.filter(action="authorize_start").count() == 1
+    final = events.get(action="authorize")
+    assert (final.from_status, final.to_status) == (OrderPayment.Status.PENDING, OrderPayment.Status.AUTHORIZED)
+    assert final.metadata["redrive"] is True
+
+
+@pytest.mark.django_db
+def test_declined_authorization_marks_payment_failed(admin_client, monkeypatch):
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment, PaymentEvent
+    from apps.payments.providers.fake import FakeProvider
+
+    client, user, org = admin_client
+    payment = _payment(org)
+    _use_provider(monkeypatch, FakeProvider(decline=True))
+
+    with pytest.raises(ValidationError) as e:
+        authorize_payment(payment=payment, actor=user)
+    assert e.value.detail == {"status": ["Payment authorization declined."]}
+
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.FAILED
+    assert PaymentEvent.objects.get(payment=payment, action="authorize").to_status == OrderPayment.Status.FAILED
+
+
+@pytest.mark.django_db
+def test_finalize_is_compare_and_set_and_writes_event_once(admin_client, monkeypatch):
+    from apps.payments.logic.authorize_payment import _finalize_authorize, authorize_payment
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    client, user, org = admin_client
+    payment = _payment(org)
+    captured = {}
+
+    class Spy:
+        def authorize(self, *, payment, timeout_s):
+            captured["payment"] = payment
+            return {"ok": True}
+
+    _use_provider(monkeypatch, Spy())
+    authorize_payment(payment=payment)
+
+    # "второй воркер" с тем же intent'ом финализирует поздно — без повторного события
+    again = _finalize_authorize(payment=captured["payment"], payload={"ok": True}, actor=None, metadata={}, redrive=True)
+
+    assert again.status == OrderPayment.Status.AUTHORIZED
+    assert PaymentEvent.objects.filter(payment=payment, action="authorize").count() == 1
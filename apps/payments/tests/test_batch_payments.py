@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+def _payments(org, statuses, amount="5.00"):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    return [
+        OrderPayment.objects.create(
+            org=org, order=Order.objects.create(org=org), tender=OrderPayment.Tender.CARD,
+            status=status, amount=Decimal(amount), provider="manual",
+        )
+        for status in statuses
+    ]
+
+
+def test_capture_payments_returns_per_payment_outcomes(org_factory, django_user_model):
+    from apps.payments.logic.batch_payments import BatchOutcome, capture_payments
+    from apps.payments.models import PaymentEvent
+
+    org = org_factory(name="Settlement Org")
+    user = django_user_model.objects.create_user(email="s@example.com", password="x")
+    authorized, pending, captured, voided = _payments(org, ["authorized", "pending", "captured", "voided"])
+    foreign, = _payments(org_factory(name="Other Org"), ["authorized"])
+
+    outcomes = capture_payments(
+        [voided.pk, authorized.pk, pending.pk, captured.pk, foreign.pk, authorized.pk],
+        org=org, actor=user, metadata={"run": "eod-1"},
+    )
+
+    assert list(outcomes) == [voided.pk, authorized.pk, pending.pk, captured.pk, foreign.pk]
+    assert outcomes[authorized.pk] == BatchOutcome(ok=True, status="captured")
+    assert outcomes[pending.pk] == BatchOutcome(ok=True, status="captured")
+    assert outcomes[captured.pk] == BatchOutcome(ok=False, status="captured", error="Payment is already captured.")
+    assert outcomes[voided.pk] == BatchOutcome(ok=False, status="voided", error="Invalid status transition.")
+    assert outcomes[foreign.pk] == BatchOutcome(ok=False, status=None, error="Payment not found.")
+
+    foreign.refresh_from_db()
+    assert foreign.status == "authorized"
+
+    events = PaymentEvent.objects.filter(action="capture").order_by("payment_id")
+    assert [(e.payment_id, e.from_status, e.to_status) for e in events] == [
+        (authorized.pk, "authorized", "captured"),
+        (pending.pk, "pending", "captured"),
+    ]
+    assert all(e.actor_id == user.pk and e.metadata == {"run": "eod-1"} for e in events)
+
+    for payment, expected in ((authorized, "5.00"), (pending, "5.00"), (captured, "5.00"), (voided, "0.00")):
+        payment.order.refresh_from_db()
+        assert payment.order.captured_total == Decimal(expected)
+
+
+def test_batch_query_count_does_not_grow_with_batch_size(org_factory):
+    from apps.payments.logic.batch_payments import capture_payments, void_payments
+
+    org = org_factory(name="Bulk Org")
+    small = [p.pk for p in _payments(org, ["authorized"] * 3)]
+    large = [p.pk for p in _payments(org, ["authorized"] * 30)]
+
+    with CaptureQueriesContext(connection) as small_ctx:
+        capture_payments(small, org=org)
+    with CaptureQueriesContext(connection) as large_ctx:
+        outcomes = void_payments(large, org=org)
+
+    assert len(large_ctx.captured_queries) <= len(small_ctx.captured_queries)
+    assert all(o.ok and o.status == "voided" for o in outcomes.values())
+    sqls = [q["sql"] for q in large_ctx.captured_queries]
+    assert sum(1 for sql in sqls if sql.startswith('UPDATE "payments_orderpayment"')) == 1
+    assert not any("orders_order" in sql for sql in sqls)  # void итоги заказа не трогает
+
+
+def test_chunks_are_processed_in_separate_transactions(org_factory):
+    from apps.payments.logic.batch_payments import capture_payments
+    from apps.payments.models import OrderPayment
+
+    org = org_factory(name="Chunk Org")
+    payments = _payments(org, ["authorized"] * 5, amount="2.50")
+
+    outcomes = capture_payments([p.pk for p in payments], org=org, chunk_size=2)
+
+    assert [o.status for o in outcomes.values()] == ["captured"] * 5
+    assert OrderPayment.objects.filter(status="captured").count() == 5
+    payments[4].order.refresh_from_db()
+    assert payments[4].order.captured_total == Decimal("2.50")
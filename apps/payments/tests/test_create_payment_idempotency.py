@@ -0,0 +1,103 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+def _create(order, key, **kwargs):
+    from apps.payments.logic.payments import create_payment
+
+    return create_payment(
+        order=order, tender="card", amount=Decimal("10.00"), currency="EUR",
+        idempotency_key=key, provider="manual", **kwargs,
+    )
+
+
+@pytest.fixture
+def idempotency_cache(settings):
+    from apps.payments import idempotency_cache
+
+    settings.PAYMENT_IDEMPOTENCY_CACHE = {"ENABLED": True, "MAX_SIZE": 100, "TTL_S": 60}
+    cache = idempotency_cache.get_idempotency_cache()
+    cache.clear()
+    return cache
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_retries_create_exactly_one_payment_and_event(org_factory, settings):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    settings.PAYMENT_IDEMPOTENCY_CACHE = {"ENABLED": False}
+    order = Order.objects.create(org=org_factory(name="Retry Org"))
+    barrier = threading.Barrier(50)
+    ids, errors = [], []
+
+    def retry():
+        try:
+            barrier.wait()
+            ids.append(_create(order, "pos-retry-1").pk)
+        except Exception as exc:  # pragma: no cover - видно в assert ниже
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=retry) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(ids) == 50 and len(set(ids)) == 1
+    assert OrderPayment.objects.count() == 1
+    assert PaymentEvent.objects.filter(action="create").count() == 1
+
+
+@pytest.mark.django_db
+def test_create_payment_inserts_without_locking_read(org_factory, settings):
+    from apps.orders.models import Order
+    from apps.payments.models import PaymentEvent
+
+    settings.PAYMENT_IDEMPOTENCY_CACHE = {"ENABLED": False}
+    order = Order.objects.create(org=org_factory(name="Insert Org"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        payment = _create(order, "k-1", metadata={"note": "first"})
+    sqls = [q["sql"] for q in ctx.captured_queries]
+
+    assert not any("FOR UPDATE" in sql for sql in sqls)
+    inserts = [sql for sql in sqls if sql.startswith('INSERT INTO "payments_orderpayment"')]
+    assert len(inserts) == 1 and "ON CONFLICT" in inserts[0]
+    assert payment.pk is not None and payment.created_at is not None
+    assert PaymentEvent.objects.get(payment=payment).metadata == {"note": "first"}
+
+    # повтор: конфликт -> чтение победителя, событие не дублируется
+    assert _create(order, "k-1").pk == payment.pk
+    assert PaymentEvent.objects.filter(payment=payment).count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recent_keys_are_served_from_cache_after_commit(org_factory, idempotency_cache):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=org_factory(name="Cache Org"))
+    payment = _create(order, "k-cached")
+
+    with CaptureQueriesContext(connection) as ctx:
+        again = _create(order, "k-cached")
+
+    assert again.pk == payment.pk
+    assert len(ctx.captured_queries) == 1
+    assert not ctx.captured_queries[0]["sql"].startswith("INSERT")
+    assert idempotency_cache.stats()["hits"] == 1
+
+    # откатившееся создание ключ в кэш не кладёт
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            _create(order, "k-rolled-back")
+            raise RuntimeError("outer rollback")
+    assert idempotency_cache.get(order.org_id, "k-rolled-back") is None
+    assert _create(order, "k-rolled-back").pk is not None
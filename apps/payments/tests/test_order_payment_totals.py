@@ -0,0 +1,144 @@
+import threading
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+
+def _payment(order, amount, status="authorized"):
+    from apps.payments.models import OrderPayment
+
+    return OrderPayment.objects.create(
+        org=order.org, order=order, tender=OrderPayment.Tender.CARD, status=status,
+        amount=Decimal(amount), provider="manual",
+    )
+
+
+def _totals(order):
+    order.refresh_from_db(fields=["captured_total", "refunded_total"])
+    return order.captured_total, order.refunded_total
+
+
+@pytest.mark.django_db
+def test_capture_and_refund_maintain_order_totals(org_factory):
+    from apps.orders.models import Order
+    from apps.payments.logic.capture_payment import capture_payment
+    from apps.payments.logic.refund_payment import refund_payment
+
+    order = Order.objects.create(org=org_factory(name="Totals Org"))
+    first, second = _payment(order, "30.00"), _payment(order, "12.50")
+
+    with CaptureQueriesContext(connection) as ctx:
+        capture_payment(payment=first)
+    updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "orders_order"')]
+    assert len(updates) == 1 and '"captured_total" + ' in updates[0]
+    assert _totals(order) == (Decimal("30.00"), Decimal("0.00"))
+
+    capture_payment(payment=second)
+    refund_payment(payment=first)
+    assert _totals(order) == (Decimal("42.50"), Decimal("30.00"))
+
+    # отклонённый переход итоги не трогает
+    with pytest.raises(ValidationError):
+        refund_payment(payment=first)
+    assert _totals(order) == (Decimal("42.50"), Decimal("30.00"))
+
+
+@pytest.mark.django_db
+def test_payment_created_captured_counts_and_full_order_save_keeps_totals(org_factory):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=org_factory(name="Cash Org"))
+    stale = Order.objects.get(pk=order.pk)
+
+    _payment(order, "8.00", status="captured")
+    _payment(order, "2.00", status="refunded")
+    _payment(order, "5.00", status="pending")
+
+    stale.save()  # устаревший экземпляр с нулевыми итогами
+    assert _totals(order) == (Decimal("10.00"), Decimal("2.00"))
+
+
+@pytest.mark.django_db
+def test_pay_order_checks_net_captured_total_without_payment_aggregate(org_factory):
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order, OrderItem
+    from apps.payments.logic.capture_payment import capture_payment
+    from apps.payments.logic.refund_payment import refund_payment
+    from apps.products.models import TaxRate, Unit
+
+    org = org_factory(name="Pay Org")
+    order = Order.objects.create(org=org)
+    OrderItem.objects.create(
+        order=order, product_name="Tea", qty=Decimal("1"), unit=Unit.objects.create(org=org, name="pcs"),
+        unit_price=Decimal("10.00"), tax_rate=TaxRate.objects.create(org=org, name="Zero", rate=Decimal("0")),
+    )
+    order.recompute_totals(save=True)
+
+    refunded = _payment(order, "10.00")
+    capture_payment(payment=refunded)
+    refund_payment(payment=refunded)
+    with pytest.raises(ValidationError) as exc:
+        pay_order(order=order)
+    assert "payment" in exc.value.detail
+
+    capture_payment(payment=_payment(order, "10.00"))
+    with CaptureQueriesContext(connection) as ctx:
+        paid = pay_order(order=order)
+
+    assert paid.status == Order.STATUS_PAID
+    assert not any("payments_orderpayment" in q["sql"] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_captures_of_one_order_do_not_lose_updates(org_factory):
+    from apps.orders.models import Order
+    from apps.payments.logic.capture_payment import capture_payment
+
+    order = Order.objects.create(org=org_factory(name="Race Org"))
+    payments = [_payment(order, "1.25") for _ in range(8)]
+    barrier = threading.Barrier(len(payments))
+
+    def worker(payment):
+        try:
+            barrier.wait()
+            capture_payment(payment=payment)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(p,)) for p in payments]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _totals(order) == (Decimal("10.00"), Decimal("0.00"))
+
+
+@pytest.mark.django_db
+def test_reconcile_command_detects_and_repairs_drift(org_factory):
+    from apps.orders.models import Order
+
+    org, other_org = org_factory(name="Drift Org"), org_factory(name="Other Org")
+    orders = [Order.objects.create(org=org) for _ in range(3)]
+    for order in orders:
+        _payment(order, "7.00", status="captured")
+    Order.objects.filter(pk=orders[1].pk).update(captured_total=Decimal("0.00"), refunded_total=Decimal("1.00"))
+    other = Order.objects.create(org=other_org)
+    Order.objects.filter(pk=other.pk).update(captured_total=Decimal("99.00"))
+
+    out = StringIO()
+    call_command("reconcile_order_payment_totals", "--org", str(org.public_id), "--batch-size", "2", "--dry-run", stdout=out)
+    assert "Checked 3 orders, found 1" in out.getvalue()
+    assert f"drift: order {orders[1].public_id} captured 0.00 -> 7.00, refunded 1.00 -> 0.00" in out.getvalue()
+    assert _totals(orders[1]) == (Decimal("0.00"), Decimal("1.00"))
+
+    out = StringIO()
+    call_command("reconcile_order_payment_totals", "--org", str(org.public_id), "--batch-size", "2", stdout=out)
+    assert "Checked 3 orders, repaired 1" in out.getvalue()
+    assert [_totals(o) for o in orders] == [(Decimal("7.00"), Decimal("0.00"))] * 3
+    assert _totals(other) == (Decimal("99.00"), Decimal("0.00"))
@@ -0,0 +1,182 @@
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+pytestmark = pytest.mark.django_db
+
+SECRET = "s3cret"
+
+
+@pytest.fixture(autouse=True)
+def _webhook_secret(settings):
+    settings.PAYMENT_PROVIDERS = {**settings.PAYMENT_PROVIDERS, "acq": {"WEBHOOK_SECRET": SECRET}}
+
+
+def _sign(body, secret=SECRET):
+    return hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+
+def _payment(org, external_id, status="authorized"):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    return OrderPayment.objects.create(
+        org=org, order=Order.objects.create(org=org), tender=OrderPayment.Tender.CARD, status=status,
+        amount=Decimal("12.00"), external_id=external_id, provider="acq",
+    )
+
+
+def _post(client, org, event, provider="acq", *, signed=True, **headers):
+    org_id = getattr(org, "public_id", org)
+    body = json.dumps(event) if isinstance(event, dict) else event
+    if signed:
+        headers.setdefault("X_WEBHOOK_SIGNATURE", _sign(body))
+    return client.post(
+        f"/api/v1/payments/webhooks/{org_id}/{provider}/",
+        data=body,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+def test_webhook_is_enqueued_with_one_insert_and_deduplicated(api_client, org_factory):
+    from apps.payments.models import PaymentWebhook
+
+    org = org_factory(name="Hook Org")
+    event = {"id": "evt-1", "type": "payment.captured", "external_id": "ext-1", "extra": {"a": 1}}
+
+    with CaptureQueriesContext(connection) as ctx:
+        first = _post(api_client, org, event)
+    assert first.status_code == 202 and first.json() == {"status": "queued"}
+    # секрет провайдера org + INSERT в очередь
+    assert len(ctx.captured_queries) == 2
+
+    assert _post(api_client, org, event).json() == {"status": "duplicate"}
+    webhook = PaymentWebhook.objects.get()
+    assert (webhook.provider, webhook.event_id, webhook.event_type, webhook.payload) == (
+        "acq", "evt-1", "payment.captured", event,
+    )
+
+    assert _post(api_client, org, {"id": "evt-2", "type": "payment.unknown", "external_id": "x"}).status_code == 400
+    assert _post(api_client, org, "not json").status_code == 400
+    assert _post(api_client, uuid.uuid4(), event).status_code == 404
+    assert PaymentWebhook.objects.count() == 1
+
+
+def test_webhook_signature_is_required(api_client, org_factory):
+    from apps.payments.models import PaymentWebhook
+
+    org = org_factory(name="Signed Org")
+    body = json.dumps({"id": "evt-1", "type": "payment.voided", "external_id": "ext-1"})
+
+    assert _post(api_client, org, body, signed=False).status_code == 403
+    assert _post(api_client, org, body, X_WEBHOOK_SIGNATURE="0" * 64).status_code == 403
+    assert _post(api_client, org, body).status_code == 202
+    assert PaymentWebhook.objects.count() == 1
+
+
+def test_unsigned_webhook_for_provider_without_secret_is_rejected(api_client, org_factory):
+    from apps.payments.models import PaymentWebhook
+
+    org = org_factory(name="No Secret Org")
+    body = json.dumps({"id": "evt-1", "type": "payment.captured", "external_id": "ext-1"})
+
+    for provider in ("manual", "fake"):
+        resp = _post(api_client, org, body, provider=provider, signed=False)
+        assert resp.status_code == 403, resp.content
+    assert not PaymentWebhook.objects.exists()
+
+
+def test_webhook_secret_comes_from_org_provider_config(api_client, org_factory):
+    from apps.payments.models import PaymentProviderConfig
+
+    org, other = org_factory(name="Config Org"), org_factory(name="Other Org")
+    PaymentProviderConfig.objects.create(
+        org=org, code="psp", kind=PaymentProviderConfig.Kind.MANUAL, options={"WEBHOOK_SECRET": "org-secret"}
+    )
+    body = json.dumps({"id": "evt-1", "type": "payment.captured", "external_id": "ext-1"})
+    signature = _sign(body, "org-secret")
+
+    assert _post(api_client, org, body, provider="psp", X_WEBHOOK_SIGNATURE=signature).status_code == 202
+    # секрет org'а не действует для другой org и не подменяется секретом из settings
+    assert _post(api_client, other, body, provider="psp", X_WEBHOOK_SIGNATURE=signature).status_code == 403
+    assert _post(api_client, org, body, provider="psp", X_WEBHOOK_SIGNATURE=_sign(body)).status_code == 403
+
+    PaymentProviderConfig.objects.filter(org=org, code="psp").update(is_active=False)
+    assert _post(api_client, org, body, provider="psp", X_WEBHOOK_SIGNATURE=signature).status_code == 403
+
+
+def test_worker_applies_transitions_via_use_cases(api_client, org_factory):
+    from apps.payments.logic.webhooks import process_webhook_batch
+    from apps.payments.models import PaymentEvent, PaymentWebhook
+
+    org = org_factory(name="Worker Org")
+    captured, voided, already = _payment(org, "ext-c"), _payment(org, "ext-v"), _payment(org, "ext-a", "captured")
+    for i, (external_id, event_type) in enumerate(
+        [("ext-c", "payment.captured"), ("ext-v", "payment.voided"), ("ext-a", "payment.captured")]
+    ):
+        _post(api_client, org, {"id": f"evt-{i}", "type": event_type, "external_id": external_id})
+
+    assert process_webhook_batch(batch_size=10) == {"done": 3, "retried": 0, "dead": 0}
+
+    for payment, status in ((captured, "captured"), (voided, "voided"), (already, "captured")):
+        payment.refresh_from_db()
+        assert payment.status == status
+    captured.order.refresh_from_db()
+    assert captured.order.captured_total == Decimal("12.00")
+
+    events = PaymentEvent.objects.filter(metadata__source="webhook").order_by("payment_id")
+    assert [(e.payment_id, e.action, e.metadata["webhook_event_id"]) for e in events] == [
+        (captured.pk, "capture", "evt-0"), (voided.pk, "void", "evt-1"),
+    ]
+    assert set(PaymentWebhook.objects.values_list("status", flat=True)) == {"done"}
+    assert process_webhook_batch(batch_size=10) == {"done": 0, "retried": 0, "dead": 0}
+
+
+def test_failed_webhook_backs_off_then_goes_to_dead_letter(api_client, org_factory, settings):
+    from apps.payments.logic.webhooks import process_webhook_batch
+    from apps.payments.models import PaymentWebhook, PaymentWebhookDeadLetter
+
+    settings.PAYMENT_WEBHOOKS = {"MAX_ATTEMPTS": 3, "BACKOFF_BASE_S": 10, "BACKOFF_MAX_S": 15}
+    org = org_factory(name="Retry Org")
+    _post(api_client, org, {"id": "evt-1", "type": "payment.refunded", "external_id": "ext-late"})
+
+    delays = []
+    for _ in range(2):
+        started = timezone.now()
+        assert process_webhook_batch() == {"done": 0, "retried": 1, "dead": 0}
+        webhook = PaymentWebhook.objects.get()
+        delays.append(round((webhook.available_at - started).total_seconds()))
+        assert process_webhook_batch() == {"done": 0, "retried": 0, "dead": 0}  # ещё не пора
+        PaymentWebhook.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    assert delays == [10, 15]
+    assert webhook.attempts == 2 and webhook.last_error == "payment: Payment not found."
+
+    assert process_webhook_batch() == {"done": 0, "retried": 0, "dead": 1}
+    assert not PaymentWebhook.objects.exists()
+    dead = PaymentWebhookDeadLetter.objects.get()
+    assert (dead.event_id, dead.attempts, dead.last_error) == ("evt-1", 3, "payment: Payment not found.")
+
+
+def test_process_command_drains_queue_once(api_client, org_factory):
+    org = org_factory(name="Command Org")
+    payment = _payment(org, "ext-1")
+    _post(api_client, org, {"id": "evt-1", "type": "payment.voided", "external_id": "ext-1"})
+
+    out = StringIO()
+    call_command("process_payment_webhooks", "--workers", "1", "--once", stdout=out)
+
+    assert "done=1 retried=0 dead=0" in out.getvalue()
+    payment.refresh_from_db()
+    assert payment.status == "voided"
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+
+BREAKER = {"BREAKER_MIN_CALLS": 3, "BREAKER_ERROR_RATE": 0.5, "BREAKER_OPEN_S": 30, "BREAKER_HALF_OPEN_PROBES": 2}
+
+
+def _payment(org, provider="fake"):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    return OrderPayment.objects.create(
+        org=org, order=Order.objects.create(org=org), tender=OrderPayment.Tender.CARD,
+        amount=Decimal("10.00"), provider=provider,
+    )
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail(timeout_s):
+    raise ConnectionError("acquirer down")
+
+
+def test_breaker_opens_on_error_rate_and_recovers_through_half_open_probes():
+    from apps.payments.providers.breaker import CircuitBreaker
+    from apps.payments.providers.port import ProviderUnavailable
+
+    clock = Clock()
+    breaker = CircuitBreaker("acq", BREAKER, clock=clock)
+    transitions = []
+
+    breaker.call(lambda t: {"ok": True}, timeout_s=10, transitions=transitions)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail, timeout_s=10, transitions=transitions)
+
+    assert breaker.state == "open"
+    assert [(t["from"], t["to"], t["reason"]) for t in transitions] == [("closed", "open", "error rate")]
+    with pytest.raises(ProviderUnavailable) as exc:
+        breaker.check()
+    assert exc.value.status_code == 503
+    assert exc.value.retry_after_s == 30
+
+    # истёк OPEN_S: пробный вызов упал — снова open
+    clock.now += 30
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail, timeout_s=10, transitions=transitions)
+    assert breaker.state == "open"
+
+    # два успешных пробных — closed
+    clock.now += 30
+    breaker.call(lambda t: {"ok": False}, timeout_s=10, transitions=transitions)  # отказ эквайера — не сбой
+    breaker.call(lambda t: {"ok": True}, timeout_s=10, transitions=transitions)
+
+    assert breaker.state == "closed"
+    assert [t["to"] for t in transitions] == ["open", "half_open", "open", "half_open", "closed"]
+    stats = breaker.stats()
+    assert stats["rejected"] == 1
+    assert stats["transitions"] == {"closed->open": 1, "open->half_open": 2, "half_open->open": 1, "half_open->closed": 1}
+
+
+def test_adaptive_timeout_follows_observed_p99():
+    from apps.payments.providers.breaker import CircuitBreaker
+
+    clock = Clock()
+    breaker = CircuitBreaker("acq", {**BREAKER, "TIMEOUT_P99_FACTOR": 2.0, "TIMEOUT_MIN_S": 0.5}, clock=clock)
+    assert breaker.timeout_s(10) == 10  # мало замеров — настроенный таймаут
+
+    for _ in range(3):
+        breaker.record(ok=True, duration_s=1.5)
+    assert breaker.timeout_s(10) == 3.0
+    assert breaker.timeout_s(2) == 2  # не больше настроенного
+
+    breaker.record(ok=True, duration_s=0.01)
+    breaker.record(ok=True, duration_s=0.01)
+    clock.now += 61  # все замеры вышли из окна — снова настроенный таймаут
+    assert breaker.timeout_s(10) == 10
+
+
+@pytest.mark.django_db
+def test_open_circuit_fails_fast_before_payment_leaves_pending(org_factory, settings, monkeypatch):
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment, PaymentEvent
+    from apps.payments.providers import registry
+    from apps.payments.providers.port import ProviderUnavailable
+
+    settings.PAYMENT_PROVIDERS = {"default": BREAKER, "fake": {"KIND": "fake"}}
+    calls = []
+
+    class Down:
+        def authorize(self, *, payment, timeout_s):
+            calls.append(timeout_s)
+            raise ConnectionError("acquirer down")
+
+    monkeypatch.setattr("apps.payments.providers.registry.get_provider_for_payment", lambda p: Down())
+    org = org_factory(name="Breaker Org")
+    failed = [_payment(org) for _ in range(3)]
+    for payment in failed:
+        with pytest.raises(ConnectionError):
+            authorize_payment(payment=payment)
+
+    payment = _payment(org)
+    with pytest.raises(ProviderUnavailable):
+        authorize_payment(payment=payment)
+
+    assert len(calls) == 3
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.PENDING
+    assert not PaymentEvent.objects.filter(payment=payment).exists()
+
+    event = PaymentEvent.objects.get(action="provider_circuit")
+    assert event.payment_id == failed[-1].pk
+    assert event.from_status == event.to_status == OrderPayment.Status.AUTHORIZING
+    assert event.metadata["breaker"]["from"] == "closed"
+    assert event.metadata["breaker"]["to"] == "open"
+    assert event.metadata["breaker"]["operation"] == "authorize"
+    assert event.metadata["breaker"]["error_rate"] == 1.0
+
+    stats = registry.get_registry().stats()["breakers"][f"{org.pk}:fake"]
+    assert stats["state"] == "open"
+    assert stats["failures"] == 3
+    assert stats["rejected"] == 1
+
+
+@pytest.mark.django_db
+def test_half_open_probe_slot_is_taken_before_payment_leaves_pending(org_factory, settings, monkeypatch):
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment, PaymentEvent
+    from apps.payments.providers import registry
+    from apps.payments.providers.port import ProviderUnavailable
+    from rest_framework.exceptions import ValidationError
+
+    settings.PAYMENT_PROVIDERS = {"default": BREAKER, "fake": {"KIND": "fake"}}
+    org = org_factory(name="Half Open Org")
+    payment = _payment(org)
+    breaker = registry.get_breaker(payment)
+    breaker.clock = clock = Clock()
+    for _ in range(3):
+        breaker.record(ok=False, duration_s=0.01)
+    assert breaker.state == "open"
+
+    # OPEN_S истёк, оба probe-слота заняты другими вызовами
+    clock.now += 30
+    breaker.acquire()
+    breaker.acquire()
+    assert breaker.state == "half_open"
+
+    with pytest.raises(ProviderUnavailable):
+        authorize_payment(payment=payment)
+    payment.refresh_from_db()
+    assert payment.status == OrderPayment.Status.PENDING
+    assert not PaymentEvent.objects.filter(payment=payment).exists()
+
+    # фаза 1 отказала (платёж уже authorized) — слот возвращён, провайдер не вызван
+    breaker.release()
+    authorized = _payment(org)
+    OrderPayment.objects.filter(pk=authorized.pk).update(status=OrderPayment.Status.AUTHORIZED)
+    with pytest.raises(ValidationError):
+        authorize_payment(payment=authorized)
+    assert breaker.stats()["calls"] == 3
+
+    # свободный слот — пробный вызов проходит всю цепочку
+    monkeypatch.setattr(
+        "apps.payments.providers.registry.get_provider_for_payment",
+        lambda p: type("Ok", (), {"authorize": lambda self, *, payment, timeout_s: {"ok": True}})(),
+    )
+    assert authorize_payment(payment=payment).status == OrderPayment.Status.AUTHORIZED
+    assert breaker.stats()["calls"] == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_calls_short_circuit_after_provider_timeouts(org_factory, settings):
+    from apps.payments.logic.async_payments import aauthorize_payments
+    from apps.payments.models import PaymentEvent
+    from apps.payments.providers.http_stub import StubProviderServer
+    from apps.payments.providers.port import ProviderTimeout, ProviderUnavailable
+
+    org = org_factory(name="Async Breaker Org")
+    slow = [_payment(org, "http") for _ in range(3)]
+    rest = [_payment(org, "http") for _ in range(5)]
+
+    async def main():
+        server = StubProviderServer(latency_s=1.0)
+        settings.PAYMENT_PROVIDERS = {"default": {**BREAKER, "TIMEOUT_S": 0.1}, "http": {"KIND": "http", "BASE_URL": await server.start()}}
+        try:
+            first = await aauthorize_payments(slow)
+            started = time.perf_counter()
+            second = await aauthorize_payments(rest)
+            return server, first, second, time.perf_counter() - started
+        finally:
+            await server.close()
+
+    server, first, second, elapsed = asyncio.run(main())
+
+    assert all(isinstance(r, ProviderTimeout) for r in first)
+    assert all(isinstance(r, ProviderUnavailable) for r in second)
+    assert server.requests == 3
+    assert elapsed < 0.1  # без таймаута провайдера
+    assert PaymentEvent.objects.filter(action="provider_circuit", metadata__breaker__to="open").count() == 1
+
+
+@pytest.mark.django_db
+def test_provider_stats_endpoint_is_staff_only(auth_client, org_factory, settings):
+    from apps.payments.providers import registry
+
+    settings.PAYMENT_PROVIDERS = {"manual": {"KIND": "manual"}}
+    org = org_factory(name="Stats Org")
+    registry.get_provider_entry(_payment(org, "manual"))
+
+    client, user = auth_client(email="ops@example.com")
+    assert client.get("/api/v1/payments/providers/stats/").status_code == 403
+
+    user.is_staff = True
+    user.save(update_fields=["is_staff"])
+
+    resp = client.get("/api/v1/payments/providers/stats/")
+    assert resp.status_code == 200
+    assert resp.json()["breakers"][f"{org.pk}:manual"]["state"] == "closed"
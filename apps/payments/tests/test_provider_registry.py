@@ -0,0 +1,229 @@
+import asyncio
+import threading
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+
+def _payment(org, provider):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    return OrderPayment.objects.create(
+        org=org, order=Order.objects.create(org=org), tender=OrderPayment.Tender.CARD,
+        amount=Decimal("10.00"), provider=provider,
+    )
+
+
+@pytest.fixture
+def registry(settings):
+    from apps.payments.providers import registry
+
+    settings.PAYMENT_PROVIDER_REGISTRY = {"MAX_SIZE": 100, "CONFIG_TTL_S": 60, "HEALTH_TIMEOUT_S": 1}
+    return registry
+
+
+@pytest.mark.django_db
+def test_provider_is_built_once_per_org_and_code(org_factory, registry):
+    from apps.payments.providers.manual import ManualProvider
+
+    payment = _payment(org_factory(name="Cache Org"), "manual")
+
+    first = registry.get_provider_for_payment(payment)
+    with CaptureQueriesContext(connection) as ctx:
+        again = registry.get_provider_for_payment(payment)
+
+    assert isinstance(first, ManualProvider)
+    assert again is first
+    assert len(ctx.captured_queries) == 0
+    assert registry.get_registry().stats()["builds"] == 1
+
+
+@pytest.mark.django_db
+def test_per_org_config_selects_provider_kind(org_factory, registry):
+    from apps.payments.models import PaymentProviderConfig
+    from apps.payments.providers.fake import FakeProvider
+
+    org_a, org_b = org_factory(name="A"), org_factory(name="B")
+    PaymentProviderConfig.objects.create(org=org_a, code="acme", kind=PaymentProviderConfig.Kind.FAKE)
+
+    assert isinstance(registry.get_provider_for_payment(_payment(org_a, "acme")), FakeProvider)
+    with pytest.raises(ValueError, match="Unknown payment provider: acme"):
+        registry.get_provider_for_payment(_payment(org_b, "acme"))
+
+    PaymentProviderConfig.objects.create(org=org_b, code="acme", kind=PaymentProviderConfig.Kind.MANUAL, is_active=False)
+    with pytest.raises(ValueError, match="disabled"):
+        registry.get_provider_for_payment(_payment(org_b, "acme"))
+
+
+@pytest.mark.django_db
+def test_fake_kind_is_rejected_outside_tests(org_factory, registry, monkeypatch):
+    from apps.payments.models import PaymentProviderConfig
+
+    # production-таблица kind'ов — без фикстуры tests/conftest.py
+    monkeypatch.delitem(registry.PROVIDER_KINDS, PaymentProviderConfig.Kind.FAKE)
+    org = org_factory(name="Prod Org")
+    PaymentProviderConfig.objects.create(org=org, code="acme", kind=PaymentProviderConfig.Kind.FAKE)
+
+    with pytest.raises(ValueError, match="Unknown payment provider kind: fake"):
+        registry.get_provider_for_payment(_payment(org, "acme"))
+
+
+@pytest.mark.django_db
+def test_hot_reload_on_config_change(org_factory, registry, settings):
+    from apps.payments.models import PaymentProviderConfig
+
+    org = org_factory(name="Reload Org")
+    config = PaymentProviderConfig.objects.create(
+        org=org, code="acq", kind=PaymentProviderConfig.Kind.HTTP, options={"BASE_URL": "http://127.0.0.1:9001"}
+    )
+    payment = _payment(org, "acq")
+    first = registry.get_async_provider_for_payment(payment)
+    assert first.port == 9001
+
+    # изменение в этом процессе: сигнал сбрасывает запись сразу
+    config.options = {"BASE_URL": "http://127.0.0.1:9002", "CONCURRENCY": 4}
+    config.save()
+    reloaded = registry.get_provider_entry(payment)
+    assert reloaded.async_instance.port == 9002
+    assert reloaded.options["CONCURRENCY"] == 4
+
+    # изменение "из другого процесса" (без сигнала): видно после CONFIG_TTL_S по version
+    PaymentProviderConfig.objects.filter(pk=config.pk).update(
+        options={"BASE_URL": "http://127.0.0.1:9003"}, version=F("version") + 1
+    )
+    assert registry.get_provider_entry(payment).async_instance.port == 9002
+
+    registry.get_registry().config_ttl_s = 0
+    assert registry.get_provider_entry(payment).async_instance.port == 9003
+    assert registry.get_registry().stats()["reloads"] == 1
+
+
+@pytest.mark.django_db
+def test_config_version_is_bumped_in_db_by_concurrent_saves(org_factory):
+    from apps.payments.models import PaymentProviderConfig
+
+    config = PaymentProviderConfig.objects.create(
+        org=org_factory(name="Version Org"), code="acq", kind=PaymentProviderConfig.Kind.MANUAL
+    )
+    assert config.version == 1
+
+    # два экземпляра, загруженные до изменений: второй save() не возвращает version назад
+    first = PaymentProviderConfig.objects.get(pk=config.pk)
+    second = PaymentProviderConfig.objects.get(pk=config.pk)
+    first.save()
+    second.save(update_fields=["is_active"])
+
+    assert (first.version, second.version) == (2, 3)
+    assert PaymentProviderConfig.objects.get(pk=config.pk).version == 3
+
+
+@pytest.mark.django_db
+def test_registry_is_bounded_and_closes_evicted_providers(org_factory, registry, settings, monkeypatch):
+    from apps.payments.providers.http import HttpProvider
+
+    settings.PAYMENT_PROVIDER_REGISTRY = {"MAX_SIZE": 2, "CONFIG_TTL_S": 60}
+    closed = []
+    monkeypatch.setattr(HttpProvider, "close", lambda self: closed.append(self))
+
+    providers = [registry.get_async_provider_for_payment(_payment(org_factory(name=f"O{i}"), "http")) for i in range(3)]
+
+    assert registry.get_registry().stats()["size"] == 2
+    assert closed == [providers[0]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_http_provider_reuses_keep_alive_connections(org_factory, settings):
+    from apps.payments.providers import registry
+    from apps.payments.providers.http_stub import StubProviderServer
+
+    org = org_factory(name="Pool Org")
+    payments = [_payment(org, "http") for _ in range(5)]
+
+    async def main():
+        server = StubProviderServer(latency_s=0.0)
+        settings.PAYMENT_PROVIDERS = {"http": {"KIND": "http", "BASE_URL": await server.start(), "POOL_SIZE": 2}}
+        try:
+            for _ in range(10):
+                await registry.call_provider(payments[0], "check_status")
+            sequential = server.connections
+            await registry.call_many(payments, "check_status")
+            return server, sequential
+        finally:
+            await server.close()
+
+    server, sequential = asyncio.run(main())
+
+    assert server.requests == 15
+    assert sequential == 1  # последовательные вызовы — одно keep-alive соединение
+    assert server.connections <= 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_http_provider_reads_chunked_responses(org_factory, settings):
+    from apps.payments.providers import registry
+    from apps.payments.providers.http_stub import StubProviderServer
+
+    payment = _payment(org_factory(name="Chunked Org"), "http")
+
+    async def main():
+        server = StubProviderServer(chunked=True)
+        settings.PAYMENT_PROVIDERS = {"http": {"KIND": "http", "BASE_URL": await server.start()}}
+        try:
+            authorized = await registry.call_provider(payment, "authorize")
+            status = await registry.call_provider(payment, "check_status")
+            return server, authorized, status
+        finally:
+            await server.close()
+
+    server, authorized, status = asyncio.run(main())
+
+    assert authorized == {"ok": True, "provider": "stub", "request_id": str(payment.public_id), "operation": "authorize"}
+    assert status["status"] == "authorized"
+    assert server.connections == 1  # chunked-ответ дочитан до конца — соединение осталось в пуле
+
+
+@pytest.mark.django_db(transaction=True)
+def test_health_check_marks_provider_degraded(org_factory, settings):
+    from apps.payments.models import PaymentProviderConfig
+    from apps.payments.providers import registry
+    from apps.payments.providers.http_stub import StubProviderServer
+
+    org = org_factory(name="Health Org")
+    loop = asyncio.new_event_loop()
+    server = StubProviderServer()
+    try:
+        base_url = loop.run_until_complete(server.start())
+        config = PaymentProviderConfig.objects.create(
+            org=org, code="acq", kind=PaymentProviderConfig.Kind.HTTP, options={"BASE_URL": base_url}
+        )
+        PaymentProviderConfig.objects.create(org=org, code="cash", kind=PaymentProviderConfig.Kind.MANUAL)
+        version = PaymentProviderConfig.objects.get(pk=config.pk).version
+
+        def check():
+            # stub обслуживается своим loop'ом, health check — в asyncio.run в отдельном потоке
+            result = {}
+            t = threading.Thread(target=lambda: result.update(report=registry.check_providers_health(org=org)))
+            t.start()
+            while t.is_alive():
+                loop.run_until_complete(asyncio.sleep(0.01))
+            t.join()
+            return {r["code"]: r["status"] for r in result["report"]}
+
+        assert check() == {"acq": "ok", "cash": "ok"}
+
+        server.healthy = False
+        assert check() == {"acq": "degraded", "cash": "ok"}
+    finally:
+        loop.run_until_complete(server.close())
+        loop.close()
+
+    config.refresh_from_db()
+    assert config.health_status == PaymentProviderConfig.Health.DEGRADED
+    assert "503" in config.health_error
+    assert config.health_checked_at is not None
+    assert config.version == version  # health check не вызывает пересборку провайдера
+    assert registry.get_registry().stats()["degraded"] == [f"{org.pk}:acq"]
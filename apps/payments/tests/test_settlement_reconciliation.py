@@ -0,0 +1,88 @@
+import json
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+def _payment(org, external_id, *, amount="10.00", status="captured", currency="EUR", provider="acq"):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    return OrderPayment.objects.create(
+        org=org, order=Order.objects.create(org=org), tender=OrderPayment.Tender.CARD, status=status,
+        amount=Decimal(amount), currency=currency, external_id=external_id, provider=provider,
+    )
+
+
+def test_reconcile_command_reports_mismatches_from_csv(org_factory, tmp_path):
+    org = org_factory(name="Settlement Org")
+    _payment(org, "ok-1")
+    _payment(org, "amount-1", amount="10.00")
+    _payment(org, "status-1", status="refunded")
+    _payment(org, "absent-1", amount="7.00")
+    _payment(org, "authorized-1", status="authorized")  # не списан — в отчёте его и не ждём
+    _payment(org, "other-provider", provider="manual")
+    _payment(org_factory(name="Foreign Org"), "foreign-1")
+
+    path = tmp_path / "settlement.csv"
+    path.write_text(
+        "external_id,amount,currency,status\n"
+        "ok-1,10.00,eur,CAPTURED\n"
+        "amount-1,9.50,EUR,captured\n"
+        "status-1,10.00,EUR,captured\n"
+        "foreign-1,10.00,EUR,captured\n"
+        "other-provider,10.00,EUR,captured\n"
+        ",1.00,EUR,captured\n"
+        "ok-1,10.00,EUR,captured\n"
+    )
+    out = StringIO()
+    call_command("reconcile_settlement", str(path), "--org", str(org.public_id), "--provider", "acq", stdout=out)
+
+    lines = out.getvalue().splitlines()
+    assert lines[:-1] == [
+        "amount: external_id=amount-1 line=3 settlement=9.50 payment=10.00",
+        "status: external_id=status-1 line=4 settlement=captured payment=refunded",
+        "missing_payment: external_id=foreign-1 line=5",
+        "missing_payment: external_id=other-provider line=6",
+        "invalid: external_id=None line=7",
+        "duplicate: external_id=ok-1 line=8",
+        "missing_in_settlement: external_id=absent-1 payment=7.00 captured",
+    ]
+    assert lines[-1].endswith("Checked 7 settlement rows, matched 3, found 7 mismatches.")
+
+
+def test_reconcile_streams_jsonl_in_chunks_with_bounded_queries(org_factory):
+    from apps.payments.logic.reconciliation import ReconciliationStats, read_settlement_rows, reconcile_settlement
+
+    org = org_factory(name="Chunk Org")
+    for i in range(12):
+        _payment(org, f"ext-{i}", amount="3.00")
+
+    rows = [json.dumps({"external_id": f"ext-{i}", "amount": "3.00", "currency": "EUR", "status": "captured"})
+            for i in range(12)]
+    rows[5] = json.dumps({"external_id": "ext-5", "amount": "3.01", "currency": "USD", "status": "captured"})
+    stream = StringIO("\n".join(rows + ["ext-0", "ext-1"]) + "\n")
+
+    stats = ReconciliationStats()
+    with CaptureQueriesContext(connection) as ctx:
+        mismatches = list(reconcile_settlement(read_settlement_rows(stream, fmt="jsonl"), org=org, chunk_size=5,
+                                               stats=stats))
+
+    assert [(m.kind, m.external_id, m.line) for m in mismatches] == [
+        ("amount", "ext-5", 6), ("currency", "ext-5", 6), ("invalid", None, 13), ("invalid", None, 14),
+    ]
+    assert (stats.rows, stats.matched, stats.mismatches) == (14, 12, 4)
+    lookups = [q["sql"] for q in ctx.captured_queries if '"external_id" IN' in q["sql"]]
+    assert len(lookups) == 3  # по одному SELECT на пачку из 5 строк
+
+    # второй проход — anti-join по проанализированной seen-таблице, без NOT IN (subquery)
+    sqls = [q["sql"] for q in ctx.captured_queries]
+    assert any(sql.startswith("ANALYZE payments_settlement_seen") for sql in sqls)
+    second_pass = [sql for sql in sqls if "payments_settlement_seen AS seen" in sql]
+    assert second_pass and all("NOT EXISTS" in sql and "NOT IN" not in sql for sql in second_pass)
@@ -0,0 +1,8 @@
+from django.urls import path
+from .api_views import PaymentWebhookView, ProviderStatsView
+
+
+urlpatterns = [
+    path("providers/stats/", ProviderStatsView.as_view(), name="payment-provider-stats"),
+    path("webhooks/<uuid:org_id>/<slug:provider>/", PaymentWebhookView.as_view(), name="payment-webhook"),
+]
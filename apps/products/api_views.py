@@ -1,12 +1,22 @@
 #apps/products/api_views.py
+import io
+
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 
 from config.orgs.org_context import get_request_org
-from config.orgs.permissions import IsOrgMemberReadOnlyOrOrgAdmin
+from config.orgs.permissions import IsOrgMemberReadOnlyOrOrgAdminFromToken
 
-from .models import Unit, TaxRate
-from .serializers import UnitSerializer, TaxRateSerializer
+from .catalog_import import import_products, render_import_errors
+from .models import Product, ProductImport, Unit, TaxRate
+from .stock_ledger import stock_as_of_annotations
+from .serializers import ProductImportSerializer, UnitSerializer, TaxRateSerializer
 
 from rest_framework import status as drf_status
 from rest_framework.response import Response
@@ -15,7 +25,7 @@ from rest_framework.response import Response
 
 
 class UnitListCreateApi(generics.ListCreateAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = UnitSerializer
 
     def get_queryset(self):
@@ -27,7 +37,7 @@ class UnitListCreateApi(generics.ListCreateAPIView):
         serializer.save(org=org)
 
 class UnitDetailApi(generics.RetrieveUpdateDestroyAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = UnitSerializer
     lookup_field = "public_id"
     lookup_url_kwarg = "public_id"
@@ -45,9 +55,92 @@ class UnitDetailApi(generics.RetrieveUpdateDestroyAPIView):
 
 
 class TaxRateListApi(generics.ListAPIView):
-    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdmin]
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
     serializer_class = TaxRateSerializer
 
     def get_queryset(self):
         org = get_request_org(self.request)
         return TaxRate.objects.filter(org=org, status=TaxRate.STATUS_ACTIVE).order_by("id")
+
+
+class ProductStockAsOfApi(generics.GenericAPIView):
+    """
+    GET /api/v1/products/<public_id>/stock/?as_of=<ISO datetime>
+    Остаток по ledger на момент as_of (по умолчанию — сейчас): последний снимок + движения после него,
+    один индексный запрос.
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
+
+    def get(self, request, *args, **kwargs):
+        org = get_request_org(request)
+
+        raw = request.query_params.get("as_of")
+        try:
+            at = parse_datetime(raw) if raw else timezone.now()
+        except ValueError:
+            at = None
+        if at is None:
+            raise ValidationError({"as_of": ["Invalid datetime."]})
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+        qty = (
+            Product.objects.filter(org=org, public_id=self.kwargs["public_id"])
+            .annotate(**stock_as_of_annotations(at))
+            .values_list("stock_as_of", flat=True)
+            .first()
+        )
+        if qty is None:
+            raise Http404
+
+        return Response({"product": self.kwargs["public_id"], "as_of": at.isoformat(), "stock_qty": str(qty)})
+
+
+class ProductImportApi(generics.GenericAPIView):
+    """
+    POST /api/v1/products/import/  (multipart, file=<CSV: name[,stock_qty]>)
+    Загрузка каталога через COPY + один upsert (catalog_import.py). 201 — итоги загрузки;
+    ошибки строк (если есть) — по errors_url.
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
+    parser_classes = [MultiPartParser]
+    serializer_class = ProductImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        org = get_request_org(request)
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["No file was submitted."]})
+
+        try:
+            product_import = import_products(
+                io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""),
+                org=org,
+                source_name=upload.name,
+            )
+        except ValueError as exc:
+            # в т.ч. UnicodeDecodeError: файл не UTF-8
+            raise ValidationError({"file": [str(exc)]})
+
+        serializer = self.get_serializer(product_import)
+        return Response(serializer.data, status=drf_status.HTTP_201_CREATED)
+
+
+class ProductImportErrorsApi(generics.GenericAPIView):
+    """
+    GET /api/v1/products/imports/<public_id>/errors/
+    CSV ошибок строк загрузки (line, name, error), потоково.
+    """
+    permission_classes = [IsAuthenticated, IsOrgMemberReadOnlyOrOrgAdminFromToken]
+
+    def get(self, request, *args, **kwargs):
+        org = get_request_org(request)
+        product_import = get_object_or_404(ProductImport, org=org, public_id=self.kwargs["public_id"])
+
+        response = StreamingHttpResponse(
+            render_import_errors(product_import),
+            content_type="text/csv; charset=utf-8",
+        )
+        filename = f"product-import-{product_import.public_id}-errors.csv"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,198 @@
+#apps/products/catalog_import.py
+"""
+Массовая загрузка каталога продуктов: CSV (заголовок name[,stock_qty]) -> Product одной set-based операцией.
+
+- строки файла потоково парсятся и пишутся COPY (psycopg 3) во временную таблицу STAGE_TABLE;
+  форма строки (имя, длина, stock_qty) проверяется при чтении, дубли имён в файле — окном по stage;
+- upsert — один INSERT ... SELECT ... ON CONFLICT (org_id, name) WHERE status = 'active':
+  конфликт разрешается по тому же частичному индексу, что uniq_active_product_name_per_org;
+- новый продукт с остатком получает opening-движение, изменённый остаток существующего — adjustment
+  (ledger сходится со stock_qty); пустой stock_qty у существующего продукта остаток не трогает;
+- sharded-продукты (stock_shard_count > 0) импорт не меняет: их остаток ведёт rebalance_stock_shards;
+- ошибки строк сохраняются в ProductImportError одним INSERT ... SELECT из stage.
+
+Всё выполняется в одной транзакции: либо каталог загружен целиком (кроме ошибочных строк), либо ничего.
+"""
+from __future__ import annotations
+
+import csv
+import re
+from typing import IO, Iterator
+
+from django.db import connection, transaction
+
+from .models import Product, ProductImport, ProductImportError, StockMovement
+
+STAGE_TABLE = "products_import_stage"
+
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+# numeric(12, 3), без знака: остаток каталога не бывает отрицательным
+_STOCK_QTY_RE = re.compile(r"\d{1,9}(\.\d{1,3})?")
+
+
+def _staged_rows(stream: IO[str]) -> Iterator[tuple]:
+    """
+    (line, name, stock_qty | None, error | None) по строкам CSV; line — номер (последней) строки записи в файле.
+    """
+    reader = csv.reader(stream)
+    header = [column.strip().lower() for column in next(reader, [])]
+    if "name" not in header:
+        raise ValueError("CSV header must contain a 'name' column.")
+    name_at = header.index("name")
+    qty_at = header.index("stock_qty") if "stock_qty" in header else None
+    width = len(header)
+
+    for row in reader:
+        line = reader.line_num
+        if not row:
+            continue
+        if len(row) != width:
+            yield line, "", None, f"expected {width} columns, got {len(row)}"
+            continue
+
+        name = row[name_at].strip()
+        qty = row[qty_at].strip() if qty_at is not None else ""
+        if not name:
+            yield line, name, None, "name is required"
+        elif len(name) > NAME_MAX_LENGTH:
+            yield line, name, None, f"name is longer than {NAME_MAX_LENGTH} characters"
+        elif qty and not _STOCK_QTY_RE.fullmatch(qty):
+            yield line, name, None, "stock_qty must be a non-negative number with up to 3 decimals"
+        else:
+            yield line, name, qty or None, None
+
+
+def import_products(stream: IO[str], *, org, source_name: str = "") -> ProductImport:
+    """
+    Загружает CSV каталога в Product org. Возвращает ProductImport с итогами
+    (rows = created + updated + unchanged + failed).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {STAGE_TABLE} (
+                line integer NOT NULL,
+                name text NOT NULL,
+                stock_qty numeric(12, 3),
+                error text
+            ) ON COMMIT DROP
+            """
+        )
+        with cursor.copy(f"COPY {STAGE_TABLE} (line, name, stock_qty, error) FROM STDIN") as copy:
+            for row in _staged_rows(stream):
+                copy.write_row(row)
+
+        # второе и следующие вхождения имени — ошибка (первое загружается)
+        cursor.execute(
+            f"""
+            UPDATE {STAGE_TABLE} AS s
+            SET error = 'duplicate name (first at line ' || d.first_line || ')'
+            FROM (
+                SELECT line, min(line) OVER (PARTITION BY name) AS first_line
+                FROM {STAGE_TABLE}
+                WHERE error IS NULL
+            ) AS d
+            WHERE s.line = d.line AND d.line <> d.first_line
+            """
+        )
+        cursor.execute(
+            f"""
+            UPDATE {STAGE_TABLE} AS s
+            SET error = 'product uses sharded stock, change it with rebalance_stock_shards'
+            FROM {Product._meta.db_table} AS p
+            WHERE p.org_id = %s AND p.status = %s AND p.name = s.name AND p.stock_shard_count > 0
+              AND s.error IS NULL AND s.stock_qty IS NOT NULL AND s.stock_qty <> p.stock_qty
+            """,
+            [org.id, Product.STATUS_ACTIVE],
+        )
+        cursor.execute(f"ANALYZE {STAGE_TABLE}")
+
+        # current — остатки существующих продуктов до upsert (FOR UPDATE: дельта ledger считается от них);
+        # upsert обновляет только реально изменённый остаток, xmax = 0 — строка вставлена
+        cursor.execute(
+            f"""
+            WITH current AS (
+                SELECT p.id, p.name, p.stock_qty
+                FROM {Product._meta.db_table} AS p
+                JOIN {STAGE_TABLE} AS s ON s.name = p.name AND s.error IS NULL
+                WHERE p.org_id = %(org)s AND p.status = %(active)s
+                FOR UPDATE OF p
+            ),
+            upserted AS (
+                INSERT INTO {Product._meta.db_table}
+                    (org_id, public_id, created_at, updated_at, name, status, stock_qty, stock_shard_count)
+                SELECT %(org)s, gen_random_uuid(), now(), now(), s.name, %(active)s,
+                       COALESCE(s.stock_qty, c.stock_qty, 0), 0
+                FROM {STAGE_TABLE} AS s
+                LEFT JOIN current AS c ON c.name = s.name
+                WHERE s.error IS NULL
+                ORDER BY s.line
+                ON CONFLICT (org_id, name) WHERE status = 'active' DO UPDATE
+                    SET stock_qty = EXCLUDED.stock_qty, updated_at = EXCLUDED.updated_at
+                    WHERE {Product._meta.db_table}.stock_shard_count = 0
+                      AND {Product._meta.db_table}.stock_qty <> EXCLUDED.stock_qty
+                RETURNING id, stock_qty, (xmax = 0) AS inserted
+            ),
+            moved AS (
+                INSERT INTO {StockMovement._meta.db_table} (org_id, product_id, delta, reason, created_at)
+                SELECT %(org)s, u.id, u.stock_qty - COALESCE(c.stock_qty, 0),
+                       CASE WHEN u.inserted THEN %(opening)s ELSE %(adjustment)s END, now()
+                FROM upserted AS u
+                LEFT JOIN current AS c ON c.id = u.id
+                WHERE u.stock_qty <> COALESCE(c.stock_qty, 0)
+            )
+            SELECT
+                (SELECT count(*) FROM {STAGE_TABLE}),
+                (SELECT count(*) FROM {STAGE_TABLE} WHERE error IS NOT NULL),
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM upserted
+            """,
+            {
+                "org": org.id,
+                "active": Product.STATUS_ACTIVE,
+                "opening": StockMovement.REASON_OPENING,
+                "adjustment": StockMovement.REASON_ADJUSTMENT,
+            },
+        )
+        rows, failed, created, updated = cursor.fetchone()
+
+        product_import = ProductImport.objects.create(
+            org=org,
+            source_name=source_name[:255],
+            rows=rows,
+            created=created,
+            updated=updated,
+            unchanged=rows - failed - created - updated,
+            failed=failed,
+        )
+        if failed:
+            cursor.execute(
+                f"""
+                INSERT INTO {ProductImportError._meta.db_table} (product_import_id, line, name, error)
+                SELECT %s, line, name, error FROM {STAGE_TABLE} WHERE error IS NOT NULL ORDER BY line
+                """,
+                [product_import.id],
+            )
+
+    return product_import
+
+
+def render_import_errors(product_import: ProductImport) -> Iterator[str]:
+    """
+    CSV ошибок загрузки (line, name, error) — для скачивания, потоково.
+    """
+    buf = _Echo()
+    writer = csv.writer(buf)
+    yield writer.writerow(["line", "name", "error"])
+    for row in product_import.errors.values_list("line", "name", "error").iterator(chunk_size=2000):
+        yield writer.writerow(row)
+
+
+class _Echo:
+    """
+    Псевдо-файл для csv.writer: writerow() возвращает строку вместо записи.
+    """
+
+    def write(self, value):
+        return value
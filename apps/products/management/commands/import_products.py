@@ -0,0 +1,46 @@
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.catalog_import import import_products, render_import_errors
+from config.orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import a product catalog CSV (header: name[,stock_qty]) via COPY into a staging table "
+        "and a single upsert into Product. Invalid rows are skipped and reported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Catalog CSV file")
+        parser.add_argument("--org", required=True, help="Organization public_id")
+        parser.add_argument("--errors", help="Write per-row errors to this CSV file")
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(public_id=options["org"])
+        except (Organization.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Organization {options['org']} not found.")
+
+        path = options["path"]
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as stream:
+                product_import = import_products(stream, org=org, source_name=os.path.basename(path))
+        except OSError as exc:
+            raise CommandError(f"Cannot read catalog file: {exc}")
+        except ValueError as exc:
+            raise CommandError(f"Invalid catalog file: {exc}")
+
+        if product_import.failed and options["errors"]:
+            with open(options["errors"], "w", newline="", encoding="utf-8") as out:
+                for chunk in render_import_errors(product_import):
+                    out.write(chunk)
+
+        summary = (
+            f"Import {product_import.public_id}: {product_import.rows} rows, created {product_import.created}, "
+            f"updated {product_import.updated}, unchanged {product_import.unchanged}, failed {product_import.failed}."
+        )
+        style = self.style.WARNING if product_import.failed else self.style.SUCCESS
+        self.stdout.write(style(summary))
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.products.models import Product, ProductStockShard
+from config.orgs.models import Organization
+
+MILLI = Decimal("0.001")
+
+
+def split_evenly(total: Decimal, shards: int) -> list[Decimal]:
+    """
+    total -> shards частей с точностью stock_qty (0.001); остаток раздаём первым шардам.
+    """
+    units, remainder = divmod(int(total / MILLI), shards)
+    return [(units + (1 if i < remainder else 0)) * MILLI for i in range(shards)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebalance sharded product stock evenly across shard rows and refresh Product.stock_qty. "
+        "With --shards switches the stock mode of --product (0 = back to a single stock_qty row)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", required=True, help="Organization public_id")
+        parser.add_argument("--product", help="Product public_id (default: all sharded products of the org)")
+        parser.add_argument("--shards", type=int, help="New shard count for --product (0 disables sharding)")
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(public_id=options["org"])
+        except (Organization.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Organization {options['org']} not found.")
+
+        target = options["shards"]
+        if target is not None and not options["product"]:
+            raise CommandError("--shards requires --product.")
+        if target is not None and not 0 <= target <= 1024:
+            raise CommandError("--shards must be between 0 and 1024.")
+
+        products = Product.objects.filter(org=org)
+        if options["product"]:
+            try:
+                product_ids = [products.get(public_id=options["product"]).id]
+            except (Product.DoesNotExist, ValueError, ValidationError):
+                raise CommandError(f"Product {options['product']} not found.")
+        else:
+            product_ids = list(products.filter(stock_shard_count__gt=0).order_by("id").values_list("id", flat=True))
+
+        for product_id in product_ids:
+            total, shards = self._rebalance(product_id, target)
+            self.stdout.write(f"product {product_id}: {total} across {shards} shards")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {len(product_ids)} products."))
+
+    @transaction.atomic
+    def _rebalance(self, product_id: int, target: int | None) -> tuple[Decimal, int]:
+        # lock: строка Product (обычные списания) + все шарды (sharded-списания), в этом порядке
+        product = Product.objects.select_for_update().get(pk=product_id)
+        shards = ProductStockShard.objects.filter(product_id=product_id)
+        list(shards.select_for_update().order_by("shard_no").values_list("id", flat=True))
+
+        if product.stock_shard_count:
+            total = shards.aggregate(total=Sum("qty"))["total"] or Decimal("0")
+        else:
+            total = product.stock_qty
+
+        target = product.stock_shard_count if target is None else target
+        if target and total < 0:
+            raise CommandError(f"Product {product.public_id} has negative stock {total}, cannot shard it.")
+
+        shards.filter(shard_no__gte=target).delete()
+        if target:
+            ProductStockShard.objects.bulk_create(
+                [
+                    ProductStockShard(product_id=product_id, shard_no=no, qty=qty)
+                    for no, qty in enumerate(split_evenly(total, target))
+                ],
+                update_conflicts=True,
+                unique_fields=["product", "shard_no"],
+                update_fields=["qty"],
+            )
+
+        Product.objects.filter(pk=product_id).update(
+            stock_qty=total,
+            stock_shard_count=target,
+            updated_at=timezone.now(),
+        )
+        return total, target
@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.stock_ledger import snapshot_cutoff, take_stock_snapshots
+from config.orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Write StockSnapshot rows (stock as of now - STOCK_LEDGER['SNAPSHOT_LAG_S']) for products "
+        "with new stock movements, so ledger stock queries only sum recent deltas. Run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", required=True, help="Organization public_id")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--min-movements",
+            type=int,
+            default=1,
+            help="Snapshot only products with at least this many movements since their last snapshot",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            org = Organization.objects.get(public_id=options["org"])
+        except (Organization.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Organization {options['org']} not found.")
+
+        at = snapshot_cutoff()
+        created = take_stock_snapshots(
+            org=org,
+            at=at,
+            batch_size=options["batch_size"],
+            min_movements=options["min_movements"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} stock snapshots as of {at.isoformat()}."))
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 10:34
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shard_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ProductStockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard_no', models.PositiveSmallIntegerField()),
+                ('qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=12)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='products.product')),
+            ],
+            options={
+                'ordering': ['product_id', 'shard_no'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'shard_no'), name='uniq_stock_shard_no_per_product'), models.CheckConstraint(condition=models.Q(('qty__gte', 0)), name='stock_shard_qty_non_negative')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0 on 2026-10-18 10:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_opening_movements(apps, schema_editor):
+    """
+    Текущие остатки -> opening-движения, чтобы ledger сошёлся со stock_qty
+    (для sharded-продуктов источник истины — сумма шардов).
+    """
+    Product = apps.get_model("products", "Product")
+    ProductStockShard = apps.get_model("products", "ProductStockShard")
+    StockMovement = apps.get_model("products", "StockMovement")
+
+    shard_totals = dict(
+        ProductStockShard.objects.order_by().values("product_id").annotate(total=Sum("qty")).values_list("product_id", "total")
+    )
+    batch = []
+    for pid, org_id, stock_qty, shards in Product.objects.values_list("id", "org_id", "stock_qty", "stock_shard_count").iterator(chunk_size=2000):
+        qty = shard_totals.get(pid, Decimal("0")) if shards else stock_qty
+        if qty:
+            batch.append(StockMovement(org_id=org_id, product_id=pid, delta=qty, reason="opening"))
+        if len(batch) >= 2000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_exact_totals'),
+        ('orgs', '0003_org_membership_version'),
+        ('products', '0002_product_stock_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('sale', 'Sale'), ('sale_cancel', 'Sale cancelled'), ('adjustment', 'Adjustment')], max_length=16)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='orders.order')),
+                ('org', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='orgs.organization')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'created_at'], include=('delta',), name='stock_mv_product_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qty', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('taken_at', models.DateTimeField()),
+                ('org', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_snapshots', to='orgs.organization')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_snapshots', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'taken_at'), include=('qty',), name='uniq_stock_snapshot_per_product_ts')],
+            },
+        ),
+        migrations.RunPython(backfill_opening_movements, migrations.RunPython.noop),
+    ]
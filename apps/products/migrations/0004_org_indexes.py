@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('products', '0003_stock_ledger'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='unit',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['org', 'id'], name='unit_org_active_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='taxrate',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['org', 'id'], name='taxrate_org_active_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['org', 'id'], name='product_org_active_id_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('products', '0005_product_imports'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='unit',
+            index=models.Index(fields=['org', 'id'], name='unit_org_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='unit',
+            name='unit_org_active_id_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='taxrate',
+            index=models.Index(fields=['org', 'id'], name='taxrate_org_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='taxrate',
+            name='taxrate_org_active_id_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['org', 'id'], name='product_org_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='product',
+            name='product_org_active_id_idx',
+        ),
+        migrations.AlterField(
+            model_name='unit',
+            name='org',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='orgs.organization'),
+        ),
+        migrations.AlterField(
+            model_name='taxrate',
+            name='org',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='orgs.organization'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='org',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='orgs.organization'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 #apps/products/models.py
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import models
+from django.utils import timezone
 
-from config.orgs.models import OrgScopedModel
+from config.orgs.models import OrgScopedModel, org_foreign_key, org_index
 from decimal import Decimal
 
 
@@ -13,6 +15,7 @@ class Unit(OrgScopedModel):
         (STATUS_ARCHIVED, "Archived"),
     )
 
+    org = org_foreign_key(db_index=False)  # покрыт unit_org_id_idx
     name = models.CharField(max_length=64)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
 
@@ -25,6 +28,9 @@ class Unit(OrgScopedModel):
         name="uniq_active_unit_name_per_org",
     ),
 ]
+        indexes = [
+            org_index("id", name="unit_org_id_idx"),
+        ]
 
 
     def __str__(self) -> str:
@@ -41,6 +47,7 @@ class TaxRate(OrgScopedModel):
         (STATUS_ARCHIVED, "Archived"),
     )
 
+    org = org_foreign_key(db_index=False)  # покрыт taxrate_org_id_idx
     name = models.CharField(max_length=64)
     rate = models.DecimalField(max_digits=5, decimal_places=2)  # 20.00, 10.00, 0.00
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
@@ -54,6 +61,9 @@ class TaxRate(OrgScopedModel):
                 name="uniq_active_taxrate_name_per_org",
             ),
         ]
+        indexes = [
+            org_index("id", name="taxrate_org_id_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.rate}%)"
@@ -67,11 +77,17 @@ class Product(OrgScopedModel):
         (STATUS_ARCHIVED, "Archived"),
     )
 
+    org = org_foreign_key(db_index=False)  # покрыт product_org_id_idx
     name = models.CharField(max_length=255)
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
     
     stock_qty = models.DecimalField(max_digits=12, decimal_places=3, default=Decimal("0.000"))
-    
+
+    # Sharded-режим склада для "горячих" SKU: 0 = обычный (stock_qty — источник истины),
+    # N > 0 = остаток разложен по N строкам ProductStockShard, stock_qty — кэш их суммы.
+    # Переключается командой rebalance_stock_shards.
+    stock_shard_count = models.PositiveSmallIntegerField(default=0)
+
     class Meta:
         ordering = ["id"]
         constraints = [
@@ -81,6 +97,149 @@ class Product(OrgScopedModel):
                 name="uniq_active_product_name_per_org",
             ),
         ]
+        indexes = [
+            org_index("id", name="product_org_id_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Новый продукт с ненулевым остатком: начальное движение в ledger (reason=opening),
+        чтобы остаток из ledger сходился со stock_qty.
+        """
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        if adding and self.stock_qty:
+            StockMovement.objects.create(
+                org_id=self.org_id,
+                product=self,
+                delta=self.stock_qty,
+                reason=StockMovement.REASON_OPENING,
+            )
 
     def __str__(self) -> str:
         return self.name
+
+
+class ProductStockShard(models.Model):
+    """
+    Часть остатка продукта в sharded-режиме (Product.stock_shard_count > 0).
+    Списание лочит один свободный шард (SKIP LOCKED), а не строку Product.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_shards")
+    shard_no = models.PositiveSmallIntegerField()
+    qty = models.DecimalField(max_digits=12, decimal_places=3, default=Decimal("0.000"))
+
+    class Meta:
+        ordering = ["product_id", "shard_no"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "shard_no"], name="uniq_stock_shard_no_per_product"),
+            # never oversell: ни один шард не уходит в минус даже при ошибке в коде
+            models.CheckConstraint(condition=models.Q(qty__gte=0), name="stock_shard_qty_non_negative"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id}#{self.shard_no}: {self.qty}"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger складских движений: строки только добавляются (bulk_create в use-case'ах).
+    Остаток на момент T = последний StockSnapshot до T + сумма delta после него (см. stock_ledger).
+    """
+    REASON_OPENING = "opening"
+    REASON_SALE = "sale"
+    REASON_SALE_CANCEL = "sale_cancel"
+    REASON_ADJUSTMENT = "adjustment"
+    REASON_CHOICES = (
+        (REASON_OPENING, "Opening balance"),
+        (REASON_SALE, "Sale"),
+        (REASON_SALE_CANCEL, "Sale cancelled"),
+        (REASON_ADJUSTMENT, "Adjustment"),
+    )
+
+    org = models.ForeignKey("orgs.Organization", on_delete=models.PROTECT, related_name="stock_movements")
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="stock_movements")
+    delta = models.DecimalField(max_digits=12, decimal_places=3)
+    reason = models.CharField(max_length=16, choices=REASON_CHOICES)
+    order = models.ForeignKey(
+        "orders.Order",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="stock_movements",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # covering: сумма delta за интервал — index-only scan без чтения heap
+            models.Index(fields=["product", "created_at"], include=["delta"], name="stock_mv_product_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise DjangoValidationError({"delta": "StockMovement is append-only."})
+        super().save(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return f"{self.product_id}: {self.delta:+} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """
+    Остаток продукта на момент taken_at = сумма всех StockMovement с created_at <= taken_at.
+    Пишется периодически командой snapshot_stock.
+    """
+    org = models.ForeignKey("orgs.Organization", on_delete=models.PROTECT, related_name="stock_snapshots")
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="stock_snapshots")
+    qty = models.DecimalField(max_digits=12, decimal_places=3)
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # индекс для "последний снимок до T" (include qty — index-only scan)
+            models.UniqueConstraint(
+                fields=["product", "taken_at"],
+                include=["qty"],
+                name="uniq_stock_snapshot_per_product_ts",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id}@{self.taken_at}: {self.qty}"
+
+
+class ProductImport(OrgScopedModel):
+    """
+    Одна загрузка каталога (import_products / POST /products/import/): итоги по строкам файла.
+    Ошибки строк — ProductImportError, выгружаются CSV (GET /products/imports/<public_id>/errors/).
+    """
+    source_name = models.CharField(max_length=255, blank=True, default="")
+    rows = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"{self.source_name or self.public_id}: {self.rows} rows, {self.failed} failed"
+
+
+class ProductImportError(models.Model):
+    product_import = models.ForeignKey(ProductImport, on_delete=models.CASCADE, related_name="errors", db_index=False)
+    line = models.PositiveIntegerField()
+    name = models.TextField(blank=True, default="")
+    error = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ["product_import", "line"]
+        indexes = [
+            models.Index(fields=["product_import", "line"], name="product_import_error_line_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.error}"
@@ -1,8 +1,9 @@
 # project/backend/apps/products/serializers.py
+from django.urls import reverse
 from rest_framework import serializers
 from config.orgs.org_context import get_request_org
 
-from .models import Unit, TaxRate
+from .models import ProductImport, Unit, TaxRate
 
 
 class UnitSerializer(serializers.ModelSerializer):
@@ -40,3 +41,19 @@ class TaxRateSerializer(serializers.ModelSerializer):
         model = TaxRate
         fields = ["public_id", "name", "rate"]
         read_only_fields = ["public_id"]
+
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    errors_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductImport
+        fields = ["public_id", "source_name", "rows", "created", "updated", "unchanged", "failed", "errors_url", "created_at"]
+        read_only_fields = fields
+
+    def get_errors_url(self, obj):
+        if not obj.failed:
+            return None
+        url = reverse("product-import-errors", kwargs={"public_id": obj.public_id})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,145 @@
+#apps/products/stock_ledger.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMovement, StockSnapshot
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def ledger_settings() -> dict:
+    return getattr(settings, "STOCK_LEDGER", {})
+
+
+def record_stock_movements(*, org, deltas: dict[int, Decimal], reason: str, order=None) -> list[StockMovement]:
+    """
+    Движения по продуктам одним bulk_create (в транзакции use-case, вместе со списанием).
+    """
+    now = timezone.now()
+    return StockMovement.objects.bulk_create(
+        StockMovement(org=org, product_id=pid, delta=delta, reason=reason, order=order, created_at=now)
+        for pid, delta in sorted(deltas.items())
+        if delta
+    )
+
+
+def stock_as_of_annotations(at: datetime) -> dict:
+    """
+    Аннотации Product для остатка на момент `at`:
+    - snapshot_qty / snapshot_at: последний StockSnapshot с taken_at <= at
+    - recent_delta: сумма StockMovement в (snapshot_at, at]
+    - stock_as_of: snapshot_qty + recent_delta
+
+    Оба подзапроса — range scan по (product, taken_at) / (product, created_at) с include:
+    стоимость зависит от числа движений после снимка, а не от длины истории.
+    """
+    qty_field = DecimalField(max_digits=12, decimal_places=3)
+    snapshot = StockSnapshot.objects.filter(product_id=OuterRef("pk"), taken_at__lte=at).order_by("-taken_at")
+    recent = (
+        StockMovement.objects.filter(
+            product_id=OuterRef("pk"),
+            created_at__gt=Coalesce(OuterRef("snapshot_at"), Value(EPOCH)),
+            created_at__lte=at,
+        )
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("delta"))
+        .values("total")
+    )
+    return {
+        "snapshot_qty": Subquery(snapshot.values("qty")[:1], output_field=qty_field),
+        "snapshot_at": Subquery(snapshot.values("taken_at")[:1]),
+        "recent_delta": Coalesce(Subquery(recent, output_field=qty_field), Value(Decimal("0")), output_field=qty_field),
+        "stock_as_of": Coalesce(F("snapshot_qty"), Value(Decimal("0")), output_field=qty_field) + F("recent_delta"),
+    }
+
+
+def stock_as_of(product_id: int, at: datetime | None = None) -> Decimal:
+    """
+    Остаток продукта по ledger на момент `at` (по умолчанию — сейчас), одним запросом.
+    """
+    at = at or timezone.now()
+    qty = (
+        Product.objects.filter(pk=product_id)
+        .annotate(**stock_as_of_annotations(at))
+        .values_list("stock_as_of", flat=True)
+        .first()
+    )
+    if qty is None:
+        raise Product.DoesNotExist(product_id)
+    return qty
+
+
+def snapshot_cutoff() -> datetime:
+    """
+    Момент, на который безопасно снимать остаток.
+
+    created_at движения ставится до commit, поэтому "свежие" движения ещё могут появиться
+    задним числом. Снимаем с запасом SNAPSHOT_LAG_S (дольше любой транзакции use-case).
+    """
+    return timezone.now() - timedelta(seconds=ledger_settings().get("SNAPSHOT_LAG_S", 300))
+
+
+def take_stock_snapshots(*, org, at: datetime, batch_size: int = 500, min_movements: int = 1) -> int:
+    """
+    Снимки остатка на момент `at` для продуктов org, у которых после последнего снимка
+    накопилось >= min_movements движений. Батчами по id; возвращает число созданных снимков
+    (уже существующий снимок на `at` — параллельный запуск — не пишется и не считается).
+    """
+    created = 0
+    last_id = 0
+    recent_count = (
+        StockMovement.objects.filter(
+            product_id=OuterRef("pk"),
+            created_at__gt=Coalesce(OuterRef("snapshot_at"), Value(EPOCH)),
+            created_at__lte=at,
+        )
+        .order_by()
+        .values("product_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+
+    while True:
+        rows = list(
+            Product.objects.filter(org=org, id__gt=last_id)
+            .order_by("id")
+            .annotate(**stock_as_of_annotations(at))
+            .annotate(recent_count=Coalesce(Subquery(recent_count), Value(0)))
+            .values("id", "stock_as_of", "recent_count")[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        candidates = [row for row in rows if row["recent_count"] >= min_movements]
+        if candidates:
+            created += _insert_snapshots(org_id=org.id, at=at, rows=candidates)
+
+    return created
+
+
+def _insert_snapshots(*, org_id: int, at: datetime, rows: list[dict]) -> int:
+    """
+    Один INSERT ... ON CONFLICT DO NOTHING на батч; rowcount — только реально вставленные строки
+    (bulk_create(ignore_conflicts=True) вернул бы все переданные объекты, включая пропущенные).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {StockSnapshot._meta.db_table} (org_id, product_id, qty, taken_at)
+            SELECT %s, s.product_id, s.qty, %s
+            FROM unnest(%s::bigint[], %s::numeric[]) AS s (product_id, qty)
+            ON CONFLICT (product_id, taken_at) DO NOTHING
+            """,
+            [org_id, at, [row["id"] for row in rows], [row["stock_as_of"] for row in rows]],
+        )
+        return cursor.rowcount
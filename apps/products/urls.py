@@ -1,9 +1,23 @@
 from django.urls import path
-from .api_views import UnitListCreateApi, UnitDetailApi, TaxRateListApi
+from .api_views import (
+    UnitListCreateApi,
+    UnitDetailApi,
+    TaxRateListApi,
+    ProductStockAsOfApi,
+    ProductImportApi,
+    ProductImportErrorsApi,
+)
 
 urlpatterns = [
     path("units/", UnitListCreateApi.as_view(), name="units"),
     path("units/<uuid:public_id>/", UnitDetailApi.as_view(), name="unit-detail"),
     path("tax-rates/", TaxRateListApi.as_view(), name="taxrates-list"),
+    path("products/<uuid:public_id>/stock/", ProductStockAsOfApi.as_view(), name="product-stock-as-of"),
+    path("products/import/", ProductImportApi.as_view(), name="product-import"),
+    path(
+        "products/imports/<uuid:public_id>/errors/",
+        ProductImportErrorsApi.as_view(),
+        name="product-import-errors",
+    ),
     
 ]
@@ -0,0 +1,70 @@
+"""
+Benchmark: пакетный async authorize через HttpProvider против локального HTTP-двойника.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_async_authorize.py -s
+
+N авторизаций (aauthorize_payments) при latency провайдера LATENCY_S:
+- "provider only" — registry.call_many без БД: N вызовов укладываются в ~один round-trip;
+- "use-case" — с intent/finalize в БД (короткие транзакции идут через один sync-поток Django,
+  поэтому сверх round-trip добавляется ~N * время двух коммитов).
+"""
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+SIZES = (1, 10, 50, 100)
+LATENCY_S = 0.2
+
+
+def test_bench_async_batch_authorize(org_factory, settings):
+    from apps.orders.models import Order
+    from apps.payments.logic.async_payments import aauthorize_payments
+    from apps.payments.models import OrderPayment
+    from apps.payments.providers import registry
+    from apps.payments.providers.http_stub import StubProviderServer
+
+    org = org_factory(name="Bench Async Org")
+    order = Order.objects.create(org=org)
+
+    def make(n):
+        return [
+            OrderPayment.objects.create(org=org, order=order, tender=OrderPayment.Tender.CARD,
+                                        amount=Decimal("1.00"), provider="http")
+            for _ in range(n)
+        ]
+
+    async def run(n):
+        server = StubProviderServer(latency_s=LATENCY_S)
+        base_url = await server.start()
+        settings.PAYMENT_PROVIDERS = {"default": {"CONCURRENCY": max(SIZES), "TIMEOUT_S": 10}, "http": {"BASE_URL": base_url}}
+        try:
+            payments = await asyncio.to_thread(make, n)
+            started = time.perf_counter()
+            results = await registry.call_many(payments, "check_status")
+            provider_s = time.perf_counter() - started
+            assert all(r["ok"] for r in results)
+
+            started = time.perf_counter()
+            results = await aauthorize_payments(payments)
+            use_case_s = time.perf_counter() - started
+            assert all(isinstance(r, OrderPayment) for r in results)
+            return provider_s, use_case_s
+        finally:
+            await server.close()
+
+    print()
+    print(f"provider latency = {LATENCY_S * 1000:.0f} ms")
+    print(f"{'N':>5} | {'provider only ms':>16} | {'x RTT':>6} | {'use-case ms':>11} | {'sequential ms':>13}")
+    for n in SIZES:
+        provider_s, use_case_s = asyncio.run(run(n))
+        print(
+            f"{n:>5} | {provider_s * 1000:>16.0f} | {provider_s / LATENCY_S:>6.2f} | "
+            f"{use_case_s * 1000:>11.0f} | {n * LATENCY_S * 1000:>13.0f}"
+        )
+        assert provider_s < LATENCY_S * 2
+        assert use_case_s < n * LATENCY_S or n == 1
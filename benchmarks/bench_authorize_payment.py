@@ -0,0 +1,132 @@
+"""
+Benchmark: authorize_payment под нагрузкой при медленном провайдере.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_authorize_payment.py -s
+
+Сравниваем:
+- "lock+call" — прежняя схема: вызов провайдера внутри transaction.atomic + select_for_update;
+- "two-phase" — authorize_payment: intent-commit, вызов без транзакции, короткий finalize.
+
+Метрика — среднее (по сэмплам раз в 5 мс) и пиковое число соединений с открытой транзакцией
+(pg_stat_activity.xact_start IS NOT NULL): столько серверных соединений держит пулер
+в transaction-режиме (pgbouncer). "tx ms/auth" = avg * время / число платежей — сколько
+соединение-миллисекунд транзакций стоит один authorize: у lock+call растёт вместе
+с latency провайдера, у two-phase — постоянно (только intent/finalize).
+"""
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection, connections, transaction
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+WORKERS = 16
+PAYMENTS_PER_WORKER = 4
+LATENCIES_S = (0.05, 0.2)
+
+
+def _legacy_authorize(*, payment, provider):
+    from apps.payments.models import OrderPayment
+
+    with transaction.atomic():
+        locked = OrderPayment.objects.select_for_update().get(pk=payment.pk)
+        payload = provider.authorize(payment=locked, timeout_s=10)
+        OrderPayment.objects.filter(pk=locked.pk).update(
+            status=OrderPayment.Status.AUTHORIZED, raw_provider_payload=payload
+        )
+
+
+def _open_transactions() -> int:
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND xact_start IS NOT NULL AND pid <> pg_backend_pid()"
+        )
+        return cur.fetchone()[0]
+
+
+def _run(authorize, payments) -> tuple[float, float, int]:
+    chunks = [payments[i::WORKERS] for i in range(WORKERS)]
+    done = threading.Event()
+    samples: list[int] = []
+
+    def worker(chunk):
+        try:
+            for p in chunk:
+                authorize(p)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    def sampler():
+        try:
+            while not done.is_set():
+                samples.append(_open_transactions())
+                time.sleep(0.005)
+        finally:
+            connections.close_all()
+
+    s = threading.Thread(target=sampler)
+    s.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    s.join()
+    return elapsed, sum(samples) / len(samples), max(samples)
+
+
+def test_bench_authorize_connection_usage_with_slow_provider(org_factory, monkeypatch):
+    from apps.orders.models import Order
+    from apps.payments.logic.authorize_payment import authorize_payment
+    from apps.payments.models import OrderPayment
+    from apps.payments.providers.fake import FakeProvider
+
+    org = org_factory(name="Bench Authorize Org")
+    provider = FakeProvider()
+    monkeypatch.setattr("apps.payments.providers.registry.get_provider_for_payment", lambda p: provider)
+
+    def make_payments():
+        order = Order.objects.create(org=org)
+        return [
+            OrderPayment.objects.create(
+                org=org, order=order, tender=OrderPayment.Tender.CARD, amount=Decimal("1.00"), provider="fake"
+            )
+            for _ in range(WORKERS * PAYMENTS_PER_WORKER)
+        ]
+
+    print()
+    print(f"workers={WORKERS} payments/run={WORKERS * PAYMENTS_PER_WORKER}")
+    print(f"{'mode':>10} | {'latency ms':>10} | {'auth/s':>7} | {'avg open tx':>11} | {'peak open tx':>12} | {'tx ms/auth':>10}")
+
+    tx_ms = {}
+    for latency_s in LATENCIES_S:
+        provider.latency_s = latency_s
+        for mode, authorize in (
+            ("lock+call", lambda p: _legacy_authorize(payment=p, provider=provider)),
+            ("two-phase", lambda p: authorize_payment(payment=p)),
+        ):
+            payments = make_payments()
+            elapsed, avg, peak = _run(authorize, payments)
+            tx_ms[mode, latency_s] = avg * elapsed / len(payments) * 1000
+            assert OrderPayment.objects.filter(
+                pk__in=[p.pk for p in payments], status=OrderPayment.Status.AUTHORIZED
+            ).count() == len(payments)
+            print(
+                f"{mode:>10} | {latency_s * 1000:>10.0f} | {len(payments) / elapsed:7.1f} | "
+                f"{avg:>11.2f} | {peak:>12} | {tx_ms[mode, latency_s]:>10.1f}"
+            )
+
+    low, high = LATENCIES_S
+    # lock+call: транзакция держится весь вызов провайдера
+    assert tx_ms["lock+call", high] - tx_ms["lock+call", low] > (high - low) * 1000 * 0.8
+    # two-phase: стоимость в транзакциях от latency не зависит
+    assert tx_ms["two-phase", high] < tx_ms["two-phase", low] * 1.5 + 5
+    assert tx_ms["two-phase", high] < tx_ms["lock+call", high]
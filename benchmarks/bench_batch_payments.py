@@ -0,0 +1,85 @@
+"""
+Benchmark: settlement run — capture 10k authorized платежей.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_batch_payments.py -s
+
+Сравниваем:
+- "per-item" — capture_payment в цикле (транзакция, row-lock, UPDATE, INSERT события на платёж);
+- "batch"    — capture_payments(ids) пачками по chunk_size (lock в порядке pk, один UPDATE
+               ... RETURNING, один UPDATE итогов заказов, bulk_create событий).
+
+Размер прогона — BENCH_PAYMENTS (по умолчанию 10000).
+"""
+import os
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+pytestmark = pytest.mark.django_db
+
+N = int(os.environ.get("BENCH_PAYMENTS", "10000"))
+CHUNK_SIZES = (500, 2000)
+
+
+def _authorized_payments(org, n):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    orders = Order.objects.bulk_create(Order(org=org) for _ in range(n))
+    return [
+        p.pk
+        for p in OrderPayment.objects.bulk_create(
+            OrderPayment(
+                org=org, order=order, tender=OrderPayment.Tender.CARD,
+                status=OrderPayment.Status.AUTHORIZED, amount=Decimal("9.99"), provider="manual",
+            )
+            for order in orders
+        )
+    ]
+
+
+def test_bench_settlement_capture(org_factory):
+    from apps.orders.models import Order
+    from apps.payments.logic.batch_payments import capture_payments
+    from apps.payments.logic.capture_payment import capture_payment
+    from apps.payments.models import OrderPayment, PaymentEvent
+
+    org = org_factory(name="Bench Settlement Org")
+
+    print()
+    print(f"payments/run={N}")
+    print(f"{'mode':>16} | {'seconds':>8} | {'payments/s':>10} | {'queries':>8}")
+
+    rates = {}
+    runs = [("per-item", None)] + [(f"batch/{size}", size) for size in CHUNK_SIZES]
+    for mode, chunk_size in runs:
+        ids = _authorized_payments(org, N)
+
+        # queries_log ограничен 9000 записей — считаем запросы сами
+        statements = []
+
+        def count(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            if chunk_size is None:
+                for payment in OrderPayment.objects.filter(pk__in=ids).order_by("pk"):
+                    capture_payment(payment=payment)
+            else:
+                outcomes = capture_payments(ids, org=org, chunk_size=chunk_size)
+                assert all(o.ok for o in outcomes.values())
+            elapsed = time.perf_counter() - started
+
+        assert OrderPayment.objects.filter(pk__in=ids, status=OrderPayment.Status.CAPTURED).count() == N
+        assert PaymentEvent.objects.filter(payment_id__in=ids, action="capture").count() == N
+        assert not Order.objects.filter(payments__pk__in=ids).exclude(captured_total=Decimal("9.99")).exists()
+
+        rates[mode] = N / elapsed
+        print(f"{mode:>16} | {elapsed:>8.2f} | {rates[mode]:>10.0f} | {len(statements):>8}")
+
+    assert all(rates[f"batch/{size}"] > rates["per-item"] * 5 for size in CHUNK_SIZES)
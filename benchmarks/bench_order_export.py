@@ -0,0 +1,120 @@
+"""
+Benchmark: потоковая выгрузка заказов (export_records + render_export) на 1k и 100k заказов.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_order_export.py -s
+    BENCH_EXPORT_ORDERS=1000,10000000 pytest benchmarks/bench_order_export.py -s
+
+Синтетика: у каждого заказа 3 позиции и 1 платёж (вставка generate_series, мимо ORM).
+Меряем records/s, прирост пикового RSS процесса (ru_maxrss) и пик Python-памяти (tracemalloc):
+память должна зависеть от chunk_size, а не от числа заказов.
+"""
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import pytest
+from django.db import connection
+
+pytestmark = pytest.mark.django_db
+
+SIZES = [int(n) for n in os.environ.get("BENCH_EXPORT_ORDERS", "1000,100000").split(",")]
+ITEMS_PER_ORDER = 3
+
+
+def _rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — KiB, macOS — байты
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _seed(org, n):
+    from apps.orders.models import Order, OrderItem
+    from apps.payments.models import OrderPayment
+    from apps.products.models import TaxRate, Unit
+
+    unit = Unit.objects.create(org=org, name="pcs")
+    tax = TaxRate.objects.create(org=org, name="VAT 20", rate="20.00")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Order._meta.db_table}
+                (org_id, public_id, created_at, updated_at, status, subtotal, tax_total, total,
+                 subtotal_exact, tax_total_exact, captured_total, refunded_total)
+            SELECT %s, gen_random_uuid(), now(), now(), 'paid', 30.00, 6.00, 36.00, 30, 6, 36.00, 0.00
+            FROM generate_series(1, %s)
+            """,
+            [org.id, n],
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {OrderItem._meta.db_table}
+                (public_id, order_id, product_name, qty, unit_id, unit_price, tax_rate_id, created_at)
+            SELECT gen_random_uuid(), o.id, 'Item ' || g, 1.000, %s, 10.00, %s, now()
+            FROM {Order._meta.db_table} o CROSS JOIN generate_series(1, %s) AS g
+            WHERE o.org_id = %s
+            """,
+            [unit.id, tax.id, ITEMS_PER_ORDER, org.id],
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {OrderPayment._meta.db_table}
+                (org_id, order_id, public_id, created_at, updated_at, tender, status, amount, currency, provider)
+            SELECT %s, o.id, gen_random_uuid(), now(), now(), 'card', 'captured', 36.00, 'EUR', 'manual'
+            FROM {Order._meta.db_table} o
+            WHERE o.org_id = %s
+            """,
+            [org.id, org.id],
+        )
+
+
+class _NullSink:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, chunk):
+        self.bytes += len(chunk)
+
+
+def test_bench_order_export(org_factory):
+    from apps.orders.logic.export import export_records, render_export
+    from apps.orders.models import Order
+
+    print()
+    print(f"{'orders':>9} | {'records':>9} | {'seconds':>8} | {'records/s':>9} | {'MiB out':>8} | "
+          f"{'RSS +MiB':>8} | {'py peak MiB':>11}")
+
+    peaks = {}
+    for n in SIZES:
+        org = org_factory(name=f"Bench Export Org {n}")
+        _seed(org, n)
+
+        records = 0
+
+        def counted(rows):
+            nonlocal records
+            for row in rows:
+                records += 1
+                yield row
+
+        sink = _NullSink()
+        rss_before = _rss_mib()
+        tracemalloc.start()
+        started = time.perf_counter()
+        for chunk in render_export(counted(export_records(Order.objects.filter(org=org))), fmt="csv"):
+            sink.write(chunk)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        peaks[n] = peak / 2**20
+        print(
+            f"{n:>9} | {records:>9} | {elapsed:>8.2f} | {records / elapsed:>9.0f} | {sink.bytes / 2**20:>8.1f} | "
+            f"{_rss_mib() - rss_before:>8.1f} | {peaks[n]:>11.1f}"
+        )
+        assert records == n * (1 + ITEMS_PER_ORDER + 1)
+
+    # память — O(chunk_size), не O(числа заказов)
+    assert max(peaks.values()) < 4 * min(peaks.values()) + 16
@@ -0,0 +1,83 @@
+"""
+Benchmark: стоимость добавления позиции в заказ в зависимости от числа строк.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_order_totals.py -s
+
+Сравниваем:
+- добавление позиции через API (инкрементальный F()-UPDATE итогов)
+- прежний построчный подсчёт в Python (все OrderItem + TaxRate в память)
+"""
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (10, 100, 500, 1000)
+ADDS_PER_SIZE = 20
+
+
+def _legacy_python_recompute(order):
+    subtotal = Decimal("0.00")
+    tax_total = Decimal("0.00")
+    for it in order.items.select_related("tax_rate").all():
+        line_base = it.qty * it.unit_price
+        subtotal += line_base
+        tax_total += line_base * it.tax_rate.rate / Decimal("100")
+    return subtotal.quantize(Decimal("0.01")), tax_total.quantize(Decimal("0.01"))
+
+
+def test_bench_add_item_cost_vs_order_size(admin_client):
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Product, Unit, TaxRate
+
+    client, user, org = admin_client
+    product = Product.objects.create(org=org, name="Bench", stock_qty=Decimal("100000"))
+    unit = Unit.objects.create(org=org, name="pcs")
+    tax = TaxRate.objects.create(org=org, name="VAT 20", rate=Decimal("20.00"))
+    payload = {
+        "product": str(product.public_id),
+        "qty": "1",
+        "unit": str(unit.public_id),
+        "unit_price": "1.99",
+        "tax_rate": str(tax.public_id),
+    }
+
+    # прогрев (membership-кэш и т.п.), чтобы не искажать первый замер
+    warmup = Order.objects.create(org=org)
+    client.post(f"/api/v1/orders/{warmup.public_id}/items/", data=payload, content_type="application/json")
+
+    print()
+    print(f"{'lines':>6} | {'POST ms/add':>11} | {'queries/add':>11} | {'legacy recompute ms':>19}")
+
+    queries_per_add = set()
+    for size in SIZES:
+        order = Order.objects.create(org=org)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, product_name="Bench", qty=Decimal("1.000"),
+                      unit=unit, unit_price=Decimal("1.99"), tax_rate=tax)
+            for _ in range(size)
+        )
+        url = f"/api/v1/orders/{order.public_id}/items/"
+
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            for _ in range(ADDS_PER_SIZE):
+                assert client.post(url, data=payload, content_type="application/json").status_code == 201
+            post_ms = (time.perf_counter() - started) * 1000 / ADDS_PER_SIZE
+
+        started = time.perf_counter()
+        for _ in range(ADDS_PER_SIZE):
+            _legacy_python_recompute(order)
+        legacy_ms = (time.perf_counter() - started) * 1000 / ADDS_PER_SIZE
+
+        per_add = len(ctx.captured_queries) / ADDS_PER_SIZE
+        queries_per_add.add(per_add)
+        print(f"{size:>6} | {post_ms:>11.2f} | {per_add:>11.1f} | {legacy_ms:>19.2f}")
+
+    # число запросов на добавление не зависит от размера заказа
+    assert len(queries_per_add) == 1
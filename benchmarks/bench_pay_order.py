@@ -0,0 +1,69 @@
+"""
+Benchmark: pay_order / cancel_order для заказов с большим числом разных продуктов.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_pay_order.py -s
+
+Складские эффекты: один GROUP BY по позициям + один lock-SELECT + один UPDATE
+с CASE по id (раньше — загрузка всех позиций и save() на каждый продукт).
+"""
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_captured_payment_for_order
+
+pytestmark = pytest.mark.django_db
+
+SIZES = (10, 50, 200)
+ROUNDS = 10
+
+
+def test_bench_pay_and_cancel_vs_products_per_order(admin_client):
+    from apps.orders.logic.cancel_order import cancel_order
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Product, Unit, TaxRate
+
+    client, user, org = admin_client
+    unit = Unit.objects.create(org=org, name="pcs")
+    tax = TaxRate.objects.create(org=org, name="VAT 20", rate=Decimal("20.00"))
+
+    print()
+    print(f"{'products':>8} | {'pay ms':>8} | {'pay q':>5} | {'cancel ms':>9} | {'cancel q':>8}")
+
+    queries = set()
+    for size in SIZES:
+        products = Product.objects.bulk_create(
+            Product(org=org, name=f"B{size}-{i}", stock_qty=Decimal("1000000")) for i in range(size)
+        )
+        pay_ms = cancel_ms = 0.0
+        for _ in range(ROUNDS):
+            order = Order.objects.create(org=org)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=p, product_name=p.name, qty=Decimal("1.000"),
+                          unit=unit, unit_price=Decimal("1.99"), tax_rate=tax)
+                for p in products
+            )
+            order.recompute_totals(save=True)
+            create_captured_payment_for_order(org=org, order=order)
+
+            with CaptureQueriesContext(connection) as pay_ctx:
+                started = time.perf_counter()
+                order = pay_order(order=order)
+                pay_ms += (time.perf_counter() - started) * 1000
+
+            with CaptureQueriesContext(connection) as cancel_ctx:
+                started = time.perf_counter()
+                cancel_order(order=order)
+                cancel_ms += (time.perf_counter() - started) * 1000
+
+        pay_q, cancel_q = len(pay_ctx.captured_queries), len(cancel_ctx.captured_queries)
+        queries.add((pay_q, cancel_q))
+        print(f"{size:>8} | {pay_ms / ROUNDS:>8.2f} | {pay_q:>5} | {cancel_ms / ROUNDS:>9.2f} | {cancel_q:>8}")
+
+    # число запросов не зависит от числа продуктов в заказе
+    assert len(queries) == 1
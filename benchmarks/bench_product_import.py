@@ -0,0 +1,59 @@
+"""
+Benchmark: загрузка каталога на 500k SKU (import_products: COPY в stage + один upsert).
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_product_import.py -s
+    BENCH_IMPORT_ROWS=2000000 pytest benchmarks/bench_product_import.py -s
+
+Два прохода по одному файлу: первый — все продукты новые (INSERT + opening-движения),
+второй — у каждой 10-й строки изменён остаток (ON CONFLICT DO UPDATE + adjustment), остальные не меняются.
+~0.1% строк — ошибки (пустое имя / неверный stock_qty). Цель — от 100k строк/с на проход.
+"""
+import os
+import time
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ROWS = int(os.environ.get("BENCH_IMPORT_ROWS", "500000"))
+TARGET_RPS = 100_000
+
+
+def _write_catalog(path, n, *, bump: bool):
+    with open(path, "w", newline="") as out:
+        out.write("name,stock_qty\n")
+        for i in range(n):
+            if i % 1000 == 999:
+                out.write(",1\n" if i % 2000 == 999 else f"SKU {i},-1\n")
+                continue
+            qty = 10 + (1 if bump and i % 10 == 0 else 0)
+            out.write(f"SKU {i},{qty}\n")
+
+
+def test_bench_product_import(org_factory, tmp_path):
+    from apps.products.catalog_import import import_products
+    from apps.products.models import Product
+
+    org = org_factory(name="Bench Catalog Org")
+
+    print()
+    print(f"{'pass':>8} | {'rows':>9} | {'seconds':>8} | {'rows/s':>9} | created | updated | unchanged | failed")
+    for label, bump in (("insert", False), ("upsert", True)):
+        path = tmp_path / f"catalog-{label}.csv"
+        _write_catalog(path, ROWS, bump=bump)
+
+        started = time.perf_counter()
+        with open(path, newline="") as stream:
+            result = import_products(stream, org=org, source_name=path.name)
+        elapsed = time.perf_counter() - started
+
+        rps = result.rows / elapsed
+        print(
+            f"{label:>8} | {result.rows:>9} | {elapsed:>8.2f} | {rps:>9.0f} | {result.created:>7} | "
+            f"{result.updated:>7} | {result.unchanged:>9} | {result.failed:>6}"
+            + ("" if rps >= TARGET_RPS else f"  (below target {TARGET_RPS})")
+        )
+        assert result.failed == ROWS // 1000
+
+    assert Product.objects.filter(org=org).count() == ROWS - ROWS // 1000
@@ -0,0 +1,100 @@
+"""
+Benchmark: сверка settlement-файла на миллион строк.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_settlement_reconciliation.py -s
+    BENCH_SETTLEMENT_ROWS=5000000 pytest benchmarks/bench_settlement_reconciliation.py -s
+
+Синтетика: ROWS списанных платежей в БД и CSV-отчёт по ним с ~1% расхождений
+(сумма, статус, отсутствующий платёж, платёж не в отчёте). Меряем rows/s и пик Python-памяти
+(tracemalloc) — он должен зависеть от chunk_size, а не от размера файла.
+"""
+import os
+import time
+import tracemalloc
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.db import connection
+
+pytestmark = pytest.mark.django_db
+
+ROWS = int(os.environ.get("BENCH_SETTLEMENT_ROWS", "1000000"))
+CHUNK_SIZES = (1000, 5000, 20000)
+
+
+def _seed_payments(org, n):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    order = Order.objects.create(org=org)
+    with connection.cursor() as cursor:
+        # captured-платежи вставляем мимо save(): итоги заказа бенчмарку не нужны
+        cursor.execute(
+            f"""
+            INSERT INTO {OrderPayment._meta.db_table}
+                (org_id, order_id, public_id, created_at, updated_at, tender, status, amount, currency,
+                 external_id, provider)
+            SELECT %s, %s, gen_random_uuid(), now(), now(), 'card', 'captured', 10.00, 'EUR',
+                   'stl-' || g, 'acq'
+            FROM generate_series(1, %s) AS g
+            """,
+            [org.id, order.id, n],
+        )
+
+
+def _write_settlement(path, n):
+    # каждая 100-я строка — расхождение, каждая 400-я — отсутствует в файле (missing_in_settlement)
+    with open(path, "w", newline="") as out:
+        out.write("external_id,amount,currency,status\n")
+        buf = StringIO()
+        for i in range(1, n + 1):
+            if i % 400 == 0:
+                continue
+            amount = "10.01" if i % 100 == 1 else "10.00"
+            status = "refunded" if i % 100 == 2 else "captured"
+            external_id = f"nope-{i}" if i % 100 == 3 else f"stl-{i}"
+            buf.write(f"{external_id},{amount},EUR,{status}\n")
+            if i % 10000 == 0:
+                out.write(buf.getvalue())
+                buf = StringIO()
+        out.write(buf.getvalue())
+
+
+def test_bench_settlement_reconciliation(org_factory, tmp_path):
+    from apps.payments.logic.reconciliation import ReconciliationStats, read_settlement_rows, reconcile_settlement
+
+    org = org_factory(name="Bench Settlement Org")
+    _seed_payments(org, ROWS)
+    path = tmp_path / "settlement.csv"
+    _write_settlement(path, ROWS)
+
+    print()
+    print(f"settlement rows={ROWS} file={path.stat().st_size / 2**20:.1f} MiB")
+    print(f"{'chunk':>8} | {'seconds':>8} | {'rows/s':>9} | {'peak MiB':>8} | mismatches")
+
+    peaks = {}
+    for chunk_size in CHUNK_SIZES:
+        stats = ReconciliationStats()
+        kinds = Counter()
+        tracemalloc.start()
+        started = time.perf_counter()
+        with open(path, newline="") as stream:
+            for mismatch in reconcile_settlement(
+                read_settlement_rows(stream, fmt="csv"), org=org, provider="acq", chunk_size=chunk_size, stats=stats,
+            ):
+                kinds[mismatch.kind] += 1
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        peaks[chunk_size] = peak / 2**20
+        print(
+            f"{chunk_size:>8} | {elapsed:>8.2f} | {stats.rows / elapsed:>9.0f} | {peaks[chunk_size]:>8.1f} | "
+            + " ".join(f"{kind}={count}" for kind, count in sorted(kinds.items()))
+        )
+        assert kinds["missing_in_settlement"] >= ROWS // 400
+
+    # память — O(chunk_size), не O(ROWS)
+    assert peaks[CHUNK_SIZES[0]] < 64
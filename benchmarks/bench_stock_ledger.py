@@ -0,0 +1,84 @@
+"""
+Benchmark: остаток "as of" по ledger на продукте с миллионами движений.
+
+Запуск (не входит в обычный прогон тестов):
+    pytest benchmarks/bench_stock_ledger.py -s
+    BENCH_LEDGER_MOVEMENTS=5000000 pytest benchmarks/bench_stock_ledger.py -s
+
+Сравниваем stock_as_of без снимка (сумма всей истории) и со снимком + RECENT свежих движений.
+Execution Time — из EXPLAIN ANALYZE (время в Postgres, без round-trip драйвера).
+"""
+import os
+import re
+import statistics
+import time
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+pytestmark = pytest.mark.django_db
+
+MOVEMENTS = int(os.environ.get("BENCH_LEDGER_MOVEMENTS", "1000000"))
+RECENT = 1000
+CALLS = 200
+
+
+def _measure(product_id, at):
+    from apps.products.models import Product
+    from apps.products.stock_ledger import stock_as_of, stock_as_of_annotations
+
+    timings = []
+    for _ in range(CALLS):
+        started = time.perf_counter()
+        stock_as_of(product_id, at)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    qs = Product.objects.filter(pk=product_id).annotate(**stock_as_of_annotations(at)).values_list("stock_as_of")
+    plan = qs.explain(analyze=True)
+    server_ms = float(re.search(r"Execution Time: ([\d.]+) ms", plan).group(1))
+    return statistics.median(timings), server_ms, plan
+
+
+def test_bench_stock_as_of_with_millions_of_movements(org_factory):
+    from apps.products.models import Product, StockMovement
+    from apps.products.stock_ledger import stock_as_of, take_stock_snapshots
+
+    org = org_factory(name="Ledger Bench")
+    product = Product.objects.create(org=org, name="Hot")
+    other = Product.objects.create(org=org, name="Neighbour")
+    start = timezone.now() - timedelta(days=30)
+
+    with connection.cursor() as cursor:
+        # история: MOVEMENTS движений по 1 шт. на product + столько же на соседа (индекс делят оба)
+        cursor.execute(
+            f"""
+            INSERT INTO {StockMovement._meta.db_table} (org_id, product_id, delta, reason, created_at)
+            SELECT %s, p, CASE WHEN g %% 2 = 0 THEN 1 ELSE -1 END, 'adjustment',
+                   %s::timestamptz + g * interval '1 millisecond'
+            FROM generate_series(1, %s) AS g, unnest(ARRAY[%s, %s]) AS p
+            """,
+            [org.id, start, MOVEMENTS, product.id, other.id],
+        )
+        cursor.execute(f"ANALYZE {StockMovement._meta.db_table}")
+
+    now = timezone.now()
+    print()
+    print(f"movements per product: {MOVEMENTS}")
+    no_snap_ms, no_snap_server_ms, _ = _measure(product.id, now)
+    print(f"no snapshot:          median {no_snap_ms:8.3f} ms/call, server {no_snap_server_ms:8.3f} ms")
+
+    snapshot_at = start + timedelta(milliseconds=MOVEMENTS - RECENT)
+    take_stock_snapshots(org=org, at=snapshot_at)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE products_stocksnapshot")
+
+    expected = stock_as_of(product.id, now)
+    snap_ms, snap_server_ms, plan = _measure(product.id, now)
+    print(f"snapshot + {RECENT} deltas: median {snap_ms:8.3f} ms/call, server {snap_server_ms:8.3f} ms")
+    print(plan)
+
+    assert expected == 0  # +1/-1 поровну
+    assert "Index Only Scan" in plan or "Index Scan" in plan
+    assert snap_server_ms < 1.0
@@ -8,11 +8,13 @@ from .serializers import CountrySerializer, CurrencySerializer
 
 class CurrencyListView(ListAPIView):
     permission_classes = [AllowAny]
+    pagination_class = None  # справочник целиком: десятки строк, кэшируется клиентом
     queryset = Currency.objects.all()
     serializer_class = CurrencySerializer
 
 
 class CountryListView(ListAPIView):
     permission_classes = [AllowAny]
+    pagination_class = None
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
@@ -1,8 +1,9 @@
 #config/orgs/api_views.py
 
 from rest_framework.generics import ListAPIView, CreateAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
+from .membership_cache import get_membership_cache
 from .models import Organization, OrganizationMember
 from .serializers import OrganizationSerializer, OrgNoteSerializer, OrgMemberListSerializer, OrgMemberUpdateSerializer
 
@@ -10,7 +11,7 @@ from .serializers import OrganizationSerializer, OrgNoteSerializer, OrgMemberLis
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .org_context import get_request_org
+from .org_context import get_request_org, get_request_membership
 
 
 from rest_framework.generics import ListCreateAPIView
@@ -37,6 +38,7 @@ from rest_framework.exceptions import PermissionDenied
 class MyOrganizationsView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OrganizationSerializer
+    pagination_class = None  # организации пользователя — не org-scoped список, их единицы
 
     def get_queryset(self):
         return Organization.objects.filter(members__user=self.request.user).distinct()
@@ -56,8 +58,25 @@ class OrgContextView(APIView):
 
     def get(self, request):
         org = get_request_org(request)
+        # org из membership-кэша содержит только pk/public_id — для ответа нужна полная строка
+        if org.get_deferred_fields():
+            org = Organization.objects.get(pk=org.pk)
         data = OrganizationSerializer(org).data
         return Response(data)
+
+
+class MembershipCacheStatsView(APIView):
+    """
+    GET /api/v1/orgs/membership-cache/stats/
+    Счётчики hit/miss membership-кэша текущего процесса (для мониторинга, только staff).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        cache = get_membership_cache()
+        if cache is None:
+            return Response({"enabled": False})
+        return Response({"enabled": True, **cache.stats()})
     
     
 class OrgNoteListCreateView(OrgScopedQuerysetMixin, ListCreateAPIView):
@@ -139,11 +158,8 @@ class OrgMemberDetailApi(generics.RetrieveUpdateDestroyAPIView):
             return None
 
         # 1) только owner может менять owner
-        is_requester_owner = OrganizationMember.objects.filter(
-            org=instance.org,
-            user=request.user,
-            role="owner",
-        ).exists()
+        # instance всегда из активной org (queryset org-scoped), роль берём из membership запроса
+        is_requester_owner = get_request_membership(request).role == OrganizationMember.ROLE_OWNER
         if not is_requester_owner:
             raise PermissionDenied("Only an owner can modify owner role.")
 
@@ -5,3 +5,6 @@ class OrgsConfig(AppConfig):
     name = 'config.orgs'
     verbose_name = 'Organizations'
     label = 'orgs'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,152 @@
+# config/orgs/jwt_claims.py
+from __future__ import annotations
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .membership_cache import CachedMembership, get_membership_cache
+from .models import OrganizationMember, OrgMembershipVersion
+
+
+# Claims access-токена (opt-in режим ORG_CLAIMS_JWT["ENABLED"]):
+#   "orgs": {"<org public_id>": {"r": role}, ...}
+#   "omv":  версия membership пользователя на момент выдачи токена
+# Внутренних pk (org, membership) в токене нет — их берём из MembershipCache на сервере.
+ORGS_CLAIM = "orgs"
+VERSION_CLAIM = "omv"
+
+VERSION_CACHE_KEY = "orgs:membership-version:{user_id}"
+
+
+def claims_settings() -> dict:
+    return getattr(settings, "ORG_CLAIMS_JWT", {})
+
+
+def org_claims_enabled() -> bool:
+    return bool(claims_settings().get("ENABLED", False))
+
+
+def _version_cache():
+    return caches[claims_settings().get("VERSION_CACHE", "default")]
+
+
+def get_membership_version(user_id) -> int:
+    """
+    Текущая версия membership пользователя.
+    Сначала cache (общий для воркеров, если CACHES настроен так), на промахе — БД.
+    """
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    cache = _version_cache()
+
+    version = cache.get(key)
+    if version is None:
+        version = (
+            OrgMembershipVersion.objects.filter(user_id=user_id)
+            .values_list("version", flat=True)
+            .first()
+        ) or 0
+        cache.set(key, version, timeout=claims_settings().get("VERSION_CACHE_TTL_S", 5))
+    return version
+
+
+def bump_membership_version(user_id) -> None:
+    """
+    Отзыв claims: +1 к версии. Все ранее выданные токены становятся stale -> проверка через БД.
+    """
+    updated = OrgMembershipVersion.objects.filter(user_id=user_id).update(version=F("version") + 1)
+    if not updated:
+        _, created = OrgMembershipVersion.objects.get_or_create(user_id=user_id, defaults={"version": 1})
+        if not created:
+            OrgMembershipVersion.objects.filter(user_id=user_id).update(version=F("version") + 1)
+
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    _version_cache().delete(key)
+    # если мы внутри транзакции — после commit сбрасываем ещё раз:
+    # параллельный запрос мог успеть закэшировать старую версию из БД
+    transaction.on_commit(lambda: _version_cache().delete(key))
+
+
+def build_org_claims(user_id) -> dict | None:
+    """
+    Claims для access-токена. None — если org слишком много (токен раздувается),
+    тогда токен выдаётся без claims и авторизация идёт обычным путём.
+    """
+    version = get_membership_version(user_id)
+    max_orgs = claims_settings().get("MAX_ORGS", 50)
+
+    rows = list(
+        OrganizationMember.objects.filter(user_id=user_id)
+        .values_list("org__public_id", "role")[: max_orgs + 1]
+    )
+    if len(rows) > max_orgs:
+        return None
+
+    orgs = {str(org_public_id): {"r": role} for org_public_id, role in rows}
+    return {ORGS_CLAIM: orgs, VERSION_CLAIM: version}
+
+
+def add_org_claims(token, user_id) -> None:
+    claims = build_org_claims(user_id)
+    if claims is None:
+        return
+    for name, value in claims.items():
+        token[name] = value
+
+
+def token_has_fresh_org_claims(token) -> bool:
+    """
+    Claims пригодны, только если режим включён и версия в токене не меньше текущей.
+    Результат запоминаем на объекте токена (auth и permission спрашивают в одном запросе).
+    """
+    if token is None or not org_claims_enabled():
+        return False
+
+    fresh = getattr(token, "_org_claims_fresh", None)
+    if fresh is None:
+        payload = getattr(token, "payload", {})
+        if ORGS_CLAIM not in payload or VERSION_CLAIM not in payload:
+            fresh = False
+        else:
+            user_id = payload.get(jwt_settings.USER_ID_CLAIM)
+            fresh = payload[VERSION_CLAIM] >= get_membership_version(user_id)
+        token._org_claims_fresh = fresh
+    return fresh
+
+
+def get_token_membership(request) -> OrganizationMember | None:
+    """
+    Membership активной org (X-ORG-ID) из claims токена, без БД.
+    Роль — из claims, pk org/membership — из MembershipCache (в токене их нет).
+    None — claims нет/устарели/org нет в токене или промах кэша: вызывающий идёт
+    обычным путём (он же заполнит кэш).
+    """
+    token = getattr(request, "auth", None)
+    if not token_has_fresh_org_claims(token):
+        return None
+
+    org_id = request.headers.get("X-ORG-ID")
+    if not org_id:
+        return None
+    try:
+        org_public_id = uuid.UUID(org_id)
+    except ValueError:
+        return None
+
+    claim = token.payload[ORGS_CLAIM].get(str(org_public_id))
+    if claim is None:
+        return None
+
+    cache = get_membership_cache()
+    cached = cache.get(request.user.pk, org_public_id) if cache is not None else None
+    if cached is None:
+        return None
+
+    return CachedMembership(member_id=cached.member_id, org_id=cached.org_id, role=claim["r"]).to_membership(
+        user=request.user,
+        org_public_id=org_public_id,
+    )
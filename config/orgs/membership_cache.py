@@ -0,0 +1,175 @@
+# config/orgs/membership_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Organization, OrganizationMember
+
+
+@dataclass(frozen=True)
+class CachedMembership:
+    member_id: int
+    org_id: int
+    role: str
+
+    def to_membership(self, *, user, org_public_id) -> OrganizationMember:
+        """
+        Собираем membership/org без похода в БД.
+        Остальные поля org — deferred: при обращении Django дочитает их из БД.
+        """
+        org = Organization.from_db(DEFAULT_DB_ALIAS, ["id", "public_id"], [self.org_id, org_public_id])
+        membership = OrganizationMember.from_db(
+            DEFAULT_DB_ALIAS,
+            ["id", "org_id", "user_id", "role"],
+            [self.member_id, self.org_id, user.pk, self.role],
+        )
+        membership.org = org
+        membership.user = user
+        return membership
+
+
+class MembershipCache:
+    """
+    Кэш membership между запросами: (user_id, org public_id) -> (member pk, org pk, role).
+
+    - process-local LRU с TTL (по умолчанию);
+    - либо Django cache framework (backend_alias), если нужен общий кэш между воркерами.
+
+    Инвалидация: сигналы OrganizationMember post_save/post_delete (см. signals.py).
+    ВАЖНО: process-local режим инвалидирует только текущий процесс,
+    остальные воркеры увидят изменение роли не позже чем через TTL.
+    """
+
+    KEY_PREFIX = "orgs:membership"
+
+    def __init__(self, *, max_size: int, ttl_s: float, backend_alias: str | None = None):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.backend_alias = backend_alias or None
+
+        self._lock = threading.Lock()
+        self._data: OrderedDict[tuple[int, str], tuple[float, CachedMembership]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _backend_key(self, key: tuple[int, str]) -> str:
+        return f"{self.KEY_PREFIX}:{key[0]}:{key[1]}"
+
+    def get(self, user_id: int, org_public_id: str) -> CachedMembership | None:
+        key = (user_id, str(org_public_id))
+
+        if self.backend_alias:
+            raw = caches[self.backend_alias].get(self._backend_key(key))
+            value = CachedMembership(*raw) if raw is not None else None
+        else:
+            with self._lock:
+                entry = self._data.get(key)
+                value = None
+                if entry is not None:
+                    expires_at, cached = entry
+                    if expires_at > time.monotonic():
+                        self._data.move_to_end(key)
+                        value = cached
+                    else:
+                        del self._data[key]
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, user_id: int, org_public_id: str, value: CachedMembership) -> None:
+        key = (user_id, str(org_public_id))
+
+        if self.backend_alias:
+            caches[self.backend_alias].set(
+                self._backend_key(key),
+                (value.member_id, value.org_id, value.role),
+                timeout=self.ttl_s,
+            )
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int, org_public_id: str) -> None:
+        key = (user_id, str(org_public_id))
+
+        if self.backend_alias:
+            caches[self.backend_alias].delete(self._backend_key(key))
+        with self._lock:
+            self._data.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Сбрасывает локальные данные.
+        Общий backend не трогаем: в нём могут быть ключи других процессов.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend_alias or "local",
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_cache: MembershipCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_membership_cache() -> MembershipCache | None:
+    """
+    Singleton процесса. None — кэш выключен (ORG_MEMBERSHIP_CACHE["ENABLED"] = False).
+    """
+    global _cache
+
+    conf = getattr(settings, "ORG_MEMBERSHIP_CACHE", {})
+    if not conf.get("ENABLED", False):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MembershipCache(
+                    max_size=conf.get("MAX_SIZE", 10_000),
+                    ttl_s=conf.get("TTL_S", 30),
+                    backend_alias=conf.get("BACKEND") or None,
+                )
+    return _cache
+
+
+def invalidate_membership(*, user_id: int, org_public_id) -> None:
+    cache = get_membership_cache()
+    if cache is not None:
+        cache.invalidate(user_id, str(org_public_id))
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orgs', '0003_org_membership_version'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='orgnote',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='orgnote_org_created_idx'),
+        ),
+    ]
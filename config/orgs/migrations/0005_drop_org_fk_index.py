@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('orgs', '0004_org_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orgnote',
+            name='org',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='orgs.organization'),
+        ),
+    ]
@@ -4,9 +4,41 @@ import uuid
 from django.db import models
 
 
+def org_index(*fields: str, name: str, condition: models.Q | None = None) -> models.Index:
+    """
+    Индекс с ведущим org для Meta.indexes наследников OrgScopedModel: каждый путь доступа
+    начинается с WHERE org_id = ?, поэтому (org, ...) — а не одиночный индекс FK org.
+
+        indexes = [
+            org_index("id", name="order_org_id_idx"),  # список + keyset по id
+            org_index("created_at", name="order_org_draft_created_idx", condition=Q(status="draft")),
+        ]
+
+    Новые индексы на существующих таблицах добавляются миграцией с AddIndexConcurrently (atomic = False).
+    """
+    return models.Index(fields=["org", *fields], name=name, condition=condition)
+
+
+def org_foreign_key(*, db_index: bool = True) -> models.ForeignKey:
+    """
+    FK org для OrgScopedModel. Наследник с полным (без condition) org_index() переопределяет поле
+    с db_index=False: одиночный индекс org_id — префикс составного и только сбивает планировщик
+    (org_id + Sort вместо упорядоченного составного индекса).
+
+        org = org_foreign_key(db_index=False)  # покрыт order_org_id_idx
+    """
+    return models.ForeignKey(
+        "orgs.Organization", on_delete=models.CASCADE, related_name="%(class)ss", db_index=db_index
+    )
+
+
 class OrgScopedModel(models.Model):
+    """
+    Базовая модель данных организации. Индексы под свои запросы наследник объявляет через org_index().
+    """
+
     public_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
-    org = models.ForeignKey("orgs.Organization", on_delete=models.CASCADE, related_name="%(class)ss")
+    org = org_foreign_key()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -14,10 +46,14 @@ class OrgScopedModel(models.Model):
         abstract = True
         
 class OrgNote(OrgScopedModel):
+    org = org_foreign_key(db_index=False)  # покрыт orgnote_org_created_idx
     title = models.CharField(max_length=255)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            org_index("created_at", "id", name="orgnote_org_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -84,3 +120,25 @@ class OrganizationMember(models.Model):
 
     def __str__(self) -> str:
         return f"{self.org.name}: {self.user.email}"
+
+
+class OrgMembershipVersion(models.Model):
+    """
+    Версия набора membership пользователя.
+
+    Увеличивается при любом изменении его membership (и при деактивации пользователя).
+    Access-токен с org-claims несёт версию на момент выдачи: если она меньше текущей,
+    claims считаются устаревшими и авторизация идёт через БД.
+    Отдельная таблица (а не поле User), чтобы обычный User.save() не перетирал счётчик.
+    """
+
+    user = models.OneToOneField(
+        "users.User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="org_membership_version",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: v{self.version}"
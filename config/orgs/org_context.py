@@ -1,23 +1,65 @@
 # config/orgs/org_context.py
 
+import uuid
+
 from rest_framework.exceptions import ParseError, PermissionDenied
 
-from .models import Organization, OrganizationMember
+from .membership_cache import CachedMembership, get_membership_cache
+from .models import OrganizationMember
 
 
-def get_request_org(request):
+# Атрибут request, в котором храним membership активной org (X-ORG-ID).
+# Резолвим один раз за запрос: permission, view, serializer переиспользуют результат.
+REQUEST_MEMBERSHIP_ATTR = "_org_membership"
+
+
+def get_request_membership(request) -> OrganizationMember:
+    """
+    Membership текущего пользователя в org из X-ORG-ID (вместе с org и role).
+
+    - Результат кэшируется на объекте request.
+    - Между запросами — MembershipCache (user_id, org public_id) -> (org pk, role);
+      на промахе один SQL-запрос (membership JOIN org).
+    """
+    membership = getattr(request, REQUEST_MEMBERSHIP_ATTR, None)
+    if membership is not None:
+        return membership
+
     org_id = request.headers.get("X-ORG-ID")
     if not org_id:
         raise ParseError('Missing "X-ORG-ID" header')
 
     try:
-        org = Organization.objects.get(public_id=org_id)
-    except Organization.DoesNotExist:
-        # можно 404, но для безопасности чаще 404
+        org_public_id = uuid.UUID(org_id)
+    except ValueError:
         raise PermissionDenied("Organization not accessible")
 
-    is_member = OrganizationMember.objects.filter(org=org, user=request.user).exists()
-    if not is_member:
-        raise PermissionDenied("Organization not accessible")
+    cache = get_membership_cache()
+    cached = cache.get(request.user.pk, org_public_id) if cache is not None else None
+
+    if cached is not None:
+        membership = cached.to_membership(user=request.user, org_public_id=org_public_id)
+    else:
+        try:
+            membership = (
+                OrganizationMember.objects
+                .select_related("org")
+                .get(org__public_id=org_public_id, user=request.user)
+            )
+        except OrganizationMember.DoesNotExist:
+            # org не существует или пользователь не участник — ответ одинаковый
+            raise PermissionDenied("Organization not accessible")
+
+        if cache is not None:
+            cache.set(
+                request.user.pk,
+                org_public_id,
+                CachedMembership(member_id=membership.pk, org_id=membership.org_id, role=membership.role),
+            )
 
-    return org
+    setattr(request, REQUEST_MEMBERSHIP_ATTR, membership)
+    return membership
+
+
+def get_request_org(request):
+    return get_request_membership(request).org
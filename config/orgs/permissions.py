@@ -1,6 +1,9 @@
+from rest_framework.exceptions import APIException
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
-from .models import Organization, OrganizationMember
+from .models import OrganizationMember
+from .jwt_claims import get_token_membership
+from .org_context import REQUEST_MEMBERSHIP_ATTR, get_request_membership
 
 
 class IsOrgMemberReadOnlyOrOrgAdmin(BasePermission):
@@ -13,22 +16,32 @@ class IsOrgMemberReadOnlyOrOrgAdmin(BasePermission):
     message = "You don't have permission for this organization."
 
     def has_permission(self, request, view):
-        # get_request_org already checks membership and header
-        org_id = request.headers.get("X-ORG-ID")
-        if not org_id:
-            return False
-
+        # membership резолвится один раз и кэшируется на request (см. org_context)
         try:
-            org = Organization.objects.get(public_id=org_id)
-        except Organization.DoesNotExist:
-            return False
-
-        try:
-            membership = OrganizationMember.objects.get(org=org, user=request.user)
-        except OrganizationMember.DoesNotExist:
+            membership = get_request_membership(request)
+        except APIException:
             return False
 
         if request.method in SAFE_METHODS:
             return True
 
         return membership.role in (OrganizationMember.ROLE_ADMIN, OrganizationMember.ROLE_OWNER)
+
+
+class IsOrgMemberReadOnlyOrOrgAdminFromToken(IsOrgMemberReadOnlyOrOrgAdmin):
+    """
+    Вариант для режима org-claims в JWT (ORG_CLAIMS_JWT):
+    SAFE methods авторизуются по claims access-токена без обращения к БД.
+
+    Write methods, токены без claims или со stale-версией membership —
+    обычная проверка через БД (IsOrgMemberReadOnlyOrOrgAdmin).
+    """
+
+    def has_permission(self, request, view):
+        if request.method in SAFE_METHODS:
+            membership = get_token_membership(request)
+            if membership is not None:
+                setattr(request, REQUEST_MEMBERSHIP_ATTR, membership)
+                return True
+
+        return super().has_permission(request, view)
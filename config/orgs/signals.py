@@ -0,0 +1,67 @@
+# config/orgs/signals.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .jwt_claims import bump_membership_version
+from .membership_cache import get_membership_cache, invalidate_membership
+from .models import Organization, OrganizationMember
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def invalidate_membership_cache(sender, instance: OrganizationMember, **kwargs):
+    """
+    Любое изменение membership (роль, удаление) сбрасывает кэш,
+    чтобы понижение/удаление участника действовало со следующего запроса.
+
+    Сигнал приходит внутри транзакции писателя: сбрасываем сразу и ещё раз после commit —
+    параллельный запрос мог успеть закэшировать старую роль из БД до commit.
+    """
+    if get_membership_cache() is None:
+        return
+
+    try:
+        org_public_id = instance.org.public_id
+    except Organization.DoesNotExist:
+        # org уже удалена (каскад) — ключи сброшены в invalidate_org_membership_cache
+        return
+
+    _invalidate_now_and_on_commit(instance.user_id, org_public_id)
+
+
+@receiver(pre_delete, sender=Organization)
+def invalidate_org_membership_cache(sender, instance: Organization, **kwargs):
+    """
+    Удаление org каскадом удаляет участников: ключи (user_id, org public_id) сбрасываем
+    до каскада, пока org ещё есть, — в том числе в общем backend'е, а не только в этом процессе.
+    """
+    if get_membership_cache() is None:
+        return
+
+    user_ids = OrganizationMember.objects.filter(org=instance).values_list("user_id", flat=True)
+    for user_id in user_ids:
+        _invalidate_now_and_on_commit(user_id, instance.public_id)
+
+
+def _invalidate_now_and_on_commit(user_id: int, org_public_id) -> None:
+    invalidate_membership(user_id=user_id, org_public_id=org_public_id)
+    transaction.on_commit(lambda: invalidate_membership(user_id=user_id, org_public_id=org_public_id))
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def revoke_membership_token_claims(sender, instance: OrganizationMember, **kwargs):
+    """
+    Org-claims в JWT: новая версия membership делает выданные access-токены stale.
+    """
+    bump_membership_version(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_token_claims_of_inactive_user(sender, instance, created, **kwargs):
+    # токены с claims не перечитывают User.is_active — отзываем их явно
+    if not created and not instance.is_active:
+        bump_membership_version(instance.pk)
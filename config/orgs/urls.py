@@ -1,6 +1,7 @@
 from django.urls import path
 from .api_views import MyOrganizationsView, OrganizationCreateView, \
-OrgContextView, OrgNoteListCreateView, OrgMemberListCreateApi, OrgMemberDetailApi
+OrgContextView, OrgNoteListCreateView, OrgMemberListCreateApi, OrgMemberDetailApi, \
+MembershipCacheStatsView
 
 
 urlpatterns = [
@@ -9,5 +10,6 @@ urlpatterns = [
     path("notes/", OrgNoteListCreateView.as_view(), name="org-notes"),
     path("members/", OrgMemberListCreateApi.as_view(), name="org-members-list"),
     path("members/<int:id>/", OrgMemberDetailApi.as_view(), name="org-member-detail"),
+    path("membership-cache/stats/", MembershipCacheStatsView.as_view(), name="org-membership-cache-stats"),
     path("", OrganizationCreateView.as_view(), name="org-create"),
 ]
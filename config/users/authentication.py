@@ -0,0 +1,29 @@
+# config/users/authentication.py
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from config.orgs.jwt_claims import token_has_fresh_org_claims
+
+
+class OrgClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication + режим org-claims (ORG_CLAIMS_JWT["ENABLED"]).
+
+    Если access-токен несёт свежие org-claims (версия membership не устарела),
+    строку User не грузим: request.user — экземпляр User только с pk,
+    остальные поля deferred и дочитываются из БД при обращении.
+
+    Токены без claims / со stale claims — обычный путь (User из БД + is_active).
+    Деактивация пользователя повышает версию membership, поэтому такие токены
+    тоже уходят на обычный путь.
+    """
+
+    def get_user(self, validated_token):
+        if not token_has_fresh_org_claims(validated_token):
+            return super().get_user(validated_token)
+
+        User = get_user_model()
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        return User.from_db(DEFAULT_DB_ALIAS, [User._meta.pk.attname], [user_id])
@@ -0,0 +1,34 @@
+# config/users/serializers.py
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.orgs.jwt_claims import add_org_claims, org_claims_enabled
+
+
+def _with_org_claims(access: str) -> str:
+    # токен только что выпущен нами — повторная проверка подписи не нужна
+    token = AccessToken(access, verify=False)
+    add_org_claims(token, token[api_settings.USER_ID_CLAIM])
+    return str(token)
+
+
+class OrgClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login: в opt-in режиме ORG_CLAIMS_JWT access-токен несёт org-claims (см. config/orgs/jwt_claims.py).
+    Refresh-токен claims не несёт: они выдаются заново при каждом refresh.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if org_claims_enabled():
+            data["access"] = _with_org_claims(data["access"])
+        return data
+
+
+class OrgClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if org_claims_enabled():
+            data["access"] = _with_org_claims(data["access"])
+        return data
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Async use-case'ы платежей (конкурентные вызовы провайдеров) —
+apps/payments/logic/async_payments.py; их можно await'ить из async views под этим application.
 """
 
 import os
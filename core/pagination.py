@@ -0,0 +1,166 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination по сортировке queryset'а, без OFFSET и без COUNT(*).
+
+    - порядок — order_by view (или Meta.ordering); в конец всегда добавляется pk: ключ уникален,
+      страницы не теряют и не дублируют строки с равными created_at;
+    - страница — WHERE (k1, k2, ...) > (v1, v2, ...) ORDER BY ... LIMIT page_size + 1:
+      индекс (org, k1, ...) дочитывает ровно одну страницу на любой глубине;
+    - cursor — base64(JSON) значений ключа последней/первой строки и направления, для клиента непрозрачен;
+    - поля сортировки — NOT NULL (created_at, id, ...): сравнение с NULL ключ не продолжит.
+
+    Ответ: {"next": url | null, "previous": url | null, "results": [...]}.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        position, reverse = self.decode_cursor(request)
+        ordering = [(name, not desc) if reverse else (name, desc) for name, desc in self.ordering]
+
+        queryset = queryset.order_by(*(f"-{name}" if desc else name for name, desc in ordering))
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # назад: "дальше" — это previous; next есть всегда, раз мы пришли со следующей страницы
+        has_next = has_more if not reverse else position is not None
+        has_previous = (position is not None) if not reverse else has_more
+        self.next_position = self.row_position(rows[-1]) if rows and has_next else None
+        self.previous_position = self.row_position(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_link(self.next_position, reverse=False)),
+                    ("previous", self.get_link(self.previous_position, reverse=True)),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """
+        [(field name, desc)] из order_by queryset'а + pk в конце (если его ещё нет).
+        Поддерживаются только поля самой модели — значения ключа берутся из строки страницы.
+        """
+        model = queryset.model
+        names = list(queryset.query.order_by) or list(model._meta.ordering)
+        ordering = []
+        for name in names:
+            if not isinstance(name, str) or name == "?":
+                raise ImproperlyConfigured(f"{self.__class__.__name__}: unsupported ordering {name!r}.")
+            desc = name.startswith("-")
+            name = name.lstrip("-")
+            name = model._meta.pk.name if name == "pk" else name
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f"{self.__class__.__name__}: ordering by {name!r} is not a model field.")
+            ordering.append((name, desc))
+
+        pk_name = model._meta.pk.name
+        if pk_name not in (name for name, _ in ordering):
+            ordering.append((pk_name, ordering[-1][1] if ordering else False))
+
+        self.fields = [model._meta.get_field(name) for name, _ in ordering]
+        return ordering
+
+    @staticmethod
+    def keyset_filter(ordering, position) -> Q:
+        """
+        (k1, k2, ...) после position в порядке ordering (направления колонок могут различаться):
+        k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... плюс k1 >= v1 — по нему Postgres берёт range scan индекса.
+        """
+        condition = Q()
+        for i, (name, desc) in enumerate(ordering):
+            step = Q(**{f"{name}__{'lt' if desc else 'gt'}": position[i]})
+            for j, (prev_name, _) in enumerate(ordering[:i]):
+                step &= Q(**{prev_name: position[j]})
+            condition |= step
+        first_name, first_desc = ordering[0]
+        return Q(**{f"{first_name}__{'lte' if first_desc else 'gte'}": position[0]}) & condition
+
+    def row_position(self, row) -> list:
+        return [getattr(row, field.attname) for field in self.fields]
+
+    def encode_cursor(self, position, *, reverse: bool) -> str:
+        raw = json.dumps({"p": [_json_value(v) for v in position], "r": int(reverse)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+            values = data["p"]
+            if len(values) != len(self.fields):
+                raise ValueError("cursor does not match ordering")
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound("Invalid cursor.")
+        return position, bool(data.get("r"))
+
+    def get_link(self, position, *, reverse: bool):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse=reverse))
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
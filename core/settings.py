@@ -57,8 +57,120 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # = JWTAuthentication, пока ORG_CLAIMS_JWT выключен
+        "config.users.authentication.OrgClaimsJWTAuthentication",
     ),
+    # keyset-пагинация списков (core/pagination.py): ?cursor=<opaque>&page_size=<= 1000
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
+    "PAGE_SIZE": config("API_PAGE_SIZE", default=50, cast=int),
+}
+
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "config.users.serializers.OrgClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "config.users.serializers.OrgClaimsTokenRefreshSerializer",
+}
+
+# Opt-in: access-токен несёт org public_id -> role + версию membership,
+# чтобы read-запросы авторизовались без БД (IsOrgMemberReadOnlyOrOrgAdminFromToken).
+# VERSION_CACHE должен быть общим для воркеров, иначе отзыв claims виден с задержкой до VERSION_CACHE_TTL_S.
+ORG_CLAIMS_JWT = {
+    "ENABLED": config("ORG_CLAIMS_JWT_ENABLED", default=False, cast=bool),
+    "MAX_ORGS": config("ORG_CLAIMS_JWT_MAX_ORGS", default=50, cast=int),
+    "VERSION_CACHE": "default",
+    "VERSION_CACHE_TTL_S": config("ORG_CLAIMS_JWT_VERSION_CACHE_TTL_S", default=5, cast=int),
+}
+
+# Кэш membership (user, X-ORG-ID) -> (org pk, role) между запросами.
+# BACKEND: alias из CACHES (общий кэш для всех воркеров); пусто = process-local LRU.
+ORG_MEMBERSHIP_CACHE = {
+    "ENABLED": config("ORG_MEMBERSHIP_CACHE_ENABLED", default=True, cast=bool),
+    "MAX_SIZE": config("ORG_MEMBERSHIP_CACHE_MAX_SIZE", default=10000, cast=int),
+    "TTL_S": config("ORG_MEMBERSHIP_CACHE_TTL_S", default=30, cast=int),
+    "BACKEND": config("ORG_MEMBERSHIP_CACHE_BACKEND", default=""),
+}
+
+# Блокировки склада в pay/cancel (apps/orders/logic/stock.py):
+# NOWAIT-попытки перед обычным FOR UPDATE и повтор use-case при 40P01/40001.
+STOCK_LOCKING = {
+    "NOWAIT_ATTEMPTS": config("STOCK_LOCKING_NOWAIT_ATTEMPTS", default=3, cast=int),
+    "RETRY_ATTEMPTS": config("STOCK_LOCKING_RETRY_ATTEMPTS", default=5, cast=int),
+    "BACKOFF_BASE_S": config("STOCK_LOCKING_BACKOFF_BASE_S", default=0.01, cast=float),
+    "BACKOFF_MAX_S": config("STOCK_LOCKING_BACKOFF_MAX_S", default=0.2, cast=float),
+}
+
+# Резервы склада под draft-заказы (apps/orders/logic/reservations.py): позиция резервирует qty на TTL_S,
+# pay_order списывает резерв без row-lock на Product. Истёкшие удаляет expire_stock_reservations.
+STOCK_RESERVATIONS = {
+    "ENABLED": config("STOCK_RESERVATIONS_ENABLED", default=False, cast=bool),
+    "TTL_S": config("STOCK_RESERVATIONS_TTL_S", default=900, cast=int),
+}
+
+# Ledger склада (apps/products/stock_ledger.py): снимки берутся на момент now - SNAPSHOT_LAG_S,
+# чтобы не пропустить движения ещё не закоммиченных транзакций.
+STOCK_LEDGER = {
+    "SNAPSHOT_LAG_S": config("STOCK_LEDGER_SNAPSHOT_LAG_S", default=300, cast=int),
+}
+
+# Двухфазный authorize (apps/payments/logic/authorize_payment.py): платёж в authorizing дольше
+# INFLIGHT_LEASE_S считается зависшим и перезапускается recover_payment_authorizations.
+PAYMENT_AUTHORIZE = {
+    "INFLIGHT_LEASE_S": config("PAYMENT_AUTHORIZE_INFLIGHT_LEASE_S", default=60, cast=int),
+}
+
+# Провайдеры платежей (apps/payments/providers/registry.py): лимит одновременных вызовов,
+# таймаут вызова, keep-alive пул; ключ — OrderPayment.provider, "default" — для всех.
+# Это значения по умолчанию: настройка org — PaymentProviderConfig (перекрывает "default").
+PAYMENT_PROVIDERS = {
+    "default": {
+        "CONCURRENCY": config("PAYMENT_PROVIDER_CONCURRENCY", default=16, cast=int),
+        "TIMEOUT_S": config("PAYMENT_PROVIDER_TIMEOUT_S", default=10, cast=float),
+        "POOL_SIZE": config("PAYMENT_PROVIDER_POOL_SIZE", default=8, cast=int),
+        # circuit breaker: окно WINDOW_S, open при >= MIN_CALLS вызовов и доле ошибок ERROR_RATE
+        # (или медленных, дольше SLOW_CALL_S, — SLOW_RATE); через OPEN_S — HALF_OPEN_PROBES пробных
+        "BREAKER_WINDOW_S": config("PAYMENT_PROVIDER_BREAKER_WINDOW_S", default=60, cast=float),
+        "BREAKER_MIN_CALLS": config("PAYMENT_PROVIDER_BREAKER_MIN_CALLS", default=20, cast=int),
+        "BREAKER_ERROR_RATE": config("PAYMENT_PROVIDER_BREAKER_ERROR_RATE", default=0.5, cast=float),
+        "BREAKER_SLOW_CALL_S": config("PAYMENT_PROVIDER_BREAKER_SLOW_CALL_S", default=5, cast=float),
+        "BREAKER_SLOW_RATE": config("PAYMENT_PROVIDER_BREAKER_SLOW_RATE", default=0.8, cast=float),
+        "BREAKER_OPEN_S": config("PAYMENT_PROVIDER_BREAKER_OPEN_S", default=30, cast=float),
+        "BREAKER_HALF_OPEN_PROBES": config("PAYMENT_PROVIDER_BREAKER_HALF_OPEN_PROBES", default=3, cast=int),
+        # adaptive timeout: min(TIMEOUT_S, max(TIMEOUT_MIN_S, p99 * TIMEOUT_P99_FACTOR))
+        "ADAPTIVE_TIMEOUT": config("PAYMENT_PROVIDER_ADAPTIVE_TIMEOUT", default=True, cast=bool),
+        "TIMEOUT_P99_FACTOR": config("PAYMENT_PROVIDER_TIMEOUT_P99_FACTOR", default=2.0, cast=float),
+        "TIMEOUT_MIN_S": config("PAYMENT_PROVIDER_TIMEOUT_MIN_S", default=0.5, cast=float),
+    },
+    "manual": {"KIND": "manual"},
+    "http": {
+        "KIND": "http",
+        "BASE_URL": config("PAYMENT_HTTP_PROVIDER_URL", default="http://127.0.0.1:8099"),
+    },
+}
+
+# create_payment: недавно виденные (org, idempotency_key) -> pk платежа (process-local, TTL_S).
+PAYMENT_IDEMPOTENCY_CACHE = {
+    "ENABLED": config("PAYMENT_IDEMPOTENCY_CACHE_ENABLED", default=True, cast=bool),
+    "MAX_SIZE": config("PAYMENT_IDEMPOTENCY_CACHE_MAX_SIZE", default=10000, cast=int),
+    "TTL_S": config("PAYMENT_IDEMPOTENCY_CACHE_TTL_S", default=10, cast=int),
+}
+
+# Кэш экземпляров провайдеров по (org, provider): MAX_SIZE записей (LRU), версия конфигурации
+# перечитывается раз в CONFIG_TTL_S (hot reload в других процессах), таймаут health check.
+PAYMENT_PROVIDER_REGISTRY = {
+    "MAX_SIZE": config("PAYMENT_PROVIDER_REGISTRY_MAX_SIZE", default=1000, cast=int),
+    "CONFIG_TTL_S": config("PAYMENT_PROVIDER_REGISTRY_CONFIG_TTL_S", default=30, cast=int),
+    "HEALTH_TIMEOUT_S": config("PAYMENT_PROVIDER_HEALTH_TIMEOUT_S", default=2, cast=float),
+}
+
+# Очередь webhook'ов провайдеров (apps/payments/logic/webhooks.py): воркер берёт BATCH_SIZE событий,
+# повтор через BACKOFF_BASE_S * 2^(n-1) (не больше BACKOFF_MAX_S), после MAX_ATTEMPTS — dead letter.
+# Подпись обязательна — WEBHOOK_SECRET в options PaymentProviderConfig org'а или в PAYMENT_PROVIDERS[code]
+# (HMAC-SHA256 тела в X-Webhook-Signature); провайдер без секрета webhook'и не принимает (403).
+PAYMENT_WEBHOOKS = {
+    "BATCH_SIZE": config("PAYMENT_WEBHOOKS_BATCH_SIZE", default=100, cast=int),
+    "MAX_ATTEMPTS": config("PAYMENT_WEBHOOKS_MAX_ATTEMPTS", default=8, cast=int),
+    "BACKOFF_BASE_S": config("PAYMENT_WEBHOOKS_BACKOFF_BASE_S", default=5, cast=float),
+    "BACKOFF_MAX_S": config("PAYMENT_WEBHOOKS_BACKOFF_MAX_S", default=3600, cast=float),
+    "POLL_INTERVAL_S": config("PAYMENT_WEBHOOKS_POLL_INTERVAL_S", default=1, cast=float),
 }
 
 
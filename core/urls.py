@@ -27,6 +27,7 @@ urlpatterns = [
     path("api/v1/partners/", include("apps.partners.urls")),
     path("api/v1/", include("apps.products.urls")),
     path("api/v1/", include("apps.orders.urls")),
+    path("api/v1/payments/", include("apps.payments.urls")),
 
 
 ]
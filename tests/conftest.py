@@ -1,5 +1,4 @@
 # tests/conftest.py
-import uuid
 import pytest
 from django.contrib.auth import get_user_model
 
@@ -8,6 +7,39 @@ from django.contrib.auth import get_user_model
 JWT_LOGIN_URL = "/api/v1/auth/login/"  # поменяй, если у тебя другой
 
 
+@pytest.fixture(autouse=True)
+def reset_membership_cache():
+    """
+    Membership-кэш живёт в процессе между тестами — сбрасываем, чтобы тесты не зависели от порядка.
+    Имя без "_" — иначе star-import в корневом conftest.py не донесёт фикстуру до apps/*/tests.
+    """
+    from config.orgs.membership_cache import get_membership_cache
+
+    cache = get_membership_cache()
+    if cache is not None:
+        cache.clear()
+        cache.reset_stats()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def fake_payment_provider(settings, monkeypatch):
+    """
+    FakeProvider всегда одобряет — в production registry его нет.
+    Тесты/benchmark'и подключают kind "fake" и provider "fake" здесь.
+
+    Имя без "_": корневой conftest.py делает `from tests.conftest import *`,
+    а star-import пропускает приватные имена — фикстура не дошла бы до apps/*/tests и benchmarks.
+    """
+    from apps.payments.models import PaymentProviderConfig
+    from apps.payments.providers import registry
+    from apps.payments.providers.fake import build_fake_provider
+
+    monkeypatch.setitem(registry.PROVIDER_KINDS, PaymentProviderConfig.Kind.FAKE, build_fake_provider)
+    settings.PAYMENT_PROVIDERS = {**settings.PAYMENT_PROVIDERS, "fake": {"KIND": "fake"}}
+    yield
+
+
 @pytest.fixture
 def user_factory(db):
     """
@@ -0,0 +1,159 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def org_claims_enabled(settings):
+    settings.ORG_CLAIMS_JWT = {
+        "ENABLED": True,
+        "MAX_ORGS": 50,
+        "VERSION_CACHE": "default",
+        "VERSION_CACHE_TTL_S": 5,
+    }
+
+
+def _queries_to(queries, table: str) -> int:
+    return sum(1 for q in queries if f'FROM "{table}"' in q["sql"])
+
+
+def _access(client) -> AccessToken:
+    return AccessToken(client.defaults["HTTP_AUTHORIZATION"].split()[1])
+
+
+def _relogin(client, user):
+    """
+    Фикстуры *_client логинятся ДО создания membership — перевыпускаем токен, чтобы claims включали org.
+    """
+    resp = client.post(
+        "/api/v1/auth/login/",
+        data={"email": user.email, "password": "pass12345"},
+        content_type="application/json",
+    )
+    assert resp.status_code == 200, resp.content
+    client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {resp.json()['access']}"
+    return client
+
+
+def test_login_issues_org_claims_when_enabled(org_claims_enabled, admin_client):
+    client, user, org = admin_client
+    _relogin(client, user)
+
+    token = _access(client)
+
+    # только public_id org и роль — внутренних pk в токене нет
+    assert token["orgs"] == {str(org.public_id): {"r": "admin"}}
+    assert "omv" in token.payload
+
+
+def test_login_without_org_claims_by_default(admin_client):
+    client, user, org = admin_client
+
+    assert "orgs" not in _access(client).payload
+
+
+def test_read_path_authorized_without_user_and_membership_queries(org_claims_enabled, member_client):
+    client, user, org = member_client
+    _relogin(client, user)
+    client.get("/api/v1/orders/")  # прогреваем cache версии membership
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get("/api/v1/orders/")
+
+    assert resp.status_code == 200
+    assert _queries_to(ctx.captured_queries, "users_user") == 0
+    assert _queries_to(ctx.captured_queries, "orgs_organizationmember") == 0
+    assert _queries_to(ctx.captured_queries, "orgs_organization") == 0
+
+
+def test_read_path_with_cold_membership_cache_resolves_pks_in_db(org_claims_enabled, member_client):
+    from config.orgs.membership_cache import get_membership_cache
+
+    client, user, org = member_client
+    _relogin(client, user)
+    client.get("/api/v1/orders/")
+    get_membership_cache().clear()
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get("/api/v1/orders/")
+
+    assert resp.status_code == 200
+    assert _queries_to(ctx.captured_queries, "orgs_organizationmember") == 1
+    assert _queries_to(ctx.captured_queries, "users_user") == 0
+
+
+def test_write_path_still_checks_role_in_db(org_claims_enabled, member_client):
+    client, user, org = member_client
+    _relogin(client, user)
+
+    resp = client.post("/api/v1/orders/", data={}, content_type="application/json")
+
+    assert resp.status_code == 403
+
+
+def test_role_change_makes_claims_stale_and_forces_db_recheck(org_claims_enabled, admin_client):
+    from config.orgs.models import OrganizationMember
+
+    client, user, org = admin_client
+    _relogin(client, user)
+
+    membership = OrganizationMember.objects.get(org=org, user=user)
+    membership.role = OrganizationMember.ROLE_MEMBER
+    membership.save(update_fields=["role"])
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get("/api/v1/orders/").status_code == 200
+    assert _queries_to(ctx.captured_queries, "orgs_organizationmember") == 1
+
+    # в токене всё ещё "admin", но запись проверяется по актуальной роли
+    assert client.post("/api/v1/orders/", data={}, content_type="application/json").status_code == 403
+
+
+def test_removed_member_loses_read_access_despite_claims(org_claims_enabled, member_client):
+    from config.orgs.models import OrganizationMember
+
+    client, user, org = member_client
+    _relogin(client, user)
+    assert client.get("/api/v1/orders/").status_code == 200
+
+    OrganizationMember.objects.get(org=org, user=user).delete()
+
+    assert client.get("/api/v1/orders/").status_code == 403
+
+
+def test_deactivated_user_rejected_despite_claims(org_claims_enabled, member_client):
+    client, user, org = member_client
+    _relogin(client, user)
+
+    user.is_active = False
+    user.save(update_fields=["is_active"])
+
+    assert client.get("/api/v1/orders/").status_code == 401
+
+
+def test_refresh_reissues_current_org_claims(org_claims_enabled, api_client, user_factory, org_factory, member_factory):
+    from config.orgs.models import OrganizationMember
+
+    user = user_factory(email="refresh@example.com")
+    org = org_factory(name="Refresh Org")
+    membership = member_factory(org=org, user=user, role="admin")
+
+    login = api_client.post(
+        "/api/v1/auth/login/",
+        data={"email": "refresh@example.com", "password": "pass12345"},
+        content_type="application/json",
+    ).json()
+
+    membership.role = OrganizationMember.ROLE_MEMBER
+    membership.save(update_fields=["role"])
+
+    resp = api_client.post("/api/v1/auth/refresh/", data={"refresh": login["refresh"]}, content_type="application/json")
+    assert resp.status_code == 200
+
+    token = AccessToken(resp.json()["access"])
+    assert token["orgs"][str(org.public_id)]["r"] == "member"
+    assert token["omv"] > AccessToken(login["access"])["omv"]
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+pytestmark = pytest.mark.django_db
+
+
+def _walk(client, url, *, key="next"):
+    pages = []
+    while url:
+        resp = client.get(url)
+        assert resp.status_code == 200, resp.content
+        data = resp.json()
+        pages.append(data)
+        url = data[key]
+    return pages
+
+
+def test_orders_are_paged_by_keyset_without_count(member_client, org_factory):
+    from apps.orders.models import Order
+
+    client, user, org = member_client
+    orders = [Order.objects.create(org=org) for _ in range(7)]
+    Order.objects.create(org=org_factory(name="Other Org"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        pages = _walk(client, "/api/v1/orders/?page_size=3")
+
+    assert [len(p["results"]) for p in pages] == [3, 3, 1]
+    assert [o["public_id"] for p in pages for o in p["results"]] == [str(o.public_id) for o in orders]
+    assert pages[0]["previous"] is None and pages[-1]["next"] is None
+    assert "cursor=" in pages[0]["next"] and "offset" not in pages[0]["next"]
+
+    sqls = [q["sql"] for q in ctx.captured_queries]
+    assert not any("COUNT(" in sql.upper() for sql in sqls)
+    assert not any("OFFSET" in sql.upper() for sql in sqls)
+
+    back = _walk(client, pages[-1]["previous"], key="previous")
+    assert [[o["public_id"] for o in p["results"]] for p in back] == [
+        [o["public_id"] for o in p["results"]] for p in reversed(pages[:-1])
+    ]
+    assert back[0]["next"] == pages[1]["next"]
+
+
+def test_descending_multi_column_keyset_handles_equal_timestamps(admin_client):
+    from apps.orders.models import Order, OrderStatusEvent
+
+    client, user, org = admin_client
+    order = Order.objects.create(org=org)
+    same = timezone.now()
+    events = [
+        OrderStatusEvent.objects.create(org=org, order=order, from_status="draft", to_status="paid")
+        for _ in range(5)
+    ]
+    # три события с одинаковым created_at — порядок держится на id
+    OrderStatusEvent.objects.filter(pk__in=[e.pk for e in events[:3]]).update(created_at=same)
+    OrderStatusEvent.objects.filter(pk__in=[e.pk for e in events[3:]]).update(created_at=same + timedelta(seconds=1))
+
+    pages = _walk(client, f"/api/v1/orders/{order.public_id}/status-events/?page_size=2")
+
+    expected = [events[4], events[3], events[2], events[1], events[0]]
+    assert [e["public_id"] for p in pages for e in p["results"]] == [str(e.public_id) for e in expected]
+
+
+def test_page_size_is_capped_and_bad_cursor_is_404(member_client):
+    from apps.partners.models import Partner
+
+    client, user, org = member_client
+    Partner.objects.bulk_create(Partner(org=org, name=f"P{i}") for i in range(3))
+
+    assert len(client.get("/api/v1/partners/?page_size=0").json()["results"]) == 1
+    assert len(client.get("/api/v1/partners/?page_size=100000").json()["results"]) == 3
+    assert client.get("/api/v1/partners/?cursor=not-a-cursor").status_code == 404
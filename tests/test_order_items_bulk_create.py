@@ -0,0 +1,131 @@
+import pytest
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalog(admin_client):
+    from apps.products.models import Product, Unit, TaxRate
+
+    client, user, org = admin_client
+    return {
+        "client": client,
+        "org": org,
+        "products": [Product.objects.create(org=org, name=f"P{i}") for i in range(3)],
+        "unit": Unit.objects.create(org=org, name="pcs"),
+        "tax": TaxRate.objects.create(org=org, name="VAT 20", rate=Decimal("20.00")),
+    }
+
+
+def _line(catalog, product, *, qty="1", price="1.00"):
+    return {
+        "product": str(product.public_id),
+        "qty": qty,
+        "unit": str(catalog["unit"].public_id),
+        "unit_price": price,
+        "tax_rate": str(catalog["tax"].public_id),
+    }
+
+
+def _post(catalog, order, lines):
+    return catalog["client"].post(
+        f"/api/v1/orders/{order.public_id}/items/bulk/",
+        data={"lines": lines},
+        content_type="application/json",
+    )
+
+
+def test_bulk_create_inserts_all_lines_and_recomputes_totals_once(catalog):
+    from apps.orders.models import Order, OrderItem
+
+    order = Order.objects.create(org=catalog["org"])
+    lines = [_line(catalog, p, qty="2", price="5.00") for p in catalog["products"]] * 10
+
+    # прогрев membership-кэша
+    catalog["client"].get("/api/v1/orders/")
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = _post(catalog, order, lines)
+
+    assert resp.status_code == 201, resp.content
+    assert len(resp.json()["items"]) == 30
+
+    sqls = [q["sql"] for q in ctx.captured_queries]
+    for table in ("products_product", "products_unit", "products_taxrate"):
+        assert sum(1 for sql in sqls if f'FROM "{table}"' in sql) == 1
+    assert sum(1 for sql in sqls if sql.startswith('INSERT INTO "orders_orderitem"')) == 1
+    assert sum(1 for sql in sqls if sql.startswith('UPDATE "orders_order"')) == 1
+
+    assert OrderItem.objects.filter(order=order).count() == 30
+    order.refresh_from_db()
+    assert (order.subtotal, order.tax_total, order.total) == (Decimal("300.00"), Decimal("60.00"), Decimal("360.00"))
+    assert order.recompute_totals(reconcile=True) is False
+
+
+def test_bulk_create_reports_errors_by_index_and_creates_nothing(catalog, org_factory):
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Product
+
+    order = Order.objects.create(org=catalog["org"])
+    foreign = Product.objects.create(org=org_factory(name="Other"), name="Foreign")
+    lines = [
+        _line(catalog, catalog["products"][0]),
+        _line(catalog, foreign),
+        _line(catalog, catalog["products"][1]),
+        {**_line(catalog, catalog["products"][2]), "qty": "abc"},
+    ]
+
+    resp = _post(catalog, order, lines)
+
+    # ошибки формы и ссылок — одним ответом
+    assert resp.status_code == 400
+    errors = resp.json()["lines"]
+    assert list(errors) == ["1", "3"]
+    assert errors["1"] == {"product": ["Invalid product."]}
+    assert "qty" in errors["3"]
+
+    lines[3]["qty"] = "1"
+    resp = _post(catalog, order, lines)
+
+    assert resp.status_code == 400
+    assert resp.json()["lines"] == {"1": {"product": ["Invalid product."]}}
+    assert not OrderItem.objects.filter(order=order).exists()
+
+
+def test_bulk_create_rejects_non_draft_order(catalog):
+    from apps.orders.models import Order, OrderItem
+
+    order = Order.objects.create(org=catalog["org"])
+    Order.objects.filter(pk=order.pk).update(status=Order.STATUS_CANCELLED)
+
+    resp = _post(catalog, order, [_line(catalog, catalog["products"][0])])
+
+    assert resp.status_code == 400
+    assert not OrderItem.objects.filter(order=order).exists()
+
+
+def test_bulk_create_rejects_empty_lines(catalog):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=catalog["org"])
+
+    assert _post(catalog, order, []).status_code == 400
+
+
+def test_bulk_create_forbidden_for_member(member_client):
+    from apps.orders.models import Order
+
+    client, user, org = member_client
+    order = Order.objects.create(org=org)
+
+    resp = client.post(
+        f"/api/v1/orders/{order.public_id}/items/bulk/",
+        data={"lines": []},
+        content_type="application/json",
+    )
+
+    assert resp.status_code == 403
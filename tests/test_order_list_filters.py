@@ -0,0 +1,154 @@
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+pytestmark = pytest.mark.django_db
+
+ORGS = 40
+ORDERS_PER_ORG = 300
+
+
+def _seed(orgs):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    statuses = [Order.STATUS_DRAFT, Order.STATUS_PAID, Order.STATUS_CANCELLED]
+    Order.objects.bulk_create(
+        (
+            Order(org=org, status=statuses[i % 3], total=Decimal(i % 97) * 10)
+            for org in orgs
+            for i in range(ORDERS_PER_ORG)
+        ),
+        batch_size=2000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE orders_order SET created_at = now() - (id % 365) * interval '1 day'")
+
+    paid = Order.objects.filter(status=Order.STATUS_PAID).only("id", "org_id", "status")
+    OrderPayment.objects.bulk_create(
+        (OrderPayment(org_id=o.org_id, order=o, tender="card", amount=Decimal("10.00")) for o in paid),
+        batch_size=2000,
+    )
+
+    with connection.cursor() as cursor:
+        for table in ("orders_order", "payments_orderpayment"):
+            cursor.execute(f'ANALYZE "{table}"')
+
+
+FILTERS = [
+    [None, "status=paid,cancelled"],
+    [None, "created_after={after}&created_before={before}"],
+    [None, "total_min=100&total_max=500"],
+    [None, "has_payments=true", "has_payments=false"],
+]
+SORTS = ["id", "-id", "created_at", "-created_at", "total", "-total"]
+
+
+def test_every_filter_and_sort_combination_uses_an_index(member_client):
+    from config.orgs.models import Organization
+
+    client, user, org = member_client
+    noise = Organization.objects.bulk_create(Organization(name=f"Noise {i}") for i in range(ORGS - 1))
+    _seed([org, *noise])
+
+    now = timezone.now()
+    dates = {"after": (now - timedelta(days=200)).isoformat(), "before": (now - timedelta(days=20)).isoformat()}
+
+    for combo in itertools.product(*FILTERS, SORTS):
+        *filters, sort = combo
+        query = "&".join([f.format(**dates) for f in filters if f] + [f"sort={sort}"])
+        url = "/api/v1/orders/?" + query.replace("+", "%2B")
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get(url)
+            assert resp.status_code == 200, (url, resp.content)
+
+        pages = [q["sql"] for q in ctx.captured_queries if 'FROM "orders_order"' in q["sql"] and "LIMIT" in q["sql"]]
+        assert len(pages) == 1, url
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {pages[0]}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        assert "Seq Scan" not in plan, (url, plan)
+
+
+def test_filters_narrow_the_list(member_client, org_factory):
+    from apps.orders.models import Order
+    from apps.payments.models import OrderPayment
+
+    client, user, org = member_client
+    cheap = Order.objects.create(org=org, total=Decimal("5.00"))
+    paid = Order.objects.create(org=org, status=Order.STATUS_PAID, total=Decimal("50.00"))
+    old = Order.objects.create(org=org, total=Decimal("500.00"))
+    Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+    OrderPayment.objects.create(org=org, order=paid, tender="card", amount=Decimal("50.00"))
+    Order.objects.create(org=org_factory(name="Other Org"), status=Order.STATUS_PAID)
+
+    def ids(query):
+        resp = client.get(f"/api/v1/orders/?{query}")
+        assert resp.status_code == 200, resp.content
+        return [o["public_id"] for o in resp.json()["results"]]
+
+    assert ids("status=paid") == [str(paid.public_id)]
+    assert ids("has_payments=true") == [str(paid.public_id)]
+    assert ids("has_payments=false") == [str(cheap.public_id), str(old.public_id)]
+    assert ids("total_min=10&total_max=50") == [str(paid.public_id)]
+    after = (timezone.now() - timedelta(days=1)).isoformat().replace("+", "%2B")
+    assert ids(f"created_after={after}") == [str(cheap.public_id), str(paid.public_id)]
+    assert ids("sort=-total") == [str(old.public_id), str(paid.public_id), str(cheap.public_id)]
+
+
+def test_sort_by_total_pages_with_keyset(member_client):
+    from apps.orders.models import Order
+
+    client, user, org = member_client
+    orders = [Order.objects.create(org=org, total=Decimal(i % 3)) for i in range(7)]
+
+    url, seen = "/api/v1/orders/?sort=total&page_size=2", []
+    while url:
+        data = client.get(url).json()
+        seen += [o["public_id"] for o in data["results"]]
+        url = data["next"]
+
+    expected = sorted(orders, key=lambda o: (o.total, o.pk))
+    assert seen == [str(o.public_id) for o in expected]
+
+
+def test_sparse_fieldset_narrows_response_and_select(member_client):
+    from apps.orders.models import Order
+
+    client, user, org = member_client
+    Order.objects.create(org=org, total=Decimal("12.50"))
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get("/api/v1/orders/?fields=total")
+    assert resp.status_code == 200, resp.content
+    assert resp.json()["results"] == [{"public_id": resp.json()["results"][0]["public_id"], "total": "12.50"}]
+
+    (page,) = [q["sql"] for q in ctx.captured_queries if 'FROM "orders_order"' in q["sql"]]
+    assert '"orders_order"."total"' in page
+    assert '"orders_order"."subtotal_exact"' not in page
+    assert '"orders_order"."captured_total"' not in page
+
+
+@pytest.mark.parametrize(
+    "query, field",
+    [
+        ("status=shipped", "status"),
+        ("created_after=yesterday", "created_after"),
+        ("total_min=abc", "total_min"),
+        ("has_payments=maybe", "has_payments"),
+        ("sort=subtotal_exact", "sort"),
+        ("fields=org", "fields"),
+    ],
+)
+def test_invalid_params_are_400(member_client, query, field):
+    client, user, org = member_client
+
+    resp = client.get(f"/api/v1/orders/?{query}")
+    assert resp.status_code == 400, resp.content
+    assert field in resp.json()
@@ -0,0 +1,172 @@
+import pytest
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalog(admin_client):
+    from apps.products.models import Product, Unit, TaxRate
+
+    client, user, org = admin_client
+    return {
+        "client": client,
+        "org": org,
+        "product": Product.objects.create(org=org, name="Cola"),
+        "unit": Unit.objects.create(org=org, name="pcs"),
+        "tax10": TaxRate.objects.create(org=org, name="VAT 10", rate=Decimal("10.00")),
+        "tax20": TaxRate.objects.create(org=org, name="VAT 20", rate=Decimal("20.00")),
+    }
+
+
+def _add(catalog, order, *, qty, price, tax="tax20"):
+    resp = catalog["client"].post(
+        f"/api/v1/orders/{order.public_id}/items/",
+        data={
+            "product": str(catalog["product"].public_id),
+            "qty": qty,
+            "unit": str(catalog["unit"].public_id),
+            "unit_price": price,
+            "tax_rate": str(catalog[tax].public_id),
+        },
+        content_type="application/json",
+    )
+    assert resp.status_code == 201, resp.content
+    return resp.json()["public_id"]
+
+
+def test_add_item_updates_totals_with_single_update_without_reading_lines(catalog):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=catalog["org"])
+    _add(catalog, order, qty="1", price="1.00")
+
+    with CaptureQueriesContext(connection) as ctx:
+        _add(catalog, order, qty="2", price="5.00")
+
+    sqls = [q["sql"] for q in ctx.captured_queries]
+    assert sum(1 for sql in sqls if sql.startswith('UPDATE "orders_order"')) == 1
+    assert not any("SUM(" in sql for sql in sqls)
+
+    order.refresh_from_db()
+    assert (order.subtotal, order.tax_total, order.total) == (Decimal("11.00"), Decimal("2.20"), Decimal("13.20"))
+
+
+def test_incremental_totals_keep_half_even_rounding_of_exact_sum(catalog):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=catalog["org"])
+
+    # налог по строке 0.025: half-even -> 0.02; две строки -> 0.05 (а не 0.02 + 0.02)
+    _add(catalog, order, qty="1", price="0.25", tax="tax10")
+    order.refresh_from_db()
+    assert order.tax_total == Decimal("0.02")
+
+    _add(catalog, order, qty="1", price="0.25", tax="tax10")
+    order.refresh_from_db()
+    assert order.tax_total == Decimal("0.05")
+    assert order.total == Decimal("0.55")
+
+
+def test_add_and_remove_items_match_full_recompute(catalog):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=catalog["org"])
+    ids = [
+        _add(catalog, order, qty="0.333", price="2.99", tax="tax10"),
+        _add(catalog, order, qty="1.250", price="0.99"),
+        _add(catalog, order, qty="7", price="0.01", tax="tax10"),
+    ]
+
+    resp = catalog["client"].delete(f"/api/v1/orders/{order.public_id}/items/{ids[1]}/")
+    assert resp.status_code == 204
+
+    order.refresh_from_db()
+    assert order.recompute_totals(reconcile=True) is False  # drift нет
+
+    for item_id in (ids[0], ids[2]):
+        catalog["client"].delete(f"/api/v1/orders/{order.public_id}/items/{item_id}/")
+    order.refresh_from_db()
+    assert (order.subtotal, order.tax_total, order.total) == (Decimal("0.00"),) * 3
+
+
+def test_cannot_remove_item_from_non_draft_order(catalog):
+    from apps.orders.models import Order, OrderItem
+
+    order = Order.objects.create(org=catalog["org"])
+    item_id = _add(catalog, order, qty="1", price="1.00")
+    Order.objects.filter(pk=order.pk).update(status=Order.STATUS_PAID)
+
+    resp = catalog["client"].delete(f"/api/v1/orders/{order.public_id}/items/{item_id}/")
+
+    assert resp.status_code == 400
+    assert OrderItem.objects.filter(public_id=item_id).exists()
+
+
+def test_stale_order_save_does_not_overwrite_incremental_totals(catalog):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=catalog["org"])
+    _add(catalog, order, qty="1", price="1.00")
+    stale = Order.objects.get(pk=order.pk)
+
+    _add(catalog, order, qty="2", price="5.00")
+    stale.save()
+
+    order.refresh_from_db()
+    assert (order.subtotal, order.tax_total, order.total) == (Decimal("11.00"), Decimal("2.20"), Decimal("13.20"))
+    assert order.recompute_totals(reconcile=True) is False
+
+
+def test_recompute_totals_reconcile_repairs_drift(catalog):
+    from apps.orders.models import Order
+
+    order = Order.objects.create(org=catalog["org"])
+    _add(catalog, order, qty="2", price="5.00")
+    Order.objects.filter(pk=order.pk).update(total=Decimal("999.00"))
+
+    assert order.recompute_totals(save=True, reconcile=True) is True
+
+    order.refresh_from_db()
+    assert order.total == Decimal("12.00")
+    assert order.recompute_totals(save=True, reconcile=True) is False
+
+
+def test_reconcile_order_totals_command_detects_and_repairs_in_batches(catalog, org_factory):
+    from apps.orders.models import Order
+
+    orders = [Order.objects.create(org=catalog["org"]) for _ in range(5)]
+    for order in orders:
+        _add(catalog, order, qty="1", price="10.00")
+
+    Order.objects.filter(pk__in=[orders[1].pk, orders[4].pk]).update(subtotal=Decimal("0.00"), total=Decimal("1.00"))
+    other_org_order = Order.objects.create(org=org_factory(name="Other"), total=Decimal("5.00"))
+
+    out = StringIO()
+    call_command("reconcile_order_totals", "--org", str(catalog["org"].public_id), "--batch-size", "2", "--dry-run", stdout=out)
+    assert "Checked 5 orders, found 2" in out.getvalue()
+    orders[1].refresh_from_db()
+    assert orders[1].total == Decimal("1.00")
+
+    out = StringIO()
+    call_command("reconcile_order_totals", "--org", str(catalog["org"].public_id), "--batch-size", "2", stdout=out)
+    assert "Checked 5 orders, repaired 2" in out.getvalue()
+
+    for order in orders:
+        order.refresh_from_db()
+        assert (order.subtotal, order.total) == (Decimal("10.00"), Decimal("12.00"))
+
+    other_org_order.refresh_from_db()
+    assert other_org_order.total == Decimal("5.00")
+
+
+def test_reconcile_order_totals_command_rejects_malformed_org_id():
+    from django.core.management.base import CommandError
+
+    with pytest.raises(CommandError, match="Organization not-a-uuid not found"):
+        call_command("reconcile_order_totals", "--org", "not-a-uuid", stdout=StringIO())
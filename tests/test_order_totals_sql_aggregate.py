@@ -0,0 +1,102 @@
+import pytest
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+def _python_totals(order):
+    """
+    Эталон: прежний построчный подсчёт в Python.
+    """
+    subtotal = Decimal("0.00")
+    tax_total = Decimal("0.00")
+    for it in order.items.select_related("tax_rate").all():
+        line_base = it.qty * it.unit_price
+        subtotal += line_base
+        tax_total += line_base * it.tax_rate.rate / Decimal("100")
+    subtotal = subtotal.quantize(Decimal("0.01"))
+    tax_total = tax_total.quantize(Decimal("0.01"))
+    return subtotal, tax_total, (subtotal + tax_total).quantize(Decimal("0.01"))
+
+
+@pytest.fixture
+def order_with_refs(org_factory):
+    from apps.orders.models import Order
+    from apps.products.models import Unit, TaxRate
+
+    org = org_factory(name="Totals Org")
+    order = Order.objects.create(org=org)
+    unit = Unit.objects.create(org=org, name="kg")
+    taxes = [
+        TaxRate.objects.create(org=org, name="VAT 20", rate=Decimal("20.00")),
+        TaxRate.objects.create(org=org, name="VAT 10", rate=Decimal("10.00")),
+        TaxRate.objects.create(org=org, name="VAT 19.5", rate=Decimal("19.50")),
+        TaxRate.objects.create(org=org, name="VAT 0", rate=Decimal("0.00")),
+    ]
+    return order, unit, taxes
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        # subtotal = 0.005 -> half-even даёт 0.00 (ROUND() в Postgres дал бы 0.01)
+        [("0.005", "1.00", 3)],
+        # subtotal = 0.015 -> 0.02, tax = 0.0015 -> 0.00
+        [("0.015", "1.00", 1)],
+        # tax = 0.025 -> 0.02, tax = 0.035 -> 0.04 (half-even)
+        [("1.000", "0.25", 1)],
+        [("1.000", "0.35", 1)],
+        [("2.000", "5.00", 0), ("0.333", "2.99", 1), ("1.250", "0.99", 2), ("7.000", "0.01", 3)],
+        [("999.999", "12345.67", 2), ("0.001", "0.01", 0)],
+    ],
+)
+def test_sql_aggregate_matches_per_line_python_semantics(order_with_refs, lines):
+    from apps.orders.models import OrderItem
+
+    order, unit, taxes = order_with_refs
+    for qty, price, tax_idx in lines:
+        OrderItem.objects.create(
+            order=order,
+            product_name="X",
+            qty=Decimal(qty),
+            unit=unit,
+            unit_price=Decimal(price),
+            tax_rate=taxes[tax_idx],
+        )
+
+    order.recompute_totals()
+
+    assert (order.subtotal, order.tax_total, order.total) == _python_totals(order)
+
+
+def test_recompute_totals_empty_order_is_zero(order_with_refs):
+    order, unit, taxes = order_with_refs
+
+    order.recompute_totals(save=True)
+    order.refresh_from_db()
+
+    assert (order.subtotal, order.tax_total, order.total) == (Decimal("0.00"),) * 3
+
+
+def test_recompute_totals_save_uses_one_aggregate_and_one_update(order_with_refs):
+    from apps.orders.models import Order, OrderItem
+
+    order, unit, taxes = order_with_refs
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product_name=f"P{i}", qty=Decimal("1.000"), unit=unit,
+                  unit_price=Decimal("1.10"), tax_rate=taxes[0])
+        for i in range(50)
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        order.recompute_totals(save=True)
+
+    assert len(ctx.captured_queries) == 2
+
+    fresh = Order.objects.get(pk=order.pk)
+    assert fresh.subtotal == Decimal("55.00")
+    assert fresh.tax_total == Decimal("11.00")
+    assert fresh.total == Decimal("66.00")
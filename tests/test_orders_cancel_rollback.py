@@ -83,22 +83,14 @@ def test_cancel_order_rolls_back_stock_if_error_occurs_midway(admin_client, monk
     assert product_b.stock_qty == Decimal("7.000")
 
     # ----------------------------------------
-    # Monkeypatch: ломаем сохранение второго продукта
+    # Monkeypatch: ломаем запись после возврата склада
     # ----------------------------------------
-    original_save = Product.save
-    calls = {"count": 0}
-
+    # Склад возвращается одним UPDATE по всем продуктам,
+    # следующая запись — смена статуса заказа: она и падает.
     def exploding_save(self, *args, **kwargs):
-        """
-        Первый save проходит (вернём stock product_a).
-        Второй save падает исключением (на product_b).
-        """
-        calls["count"] += 1
-        if calls["count"] == 2:
-            raise RuntimeError("DB write failed")
-        return original_save(self, *args, **kwargs)
-
-    monkeypatch.setattr(Product, "save", exploding_save)
+        raise RuntimeError("DB write failed")
+
+    monkeypatch.setattr(Order, "save", exploding_save)
 
     # ----------------------------------------
     # Act: пытаемся отменить (ожидаем исключение)
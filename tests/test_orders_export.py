@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+def _body(resp):
+    assert resp.status_code == 200, resp.content
+    return b"".join(resp.streaming_content).decode()
+
+
+def _make_orders(org, n, *, items=2):
+    from apps.orders.models import Order, OrderItem
+    from apps.payments.models import OrderPayment
+    from apps.products.models import TaxRate, Unit
+
+    unit, _ = Unit.objects.get_or_create(org=org, name="pcs")
+    tax, _ = TaxRate.objects.get_or_create(org=org, name="VAT 20", defaults={"rate": Decimal("20.00")})
+    orders = Order.objects.bulk_create(Order(org=org) for _ in range(n))
+    OrderItem.objects.bulk_create(
+        OrderItem(order=o, product_name=f"Item {i}", qty=Decimal("2.000"), unit=unit, unit_price=Decimal("1.50"),
+                  tax_rate=tax)
+        for o in orders
+        for i in range(items)
+    )
+    OrderPayment.objects.bulk_create(
+        OrderPayment(org=org, order=o, tender="card", amount=Decimal("3.60"), external_id=f"ext-{o.pk}")
+        for o in orders
+    )
+    return orders
+
+
+def test_csv_export_streams_orders_with_items_and_payments(member_client, org_factory):
+    client, user, org = member_client
+    orders = _make_orders(org, 2)
+    _make_orders(org_factory(name="Other Org"), 1)
+
+    resp = client.get("/api/v1/orders/export/?format=csv")
+    assert resp["Content-Type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(_body(resp))))
+
+    assert [r["record"] for r in rows] == ["order", "item", "item", "payment"] * 2
+    assert [r["order_id"] for r in rows[:4]] == [str(orders[0].public_id)] * 4
+    item, payment = rows[1], rows[3]
+    assert (item["product_name"], item["qty"], item["unit"], item["unit_price"], item["tax_rate"]) == (
+        "Item 0", "2.000", "pcs", "1.50", "20.00",
+    )
+    assert (payment["tender"], payment["amount"], payment["status"], payment["product_name"]) == (
+        "card", "3.60", "pending", "",
+    )
+
+
+def test_jsonl_export_applies_list_filters(member_client):
+    from apps.orders.models import Order
+
+    client, user, org = member_client
+    _make_orders(org, 3, items=1)
+    paid = Order.objects.create(org=org, status=Order.STATUS_PAID)
+
+    resp = client.get("/api/v1/orders/export/?format=jsonl&status=paid")
+    assert resp["Content-Type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in _body(resp).splitlines()]
+
+    assert records == [
+        {
+            "record": "order",
+            "order_id": str(paid.public_id),
+            "id": str(paid.public_id),
+            "status": "paid",
+            "subtotal": "0.00",
+            "tax_total": "0.00",
+            "total": "0.00",
+            "captured_total": "0.00",
+            "refunded_total": "0.00",
+            "created_at": records[0]["created_at"],
+            "updated_at": records[0]["updated_at"],
+        }
+    ]
+
+
+def test_export_query_count_does_not_grow_with_orders(member_client):
+    client, user, org = member_client
+    # первый запрос заполняет кэш членства — меряем только "тёплые"
+    _body(client.get("/api/v1/orders/export/?format=jsonl"))
+
+    def queries(n):
+        _make_orders(org, n)
+        with CaptureQueriesContext(connection) as ctx:
+            _body(client.get("/api/v1/orders/export/?format=jsonl"))
+        return len(ctx.captured_queries)
+
+    assert queries(3) == queries(30)
+
+
+def test_export_rejects_unknown_format(member_client):
+    client, user, org = member_client
+
+    resp = client.get("/api/v1/orders/export/?format=xlsx")
+    assert resp.status_code == 400, resp.content
+    assert "format" in resp.json()
+
+
+def test_export_command_writes_file(org_factory, tmp_path):
+    org = org_factory(name="Export Org")
+    _make_orders(org, 5, items=3)
+    path = tmp_path / "orders.jsonl"
+
+    err = io.StringIO()
+    call_command("export_orders", "--org", str(org.public_id), "--output", str(path), "--chunk-size", "2", stderr=err)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 5 * (1 + 3 + 1)
+    assert "Exported 5 orders, 15 items, 5 payments." in err.getvalue()
+
+
+def test_export_command_rejects_malformed_org_id(tmp_path):
+    from django.core.management.base import CommandError
+
+    with pytest.raises(CommandError, match="Organization not-a-uuid not found"):
+        call_command("export_orders", "--org", "not-a-uuid", "--output", str(tmp_path / "orders.csv"))
@@ -63,16 +63,12 @@ def test_pay_order_rolls_back_stock_if_error_occurs_midway(admin_client, monkeyp
     # NEW: без captured payment мы не дойдём до списания -> monkeypatch не сработает
     seed_captured_payment(order)
 
-    original_save = Product.save
-    calls = {"count": 0}
-
+    # Склад списывается одним UPDATE по всем продуктам,
+    # следующая запись — смена статуса заказа: ломаем её (склад уже списан).
     def exploding_save(self, *args, **kwargs):
-        calls["count"] += 1
-        if calls["count"] == 2:
-            raise RuntimeError("DB write failed")
-        return original_save(self, *args, **kwargs)
+        raise RuntimeError("DB write failed")
 
-    monkeypatch.setattr(Product, "save", exploding_save)
+    monkeypatch.setattr(Order, "save", exploding_save)
 
     with pytest.raises(RuntimeError, match="DB write failed"):
         client.patch(
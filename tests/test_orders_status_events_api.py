@@ -69,7 +69,7 @@ def test_order_status_events_list_returns_events_for_order(admin_client):
     )
     assert resp.status_code == 200, resp.content
 
-    data = resp.json()
+    data = resp.json()["results"]
     assert isinstance(data, list)
     assert len(data) >= 1
 
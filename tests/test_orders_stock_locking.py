@@ -1,11 +1,27 @@
-# tests/test_orders_stock_locking.py
+import random
+import threading
+import time
+from decimal import Decimal
 
 import pytest
-from decimal import Decimal
+from django.db import OperationalError, connection, connections, transaction
+
+from tests.conftest import create_captured_payment_for_order
+
+
+def _db_error(pg_error_cls):
+    exc = OperationalError("boom")
+    exc.__cause__ = pg_error_cls()
+    return exc
 
 
 @pytest.mark.django_db
-def test_pay_order_locks_products_rows_select_for_update(admin_client, monkeypatch):
+@pytest.mark.parametrize(
+    "nowait_attempts, lock_clause",
+    [(3, "FOR UPDATE NOWAIT"), (0, "FOR UPDATE")],
+    ids=["nowait", "blocking"],
+)
+def test_pay_order_locks_products_rows_select_for_update(admin_client, settings, nowait_attempts, lock_clause):
     """
     GIVEN:
         - Заказ draft
@@ -16,23 +32,22 @@ def test_pay_order_locks_products_rows_select_for_update(admin_client, monkeypat
         - Вызываем use-case pay_order(order=order)
 
     THEN:
-        - Во время оплаты должен использоваться row-level lock:
-          Product.objects.select_for_update()
+        - Во время оплаты строки Product лочатся row-level lock'ом (lock_products_stock):
+          сначала FOR UPDATE NOWAIT, при NOWAIT_ATTEMPTS=0 — сразу обычный FOR UPDATE
     """
 
     # ----------------------------------------
     # Arrange
     # ----------------------------------------
     client, user, org = admin_client
+    settings.STOCK_LOCKING = {"NOWAIT_ATTEMPTS": nowait_attempts}
 
+    from django.test.utils import CaptureQueriesContext
     from apps.orders.logic.pay_order import pay_order
     from apps.orders.models import Order, OrderItem
     from apps.products.models import Product, Unit, TaxRate
 
-    # Создаём заказ
     order = Order.objects.create(org=org)
-
-    # Создаём продукт и справочники
     product = Product.objects.create(
         org=org,
         name="Cola",
@@ -58,28 +73,201 @@ def test_pay_order_locks_products_rows_select_for_update(admin_client, monkeypat
         unit_price=Decimal("3.50"),
         tax_rate=tax,
     )
-
-    # ----------------------------------------
-    # Monkeypatch: отслеживаем вызов select_for_update
-    # ----------------------------------------
-    called = {"value": False}
-
-    original = Product.objects.select_for_update
-
-    def wrapped_select_for_update(*args, **kwargs):
-        # Фиксируем факт row-lock
-        called["value"] = True
-        return original(*args, **kwargs)
-
-    monkeypatch.setattr(Product.objects, "select_for_update", wrapped_select_for_update, raising=False)
+    order.recompute_totals(save=True)
+    create_captured_payment_for_order(org=org, order=order)
 
     # ----------------------------------------
     # Act
     # ----------------------------------------
-    paid = pay_order(order=order)
+    with CaptureQueriesContext(connection) as ctx:
+        paid = pay_order(order=order)
 
     # ----------------------------------------
     # Assert
     # ----------------------------------------
     assert paid.status == Order.STATUS_PAID
-    assert called["value"] is True
+    product_locks = [
+        q["sql"] for q in ctx.captured_queries
+        if "FOR UPDATE" in q["sql"] and f'FROM "{Product._meta.db_table}"' in q["sql"]
+    ]
+    assert len(product_locks) == 1
+    assert product_locks[0].rstrip().endswith(lock_clause)
+    product.refresh_from_db()
+    assert product.stock_qty == Decimal("8.000")
+
+
+def test_retry_on_lock_conflict_repeats_deadlock_with_bounded_attempts(settings):
+    from psycopg import errors as pg_errors
+    from apps.orders.logic import stock
+
+    settings.STOCK_LOCKING = {"RETRY_ATTEMPTS": 3, "BACKOFF_BASE_S": 0, "BACKOFF_MAX_S": 0}
+    calls = {"count": 0}
+
+    @stock.retry_on_lock_conflict
+    def flaky():
+        calls["count"] += 1
+        if calls["count"] < 3:
+            raise _db_error(pg_errors.DeadlockDetected if calls["count"] == 1 else pg_errors.SerializationFailure)
+        return "ok"
+
+    assert flaky() == "ok"
+    assert calls["count"] == 3
+
+    calls["count"] = -10
+    with pytest.raises(OperationalError):
+        flaky()
+    assert calls["count"] == -7  # 3 попытки и сдаёмся
+
+
+def test_retry_on_lock_conflict_does_not_retry_other_errors(settings):
+    from psycopg import errors as pg_errors
+    from apps.orders.logic import stock
+
+    settings.STOCK_LOCKING = {"RETRY_ATTEMPTS": 5, "BACKOFF_BASE_S": 0, "BACKOFF_MAX_S": 0}
+    calls = {"count": 0}
+
+    @stock.retry_on_lock_conflict
+    def failing():
+        calls["count"] += 1
+        raise _db_error(pg_errors.QueryCanceled)
+
+    with pytest.raises(OperationalError):
+        failing()
+    assert calls["count"] == 1
+
+
+@pytest.mark.django_db
+def test_retry_on_lock_conflict_does_not_retry_inside_outer_transaction(settings):
+    from psycopg import errors as pg_errors
+    from apps.orders.logic import stock
+
+    settings.STOCK_LOCKING = {"RETRY_ATTEMPTS": 5, "BACKOFF_BASE_S": 0, "BACKOFF_MAX_S": 0}
+    calls = {"count": 0}
+
+    @stock.retry_on_lock_conflict
+    def failing():
+        calls["count"] += 1
+        raise _db_error(pg_errors.DeadlockDetected)
+
+    # внешняя транзакция уже aborted — повтор только внутри неё бессмысленен
+    with pytest.raises(OperationalError):
+        failing()
+    assert calls["count"] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lock_products_stock_falls_back_to_blocking_lock_after_nowait_attempts(org_factory, settings):
+    from apps.orders.logic.stock import lock_products_stock
+    from apps.products.models import Product
+
+    settings.STOCK_LOCKING = {"NOWAIT_ATTEMPTS": 2, "BACKOFF_BASE_S": 0.01, "BACKOFF_MAX_S": 0.01}
+    org = org_factory(name="Lock Org")
+    product = Product.objects.create(org=org, name="Hot", stock_qty=Decimal("5"))
+
+    locked = threading.Event()
+
+    def holder():
+        try:
+            with transaction.atomic():
+                Product.objects.select_for_update().get(pk=product.pk)
+                locked.set()
+                time.sleep(0.3)
+        finally:
+            connection.close()
+
+    t = threading.Thread(target=holder)
+    t.start()
+    locked.wait(5)
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        assert lock_products_stock([product.pk]) == {product.pk: Decimal("5.000")}
+        waited = time.perf_counter() - started
+
+    t.join()
+    assert waited > 0.1  # NOWAIT не взял lock -> дождались обычным FOR UPDATE
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    "locking",
+    [
+        # только упорядоченный FOR UPDATE, без NOWAIT и ретраев: сам порядок lock'ов не даёт deadlock
+        {"NOWAIT_ATTEMPTS": 0, "RETRY_ATTEMPTS": 1},
+        {"NOWAIT_ATTEMPTS": 3, "RETRY_ATTEMPTS": 5, "BACKOFF_BASE_S": 0.005, "BACKOFF_MAX_S": 0.05},
+    ],
+    ids=["ordered-blocking", "nowait-with-retry"],
+)
+def test_concurrent_pay_and_cancel_on_hot_skus_never_deadlock_or_oversell(org_factory, settings, locking):
+    """
+    Stress: несколько потоков-"касс" оплачивают пересекающиеся корзины из одних и тех же
+    горячих SKU (позиции добавлены в разном порядке), часть оплаченных сразу отменяют.
+    Ожидаем: ни одной ошибки БД (deadlock), склад сходится и не уходит в минус.
+    """
+    from rest_framework.exceptions import ValidationError
+    from apps.orders.logic.cancel_order import cancel_order
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Product, Unit, TaxRate
+
+    settings.STOCK_LOCKING = locking
+    threads_n, orders_per_thread = 6, 8
+    org = org_factory(name="Stress Org")
+    unit = Unit.objects.create(org=org, name="pcs")
+    tax = TaxRate.objects.create(org=org, name="VAT 0", rate=Decimal("0.00"))
+    hot = [Product.objects.create(org=org, name=f"HOT{i}", stock_qty=Decimal("20")) for i in range(4)]
+
+    rnd = random.Random(8)
+    plans = []
+    for _ in range(threads_n):
+        orders = []
+        for _ in range(orders_per_thread):
+            basket = rnd.sample(hot, k=rnd.randint(2, len(hot)))  # разный порядок позиций
+            order = Order.objects.create(org=org)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=p, product_name=p.name, qty=Decimal("1"), unit=unit,
+                          unit_price=Decimal("1.00"), tax_rate=tax)
+                for p in basket
+            )
+            order.recompute_totals(save=True)
+            create_captured_payment_for_order(org=org, order=order)
+            orders.append((order, rnd.random() < 0.4))
+        plans.append(orders)
+
+    errors = []
+    rejected = []
+    barrier = threading.Barrier(threads_n)
+
+    def cashier(orders):
+        try:
+            barrier.wait()
+            for order, then_cancel in orders:
+                try:
+                    paid = pay_order(order=order)
+                except ValidationError:
+                    rejected.append(order.pk)  # Insufficient stock — допустимо
+                    continue
+                if then_cancel:
+                    cancel_order(order=paid)
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=cashier, args=(orders,)) for orders in plans]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+
+    assert errors == []
+    assert rejected  # склада хватает не всем — горячие SKU реально распроданы
+
+    for product in hot:
+        sold = sum(
+            OrderItem.objects.filter(product=product, order__status=Order.STATUS_PAID).values_list("qty", flat=True),
+            Decimal("0"),
+        )
+        product.refresh_from_db()
+        assert product.stock_qty >= 0
+        assert product.stock_qty == Decimal("20") - sold
@@ -0,0 +1,186 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tests.conftest import create_captured_payment_for_order
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def shop(admin_client, settings):
+    from apps.products.models import Product, Unit, TaxRate
+
+    settings.STOCK_RESERVATIONS = {"ENABLED": True, "TTL_S": 900}
+    client, user, org = admin_client
+    return {
+        "client": client,
+        "org": org,
+        "cola": Product.objects.create(org=org, name="Cola", stock_qty=Decimal("5")),
+        "unit": Unit.objects.create(org=org, name="pcs"),
+        "tax": TaxRate.objects.create(org=org, name="VAT 0", rate=Decimal("0.00")),
+    }
+
+
+def _add(shop, order, qty, product="cola"):
+    return shop["client"].post(
+        f"/api/v1/orders/{order.public_id}/items/",
+        data={
+            "product": str(shop[product].public_id),
+            "qty": qty,
+            "unit": str(shop["unit"].public_id),
+            "unit_price": "1.00",
+            "tax_rate": str(shop["tax"].public_id),
+        },
+        content_type="application/json",
+    )
+
+
+def _new_order(shop):
+    from apps.orders.models import Order
+
+    return Order.objects.create(org=shop["org"])
+
+
+def test_adding_items_reserves_stock_and_blocks_overbooking(shop):
+    from apps.orders.logic.reservations import available_to_sell
+
+    basket_a, basket_b = _new_order(shop), _new_order(shop)
+
+    assert _add(shop, basket_a, "3").status_code == 201
+    assert available_to_sell(shop["cola"].id) == Decimal("2.000")
+
+    resp = _add(shop, basket_b, "3")
+    assert resp.status_code == 400
+    assert resp.json() == {"order": "Insufficient stock."}
+    assert not basket_b.items.exists()  # позиция откатилась вместе с резервом
+
+    assert _add(shop, basket_b, "2").status_code == 201
+    with CaptureQueriesContext(connection) as ctx:
+        assert available_to_sell(shop["cola"].id) == Decimal("0.000")
+    assert len(ctx.captured_queries) == 1
+
+
+def test_pay_converts_reservation_without_locking_product_row(shop):
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import StockReservation
+
+    order = _new_order(shop)
+    _add(shop, order, "2")
+    _add(shop, order, "1")
+    create_captured_payment_for_order(org=shop["org"], order=order)
+
+    with CaptureQueriesContext(connection) as ctx:
+        pay_order(order=order)
+
+    assert not any(
+        'FROM "products_product"' in q["sql"] and "FOR UPDATE" in q["sql"] for q in ctx.captured_queries
+    )
+    shop["cola"].refresh_from_db()
+    assert shop["cola"].stock_qty == Decimal("2.000")
+    assert not StockReservation.objects.filter(order=order).exists()
+
+
+def test_unreserved_pay_respects_other_baskets_reservations(shop, settings):
+    from rest_framework.exceptions import ValidationError
+    from apps.orders.logic.pay_order import pay_order
+
+    settings.STOCK_RESERVATIONS = {"ENABLED": False}
+    walk_in = _new_order(shop)
+    _add(shop, walk_in, "2")  # до включения резервов — без резерва
+
+    settings.STOCK_RESERVATIONS = {"ENABLED": True, "TTL_S": 900}
+    basket = _new_order(shop)
+    _add(shop, basket, "4")
+    create_captured_payment_for_order(org=shop["org"], order=walk_in)
+
+    with pytest.raises(ValidationError) as exc:
+        pay_order(order=walk_in)
+    assert exc.value.detail == {"order": "Insufficient stock."}
+
+
+def test_cancel_draft_and_item_delete_release_reservations(shop):
+    from apps.orders.logic.cancel_draft_order import cancel_draft_order
+    from apps.orders.logic.reservations import available_to_sell
+
+    order = _new_order(shop)
+    item_id = _add(shop, order, "2").json()["public_id"]
+    _add(shop, order, "1")
+    assert available_to_sell(shop["cola"].id) == Decimal("2.000")
+
+    shop["client"].delete(f"/api/v1/orders/{order.public_id}/items/{item_id}/")
+    assert available_to_sell(shop["cola"].id) == Decimal("4.000")
+
+    cancel_draft_order(order=order)
+    assert available_to_sell(shop["cola"].id) == Decimal("5.000")
+
+
+def test_expired_holds_are_ignored_and_swept_in_batches(shop):
+    from apps.orders.logic.reservations import available_to_sell
+    from apps.orders.models import StockReservation
+
+    orders = [_new_order(shop) for _ in range(5)]
+    for order in orders:
+        _add(shop, order, "1")
+    StockReservation.objects.filter(order__in=orders[:3]).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert available_to_sell(shop["cola"].id) == Decimal("3.000")
+
+    out = StringIO()
+    call_command("expire_stock_reservations", "--batch-size", "2", stdout=out)
+    assert "Expired 3 stock reservations." in out.getvalue()
+    assert StockReservation.objects.count() == 2
+
+
+def test_pay_with_expired_hold_fails_if_stock_was_sold_meanwhile(shop):
+    from rest_framework.exceptions import ValidationError
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order, StockReservation
+
+    late = _new_order(shop)
+    _add(shop, late, "5")
+    StockReservation.objects.filter(order=late).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    quick = _new_order(shop)
+    _add(shop, quick, "4")
+    create_captured_payment_for_order(org=shop["org"], order=quick)
+    pay_order(order=quick)
+
+    create_captured_payment_for_order(org=shop["org"], order=late)
+    with pytest.raises(ValidationError):
+        pay_order(order=late)
+
+    assert Order.objects.get(pk=late.pk).status == Order.STATUS_DRAFT
+    shop["cola"].refresh_from_db()
+    assert shop["cola"].stock_qty == Decimal("1.000")
+
+
+def test_bulk_lines_reserve_in_one_batch(shop):
+    from apps.orders.models import StockReservation
+
+    order = _new_order(shop)
+    line = {
+        "product": str(shop["cola"].public_id),
+        "qty": "2",
+        "unit": str(shop["unit"].public_id),
+        "unit_price": "1.00",
+        "tax_rate": str(shop["tax"].public_id),
+    }
+
+    resp = shop["client"].post(
+        f"/api/v1/orders/{order.public_id}/items/bulk/", data={"lines": [line] * 3}, content_type="application/json"
+    )
+    assert resp.status_code == 400  # 6 > 5
+    assert not StockReservation.objects.exists()
+
+    resp = shop["client"].post(
+        f"/api/v1/orders/{order.public_id}/items/bulk/", data={"lines": [line] * 2}, content_type="application/json"
+    )
+    assert resp.status_code == 201
+    assert StockReservation.objects.filter(order=order).count() == 2
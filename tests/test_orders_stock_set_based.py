@@ -0,0 +1,93 @@
+import pytest
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_captured_payment_for_order
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def big_order(admin_client):
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Product, Unit, TaxRate
+
+    client, user, org = admin_client
+    unit = Unit.objects.create(org=org, name="pcs")
+    tax = TaxRate.objects.create(org=org, name="VAT 0", rate=Decimal("0.00"))
+    products = [
+        Product.objects.create(org=org, name=f"P{i}", stock_qty=Decimal("10.000")) for i in range(25)
+    ]
+
+    order = Order.objects.create(org=org)
+    # по две строки на продукт: qty должна суммироваться по product
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=p, product_name=p.name, qty=Decimal(qty), unit=unit,
+                  unit_price=Decimal("1.00"), tax_rate=tax)
+        for p in products
+        for qty in ("1.500", "0.250")
+    )
+    order.recompute_totals(save=True)
+    create_captured_payment_for_order(org=org, order=order)
+    return order, products
+
+
+def _stock(products):
+    from apps.products.models import Product
+
+    return list(Product.objects.filter(id__in=[p.id for p in products]).order_by("id").values_list("stock_qty", flat=True))
+
+
+def test_pay_and_cancel_write_stock_with_one_grouped_select_and_one_update(big_order):
+    from apps.orders.logic.cancel_order import cancel_order
+    from apps.orders.logic.pay_order import pay_order
+
+    order, products = big_order
+
+    with CaptureQueriesContext(connection) as ctx:
+        order = pay_order(order=order)
+
+    sqls = [q["sql"] for q in ctx.captured_queries]
+    assert sum(1 for sql in sqls if 'FROM "orders_orderitem"' in sql) == 1
+    assert sum(1 for sql in sqls if sql.startswith('UPDATE "products_product"')) == 1
+    assert _stock(products) == [Decimal("8.250")] * len(products)
+
+    with CaptureQueriesContext(connection) as ctx:
+        cancel_order(order=order)
+
+    sqls = [q["sql"] for q in ctx.captured_queries]
+    assert sum(1 for sql in sqls if 'FROM "orders_orderitem"' in sql) == 1
+    assert sum(1 for sql in sqls if sql.startswith('UPDATE "products_product"')) == 1
+    assert _stock(products) == [Decimal("10.000")] * len(products)
+
+
+def test_pay_locks_products_in_id_order(big_order):
+    from apps.orders.logic.pay_order import pay_order
+
+    order, products = big_order
+
+    with CaptureQueriesContext(connection) as ctx:
+        pay_order(order=order)
+
+    lock_sqls = [q["sql"] for q in ctx.captured_queries if 'FROM "products_product"' in q["sql"] and "FOR UPDATE" in q["sql"]]
+    assert len(lock_sqls) == 1
+    assert lock_sqls[0].endswith("ORDER BY 1 ASC FOR UPDATE NOWAIT")  # ORDER BY id
+
+
+def test_pay_insufficient_stock_on_one_product_changes_nothing(big_order):
+    from rest_framework.exceptions import ValidationError
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order
+    from apps.products.models import Product
+
+    order, products = big_order
+    Product.objects.filter(pk=products[-1].pk).update(stock_qty=Decimal("1.749"))
+
+    with pytest.raises(ValidationError) as exc:
+        pay_order(order=order)
+
+    assert exc.value.detail == {"order": "Insufficient stock."}
+    assert Order.objects.get(pk=order.pk).status == Order.STATUS_DRAFT
+    assert _stock(products[:-1]) == [Decimal("10.000")] * (len(products) - 1)
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+ORGS = 40
+ROWS_PER_ORG = 300
+
+
+def _seed(orgs):
+    from apps.orders.models import Order
+    from apps.partners.models import Partner
+    from apps.products.models import TaxRate, Unit
+    from config.orgs.models import OrgNote
+
+    archived = lambda i: "archived" if i % 10 == 0 else "active"  # noqa: E731
+    for model, build in (
+        (Order, lambda org, i: Order(org=org)),
+        (Partner, lambda org, i: Partner(org=org, name=f"P{i}", status=archived(i))),
+        (Unit, lambda org, i: Unit(org=org, name=f"U{i}", status=archived(i))),
+        (TaxRate, lambda org, i: TaxRate(org=org, name=f"T{i}", rate=Decimal("20.00"), status=archived(i))),
+        (OrgNote, lambda org, i: OrgNote(org=org, title=f"N{i}")),
+    ):
+        model.objects.bulk_create((build(org, i) for org in orgs for i in range(ROWS_PER_ORG)), batch_size=2000)
+
+    with connection.cursor() as cursor:
+        for table in ("orders_order", "partners_partner", "products_unit", "products_taxrate", "orgs_orgnote"):
+            cursor.execute(f'ANALYZE "{table}"')
+
+
+@pytest.mark.parametrize(
+    "url, table, index",
+    [
+        ("/api/v1/orders/", "orders_order", "order_org_id_idx"),
+        ("/api/v1/partners/", "partners_partner", "partner_org_id_idx"),
+        ("/api/v1/units/", "products_unit", "unit_org_id_idx"),
+        ("/api/v1/tax-rates/", "products_taxrate", "taxrate_org_id_idx"),
+        ("/api/v1/orgs/notes/", "orgs_orgnote", "orgnote_org_created_idx"),
+    ],
+)
+def test_list_endpoint_page_query_uses_org_index(member_client, org_factory, url, table, index):
+    from config.orgs.models import Organization
+
+    client, user, org = member_client
+    noise = Organization.objects.bulk_create(Organization(name=f"Noise {i}") for i in range(ORGS - 1))
+    _seed([org, *noise])
+
+    with CaptureQueriesContext(connection) as ctx:
+        first = client.get(url)
+        assert first.status_code == 200, first.content
+        # страница в глубине списка — тот же план (keyset), без OFFSET
+        deep = client.get(first.json()["next"])
+        assert deep.status_code == 200, deep.content
+
+    pages = [q["sql"] for q in ctx.captured_queries if f'FROM "{table}"' in q["sql"] and "LIMIT" in q["sql"]]
+    assert len(pages) == 2
+    for sql in pages:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        assert index in plan, plan
+        assert "Seq Scan" not in plan, plan
+
+
+@pytest.mark.parametrize("table", ["orders_order", "partners_partner", "products_unit", "products_taxrate", "orgs_orgnote"])
+def test_single_column_org_index_is_dropped(table):
+    # индекс FK org_id — префикс составного: с ним планировщик выбирает org_id + Sort
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    assert not [name for name, c in constraints.items() if c["index"] and c["columns"] == ["org_id"]]
@@ -0,0 +1,159 @@
+import pytest
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+def _member_queries(queries) -> int:
+    return sum(1 for q in queries if 'FROM "orgs_organizationmember"' in q["sql"])
+
+
+def _login_client(email: str, org, password: str = "pass12345") -> Client:
+    client = Client()
+    resp = client.post(
+        "/api/v1/auth/login/",
+        data={"email": email, "password": password},
+        content_type="application/json",
+    )
+    assert resp.status_code == 200, resp.content
+    client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {resp.json()['access']}"
+    client.defaults["HTTP_X_ORG_ID"] = str(org.public_id)
+    return client
+
+
+def test_second_request_served_from_membership_cache(member_client):
+    from config.orgs.membership_cache import get_membership_cache
+
+    client, user, org = member_client
+
+    assert client.get("/api/v1/orders/").status_code == 200
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get("/api/v1/orders/").status_code == 200
+
+    assert _member_queries(ctx.captured_queries) == 0
+    stats = get_membership_cache().stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+
+def test_org_context_returns_full_org_on_cache_hit(member_client):
+    client, user, org = member_client
+
+    client.get("/api/v1/orgs/context/")
+    resp = client.get("/api/v1/orgs/context/")
+
+    assert resp.status_code == 200
+    assert resp.json()["name"] == org.name
+
+
+def test_demotion_through_member_detail_api_takes_effect_immediately(owner_client, user_factory, member_factory):
+    owner, owner_user, org = owner_client
+
+    admin_user = user_factory(email="second-admin@example.com")
+    membership = member_factory(org=org, user=admin_user, role="admin")
+    admin = _login_client("second-admin@example.com", org)
+
+    # прогреваем кэш ролью admin
+    assert admin.post("/api/v1/orders/", data={}, content_type="application/json").status_code == 201
+
+    resp = owner.patch(
+        f"/api/v1/orgs/members/{membership.id}/",
+        data={"role": "member"},
+        content_type="application/json",
+    )
+    assert resp.status_code == 200
+
+    assert admin.post("/api/v1/orders/", data={}, content_type="application/json").status_code == 403
+
+
+def test_removal_through_member_detail_api_takes_effect_immediately(owner_client, user_factory, member_factory):
+    owner, owner_user, org = owner_client
+
+    user = user_factory(email="removed@example.com")
+    membership = member_factory(org=org, user=user, role="member")
+    removed = _login_client("removed@example.com", org)
+
+    assert removed.get("/api/v1/orders/").status_code == 200
+
+    assert owner.delete(f"/api/v1/orgs/members/{membership.id}/").status_code == 204
+
+    assert removed.get("/api/v1/orders/").status_code == 403
+
+
+def test_membership_change_invalidates_cache_again_after_commit(
+    member_client, django_capture_on_commit_callbacks
+):
+    from django.db import transaction
+    from config.orgs.membership_cache import CachedMembership, get_membership_cache
+    from config.orgs.models import OrganizationMember
+
+    client, user, org = member_client
+    cache = get_membership_cache()
+    membership = OrganizationMember.objects.get(org=org, user=user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            membership.role = "admin"
+            membership.save(update_fields=["role"])
+            # параллельный запрос до commit видит в БД ещё старую роль и кэширует её
+            cache.set(user.pk, str(org.public_id), CachedMembership(membership.pk, org.pk, "member"))
+
+    assert cache.get(user.pk, str(org.public_id)) is None
+
+
+def test_org_delete_invalidates_shared_backend_entries(member_client, monkeypatch, django_capture_on_commit_callbacks):
+    from config.orgs import membership_cache as mc
+    from config.orgs.models import OrganizationMember
+
+    client, user, org = member_client
+    # общий backend (Django cache): clear() его не трогает, сбросить можно только по ключу
+    shared = mc.MembershipCache(max_size=10, ttl_s=30, backend_alias="default")
+    monkeypatch.setattr(mc, "_cache", shared)
+    membership = OrganizationMember.objects.get(org=org, user=user)
+    org_public_id = str(org.public_id)
+    shared.set(user.pk, org_public_id, mc.CachedMembership(membership.pk, org.pk, membership.role))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        org.delete()
+
+    assert shared.get(user.pk, org_public_id) is None
+
+
+def test_lru_evicts_least_recently_used_and_expires_by_ttl(monkeypatch):
+    from config.orgs import membership_cache as mc
+
+    cache = mc.MembershipCache(max_size=2, ttl_s=10)
+    cache.set(1, "a", mc.CachedMembership(member_id=1, org_id=1, role="owner"))
+    cache.set(2, "a", mc.CachedMembership(member_id=2, org_id=1, role="member"))
+
+    assert cache.get(1, "a") is not None  # 1 становится "свежим"
+    cache.set(3, "a", mc.CachedMembership(member_id=3, org_id=1, role="member"))
+
+    assert cache.get(2, "a") is None
+    assert cache.get(3, "a").role == "member"
+
+    now = mc.time.monotonic()
+    monkeypatch.setattr(mc.time, "monotonic", lambda: now + 11)
+    assert cache.get(1, "a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["size"] == 1
+
+
+def test_membership_cache_stats_endpoint_is_staff_only(auth_client):
+    client, user = auth_client(email="ops@example.com")
+    assert client.get("/api/v1/orgs/membership-cache/stats/").status_code == 403
+
+    user.is_staff = True
+    user.save(update_fields=["is_staff"])
+
+    resp = client.get("/api/v1/orgs/membership-cache/stats/")
+    assert resp.status_code == 200
+    assert resp.json()["enabled"] is True
+    assert {"hits", "misses", "size"} <= set(resp.json())
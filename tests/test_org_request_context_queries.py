@@ -0,0 +1,55 @@
+import pytest
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+
+def _count(queries, table: str) -> int:
+    return sum(1 for q in queries if f'FROM "{table}"' in q["sql"])
+
+
+def test_add_order_item_resolves_org_membership_once(admin_client):
+    """
+    POST /orders/<id>/items/ проходит через permission, serializer.validate и view.get_order,
+    но membership + org (X-ORG-ID) должны резолвиться одним запросом на весь request.
+    """
+    client, user, org = admin_client
+
+    from apps.orders.models import Order
+    from apps.products.models import Product, Unit, TaxRate
+
+    order = Order.objects.create(org=org)
+    product = Product.objects.create(org=org, name="Burger", status=Product.STATUS_ACTIVE)
+    unit = Unit.objects.create(org=org, name="pcs", status=Unit.STATUS_ACTIVE)
+    tax = TaxRate.objects.create(org=org, name="VAT 20", rate=Decimal("20.00"), status=TaxRate.STATUS_ACTIVE)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.post(
+            f"/api/v1/orders/{order.public_id}/items/",
+            data={
+                "product": str(product.public_id),
+                "qty": "1",
+                "unit": str(unit.public_id),
+                "unit_price": "5.00",
+                "tax_rate": str(tax.public_id),
+            },
+            content_type="application/json",
+        )
+
+    assert resp.status_code == 201, resp.content
+    assert _count(ctx.captured_queries, "orgs_organizationmember") == 1
+    assert _count(ctx.captured_queries, "orgs_organization") == 0
+    assert _count(ctx.captured_queries, "orders_order") == 1
+
+
+def test_write_denied_for_member_role_uses_cached_membership(member_client):
+    client, user, org = member_client
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.post("/api/v1/orders/", data={}, content_type="application/json")
+
+    assert resp.status_code == 403
+    assert _count(ctx.captured_queries, "orgs_organizationmember") == 1
@@ -23,7 +23,7 @@ def test_org_note_list_is_scoped_by_x_org_id(auth_client, org_factory, member_fa
     
     resp = client.get("/api/v1/orgs/notes/")
     assert resp.status_code == 200
-    data = resp.json()
+    data = resp.json()["results"]
     assert len(data) == 1
     assert data[0]["title"] == "A"
 
@@ -0,0 +1,107 @@
+import io
+from decimal import Decimal
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/v1/products/import/"
+
+
+def _upload(client, content: str, name="catalog.csv"):
+    return client.post(URL, {"file": SimpleUploadedFile(name, content.encode(), content_type="text/csv")})
+
+
+def test_import_creates_updates_and_reports_row_errors(admin_client, org_factory):
+    from apps.products.models import Product, StockMovement
+
+    client, user, org = admin_client
+    kept = Product.objects.create(org=org, name="Kept", stock_qty=Decimal("5.000"))
+    changed = Product.objects.create(org=org, name="Changed", stock_qty=Decimal("5.000"))
+    archived = Product.objects.create(org=org, name="New", status=Product.STATUS_ARCHIVED)
+    Product.objects.create(org=org_factory(name="Other Org"), name="New", stock_qty=Decimal("1.000"))
+
+    resp = _upload(
+        client,
+        "name,stock_qty\n"
+        "New,10\n"
+        "Kept,\n"
+        "Changed,7.5\n"
+        ",3\n"
+        "New,1\n"
+        "Bad qty,-1\n"
+        "No stock,\n",
+    )
+    assert resp.status_code == 201, resp.content
+    data = resp.json()
+    assert (data["rows"], data["created"], data["updated"], data["unchanged"], data["failed"]) == (7, 2, 1, 1, 3)
+
+    new = Product.objects.get(org=org, name="New", status=Product.STATUS_ACTIVE)
+    assert new.pk != archived.pk and new.stock_qty == Decimal("10.000")
+    assert Product.objects.get(org=org, name="No stock").stock_qty == Decimal("0.000")
+    kept.refresh_from_db()
+    changed.refresh_from_db()
+    assert kept.stock_qty == Decimal("5.000")
+    assert changed.stock_qty == Decimal("7.500")
+
+    # ledger сходится со stock_qty: opening для нового, adjustment на разницу для изменённого
+    assert list(StockMovement.objects.filter(product=new).values_list("reason", "delta")) == [
+        ("opening", Decimal("10.000"))
+    ]
+    assert list(StockMovement.objects.filter(product=changed).order_by("id").values_list("reason", "delta")) == [
+        ("opening", Decimal("5.000")),
+        ("adjustment", Decimal("2.500")),
+    ]
+
+    errors = client.get(data["errors_url"])
+    assert errors.status_code == 200
+    assert b"".join(errors.streaming_content).decode().splitlines() == [
+        "line,name,error",
+        "5,,name is required",
+        "6,New,duplicate name (first at line 2)",
+        "7,Bad qty,stock_qty must be a non-negative number with up to 3 decimals",
+    ]
+
+
+def test_import_is_admin_only(member_client):
+    from apps.products.models import Product
+
+    client, user, org = member_client
+    assert _upload(client, "name\nA\n").status_code == 403
+    assert not Product.objects.exists()
+
+
+def test_import_requires_name_column(admin_client):
+    client, user, org = admin_client
+    resp = _upload(client, "sku,qty\nA,1\n")
+    assert resp.status_code == 400, resp.content
+    assert "file" in resp.json()
+
+
+def test_import_leaves_sharded_stock_alone(admin_client):
+    from apps.products.models import Product
+
+    client, user, org = admin_client
+    Product.objects.create(org=org, name="Hot", stock_qty=Decimal("100.000"), stock_shard_count=4)
+
+    data = _upload(client, "name,stock_qty\nHot,1\n").json()
+    assert (data["updated"], data["failed"]) == (0, 1)
+    assert Product.objects.get(org=org, name="Hot").stock_qty == Decimal("100.000")
+
+
+def test_import_command(org_factory, tmp_path):
+    from apps.products.models import Product
+
+    org = org_factory(name="Catalog Org")
+    path = tmp_path / "catalog.csv"
+    path.write_text("name\n" + "".join(f"SKU {i}\n" for i in range(1000)) + "SKU 1\n")
+    errors = tmp_path / "errors.csv"
+
+    out = io.StringIO()
+    call_command("import_products", str(path), "--org", str(org.public_id), "--errors", str(errors), stdout=out)
+
+    assert Product.objects.filter(org=org).count() == 1000
+    assert "1001 rows, created 1000, updated 0, unchanged 0, failed 1" in out.getvalue()
+    assert errors.read_text().splitlines()[1] == "1002,SKU 1,duplicate name (first at line 3)"
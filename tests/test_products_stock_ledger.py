@@ -0,0 +1,155 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tests.conftest import create_captured_payment_for_order
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def shop(admin_client):
+    from apps.products.models import Product, Unit, TaxRate
+
+    client, user, org = admin_client
+    return {
+        "client": client,
+        "org": org,
+        "cola": Product.objects.create(org=org, name="Cola", stock_qty=Decimal("10")),
+        "chips": Product.objects.create(org=org, name="Chips", stock_qty=Decimal("5")),
+        "unit": Unit.objects.create(org=org, name="pcs"),
+        "tax": TaxRate.objects.create(org=org, name="VAT 0", rate=Decimal("0.00")),
+    }
+
+
+def _paid_order(shop, lines):
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order, OrderItem
+
+    order = Order.objects.create(org=shop["org"])
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=p, product_name=p.name, qty=Decimal(qty), unit=shop["unit"],
+                  unit_price=Decimal("1.00"), tax_rate=shop["tax"])
+        for p, qty in lines
+    )
+    order.recompute_totals(save=True)
+    create_captured_payment_for_order(org=shop["org"], order=order)
+    return pay_order(order=order)
+
+
+def test_pay_and_cancel_append_movements_with_one_insert(shop):
+    from apps.orders.logic.cancel_order import cancel_order
+    from apps.products.models import StockMovement
+
+    with CaptureQueriesContext(connection) as ctx:
+        order = _paid_order(shop, [(shop["cola"], "2"), (shop["cola"], "1"), (shop["chips"], "4")])
+    assert sum(1 for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "products_stockmovement"')) == 1
+
+    cancel_order(order=order)
+
+    rows = list(StockMovement.objects.filter(order=order).order_by("id").values_list("product_id", "delta", "reason"))
+    assert rows == [
+        (shop["cola"].id, Decimal("-3.000"), "sale"),
+        (shop["chips"].id, Decimal("-4.000"), "sale"),
+        (shop["cola"].id, Decimal("3.000"), "sale_cancel"),
+        (shop["chips"].id, Decimal("4.000"), "sale_cancel"),
+    ]
+
+
+def test_ledger_stock_matches_stock_qty_and_supports_as_of(shop):
+    from apps.products.stock_ledger import stock_as_of
+
+    before = timezone.now()
+    _paid_order(shop, [(shop["cola"], "2")])
+    _paid_order(shop, [(shop["cola"], "3"), (shop["chips"], "1")])
+
+    for key in ("cola", "chips"):
+        shop[key].refresh_from_db()
+        assert stock_as_of(shop[key].id) == shop[key].stock_qty
+
+    assert stock_as_of(shop["cola"].id, before) == Decimal("10.000")
+
+
+def test_snapshots_do_not_change_result_and_query_stays_single(shop, settings):
+    from apps.products.models import StockMovement, StockSnapshot
+    from apps.products.stock_ledger import stock_as_of
+
+    settings.STOCK_LEDGER = {"SNAPSHOT_LAG_S": 0}
+    cola = shop["cola"]
+    _paid_order(shop, [(cola, "2")])
+
+    out = StringIO()
+    call_command("snapshot_stock", "--org", str(shop["org"].public_id), stdout=out)
+    assert "Created 2 stock snapshots" in out.getvalue()
+    snapshot = StockSnapshot.objects.get(product=cola)
+    assert snapshot.qty == Decimal("8.000")
+
+    # движения до снимка больше не читаются: "подделаем" старое — результат не изменится
+    StockMovement.objects.filter(product=cola, created_at__lte=snapshot.taken_at).update(delta=Decimal("999"))
+    _paid_order(shop, [(cola, "1")])
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert stock_as_of(cola.id) == Decimal("7.000")
+    assert len(ctx.captured_queries) == 1
+
+    # без новых движений повторный снимок не пишется
+    call_command("snapshot_stock", "--org", str(shop["org"].public_id), "--min-movements", "2", stdout=StringIO())
+    assert StockSnapshot.objects.filter(product=cola).count() == 1
+
+
+def test_take_stock_snapshots_counts_only_inserted_rows(shop):
+    from apps.products.models import StockSnapshot
+    from apps.products.stock_ledger import take_stock_snapshots
+
+    _paid_order(shop, [(shop["cola"], "2")])
+    at = timezone.now()
+
+    assert take_stock_snapshots(org=shop["org"], at=at, min_movements=0) == 2
+    # снимки на тот же момент уже есть (как при параллельном запуске) — ничего не вставлено
+    assert take_stock_snapshots(org=shop["org"], at=at, min_movements=0) == 0
+    assert StockSnapshot.objects.filter(org=shop["org"], taken_at=at).count() == 2
+
+
+def test_snapshot_command_rejects_malformed_org_id():
+    from django.core.management.base import CommandError
+
+    with pytest.raises(CommandError, match="Organization not-a-uuid not found"):
+        call_command("snapshot_stock", "--org", "not-a-uuid", stdout=StringIO())
+
+
+def test_stock_movement_is_append_only(shop):
+    from django.core.exceptions import ValidationError
+    from apps.products.models import StockMovement
+
+    movement = StockMovement.objects.filter(product=shop["cola"]).get()
+    assert movement.reason == StockMovement.REASON_OPENING
+
+    movement.delta = Decimal("1")
+    with pytest.raises(ValidationError):
+        movement.save()
+
+
+def test_stock_as_of_api(shop, org_factory):
+    from apps.products.models import Product
+
+    before = timezone.now() - timedelta(microseconds=1)
+    _paid_order(shop, [(shop["cola"], "4")])
+    url = f"/api/v1/products/{shop['cola'].public_id}/stock/"
+
+    resp = shop["client"].get(url)
+    assert resp.status_code == 200
+    assert resp.json()["stock_qty"] == "6.000"
+
+    resp = shop["client"].get(url, {"as_of": before.isoformat()})
+    assert resp.json()["stock_qty"] == "10.000"
+
+    assert shop["client"].get(url, {"as_of": "yesterday"}).status_code == 400
+
+    foreign = Product.objects.create(org=org_factory(name="Other"), name="Foreign", stock_qty=Decimal("1"))
+    assert shop["client"].get(f"/api/v1/products/{foreign.public_id}/stock/").status_code == 404
@@ -0,0 +1,180 @@
+import threading
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_captured_payment_for_order
+
+
+def _shard(org, *, stock, shards):
+    from apps.products.models import Product
+
+    product = Product.objects.create(org=org, name=f"Hot {stock}/{shards}", stock_qty=Decimal(stock))
+    call_command(
+        "rebalance_stock_shards", "--org", str(org.public_id), "--product", str(product.public_id),
+        "--shards", str(shards), stdout=StringIO(),
+    )
+    product.refresh_from_db()
+    return product
+
+
+def _shard_qtys(product):
+    return list(product.stock_shards.order_by("shard_no").values_list("qty", flat=True))
+
+
+def _order(org, lines):
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Unit, TaxRate
+
+    unit, _ = Unit.objects.get_or_create(org=org, name="pcs")
+    tax, _ = TaxRate.objects.get_or_create(org=org, name="VAT 0", defaults={"rate": Decimal("0.00")})
+    order = Order.objects.create(org=org)
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=p, product_name=p.name, qty=Decimal(qty), unit=unit,
+                  unit_price=Decimal("1.00"), tax_rate=tax)
+        for p, qty in lines
+    )
+    order.recompute_totals(save=True)
+    create_captured_payment_for_order(org=org, order=order)
+    return order
+
+
+@pytest.mark.django_db
+def test_rebalance_command_switches_mode_and_splits_stock_evenly(org_factory):
+    from apps.products.models import ProductStockShard
+
+    org = org_factory(name="Shard Org")
+    product = _shard(org, stock="10.001", shards=4)
+
+    assert product.stock_shard_count == 4
+    assert _shard_qtys(product) == [Decimal("2.501"), Decimal("2.500"), Decimal("2.500"), Decimal("2.500")]
+
+    ProductStockShard.objects.filter(product=product, shard_no=0).update(qty=Decimal("0"))
+    call_command("rebalance_stock_shards", "--org", str(org.public_id), stdout=StringIO())
+    product.refresh_from_db()
+    assert product.stock_qty == Decimal("7.500")
+    assert _shard_qtys(product) == [Decimal("1.875")] * 4
+
+    call_command(
+        "rebalance_stock_shards", "--org", str(org.public_id), "--product", str(product.public_id),
+        "--shards", "0", stdout=StringIO(),
+    )
+    product.refresh_from_db()
+    assert (product.stock_shard_count, product.stock_qty) == (0, Decimal("7.500"))
+    assert not ProductStockShard.objects.filter(product=product).exists()
+
+
+@pytest.mark.django_db
+def test_rebalance_command_rejects_malformed_ids(org_factory):
+    from django.core.management.base import CommandError
+
+    org = org_factory(name="Shard Org")
+
+    with pytest.raises(CommandError, match="Organization not-a-uuid not found"):
+        call_command("rebalance_stock_shards", "--org", "not-a-uuid", stdout=StringIO())
+    with pytest.raises(CommandError, match="Product not-a-uuid not found"):
+        call_command("rebalance_stock_shards", "--org", str(org.public_id), "--product", "not-a-uuid", stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_pay_sharded_product_falls_back_across_shards_without_locking_product_row(org_factory, django_capture_on_commit_callbacks):
+    from apps.orders.logic.pay_order import pay_order
+    from apps.products.models import ProductStockShard
+
+    org = org_factory(name="Shard Org")
+    product = _shard(org, stock="8", shards=4)
+    ProductStockShard.objects.filter(product=product, shard_no__in=[0, 1]).update(qty=Decimal("0.500"))
+    order = _order(org, [(product, "4.5")])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with CaptureQueriesContext(connection) as ctx:
+            pay_order(order=order)
+
+    assert not any(
+        'FROM "products_product"' in q["sql"] and "FOR UPDATE" in q["sql"] and "SKIP LOCKED" not in q["sql"]
+        for q in ctx.captured_queries
+    )
+    assert sum(_shard_qtys(product)) == Decimal("0.500")
+    assert min(_shard_qtys(product)) >= 0
+
+    product.refresh_from_db()
+    assert product.stock_qty == Decimal("0.500")  # кэш пересчитан после commit
+
+
+@pytest.mark.django_db
+def test_pay_sharded_insufficient_stock_changes_nothing_and_cancel_restocks(org_factory):
+    from rest_framework.exceptions import ValidationError
+    from apps.orders.logic.cancel_order import cancel_order
+    from apps.orders.logic.pay_order import pay_order
+    from apps.products.models import Product
+
+    org = org_factory(name="Shard Org")
+    product = _shard(org, stock="3", shards=3)
+    plain = Product.objects.create(org=org, name="Plain", stock_qty=Decimal("5"))
+
+    with pytest.raises(ValidationError) as exc:
+        pay_order(order=_order(org, [(plain, "1"), (product, "3.001")]))
+    assert exc.value.detail == {"order": "Insufficient stock."}
+    assert _shard_qtys(product) == [Decimal("1.000")] * 3
+
+    order = pay_order(order=_order(org, [(plain, "1"), (product, "2")]))
+    assert sum(_shard_qtys(product)) == Decimal("1.000")
+    plain.refresh_from_db()
+    assert plain.stock_qty == Decimal("4.000")
+
+    cancel_order(order=order)
+    assert sum(_shard_qtys(product)) == Decimal("3.000")
+    plain.refresh_from_db()
+    assert plain.stock_qty == Decimal("5.000")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_checkout_on_sharded_hot_sku_never_oversells(org_factory):
+    """
+    Stress: много касс продают один горячий sharded SKU; заказов больше, чем остатка.
+    Продано ровно столько, сколько было, ни один шард не ушёл в минус, кэш сходится.
+    """
+    from rest_framework.exceptions import ValidationError
+    from apps.orders.logic.pay_order import pay_order
+    from apps.orders.models import Order, OrderItem
+
+    threads_n, orders_per_thread = 8, 6
+    org = org_factory(name="Stress Shard Org")
+    product = _shard(org, stock="30", shards=4)
+    plans = [[_order(org, [(product, "1")]) for _ in range(orders_per_thread)] for _ in range(threads_n)]
+
+    errors, rejected = [], []
+    barrier = threading.Barrier(threads_n)
+
+    def cashier(orders):
+        try:
+            barrier.wait()
+            for order in orders:
+                try:
+                    pay_order(order=order)
+                except ValidationError:
+                    rejected.append(order.pk)
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=cashier, args=(orders,)) for orders in plans]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+
+    assert errors == []
+    sold = OrderItem.objects.filter(product=product, order__status=Order.STATUS_PAID).count()
+    assert sold == 30
+    assert len(rejected) == threads_n * orders_per_thread - 30
+    assert _shard_qtys(product) == [Decimal("0.000")] * 4
+
+    call_command("rebalance_stock_shards", "--org", str(org.public_id), stdout=StringIO())
+    product.refresh_from_db()
+    assert product.stock_qty == Decimal("0.000")